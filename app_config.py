@@ -85,7 +85,8 @@ class PathConfig:
         self.messages_to_delete_file: Path = self.data_dir / "messages_to_delete.json"
 
         self.quiz_config_file: Path = self.config_dir / "quiz_config.json"
-        self.persistence_file_name: str = "ptb_persistence.pickle"
+        self.persistence_file_name: str = "ptb_persistence.pickle"  # PicklePersistence, только для переноса
+        self.persistence_db_file_name: str = "ptb_persistence.sqlite3"
 
         logger.debug(f"PathConfig: Пути к файлам определены: questions={self.questions_file}, config={self.quiz_config_file}")
 
@@ -112,6 +113,15 @@ class AppConfig:
         self.bot_token: Optional[str] = os.getenv("BOT_TOKEN")
         logger.debug(f"AppConfig: BOT_TOKEN считан: {'Да' if self.bot_token else 'Нет'}")
 
+        # Режим получения обновлений: polling (по умолчанию) или webhook
+        self.update_mode: str = os.getenv("UPDATE_MODE", "polling").lower()
+        # Публичный HTTPS URL webhook (путь URL совпадает с путем на встроенном сервере)
+        self.webhook_url: Optional[str] = os.getenv("WEBHOOK_URL")
+        # Секрет заголовка X-Telegram-Bot-Api-Secret-Token (если не задан - генерируется при запуске)
+        self.webhook_secret_token: Optional[str] = os.getenv("WEBHOOK_SECRET_TOKEN")
+        self.webhook_listen: str = os.getenv("WEBHOOK_LISTEN", "127.0.0.1")
+        self.webhook_port: int = int(os.getenv("WEBHOOK_PORT", "8081"))
+
         # Получаем режим работы из переменной окружения
         mode = os.getenv("MODE", "production").lower()
         self.debug_mode: bool = mode == "testing"
@@ -166,6 +176,27 @@ class AppConfig:
         # Rate limiting для API вызовов (запросов в минуту)
         self.api_rate_limit_per_minute: int = self.global_settings.get("api_rate_limit_per_minute", 30)
 
+        # Количество процессов для валидации файлов вопросов (0 - по числу CPU)
+        self.question_validation_workers: int = self.global_settings.get("question_validation_workers", 0)
+
+        # Окно, на которое разносятся ежедневные викторины с одинаковым временем запуска (секунды)
+        self.daily_quiz_fanout_window_seconds: int = self.global_settings.get("daily_quiz_fanout_window_seconds", 60)
+
+        # За сколько секунд до запуска подбирать вопросы для ежедневной викторины
+        self.daily_quiz_fanout_lead_seconds: int = self.global_settings.get("daily_quiz_fanout_lead_seconds", 30)
+
+        # Через сколько секунд после закрытия опрос брошенной сессии вытесняется из current_polls
+        self.poll_registry_grace_seconds: int = self.global_settings.get("poll_registry_grace_seconds", 600)
+
+        # Емкость очереди обновлений в режиме webhook (при переполнении Telegram получает 503 и повторяет доставку)
+        self.webhook_queue_size: int = self.global_settings.get("webhook_queue_size", 1000)
+
+        # Общий бюджет времени на остановку приема, дообработку и сброс хранилищ (секунды)
+        self.shutdown_deadline_seconds: float = self.global_settings.get("shutdown_deadline_seconds", 8)
+
+        # Как часто бот пишет измененные представления аналитики для веб-панели (секунды)
+        self.analytics_views_flush_seconds: int = self.global_settings.get("analytics_views_flush_seconds", 30)
+
         logger.debug("AppConfig: Глобальные параметры и оптимизации CPU установлены.")
 
         self.parsed_chat_achievements: Dict[int, str] = self._parse_achievement_messages(
@@ -195,6 +226,7 @@ class AppConfig:
 
         self.data_dir: Path = self.paths.data_dir
         self.persistence_file_name: str = self.paths.persistence_file_name
+        self.persistence_db_file_name: str = self.paths.persistence_db_file_name
         
         # Контакт поддержки
         self.support_contact: str = self.global_settings.get("support_contact", "@Ilzrd")
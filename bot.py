@@ -3,16 +3,19 @@ import logging
 import logging.handlers
 import asyncio
 import os
+import secrets
 import sys
 import subprocess
+import time
 from typing import Optional
 from pathlib import Path
 from datetime import datetime
+from urllib.parse import urlparse
 
 from telegram import Update
 from telegram.ext import (
     Application, CommandHandler, MessageHandler,
-    CallbackQueryHandler, ContextTypes, PicklePersistence, ConversationHandler,
+    CallbackQueryHandler, ContextTypes, ConversationHandler,
     Defaults, filters
 )
 from telegram.constants import ParseMode
@@ -30,6 +33,14 @@ from modules.category_manager import CategoryManager
 from modules.score_manager import ScoreManager
 from modules.photo_quiz_manager import PhotoQuizManager
 from modules.bot_commands_setup import setup_bot_commands
+from modules.webhook_server import DEFAULT_WEBHOOK_PATH, WebhookIngress, WebhookServer
+from modules.incremental_persistence import RUNTIME_BOT_DATA_KEYS, BotData, IncrementalPersistence
+from modules.analytics_views import REBUILD_INTERVAL_SECONDS as ANALYTICS_VIEWS_REBUILD_INTERVAL_SECONDS
+from modules.admin_broadcast import POLL_INTERVAL_SECONDS as ADMIN_BROADCAST_POLL_SECONDS
+from modules.quiz_actors import METRICS_LOG_INTERVAL_SECONDS as QUIZ_ACTOR_METRICS_INTERVAL_SECONDS
+from modules.admin_broadcast import BROADCASTS_DIR_NAME, AdminBroadcastQueue, deliver_pending_broadcasts
+from modules.job_registry import get_job_registry
+from modules.shutdown_coordinator import PRIORITY_CLOSE, PRIORITY_DRAIN, PRIORITY_STOP_INTAKE, get_shutdown_coordinator
 from backup_manager import BackupManager
 
 # Обработчики команд и колбэков
@@ -227,12 +238,14 @@ def check_and_kill_duplicate_bots() -> None:
 
 
 async def autosave_messages_callback(context: ContextTypes.DEFAULT_TYPE) -> None:
-    """Периодическое автосохранение сообщений для удаления"""
+    """Периодическое сжатие журнала сообщений для удаления и сохранение таймеров"""
     try:
         data_manager = context.bot_data.get('data_manager')
         if data_manager:
-            data_manager.save_messages_to_delete()
-            logger.info("💾 Периодическое автосохранение сообщений для удаления выполнено")
+            # Изменения списка уже в журнале; снимок переписывается, только если журнал разросся
+            compacted = await data_manager.compact_messages_to_delete()
+            data_manager.save_deletion_timers()
+            logger.info(f"💾 Периодическое автосохранение сообщений для удаления выполнено (сжатие журнала: {'да' if compacted else 'не требуется'})")
         else:
             logger.warning("⚠️ data_manager не найден в bot_data для автосохранения")
     except Exception as e:
@@ -242,36 +255,121 @@ async def autosave_messages_callback(context: ContextTypes.DEFAULT_TYPE) -> None
 def schedule_autosave_job(job_queue, data_manager) -> None:
     """Планирует периодическое автосохранение сообщений для удаления"""
     try:
-        job_name = "autosave_messages_to_delete"
-
-        # Удаляем старую задачу если есть
-        existing_jobs = job_queue.get_jobs_by_name(job_name)
-        for job in existing_jobs:
-            job.schedule_removal()
-
-        # Создаем новую задачу
-        job_queue.run_repeating(
+        # Задача с тем же именем (после перезапуска) заменяется реестром
+        get_job_registry(job_queue).run_repeating(
             autosave_messages_callback,
             interval=timedelta(minutes=15),
             first=timedelta(minutes=15),
-            name=job_name
+            name="autosave_messages_to_delete"
         )
-        logger.info("📅 Запланировано периодическое автосохранение сообщений (каждые 15 минут)")
+        logger.info("📅 Запланировано периодическое сжатие журнала сообщений для удаления (каждые 15 минут)")
     except Exception as e:
         logger.error(f"❌ Ошибка планирования автосохранения: {e}")
 
 
-async def save_state_on_shutdown(application: Application) -> None:
-    """Сохранение состояния при остановке бота"""
+async def flush_analytics_views_callback(context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Запись измененных представлений аналитики и периодическая пересборка для исправления расхождений"""
+    data_manager = context.bot_data.get('data_manager')
+    if not data_manager:
+        return
     try:
-        data_manager = application.bot_data.get('data_manager')
-        if data_manager:
-            data_manager.save_messages_to_delete()
-            logger.info("💾 Сообщения для удаления сохранены при shutdown")
+        job_data = context.job.data
+        if time.monotonic() - job_data["last_rebuild"] >= ANALYTICS_VIEWS_REBUILD_INTERVAL_SECONDS:
+            # Очки меняются и в обход ответов (сброс статистики, правки из веб-панели)
+            data_manager.rebuild_analytics_views()
+            job_data["last_rebuild"] = time.monotonic()
+        data_manager.flush_analytics_views()
+    except Exception as e:
+        logger.error(f"❌ Ошибка записи представлений аналитики: {e}")
+
+
+def schedule_analytics_views_job(job_queue, app_config: AppConfig) -> None:
+    """Планирует запись представлений аналитики для веб-панели"""
+    interval = app_config.analytics_views_flush_seconds
+    get_job_registry(job_queue).run_repeating(
+        flush_analytics_views_callback,
+        interval=interval,
+        first=1,
+        name="flush_analytics_views",
+        data={"last_rebuild": time.monotonic()},
+    )
+    logger.info(f"📅 Запланирована запись представлений аналитики (каждые {interval} сек)")
+
+
+async def deliver_admin_broadcasts_callback(context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Отправка рассылок, поставленных в очередь веб-панелью"""
+    queue: AdminBroadcastQueue = context.job.data
+    try:
+        await deliver_pending_broadcasts(queue, context.bot)
+        queue.cleanup()
+    except Exception as e:
+        logger.error(f"❌ Ошибка отправки рассылок админа: {e}")
+
+
+def schedule_admin_broadcasts_job(job_queue, data_manager) -> None:
+    """Планирует проверку очереди рассылок админа"""
+    queue = AdminBroadcastQueue(data_manager.system_dir / BROADCASTS_DIR_NAME)
+    get_job_registry(job_queue).run_repeating(
+        deliver_admin_broadcasts_callback,
+        interval=ADMIN_BROADCAST_POLL_SECONDS,
+        first=ADMIN_BROADCAST_POLL_SECONDS,
+        name="deliver_admin_broadcasts",
+        data=queue,
+    )
+    logger.info(f"📅 Запланирована отправка рассылок админа из очереди (каждые {ADMIN_BROADCAST_POLL_SECONDS:.0f} сек)")
+
+
+async def log_quiz_actor_metrics_callback(context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Периодическая запись метрик акторов викторин (глубина ящиков, ожидание, ошибки)"""
+    job_data = context.job.data
+    try:
+        metrics = job_data["quiz_manager"].get_actor_metrics()
+        # Без новых событий метрики не меняются - не засоряем лог
+        if metrics["processed_total"] != job_data["last_processed"] or metrics["mailbox_depth"]:
+            logger.info(f"📊 Акторы викторин: {metrics}")
         else:
-            logger.warning("⚠️ data_manager не найден в bot_data при shutdown")
+            logger.debug(f"📊 Акторы викторин без новых событий: {metrics}")
+        job_data["last_processed"] = metrics["processed_total"]
     except Exception as e:
-        logger.error(f"❌ Ошибка сохранения при shutdown: {e}")
+        logger.error(f"❌ Ошибка записи метрик акторов викторин: {e}")
+
+
+def schedule_quiz_actor_metrics_job(job_queue, quiz_manager) -> None:
+    """Планирует периодическую запись метрик акторов викторин"""
+    get_job_registry(job_queue).run_repeating(
+        log_quiz_actor_metrics_callback,
+        interval=QUIZ_ACTOR_METRICS_INTERVAL_SECONDS,
+        first=QUIZ_ACTOR_METRICS_INTERVAL_SECONDS,
+        name="log_quiz_actor_metrics",
+        data={"quiz_manager": quiz_manager, "last_processed": 0},
+    )
+    logger.info(f"📅 Запланирована запись метрик акторов викторин (каждые {QUIZ_ACTOR_METRICS_INTERVAL_SECONDS} сек)")
+
+
+async def start_webhook_mode(application: Application, app_config: AppConfig) -> WebhookServer:
+    """
+    Запускает встроенный webhook-сервер и регистрирует webhook в Telegram.
+    Обновления попадают в ограниченную очередь обновлений Application.
+    """
+    secret_token = app_config.webhook_secret_token or secrets.token_urlsafe(32)
+    webhook_path = urlparse(app_config.webhook_url).path or DEFAULT_WEBHOOK_PATH
+    ingress = WebhookIngress(
+        application.update_queue,
+        decode=lambda data: Update.de_json(data, application.bot),
+        secret_token=secret_token,
+        webhook_path=webhook_path
+    )
+    webhook_server = WebhookServer(ingress, host=app_config.webhook_listen, port=app_config.webhook_port)
+    await webhook_server.start()
+    # Webhook при остановке не удаляется: пока бот выключен, Telegram копит обновления
+    await application.bot.set_webhook(
+        url=app_config.webhook_url,
+        secret_token=secret_token,
+        allowed_updates=Update.ALL_TYPES,
+        drop_pending_updates=False
+    )
+    logger.info(f"Webhook зарегистрирован: {app_config.webhook_url}")
+    return webhook_server
 
 
 async def main() -> None:
@@ -292,14 +390,21 @@ async def main() -> None:
     
     application_instance: Optional[Application] = None # Переименовано для ясности
     data_manager_instance: Optional[DataManager] = None
+    webhook_server: Optional[WebhookServer] = None
+    shutdown = get_shutdown_coordinator()
 
     try:
+        shutdown.install_signal_handlers()
         logger.debug("Загрузка конфигурации из AppConfig...")
         app_config = AppConfig()
         if not app_config.bot_token:
             logger.critical("Токен бота не найден. Укажите BOT_TOKEN в .env или конфигурации.")
             return
+        if app_config.update_mode == "webhook" and not app_config.webhook_url:
+            logger.critical("UPDATE_MODE=webhook, но WEBHOOK_URL не задан. Укажите публичный URL webhook в .env.")
+            return
         logger.debug(f"AppConfig инициализирован. Режим отладки: {app_config.debug_mode}")
+        shutdown.total_deadline = app_config.shutdown_deadline_seconds
         
         # Обновляем уровень логирования на основе конфигурации
         update_logging_level(app_config)
@@ -315,6 +420,7 @@ async def main() -> None:
         category_manager = CategoryManager(state=bot_state, app_config=app_config, data_manager=data_manager)
         # Добавляем category_manager в data_manager для доступа при завершении работы
         data_manager.category_manager = category_manager
+        data_manager.rebuild_analytics_views()
         score_manager = ScoreManager(app_config=app_config, state=bot_state, data_manager=data_manager)
         
         # Инициализируем PhotoQuizManager
@@ -323,16 +429,21 @@ async def main() -> None:
         # Инициализируем BackupManager
         backup_manager = BackupManager(project_root=Path.cwd())
 
-        persistence_path = os.path.join(app_config.data_dir, app_config.persistence_file_name)
-        persistence = PicklePersistence(filepath=persistence_path)
+        # Построчная persistence: пишутся только изменившиеся записи, данные чатов читаются по обращению
+        persistence = IncrementalPersistence(
+            filepath=Path(app_config.data_dir) / app_config.persistence_db_file_name,
+            legacy_pickle_path=Path(app_config.data_dir) / app_config.persistence_file_name
+        )
         defaults = Defaults(parse_mode=ParseMode.MARKDOWN_V2)
 
         # HTTPXRequest с таймаутами под RU→EU маршруты (СПб → Amsterdam Telegram DC)
         # С 30.12.2025 маршрутизация стала критически медленной для send_poll()
         # send_poll() обработка: +8-15с + Peak нагрузка: +3-7с = нужны 60с таймауты
-        from telegram.request import HTTPXRequest
-        
-        request = HTTPXRequest(
+        # ScheduledHTTPXRequest: прямые вызовы context.bot.* тоже проходят через общий планировщик
+        from modules.request_scheduler import ScheduledHTTPXRequest, get_request_scheduler
+
+        request = ScheduledHTTPXRequest(
+            scheduler=get_request_scheduler(),
             read_timeout=60.0,       # Восстановлено: критично для send_poll() при RU→EU маршрутизации
             write_timeout=45.0,      # Восстановлено: для больших запросов (polls с опциями)
             connect_timeout=20.0,    # Восстановлено: подключение через VPN/прокси может быть медленным
@@ -345,10 +456,18 @@ async def main() -> None:
             Application.builder()
             .token(app_config.bot_token)
             .persistence(persistence)
+            .context_types(ContextTypes(bot_data=BotData))
             .defaults(defaults)
             .concurrent_updates(True)
             .request(request)
         )
+        if app_config.update_mode == "webhook":
+            # Обновления принимает встроенный сервер; ограниченная очередь дает backpressure
+            application_builder = (
+                application_builder
+                .updater(None)
+                .update_queue(asyncio.Queue(maxsize=app_config.webhook_queue_size))
+            )
         application_instance = application_builder.build() # Присваиваем созданный application
         logger.info("Объект Application создан.")
 
@@ -390,6 +509,31 @@ async def main() -> None:
         if hasattr(config_handlers, 'set_wisdom_scheduler'):
             config_handlers.set_wisdom_scheduler(wisdom_scheduler)
 
+        # ===== ХУКИ ОСТАНОВКИ =====
+        # Порядок: прием обновлений -> дообработка обновлений, задач и событий викторин -> сброс хранилищ -> persistence
+        async def stop_intake() -> None:
+            if webhook_server:
+                await webhook_server.stop()
+            if application_instance.updater and application_instance.updater.running:
+                await application_instance.updater.stop()
+
+        async def stop_application() -> None:
+            # Application.stop() дожидается обработки принятых обновлений и выполняющихся задач
+            if application_instance.running:
+                await application_instance.stop()
+
+        async def drain_quiz_actors() -> None:
+            if not await quiz_manager.actors.drain():
+                raise RuntimeError("остались необработанные события викторин")
+            logger.info(f"События викторин дообработаны: {quiz_manager.get_actor_metrics()}")
+
+        shutdown.register("update_intake", stop_intake, priority=PRIORITY_STOP_INTAKE)
+        shutdown.register("ptb_application", stop_application, priority=PRIORITY_DRAIN, parallel=False)
+        shutdown.register("quiz_actors", drain_quiz_actors, priority=PRIORITY_DRAIN, deadline=3.0, parallel=False)
+        data_manager.register_flush_hooks(shutdown)
+        # Application.shutdown() сбрасывает persistence (bot_data, chat_data, user_data)
+        shutdown.register("ptb_persistence", application_instance.shutdown, priority=PRIORITY_CLOSE)
+
         # Инициализируем BackupHandlers
         backup_handlers = BackupHandlers(app_config=app_config, backup_manager=backup_manager)
         
@@ -424,12 +568,9 @@ async def main() -> None:
             # Очищаем устаревшие викторины
             data_manager.cleanup_stale_quizzes()
 
-            # Восстанавливаем актуальные викторины
+            # Восстанавливаем актуальные викторины (снимок + журнал каждой сессии)
             await quiz_manager.restore_all_active_quizzes()
 
-            # Настраиваем автоматическое сохранение викторин
-            quiz_manager.schedule_quiz_auto_save()
-
             logger.info("✅ Система восстановления викторин инициализирована")
 
         except Exception as e:
@@ -476,15 +617,24 @@ async def main() -> None:
         # Устанавливаем команды бота ДО запуска (правильный порядок для python-telegram-bot 21.7 и Telegram Bot API 9.2)
         await setup_bot_commands(application_instance, app_config)
 
+        # initialize() заменяет bot_data данными persistence, служебные объекты возвращаем после него
+        runtime_bot_data = {
+            key: value for key, value in application_instance.bot_data.items() if key in RUNTIME_BOT_DATA_KEYS
+        }
         # Инициализируем Application перед запуском (требуется для python-telegram-bot 21.7)
         await application_instance.initialize()
+        application_instance.bot_data.update(runtime_bot_data)
         
         # Запускаем планировщики после инициализации
         await daily_quiz_scheduler.schedule_all_daily_quizzes_from_startup()
         wisdom_scheduler.schedule_all_wisdoms_from_startup()
         wisdom_scheduler.start()
 
-        if application_instance.updater:
+        if app_config.update_mode == "webhook":
+            logger.info(f"Запуск бота (webhook) с уровнем логирования: {logging.getLevelName(logger.getEffectiveLevel())}")
+            await application_instance.start()
+            webhook_server = await start_webhook_mode(application_instance, app_config)
+        elif application_instance.updater:
             logger.info(f"Запуск бота (polling) с уровнем логирования: {logging.getLevelName(logger.getEffectiveLevel())}")
             await application_instance.updater.start_polling(
                 allowed_updates=Update.ALL_TYPES,
@@ -493,22 +643,31 @@ async def main() -> None:
                 drop_pending_updates=False  # Не пропускаем накопленные обновления
             )
             await application_instance.start()
-            
-            # Добавляем data_manager в bot_data после start() (на случай, если bot_data очищается)
-            application_instance.bot_data['data_manager'] = data_manager
-            logger.debug(f"🔧 data_manager добавлен в bot_data после start(): {data_manager}")
-            logger.debug(f"🔧 Доступные ключи в bot_data после start(): {list(application_instance.bot_data.keys())}")
-            
-            schedule_cleanup_job(application_instance.job_queue, bot_state)
-            schedule_autosave_job(application_instance.job_queue, data_manager)
-            logger.info("Бот запущен и готов принимать обновления.")
-            while application_instance.updater.running:
-                await asyncio.sleep(1)
-            logger.info("Updater остановлен (внутри main).")
         else:
             logger.error("Updater не был создан. Бот не может быть запущен.")
             return
 
+        # Добавляем data_manager в bot_data после start() (на случай, если bot_data очищается)
+        application_instance.bot_data['data_manager'] = data_manager
+        logger.debug(f"🔧 data_manager добавлен в bot_data после start(): {data_manager}")
+        logger.debug(f"🔧 Доступные ключи в bot_data после start(): {list(application_instance.bot_data.keys())}")
+
+        schedule_cleanup_job(application_instance.job_queue, bot_state)
+        bot_state.start_deletion_timer_driver()
+        bot_state.start_poll_eviction_job()
+        schedule_autosave_job(application_instance.job_queue, data_manager)
+        schedule_analytics_views_job(application_instance.job_queue, app_config)
+        schedule_admin_broadcasts_job(application_instance.job_queue, data_manager)
+        schedule_quiz_actor_metrics_job(application_instance.job_queue, quiz_manager)
+        logger.info("Бот запущен и готов принимать обновления.")
+        while not await shutdown.wait(timeout=1.0):
+            if webhook_server and not webhook_server.running:
+                logger.info("Webhook-сервер остановлен (внутри main).")
+                break
+            if not webhook_server and not application_instance.updater.running:
+                logger.info("Updater остановлен (внутри main).")
+                break
+
     except (KeyboardInterrupt, SystemExit):
         logger.info("Программа прервана (KeyboardInterrupt/SystemExit в main).")
     except Exception as e:
@@ -516,32 +675,18 @@ async def main() -> None:
     finally:
         logger.info("Блок finally в main() начал выполнение.")
 
-        # Сохраняем состояние перед остановкой
-        if application_instance:
-            await save_state_on_shutdown(application_instance)
-
-        if application_instance: # Используем application_instance
-            if application_instance.updater and application_instance.updater.running:
-                logger.info("Остановка Updater в main().finally...")
-                await application_instance.updater.stop()
-                logger.info("Updater остановлен в main().finally.")
-
-            # Проверяем, запущен ли диспетчер более безопасным способом
-            try:
-                if hasattr(application_instance, 'running') and application_instance.running:
-                    logger.info("Остановка Application в main().finally...")
-                    await application_instance.stop()
-                    logger.info("Application остановлен в main().finally.")
-            except Exception as e:
-                logger.warning(f"Ошибка при остановке Application: {e}")
+        # Остановка приема, дообработка и сброс всех хранилищ с дедлайнами
+        await shutdown.run()
 
-            logger.info("Запуск Application.shutdown() в main().finally...")
+        if data_manager_instance and not shutdown.is_registered("user_scores"):
+            # Запуск прервался после загрузки данных, но до регистрации хуков сброса
+            logger.info("Хуки сброса не зарегистрированы, сохранение данных DataManager в main().finally...")
             try:
-                await application_instance.shutdown()
-                logger.info("Application.shutdown() завершен в main().finally.")
+                data_manager_instance.save_all_data()
             except Exception as e:
-                logger.warning(f"Ошибка при shutdown Application: {e}")
+                logger.error(f"❌ Ошибка сохранения данных DataManager в main().finally: {e}", exc_info=True)
 
+        if application_instance: # Используем application_instance
             # Останавливаем планировщик мудрости дня
             if 'wisdom_scheduler' in application_instance.bot_data:
                 try:
@@ -554,17 +699,6 @@ async def main() -> None:
             logger.warning("Экземпляр Application не был создан, пропуск шагов остановки PTB в main().finally.")
 
         if data_manager_instance:
-            # Сохраняем активные викторины перед завершением работы
-            logger.info("💾 Сохранение активных викторин перед завершением...")
-            try:
-                if hasattr(data_manager_instance, 'save_active_quizzes'):
-                    data_manager_instance.save_active_quizzes()
-                    logger.info("✅ Активные викторины сохранены перед завершением")
-                else:
-                    logger.warning("Метод save_active_quizzes не найден в data_manager")
-            except Exception as e:
-                logger.warning(f"❌ Ошибка при сохранении активных викторин: {e}")
-
             # Включаем режим обслуживания при остановке бота
             logger.info("🔧 Включение режима обслуживания при остановке бота...")
             try:
@@ -576,22 +710,8 @@ async def main() -> None:
             except Exception as e:
                 logger.warning(f"❌ Ошибка при включении режима обслуживания: {e}")
 
-            logger.info("Сохранение данных DataManager в main().finally...")
-            data_manager_instance.save_all_data()
-            logger.info("Данные DataManager сохранены в main().finally.")
-            
-            # Сохраняем статистику категорий
-            try:
-                if hasattr(data_manager_instance, 'category_manager'):
-                    logger.info("Сохранение статистики категорий в main().finally...")
-                    data_manager_instance.category_manager.force_save_all_stats()
-                    logger.info("Статистика категорий сохранена в main().finally.")
-                else:
-                    logger.debug("category_manager не доступен в data_manager")
-            except Exception as e:
-                logger.warning(f"Не удалось сохранить статистику категорий: {e}")
         else:
-            logger.warning("Экземпляр DataManager не был создан, пропуск сохранения данных в main().finally.")
+            logger.warning("Экземпляр DataManager не был создан, пропуск включения режима обслуживания в main().finally.")
         
         # Удаляем PID файл при завершении
         pid_file = Path("bot.pid")
@@ -6,14 +6,24 @@ import asyncio
 from pathlib import Path
 from typing import Dict, Any, List, Set, Optional, TYPE_CHECKING
 import re
+import time
 from datetime import datetime
 from concurrent.futures import ThreadPoolExecutor
 import aiofiles
 from modules.logger_config import get_logger
+from modules.poll_payload import PollPayload, build_poll_payload
+from modules.quiz_journal import EVENT_FINALIZED, EVENT_MESSAGES, EVENT_SCORE, JOURNAL_DIR_NAME, QuizJournal
+from modules.deletion_log import DeletionLog, snapshot_payload
+from modules.analytics_views import VIEWS_DIR_NAME, AnalyticsViews
+from modules.atomic_io import write_json_atomic
+from modules.question_validation import (
+    FileValidationResult, build_validation_report, iter_validate_question_files
+)
 
 if TYPE_CHECKING:
     from app_config import AppConfig
-    from state import BotState
+    from state import BotState, QuizState
+    from modules.shutdown_coordinator import ShutdownCoordinator
 
 logger = get_logger(__name__)
 
@@ -43,6 +53,14 @@ class DataManager:
         
         # Создаем папки, если их нет
         self._ensure_directories()
+
+        # Снимки и журналы активных викторин
+        self.quiz_journal = QuizJournal(Path(self.app_config.data_dir) / JOURNAL_DIR_NAME)
+        # Снимок и журнал сообщений на удаление
+        self.deletion_log = DeletionLog(self.system_dir / "messages_to_delete.json", self.system_dir / "messages_to_delete.log")
+        self._deletion_compaction_running = False
+        # Материализованные представления аналитики для веб-панели
+        self.analytics_views = AnalyticsViews(self.statistics_dir / VIEWS_DIR_NAME)
         
         # Паттерн для символов, которые могут вызвать проблемы в Telegram
         self._problematic_chars_pattern = re.compile(r'[_\*\\[\\]\\(\\)\~\\`\\>\\#\\+\\-\=\\|\\{\\}\\.\\!]')
@@ -336,78 +354,97 @@ class DataManager:
         return scores_data
 
     def load_questions(self) -> None:
-        """Загружает вопросы из консолидированной структуры (по категориям)"""
+        """
+        Загружает вопросы из консолидированной структуры (по категориям).
+        Файлы валидируются параллельно (modules/question_validation.py),
+        отчёт с временем по каждому файлу пишется в system/validation_report.json.
+        """
         logger.debug("Загрузка вопросов из консолидированной структуры...")
         processed_questions_count = 0
         valid_categories_count = 0
         malformed_entries: List[Dict[str, Any]] = []
+        validation_results: List[FileValidationResult] = []
         temp_quiz_data: Dict[str, List[Dict[str, Any]]] = {}
+        temp_poll_payloads: Dict[str, PollPayload] = {}
+        temp_questions_by_id: Dict[str, Dict[str, Any]] = {}
+        max_option_length = self.app_config.max_poll_option_length
+        workers = self.app_config.question_validation_workers
         
         try:
-            # Загружаем вопросы из каждой категории
-            for category_file in self.questions_dir.glob("*.json"):
-                category_name = category_file.stem
-                try:
-                    with open(category_file, 'r', encoding='utf-8') as f:
-                        questions_list = json.load(f)
-                    
-                    if isinstance(questions_list, list):
-                        valid_questions = []
-                        for i, question in enumerate(questions_list):
-                            if isinstance(question, dict) and 'question' in question:
-                                # Создаем поле correct_option_text из correct для совместимости
-                                if 'correct' in question and 'correct_option_text' not in question:
-                                    question['correct_option_text'] = question['correct']
-                                # Добавляем поле категории для корректного обновления статистики
-                                question['original_category'] = category_name
-                                valid_questions.append(question)
-                            else:
-                                malformed_entries.append({
-                                    "error_type": "invalid_question",
-                                    "category": category_name,
-                                    "data": question
-                                })
-                        
-                        if valid_questions:
-                            temp_quiz_data[category_name] = valid_questions
-                            processed_questions_count += len(valid_questions)
-                            valid_categories_count += 1
-                            logger.debug(f"Категория '{category_name}': {len(valid_questions)} вопросов")
-                        else:
-                            logger.warning(f"Категория '{category_name}' не содержит валидных вопросов")
-                    else:
-                        logger.error(f"Файл категории {category_name} должен содержать список вопросов")
-                        malformed_entries.append({
-                            "error_type": "category_not_list",
-                            "category": category_name,
-                            "data": questions_list
-                        })
-                        
-                except Exception as e:
-                    logger.error(f"Ошибка загрузки категории {category_name}: {e}")
-                    malformed_entries.append({
-                        "error_type": "load_error",
-                        "category": category_name,
-                        "error": str(e)
-                    })
-            
-            # Сохраняем малформированные вопросы
-            if malformed_entries:
-                self._save_malformed_questions(malformed_entries)
+            started = time.perf_counter()
+            category_files = sorted(self.questions_dir.glob("*.json"))
+            for result in iter_validate_question_files(category_files, workers=workers):
+                validation_results.append(result)
+                category_name = result.category
+                malformed_entries.extend(result.malformed)
+                if result.malformed and result.malformed[0]["error_type"] != "invalid_question":
+                    logger.error(f"Ошибка загрузки категории {category_name}: {result.malformed[0].get('error_type')}")
+                    continue
+                if result.warnings_count:
+                    logger.debug(f"Категория '{category_name}': {result.warnings_count} вопросов с предупреждениями валидатора")
+
+                if result.questions:
+                    # Предвычисляем не зависящие от чата данные опроса
+                    for question in result.questions:
+                        question_id = question['question_id']
+                        temp_questions_by_id.setdefault(question_id, question)
+                        if question_id not in temp_poll_payloads:
+                            temp_poll_payloads[question_id] = build_poll_payload(
+                                question, question_id, max_option_length, self._sanitize_text_for_telegram
+                            )
+                    temp_quiz_data[category_name] = result.questions
+                    processed_questions_count += len(result.questions)
+                    valid_categories_count += 1
+                    logger.debug(f"Категория '{category_name}': {len(result.questions)} вопросов ({result.duration_ms:.1f} мс)")
+                else:
+                    logger.warning(f"Категория '{category_name}' не содержит валидных вопросов")
+
+            total_duration_ms = (time.perf_counter() - started) * 1000
+            self._save_validation_report(validation_results, total_duration_ms, workers)
+
+            fixed_categories = sorted(r.category for r in validation_results if r.auto_fixed)
+            if fixed_categories:
+                logger.info(f"Автоматически исправлено {len(fixed_categories)} файлов: {', '.join(fixed_categories)}")
+                self._notify_developer_about_auto_fix(fixed_categories)
+
+            # Сохраняем малформированные вопросы (записи проверенных категорий заменяются)
+            self._save_malformed_questions(malformed_entries, [r.category for r in validation_results])
             
             self.state.quiz_data = temp_quiz_data
-            logger.info(f"Вопросы загружены: {valid_categories_count} категорий, {processed_questions_count} вопросов")
+            self.state.poll_payloads = temp_poll_payloads
+            self.state.questions_by_id = temp_questions_by_id
+            logger.info(
+                f"Вопросы загружены: {valid_categories_count} категорий, {processed_questions_count} вопросов "
+                f"за {total_duration_ms:.0f} мс"
+            )
             
             # Автоматически обновляем global/categories.json
-            self._update_categories_file(temp_quiz_data)
+            self._update_categories_file(temp_quiz_data, {r.category: r for r in validation_results})
             
         except Exception as e:
             logger.error(f"Критическая ошибка при загрузке вопросов: {e}", exc_info=True)
 
-    def _save_malformed_questions(self, malformed_entries: List[Dict[str, Any]]) -> None:
-        """Сохраняет малформированные вопросы и пытается их исправить"""
+    def _save_validation_report(
+        self, results: List[FileValidationResult], total_duration_ms: float, workers: int
+    ) -> None:
+        """Атомарно сохраняет машинно-читаемый отчёт о валидации вопросов"""
+        try:
+            report = build_validation_report(results, total_duration_ms, workers)
+            write_json_atomic(self.system_dir / "validation_report.json", report)
+        except Exception as e:
+            logger.error(f"Ошибка сохранения отчёта валидации: {e}")
+
+    def _save_malformed_questions(
+        self, malformed_entries: List[Dict[str, Any]], validated_categories: Optional[List[str]] = None
+    ) -> None:
+        """
+        Сохраняет малформированные вопросы.
+        Записи категорий из validated_categories заменяются свежими результатами:
+        исправленные файлы автоматически пропадают из списка.
+        """
         try:
             malformed_file = self.system_dir / "malformed_questions.json"
+            validated = set(validated_categories or [])
             
             # Загружаем существующие проблемные записи
             existing_malformed = []
@@ -417,6 +454,7 @@ class DataManager:
                         existing_malformed = json.load(f)
                 except Exception:
                     existing_malformed = []
+            existing_malformed = [e for e in existing_malformed if e.get("category") not in validated]
             
             # Объединяем с новыми проблемами
             all_malformed = existing_malformed + malformed_entries
@@ -430,91 +468,33 @@ class DataManager:
                     unique_malformed.append(entry)
                     seen_categories.add(category)
             
+            if not unique_malformed and not malformed_file.exists():
+                return
+
             # Сохраняем обновленный список
-            with open(malformed_file, 'w', encoding='utf-8') as f:
-                json.dump(unique_malformed, f, ensure_ascii=False, indent=2)
+            write_json_atomic(malformed_file, unique_malformed)
             
-            logger.warning(f"Сохранено {len(unique_malformed)} малформированных записей в {malformed_file}")
+            if unique_malformed:
+                logger.warning(f"Сохранено {len(unique_malformed)} малформированных записей в {malformed_file}")
             
             # Отправляем уведомление разработчику о новых проблемах
-            self._notify_developer_about_malformed(unique_malformed)
-            
-            # Пытаемся автоматически исправить некоторые проблемы
-            self._try_auto_fix_malformed_files(unique_malformed)
+            if malformed_entries:
+                self._notify_developer_about_malformed(unique_malformed)
             
         except Exception as e:
             logger.error(f"Ошибка сохранения малформированных вопросов: {e}")
             # Уведомляем об ошибке сохранения
             self._notify_developer_about_error("save_malformed_error", str(e), "Сохранение малформированных вопросов")
 
-    def _try_auto_fix_malformed_files(self, malformed_entries: List[Dict[str, Any]]) -> None:
-        """Пытается автоматически исправить некоторые проблемы с файлами"""
-        fixed_count = 0
-        fixed_categories = []
-        
-        for entry in malformed_entries:
-            category = entry.get("category")
-            error_type = entry.get("error_type")
-            
-            if error_type == "load_error":
-                category_file = self.questions_dir / f"{category}.json"
-                if category_file.exists():
-                    try:
-                        # Читаем содержимое файла
-                        with open(category_file, 'r', encoding='utf-8') as f:
-                            content = f.read()
-                        
-                        # Убираем лишние пробелы и переносы строк в конце
-                        cleaned_content = content.rstrip()
-                        
-                        # Проверяем, что после очистки файл валиден
-                        json.loads(cleaned_content)
-                        
-                        # Сохраняем исправленный файл
-                        with open(category_file, 'w', encoding='utf-8') as f:
-                            f.write(cleaned_content)
-                        
-                        logger.info(f"Автоматически исправлен файл {category}")
-                        fixed_count += 1
-                        fixed_categories.append(category)
-                        
-                    except Exception as e:
-                        logger.debug(f"Не удалось автоматически исправить {category}: {e}")
-        
-        if fixed_count > 0:
-            logger.info(f"Автоматически исправлено {fixed_count} файлов")
-            # Уведомляем разработчика об успешном исправлении
-            self._notify_developer_about_auto_fix(fixed_categories)
-            # Очищаем список исправленных файлов
-            self._cleanup_fixed_malformed_files(fixed_categories)
-
-    def _cleanup_fixed_malformed_files(self, fixed_categories: List[str]) -> None:
-        """Очищает список исправленных файлов из malformed_questions.json"""
-        try:
-            malformed_file = self.system_dir / "malformed_questions.json"
-            if not malformed_file.exists():
-                return
-            
-            with open(malformed_file, 'r', encoding='utf-8') as f:
-                malformed_entries = json.load(f)
-            
-            # Убираем исправленные категории
-            original_count = len(malformed_entries)
-            malformed_entries = [entry for entry in malformed_entries 
-                               if entry.get("category") not in fixed_categories]
-            
-            if len(malformed_entries) < original_count:
-                # Сохраняем обновленный список
-                with open(malformed_file, 'w', encoding='utf-8') as f:
-                    json.dump(malformed_entries, f, ensure_ascii=False, indent=2)
-                
-                logger.info(f"Очищен список проблемных файлов: {original_count - len(malformed_entries)} исправленных файлов удалено")
-        
-        except Exception as e:
-            logger.error(f"Ошибка очистки списка проблемных файлов: {e}")
-
-    def _update_categories_file(self, quiz_data: Dict[str, List[Dict[str, Any]]]) -> None:
-        """Автоматически обновляет global/categories.json на основе загруженных вопросов"""
+    def _update_categories_file(
+        self,
+        quiz_data: Dict[str, List[Dict[str, Any]]],
+        file_info: Optional[Dict[str, 'FileValidationResult']] = None
+    ) -> None:
+        """
+        Автоматически обновляет global/categories.json на основе загруженных вопросов.
+        Размер и checksum берутся из результатов валидации, если они переданы.
+        """
         try:
             import hashlib
             
@@ -536,15 +516,19 @@ class DataManager:
             for category_name, questions in quiz_data.items():
                 category_file = self.questions_dir / f"{category_name}.json"
                 
-                if category_file.exists():
-                    # Вычисляем новую информацию о категории
-                    file_size = category_file.stat().st_size
+                validation_result = (file_info or {}).get(category_name)
+                if validation_result is not None or category_file.exists():
                     question_count = len(questions)
-                    
-                    # Создаем checksum на основе содержимого файла
-                    with open(category_file, 'r', encoding='utf-8') as f:
-                        content = f.read()
-                        checksum = hashlib.md5(content.encode('utf-8')).hexdigest()
+                    if validation_result is not None:
+                        # Файл уже прочитан при валидации
+                        file_size = validation_result.file_size
+                        checksum = validation_result.checksum
+                    else:
+                        # Вычисляем новую информацию о категории
+                        content_bytes = category_file.read_bytes()
+                        file_size = len(content_bytes)
+                        # Создаем checksum на основе содержимого файла
+                        checksum = hashlib.md5(content_bytes).hexdigest()
                     
                     new_category_info = {
                         "question_count": question_count,
@@ -793,75 +777,84 @@ class DataManager:
             logger.error(f"Критическая ошибка при загрузке настроек чатов: {e}", exc_info=True)
 
     def load_messages_to_delete(self) -> None:
-        """Загружает сообщения для удаления из консолидированной структуры с поддержкой миграции"""
+        """Загружает сообщения для удаления: снимок (с миграцией старого формата) и журнал изменений после него"""
         import time
+        current_time = time.time()
+        max_age_seconds = 24 * 3600  # 24 часа
         try:
-            messages_file = self.system_dir / "messages_to_delete.json"
+            messages_file = self.deletion_log.snapshot_path
             if not messages_file.exists():
                 logger.debug("Файл сообщений для удаления не найден")
-                return
-
-            # Проверка на пустой файл
-            if messages_file.stat().st_size == 0:
+            elif messages_file.stat().st_size == 0:
                 logger.debug("Файл сообщений для удаления пустой, пропускаем загрузку")
-                return
+            else:
+                with open(messages_file, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+                self._load_messages_to_delete_snapshot(data, current_time, max_age_seconds)
+        except json.JSONDecodeError as e:
+            logger.warning(f"Файл messages_to_delete.json поврежден или содержит невалидный JSON: {e}. Пропускаем загрузку снимка.")
+        except Exception as e:
+            logger.error(f"Ошибка загрузки сообщений для удаления: {e}", exc_info=True)
 
-            with open(messages_file, 'r', encoding='utf-8') as f:
-                data = json.load(f)
+        try:
+            applied = self.deletion_log.replay(self.state.generic_messages_to_delete, min_timestamp=current_time - max_age_seconds)
+            if applied:
+                logger.info(f"Применено {applied} записей журнала сообщений для удаления")
+        except Exception as e:
+            logger.error(f"Ошибка чтения журнала сообщений для удаления: {e}", exc_info=True)
 
-            current_time = time.time()
-            max_age_seconds = 24 * 3600  # 24 часа
-            migrated_count = 0
-            filtered_count = 0
+        total_messages = sum(len(msgs) for msgs in self.state.generic_messages_to_delete.values())
+        logger.info(f"Загружено {total_messages} сообщений для удаления из {len(self.state.generic_messages_to_delete)} чатов")
 
-            # Преобразуем данные с миграцией из старого формата
-            for chat_id_str, message_data in data.items():
-                try:
-                    chat_id = int(chat_id_str)
-
-                    # Проверяем формат данных
-                    if isinstance(message_data, list):
-                        # Старый формат: List[int] -> мигрируем в Dict[int, float]
-                        logger.info(f"Миграция из старого формата для чата {chat_id}")
-                        for msg_id in message_data:
-                            # Устанавливаем текущий timestamp для старых сообщений
-                            self.state.generic_messages_to_delete[chat_id][msg_id] = current_time
-                        migrated_count += len(message_data)
-
-                    elif isinstance(message_data, dict):
-                        # Новый формат: Dict[str, float] -> преобразуем ключи в int
-                        for msg_id_str, timestamp in message_data.items():
-                            msg_id = int(msg_id_str)
-                            age = current_time - timestamp
-
-                            # Фильтруем сообщения старше 24 часов
-                            if age <= max_age_seconds:
-                                self.state.generic_messages_to_delete[chat_id][msg_id] = timestamp
-                            else:
-                                filtered_count += 1
-                                logger.debug(f"Фильтрация старого сообщения {msg_id} (возраст: {age/3600:.1f} часов)")
-                    else:
-                        logger.warning(f"Неизвестный формат данных для чата {chat_id}: {type(message_data)}")
+    def _load_messages_to_delete_snapshot(self, data: Dict[str, Any], current_time: float, max_age_seconds: float) -> None:
+        migrated_count = 0
+        filtered_count = 0
 
-                except (ValueError, TypeError) as e:
-                    logger.warning(f"Ошибка преобразования данных для чата {chat_id_str}: {e}")
+        # Преобразуем данные с миграцией из старого формата
+        for chat_id_str, message_data in data.items():
+            try:
+                chat_id = int(chat_id_str)
+
+                # Проверяем формат данных
+                if isinstance(message_data, list):
+                    # Старый формат: List[int] -> мигрируем в Dict[int, float]
+                    logger.info(f"Миграция из старого формата для чата {chat_id}")
+                    for msg_id in message_data:
+                        # Устанавливаем текущий timestamp для старых сообщений
+                        self.state.generic_messages_to_delete[chat_id][msg_id] = current_time
+                    migrated_count += len(message_data)
+
+                elif isinstance(message_data, dict):
+                    # Новый формат: Dict[str, float] -> преобразуем ключи в int
+                    for msg_id_str, timestamp in message_data.items():
+                        msg_id = int(msg_id_str)
+                        age = current_time - timestamp
+
+                        # Фильтруем сообщения старше 24 часов
+                        if age <= max_age_seconds:
+                            self.state.generic_messages_to_delete[chat_id][msg_id] = timestamp
+                        else:
+                            filtered_count += 1
+                            logger.debug(f"Фильтрация старого сообщения {msg_id} (возраст: {age/3600:.1f} часов)")
+                else:
+                    logger.warning(f"Неизвестный формат данных для чата {chat_id}: {type(message_data)}")
 
-            total_messages = sum(len(msgs) for msgs in self.state.generic_messages_to_delete.values())
-            logger.info(f"Загружено {total_messages} сообщений для удаления из {len(self.state.generic_messages_to_delete)} чатов")
-            if migrated_count > 0:
-                logger.info(f"🔄 Мигрировано {migrated_count} сообщений из старого формата")
-            if filtered_count > 0:
-                logger.info(f"🗑️ Отфильтровано {filtered_count} старых сообщений (>24ч)")
+            except (ValueError, TypeError) as e:
+                logger.warning(f"Ошибка преобразования данных для чата {chat_id_str}: {e}")
 
-        except json.JSONDecodeError as e:
-            logger.warning(f"Файл messages_to_delete.json поврежден или содержит невалидный JSON: {e}. Пропускаем загрузку.")
-        except Exception as e:
-            logger.error(f"Ошибка загрузки сообщений для удаления: {e}", exc_info=True)
+        if migrated_count > 0:
+            logger.info(f"🔄 Мигрировано {migrated_count} сообщений из старого формата")
+        if filtered_count > 0:
+            logger.info(f"🗑️ Отфильтровано {filtered_count} старых сообщений (>24ч)")
 
-    def save_user_data(self, chat_id: int) -> None:
+    def save_user_data(self, chat_id: int, update_global: bool = True) -> None:
         """
         Сохраняет данные пользователей чата в консолидированную структуру
         Правильно интегрируется с Telegram Bot API persistence system
+
+        Args:
+            update_global: Пересчитать глобальную статистику (при сохранении всех
+                чатов пересчитывается один раз после цикла)
         """
         try:
             if chat_id not in self.state.user_scores:
@@ -893,9 +886,7 @@ class DataManager:
                     user_data_copy["daily_answered_polls"] = list(user_data_copy["daily_answered_polls"])
                 users_data[user_id] = user_data_copy
             
-            users_file = chat_dir / "users.json"
-            with open(users_file, 'w', encoding='utf-8') as f:
-                json.dump(users_data, f, ensure_ascii=False, indent=2)
+            write_json_atomic(chat_dir / "users.json", users_data)
             
             # Создаем stats.json для синхронизации
             stats_data = {
@@ -919,14 +910,13 @@ class DataManager:
                     "streak_achievements_count": len(user_data.get("streak_achievements_earned", []))
                 }
             
-            stats_file = chat_dir / "stats.json"
-            with open(stats_file, 'w', encoding='utf-8') as f:
-                json.dump(stats_data, f, ensure_ascii=False, indent=2)
+            write_json_atomic(chat_dir / "stats.json", stats_data)
             
             logger.debug(f"Данные пользователей чата {chat_id} сохранены (users.json + stats.json)")
             
             # Обновляем глобальную статистику
-            self.update_global_statistics()
+            if update_global:
+                self.update_global_statistics()
             
         except Exception as e:
             logger.error(f"Ошибка сохранения данных пользователей чата {chat_id}: {e}", exc_info=True)
@@ -1042,36 +1032,136 @@ class DataManager:
             logger.warning(f"Ошибка асинхронного сохранения настроек чата {chat_id}: {e}")
             return False
 
+    def flush_messages_to_delete_log(self) -> int:
+        """Дописывает накопленные изменения списка сообщений для удаления в журнал"""
+        try:
+            return self.deletion_log.flush()
+        except Exception as e:
+            logger.error(f"Ошибка записи журнала сообщений для удаления: {e}", exc_info=True)
+            return 0
+
     def save_messages_to_delete(self) -> None:
-        """Сохраняет сообщения для удаления в консолидированную структуру с timestamp"""
+        """Сжимает журнал сообщений для удаления: пишет снимок текущего списка (синхронно, при остановке)"""
         try:
-            # Преобразуем Dict[int, Dict[int, float]] в JSON-совместимый формат
-            # chat_id (str) -> {message_id (str): timestamp (float)}
-            data_to_save = {}
-            for chat_id, messages_dict in self.state.generic_messages_to_delete.items():
-                data_to_save[str(chat_id)] = {str(msg_id): timestamp for msg_id, timestamp in messages_dict.items()}
+            # Поколение новее любого идущего фонового сжатия: его снимок будет пропущен
+            generation = self.deletion_log.rotate()
+            self.deletion_log.write_snapshot(snapshot_payload(self.state.generic_messages_to_delete), generation)
+            total_messages = sum(len(msgs) for msgs in self.state.generic_messages_to_delete.values())
+            logger.debug(f"Сообщения для удаления сохранены ({len(self.state.generic_messages_to_delete)} чатов, {total_messages} сообщений)")
+        except Exception as e:
+            logger.error(f"Ошибка сохранения сообщений для удаления: {e}", exc_info=True)
 
-            with open(self.system_dir / "messages_to_delete.json", 'w', encoding='utf-8') as f:
-                json.dump(data_to_save, f, ensure_ascii=False, indent=2)
+    async def compact_messages_to_delete(self, force: bool = False) -> bool:
+        """
+        Фоновое сжатие журнала сообщений для удаления: копия списка снимается
+        в цикле событий, снимок пишется в потоке исполнителя.
 
-            total_messages = sum(len(msgs) for msgs in self.state.generic_messages_to_delete.values())
-            logger.debug(f"Сообщения для удаления сохранены ({len(data_to_save)} чатов, {total_messages} сообщений)")
+        Returns:
+            True, если снимок записан
+        """
+        # Буфер дописывается в журнал и тогда, когда сжатие уже идет
+        self.flush_messages_to_delete_log()
+        if self._deletion_compaction_running:
+            return False
+        live_messages = sum(len(msgs) for msgs in self.state.generic_messages_to_delete.values())
+        if not force and not self.deletion_log.needs_compaction(live_messages):
+            return False
+        self._deletion_compaction_running = True
+        try:
+            # Ротация журнала и копия списка - в одном шаге цикла: новые записи попадут в свежий журнал
+            generation = self.deletion_log.rotate()
+            payload = snapshot_payload(self.state.generic_messages_to_delete)
+            if not await self._run_in_executor(self.deletion_log.write_snapshot, payload, generation):
+                # Пока писали, сохранение при остановке записало более новый снимок
+                return False
+            logger.info(f"Журнал сообщений для удаления сжат: {live_messages} сообщений в снимке. {self.deletion_log.get_stats()}")
+            return True
+        except Exception as e:
+            logger.error(f"Ошибка сжатия журнала сообщений для удаления: {e}", exc_info=True)
+            return False
+        finally:
+            self._deletion_compaction_running = False
 
+    def save_deletion_timers(self) -> None:
+        """Сохраняет колесо таймеров отложенного удаления: chat_id -> {message_id: время удаления}"""
+        try:
+            write_json_atomic(self.system_dir / "deletion_timers.json", self.state.deletion_timers.to_dict())
+            logger.debug(f"Таймеры удаления сохранены ({len(self.state.deletion_timers)} сообщений)")
         except Exception as e:
-            logger.error(f"Ошибка сохранения сообщений для удаления: {e}", exc_info=True)
+            logger.error(f"Ошибка сохранения таймеров удаления: {e}", exc_info=True)
+
+    def load_deletion_timers(self) -> None:
+        """Загружает таймеры отложенного удаления; просроченные сработают на первом тике драйвера"""
+        timers_file = self.system_dir / "deletion_timers.json"
+        if not timers_file.exists() or timers_file.stat().st_size == 0:
+            return
+        try:
+            with open(timers_file, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            loaded = self.state.deletion_timers.load(data)
+            logger.info(f"Загружено {loaded} таймеров отложенного удаления сообщений")
+        except json.JSONDecodeError as e:
+            logger.warning(f"Файл deletion_timers.json поврежден: {e}. Пропускаем загрузку.")
+        except Exception as e:
+            logger.error(f"Ошибка загрузки таймеров удаления: {e}", exc_info=True)
 
     def save_all_data(self) -> None:
         """Сохраняет все данные в консолидированную структуру"""
         logger.info("Сохранение всех данных в консолидированную структуру...")
         # Сохраняем данные пользователей для каждого чата
-        for chat_id in self.state.user_scores.keys():
-            self.save_user_data(chat_id)
+        self.save_all_user_data()
 
         # Сохраняем только измененные настройки чатов
         self.save_modified_chat_settings()
         self.save_messages_to_delete()
+        self.save_deletion_timers()
         logger.info("Сохранение всех данных завершено")
 
+    def save_all_user_data(self) -> None:
+        """Сохраняет данные пользователей всех чатов; глобальная статистика пересчитывается один раз"""
+        chat_ids = list(self.state.user_scores.keys())
+        for chat_id in chat_ids:
+            self.save_user_data(chat_id, update_global=False)
+        if chat_ids:
+            self.update_global_statistics()
+
+    def register_flush_hooks(self, coordinator: 'ShutdownCoordinator') -> None:
+        """
+        Регистрирует сброс хранилищ при остановке бота.
+
+        Хранилища с отдельными файлами сбрасываются параллельно. Статистика
+        категорий и очки пользователей пишут общие файлы (statistics/categories_stats.json,
+        categories_stats.json чатов), поэтому сбрасываются по очереди: сначала
+        статистика категорий, затем очки с пересчетом глобальной статистики.
+        """
+        coordinator.register("active_quizzes", self.save_active_quizzes)
+        coordinator.register("messages_to_delete", self.save_messages_to_delete)
+        coordinator.register("deletion_timers", self.save_deletion_timers)
+        coordinator.register("chat_settings", self.save_modified_chat_settings)
+        category_manager = getattr(self, 'category_manager', None)
+        if category_manager:
+            coordinator.register("category_stats", category_manager.force_save_all_stats, parallel=False)
+        coordinator.register("user_scores", self.save_all_user_data, parallel=False)
+        coordinator.register("analytics_views", self.flush_analytics_views)
+
+    def rebuild_analytics_views(self) -> None:
+        """Пересобирает представления аналитики из загруженных очков, настроек и статистики категорий"""
+        category_manager = getattr(self, 'category_manager', None)
+        self.analytics_views.rebuild(
+            self.state.user_scores,
+            self.state.chat_settings,
+            category_manager.get_global_category_stats() if category_manager else None,
+        )
+
+    def flush_analytics_views(self) -> int:
+        """Пишет измененные представления аналитики; возвращает число записанных файлов"""
+        for chat_id, settings in list(self.state.chat_settings.items()):
+            self.analytics_views.update_chat_info(chat_id, settings)
+        written = self.analytics_views.flush()
+        if written:
+            logger.debug(f"Представления аналитики записаны: {self.analytics_views.get_stats()}")
+        return written
+
     async def save_all_data_async(self) -> None:
         """Асинхронно сохраняет все данные в консолидированную структуру"""
         logger.info("Асинхронное сохранение всех данных...")
@@ -1080,15 +1170,20 @@ class DataManager:
         tasks = []
 
         # Сохраняем данные пользователей для каждого чата параллельно
-        for chat_id in self.state.user_scores.keys():
-            tasks.append(self._run_in_executor(self.save_user_data, chat_id))
+        chat_ids = list(self.state.user_scores.keys())
+        for chat_id in chat_ids:
+            tasks.append(self._run_in_executor(self.save_user_data, chat_id, False))
 
         # Добавляем задачи для сохранения настроек и сообщений
         tasks.append(self.save_modified_chat_settings_async())
-        tasks.append(self._run_in_executor(self.save_messages_to_delete))
+        tasks.append(self.compact_messages_to_delete(force=True))
+        tasks.append(self._run_in_executor(self.save_deletion_timers))
 
         # Выполняем все задачи параллельно
         await asyncio.gather(*tasks, return_exceptions=True)
+        if chat_ids:
+            # Глобальная статистика - один раз после всех чатов
+            await self._run_in_executor(self.update_global_statistics)
         logger.info("Асинхронное сохранение всех данных завершено")
 
     async def load_all_data_async(self) -> None:
@@ -1109,7 +1204,8 @@ class DataManager:
             load_with_semaphore(self.load_questions),
             load_with_semaphore(self.load_user_data),
             load_with_semaphore(self.load_chat_settings),
-            load_with_semaphore(self.load_messages_to_delete)
+            load_with_semaphore(self.load_messages_to_delete),
+            load_with_semaphore(self.load_deletion_timers)
         )
 
         logger.debug("Асинхронная загрузка всех данных завершена")
@@ -1121,6 +1217,7 @@ class DataManager:
         self.load_user_data()
         self.load_chat_settings()
         self.load_messages_to_delete()
+        self.load_deletion_timers()
         logger.debug("Загрузка всех данных завершена")
 
     def update_chat_setting(self, chat_id: int, key_path: List[str], value: Any) -> None:
@@ -1613,9 +1710,7 @@ class DataManager:
                 category_stats["chats_used_in"] = list(category_stats["chats_used_in"])
             
             # Сохраняем глобальную статистику категорий
-            categories_stats_file = self.statistics_dir / "categories_stats.json"
-            with open(categories_stats_file, 'w', encoding='utf-8') as f:
-                json.dump(global_categories_stats, f, ensure_ascii=False, indent=2)
+            write_json_atomic(self.statistics_dir / "categories_stats.json", global_categories_stats)
             
             logger.info(f"Обновлена глобальная статистика категорий: {len(global_categories_stats)} категорий")
             
@@ -1697,7 +1792,7 @@ class DataManager:
     # ===== СИСТЕМА СОХРАНЕНИЯ АКТИВНЫХ ВИКТОРИН =====
 
     def get_active_quizzes_file_path(self) -> Path:
-        """Возвращает путь к файлу активных викторин"""
+        """Возвращает путь к файлу активных викторин прежнего формата (только для переноса)"""
         return Path(self.app_config.data_dir) / "active_quizzes.json"
 
     def _convert_sets_to_lists(self, obj):
@@ -1714,179 +1809,194 @@ class DataManager:
         else:
             return obj
 
-    def save_active_quizzes(self) -> None:
+    def _serialize_quiz_state(self, quiz_state: 'QuizState') -> Dict[str, Any]:
+        """Сериализуемые данные викторины (формат снимка журнала)"""
+        return {
+            "chat_id": quiz_state.chat_id,
+            "quiz_type": quiz_state.quiz_type,
+            "quiz_mode": quiz_state.quiz_mode,
+            "num_questions_to_ask": quiz_state.num_questions_to_ask,
+            "open_period_seconds": quiz_state.open_period_seconds,
+            "created_by_user_id": quiz_state.created_by_user_id,
+            "original_command_message_id": quiz_state.original_command_message_id,
+            "announce_message_id": quiz_state.announce_message_id,
+            "interval_seconds": quiz_state.interval_seconds,
+            "quiz_start_time": quiz_state.quiz_start_time.isoformat() if quiz_state.quiz_start_time else None,
+            "current_question_index": quiz_state.current_question_index,
+            "scores": self._convert_sets_to_lists(dict(quiz_state.scores)),  # Конвертируем set() в list()
+            "active_poll_ids_in_session": list(quiz_state.active_poll_ids_in_session),
+            "latest_poll_id_sent": quiz_state.latest_poll_id_sent,
+            "progression_triggered_for_poll": dict(quiz_state.progression_triggered_for_poll),
+            "message_ids_to_delete": list(quiz_state.message_ids_to_delete),
+            "is_stopping": quiz_state.is_stopping,
+            "poll_and_solution_message_ids": quiz_state.poll_and_solution_message_ids.copy(),
+            "results_message_ids": list(quiz_state.results_message_ids),
+            # Сохраняем вопросы (без потенциально проблемных данных)
+            "questions": [
+                {
+                    k: v for k, v in q.items()
+                    if k not in ['job_poll_end_name', 'next_question_job_name']  # Исключаем несериализуемые объекты
+                } for q in quiz_state.questions
+            ]
+        }
+
+    def save_active_quiz_snapshot(self, quiz_state: 'QuizState') -> None:
         """
-        Сохраняет активные викторины для восстановления после перезапуска.
-        Сохраняются только сериализуемые данные викторины.
+        Записывает снимок викторины и начинает ее журнал заново.
+        Вызывается при старте сессии и при восстановлении после перезапуска.
         """
-        if not hasattr(self, 'state') or not self.state:
-            logger.warning("DataManager.save_active_quizzes: state не инициализирован")
-            return
-
-        active_quizzes_file = self.get_active_quizzes_file_path()
-        active_quizzes_file.parent.mkdir(parents=True, exist_ok=True)
-
         try:
-            # Собираем данные активных викторин
-            quizzes_data = {}
+            self.quiz_journal.write_snapshot(quiz_state.chat_id, self._serialize_quiz_state(quiz_state))
+            logger.debug(f"Снимок викторины чата {quiz_state.chat_id} сохранен")
+        except Exception as e:
+            logger.error(f"❌ Ошибка сохранения снимка викторины чата {quiz_state.chat_id}: {e}")
 
-            for chat_id, quiz_state in self.state.active_quizzes.items():
-                try:
-                    # Создаем сериализуемые данные викторины
-                    quiz_data = {
-                        "chat_id": quiz_state.chat_id,
-                        "quiz_type": quiz_state.quiz_type,
-                        "quiz_mode": quiz_state.quiz_mode,
-                        "num_questions_to_ask": quiz_state.num_questions_to_ask,
-                        "open_period_seconds": quiz_state.open_period_seconds,
-                        "created_by_user_id": quiz_state.created_by_user_id,
-                        "original_command_message_id": quiz_state.original_command_message_id,
-                        "announce_message_id": quiz_state.announce_message_id,
-                        "interval_seconds": quiz_state.interval_seconds,
-                        "quiz_start_time": quiz_state.quiz_start_time.isoformat() if quiz_state.quiz_start_time else None,
-                        "current_question_index": quiz_state.current_question_index,
-                        "scores": self._convert_sets_to_lists(dict(quiz_state.scores)),  # Конвертируем set() в list()
-                        "active_poll_ids_in_session": list(quiz_state.active_poll_ids_in_session),
-                        "latest_poll_id_sent": quiz_state.latest_poll_id_sent,
-                        "progression_triggered_for_poll": dict(quiz_state.progression_triggered_for_poll),
-                        "message_ids_to_delete": list(quiz_state.message_ids_to_delete),
-                        "is_stopping": quiz_state.is_stopping,
-                        "poll_and_solution_message_ids": quiz_state.poll_and_solution_message_ids.copy(),
-                        "results_message_ids": list(quiz_state.results_message_ids),
-                        # Сохраняем вопросы (без потенциально проблемных данных)
-                        "questions": [
-                            {
-                                k: v for k, v in q.items()
-                                if k not in ['job_poll_end_name', 'next_question_job_name']  # Исключаем несериализуемые объекты
-                            } for q in quiz_state.questions
-                        ]
-                    }
+    def journal_quiz_event(self, chat_id: int, event: str, **fields: Any) -> None:
+        """Добавляет переход состояния викторины в журнал сессии"""
+        try:
+            self.quiz_journal.append(chat_id, event, **fields)
+        except Exception as e:
+            logger.error(f"Ошибка записи события '{event}' в журнал викторины чата {chat_id}: {e}")
 
-                    quizzes_data[str(chat_id)] = quiz_data
-                    logger.debug(f"Подготовлена викторина чата {chat_id} для сохранения")
+    def add_quiz_message_for_deletion(self, quiz_state: 'QuizState', message_id: int) -> None:
+        """
+        Добавляет сообщение в список удаления сессии и в ее журнал: после
+        восстановления из снимка и журнала сообщение тоже будет удалено.
+        До записи снимка журнал не ведется - ID попадет в сам снимок.
+        """
+        quiz_state.message_ids_to_delete.add(message_id)
+        self.journal_quiz_event(quiz_state.chat_id, EVENT_MESSAGES, message_ids=[message_id])
 
-                except Exception as e:
-                    logger.error(f"Ошибка при подготовке викторины чата {chat_id} для сохранения: {e}")
-                    continue
+    def journal_quiz_score(self, chat_id: int, user_id: str, entry: Dict[str, Any]) -> None:
+        """Записывает текущие очки участника сессии"""
+        self.journal_quiz_event(chat_id, EVENT_SCORE, user_id=user_id, entry=self._convert_sets_to_lists(entry))
 
-            # Сохраняем в файл
-            with open(active_quizzes_file, 'w', encoding='utf-8') as f:
-                json.dump({
-                    "timestamp": datetime.now().isoformat(),
-                    "active_quizzes": quizzes_data
-                }, f, ensure_ascii=False, indent=2)
+    def finalize_active_quiz(self, chat_id: int) -> None:
+        """Отмечает сессию завершенной и удаляет ее снимок и журнал"""
+        try:
+            self.quiz_journal.append(chat_id, EVENT_FINALIZED)
+            self.quiz_journal.remove(chat_id)
+        except Exception as e:
+            logger.error(f"Ошибка удаления журнала викторины чата {chat_id}: {e}")
 
-            logger.info(f"✅ Сохранено {len(quizzes_data)} активных викторин в {active_quizzes_file}")
+    def save_active_quizzes(self) -> None:
+        """
+        Переписывает снимки всех активных викторин (сжатие журналов).
+        Вызывается при остановке бота; во время работы состояние
+        сохраняется событиями журнала.
+        """
+        if not hasattr(self, 'state') or not self.state:
+            logger.warning("DataManager.save_active_quizzes: state не инициализирован")
+            return
 
-        except Exception as e:
-            logger.error(f"❌ Ошибка сохранения активных викторин: {e}")
+        saved_count = 0
+        for chat_id, quiz_state in list(self.state.active_quizzes.items()):
+            try:
+                self.quiz_journal.write_snapshot(chat_id, self._serialize_quiz_state(quiz_state))
+                saved_count += 1
+            except Exception as e:
+                logger.error(f"Ошибка при сохранении снимка викторины чата {chat_id}: {e}")
+        self.quiz_journal.retain(self.state.active_quizzes.keys())
+        logger.info(f"✅ Сохранено {saved_count} активных викторин в {self.quiz_journal.directory}. Журналы: {self.quiz_journal.get_stats()}")
 
-    def load_active_quizzes(self) -> Dict[int, Dict[str, Any]]:
+    def _migrate_legacy_active_quizzes(self) -> None:
         """
-        Загружает сохраненные активные викторины.
-        Возвращает словарь chat_id -> quiz_data для восстановления.
+        Переносит викторины из active_quizzes.json прежнего формата (до журналов)
+        в журналы и удаляет файл - в том числе пустой или только с устаревшими
+        викторинами (их журналы удалит cleanup_stale_quizzes). Нечитаемый файл
+        переименовывается в .corrupt, чтобы не читать его при каждом запуске.
         """
         active_quizzes_file = self.get_active_quizzes_file_path()
-
         if not active_quizzes_file.exists():
-            logger.info("Файл активных викторин не найден, восстановление не требуется")
-            return {}
-
+            return
         try:
             with open(active_quizzes_file, 'r', encoding='utf-8') as f:
                 data = json.load(f)
+            legacy_quizzes = {int(chat_id): quiz_data for chat_id, quiz_data in data.get("active_quizzes", {}).items()}
+        except Exception as e:
+            corrupt_file = active_quizzes_file.with_name(active_quizzes_file.name + ".corrupt")
+            active_quizzes_file.replace(corrupt_file)
+            logger.error(f"❌ Ошибка чтения {active_quizzes_file}: {e}. Файл переименован в {corrupt_file.name}")
+            return
 
-            quizzes_data = data.get("active_quizzes", {})
-            saved_timestamp = data.get("timestamp")
+        # Журнал новее файла прежнего формата
+        journaled = set(self.quiz_journal.chat_ids())
+        migrated = 0
+        for chat_id, quiz_data in legacy_quizzes.items():
+            if chat_id not in journaled:
+                self.quiz_journal.write_snapshot(chat_id, quiz_data)
+                migrated += 1
+        self.delete_active_quizzes_file()
+        logger.info(f"Викторины из файла прежнего формата перенесены в журналы: {migrated} из {len(legacy_quizzes)}")
 
-            if not quizzes_data:
-                logger.info("В файле активных викторин нет данных")
-                return {}
+    def load_active_quizzes(self) -> Dict[int, Dict[str, Any]]:
+        """
+        Загружает незавершенные викторины: снимок каждой сессии дополняется
+        событиями ее журнала. Возвращает словарь chat_id -> quiz_data для восстановления.
+        """
+        self._migrate_legacy_active_quizzes()
+        quizzes_data = self.quiz_journal.load_all()
 
-            logger.info(f"Загружено {len(quizzes_data)} активных викторин (сохранено: {saved_timestamp})")
+        if not quizzes_data:
+            logger.info("Незавершенных викторин нет, восстановление не требуется")
+            return {}
 
-            # Очищаем устаревшие викторины (старше 2 часов)
-            # ИСПРАВЛЕНИЕ: Используем UTC для совместимости с quiz_start_time (который сохраняется как UTC через get_current_utc_time())
-            from datetime import timezone
-            current_time = datetime.now(timezone.utc)
-            valid_quizzes = {}
+        logger.info(f"Загружено {len(quizzes_data)} незавершенных викторин")
 
-            for chat_id_str, quiz_data in quizzes_data.items():
-                try:
-                    chat_id = int(chat_id_str)
-
-                    # Проверяем актуальность викторины
-                    quiz_start_time_str = quiz_data.get("quiz_start_time")
-                    if quiz_start_time_str:
-                        quiz_start_time = datetime.fromisoformat(quiz_start_time_str)
-                        # Нормализуем quiz_start_time к UTC, если он timezone-aware
-                        if quiz_start_time.tzinfo is not None:
-                            quiz_start_time = quiz_start_time.astimezone(timezone.utc)
-                        # Если quiz_start_time timezone-naive, считаем его UTC и делаем aware
-                        else:
-                            quiz_start_time = quiz_start_time.replace(tzinfo=timezone.utc)
-                        time_diff = current_time - quiz_start_time
+        # Очищаем устаревшие викторины (старше 2 часов)
+        # ИСПРАВЛЕНИЕ: Используем UTC для совместимости с quiz_start_time (который сохраняется как UTC через get_current_utc_time())
+        from datetime import timezone
+        current_time = datetime.now(timezone.utc)
+        valid_quizzes = {}
 
-                        # Если викторина старше 2 часов, пропускаем
-                        if time_diff.total_seconds() > 7200:  # 2 часа
-                            logger.warning(f"Викторина чата {chat_id} слишком старая ({time_diff}), пропускаем")
-                            continue
+        for chat_id, quiz_data in quizzes_data.items():
+            try:
+                # Проверяем актуальность викторины
+                quiz_start_time_str = quiz_data.get("quiz_start_time")
+                if quiz_start_time_str:
+                    quiz_start_time = datetime.fromisoformat(quiz_start_time_str)
+                    # Нормализуем quiz_start_time к UTC, если он timezone-aware
+                    if quiz_start_time.tzinfo is not None:
+                        quiz_start_time = quiz_start_time.astimezone(timezone.utc)
+                    # Если quiz_start_time timezone-naive, считаем его UTC и делаем aware
+                    else:
+                        quiz_start_time = quiz_start_time.replace(tzinfo=timezone.utc)
+                    time_diff = current_time - quiz_start_time
 
-                    valid_quizzes[chat_id] = quiz_data
-                    logger.debug(f"Восстановлена викторина чата {chat_id}")
+                    # Если викторина старше 2 часов, пропускаем
+                    if time_diff.total_seconds() > 7200:  # 2 часа
+                        logger.warning(f"Викторина чата {chat_id} слишком старая ({time_diff}), пропускаем")
+                        continue
 
-                except Exception as e:
-                    logger.error(f"Ошибка при обработке викторины чата {chat_id_str}: {e}")
-                    continue
+                valid_quizzes[chat_id] = quiz_data
+                logger.debug(f"Восстановлена викторина чата {chat_id}")
 
-            logger.info(f"✅ Доступно для восстановления {len(valid_quizzes)} актуальных викторин")
-            return valid_quizzes
+            except Exception as e:
+                logger.error(f"Ошибка при обработке викторины чата {chat_id}: {e}")
+                continue
 
-        except Exception as e:
-            logger.error(f"❌ Ошибка загрузки активных викторин: {e}")
-            return {}
+        logger.info(f"✅ Доступно для восстановления {len(valid_quizzes)} актуальных викторин")
+        return valid_quizzes
 
     def cleanup_stale_quizzes(self) -> None:
         """
-        Очищает файл активных викторин от устаревших записей.
+        Удаляет журналы устаревших викторин.
         Вызывается автоматически при запуске бота.
         """
-        active_quizzes_file = self.get_active_quizzes_file_path()
-
-        if not active_quizzes_file.exists():
-            return
-
         try:
-            # Загружаем текущие данные
-            current_data = self.load_active_quizzes()
-
-            if not current_data:
-                # Если нет валидных викторин, удаляем файл
-                active_quizzes_file.unlink()
-                logger.info("Файл активных викторин очищен (нет валидных викторин)")
-                return
-
-            # Пересохраняем только валидные викторины
-            with open(active_quizzes_file, 'w', encoding='utf-8') as f:
-                json.dump({
-                    "timestamp": datetime.now().isoformat(),
-                    "active_quizzes": {
-                        str(chat_id): quiz_data
-                        for chat_id, quiz_data in current_data.items()
-                    }
-                }, f, ensure_ascii=False, indent=2)
-
-            logger.info(f"Очищено, осталось {len(current_data)} актуальных викторин")
-
+            valid_quizzes = self.load_active_quizzes()
+            removed = self.quiz_journal.retain(valid_quizzes.keys())
+            if removed:
+                logger.info(f"Удалены журналы {removed} устаревших викторин, осталось {len(valid_quizzes)} актуальных")
         except Exception as e:
             logger.error(f"Ошибка очистки устаревших викторин: {e}")
 
     def delete_active_quizzes_file(self) -> None:
-        """Удаляет файл активных викторин (при успешном завершении всех викторин)"""
+        """Удаляет active_quizzes.json прежнего формата (после переноса в журналы)"""
         active_quizzes_file = self.get_active_quizzes_file_path()
         if active_quizzes_file.exists():
             active_quizzes_file.unlink()
-            logger.info("Файл активных викторин удален")
+            logger.info("Файл активных викторин прежнего формата удален")
 
     # ===== СИСТЕМА УПРАВЛЕНИЯ ТЕХНИЧЕСКИМ ОБСЛУЖИВАНИЕМ =====
 
@@ -1,7 +1,10 @@
 #handlers/cleanup_handler.py
+import json
 import logging
 import os
-from datetime import timedelta
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict
 from telegram.ext import ContextTypes, JobQueue
 from telegram import Update
 # from telegram.constants import ParseMode # ParseMode не используется в этом файле напрямую
@@ -11,11 +14,37 @@ from telegram import Update
 # Чтобы избежать циклических импортов и для явности, BotState лучше получать из context.bot_data
 # from state import BotState # Можно раскомментировать, если используется для тайп-хинтинга напрямую
 
+from modules.job_registry import get_job_registry
+from modules.message_deletion import get_message_deletion_service
+from modules.atomic_io import write_json_atomic
+from modules.rate_limiter import RequestPriority
+from modules.request_scheduler import get_request_scheduler
+
 logger = logging.getLogger(__name__)
 
+# Метрики запусков очистки для веб-интерфейса (data/system/cleanup_metrics.json)
+CLEANUP_METRICS_FILE_NAME = "cleanup_metrics.json"
+CLEANUP_METRICS_HISTORY = 20
+
+
+def save_cleanup_metrics(system_dir: Path, run_metrics: Dict[str, Any]) -> None:
+    """Дописывает метрики запуска очистки в файл (последние CLEANUP_METRICS_HISTORY запусков)"""
+    metrics_file = system_dir / CLEANUP_METRICS_FILE_NAME
+    history = []
+    try:
+        with open(metrics_file, 'r', encoding='utf-8') as f:
+            history = json.load(f).get("history", [])
+    except (OSError, ValueError, AttributeError):
+        pass
+    history = (history + [run_metrics])[-CLEANUP_METRICS_HISTORY:]
+    write_json_atomic(metrics_file, {"last_run": run_metrics, "history": history})
+
+
 async def cleanup_old_messages_job(context: ContextTypes.DEFAULT_TYPE):
     import time
     logger.info("Запуск задачи очистки старых сообщений...")
+    started_at = time.time()
+    started_monotonic = time.monotonic()
 
     # Получаем BotState из data задачи или из context.bot_data
     bot_state = None
@@ -44,73 +73,50 @@ async def cleanup_old_messages_job(context: ContextTypes.DEFAULT_TYPE):
 
     # Константы
     MIN_AGE_SECONDS = 120  # Минимальный возраст сообщения (2 минуты)
-    max_messages_per_batch = 50
-    processed_in_this_batch = 0
     current_time = time.time()
 
     chats_to_remove_entry_for = []
 
-    # Собираем все сообщения с сортировкой по возрасту
-    all_messages_with_age = []
+    # Собираем сообщения по чатам; чаты с самыми старыми сообщениями обрабатываются первыми
+    messages_by_chat = {}
+    oldest_timestamp_by_chat = {}
     for chat_id, messages_dict in list(bot_state.generic_messages_to_delete.items()):
         if not messages_dict:
             chats_to_remove_entry_for.append(chat_id)
             continue
 
-        for msg_id, timestamp in messages_dict.items():
-            age = current_time - timestamp
-            if age >= MIN_AGE_SECONDS:
-                all_messages_with_age.append((chat_id, msg_id, age))
+        aged_ids = [msg_id for msg_id, timestamp in messages_dict.items() if current_time - timestamp >= MIN_AGE_SECONDS]
+        if aged_ids:
+            messages_by_chat[chat_id] = aged_ids
+            oldest_timestamp_by_chat[chat_id] = min(messages_dict[msg_id] for msg_id in aged_ids)
 
-    # Сортируем по возрасту (старые первыми)
-    all_messages_with_age.sort(key=lambda x: x[2], reverse=True)
+    messages_by_chat = {
+        chat_id: messages_by_chat[chat_id]
+        for chat_id in sorted(messages_by_chat, key=oldest_timestamp_by_chat.__getitem__)
+    }
+    total_aged = sum(len(ids) for ids in messages_by_chat.values())
 
-    logger.info(f"🕐 Найдено {len(all_messages_with_age)} сообщений старше {MIN_AGE_SECONDS} секунд для обработки")
+    logger.info(f"🕐 Найдено {total_aged} сообщений старше {MIN_AGE_SECONDS} секунд в {len(messages_by_chat)} чатах для обработки")
 
-    # Обрабатываем сообщения
-    processed_message_ids = {}  # chat_id -> set(message_ids)
+    scheduler = get_request_scheduler()
 
-    for chat_id, msg_id, age in all_messages_with_age[:max_messages_per_batch]:
-        if processed_in_this_batch >= max_messages_per_batch:
-            logger.info(f"Достигнут лимит обрабатываемых сообщений ({max_messages_per_batch}), останавливаем обработку")
-            break
+    def _is_congested() -> bool:
+        # Backpressure: опросы и сообщения ждут токен - остальное удалим в следующий запуск
+        if scheduler.is_congested(RequestPriority.CLEANUP):
+            logger.info(f"Планировщик запросов занят более важными запросами, очистка остановлена. Метрики: {scheduler.get_metrics()['queue_depth']}")
+            return True
+        return False
 
-        try:
-            await context.bot.delete_message(chat_id=chat_id, message_id=msg_id)
-            logger.debug(f"Удалено старое сообщение {msg_id} из чата {chat_id} (возраст: {age:.1f}s)")
+    # Пакетное удаление (deleteMessages до 100 ID), при ошибке пачки - по одному;
+    # пачки разных чатов идут параллельно в пределах семафоров сервиса
+    deletion_service = get_message_deletion_service()
+    result = await deletion_service.delete_messages(context.bot, messages_by_chat, should_stop=_is_congested)
+    processed_message_ids = result.resolved
+    processed_in_this_batch = result.resolved_count
 
-            if chat_id not in processed_message_ids:
-                processed_message_ids[chat_id] = set()
-            processed_message_ids[chat_id].add(msg_id)
-            processed_in_this_batch += 1
-
-        except Exception as e:
-            error_str = str(e).lower()
-            # Распространенные ошибки, указывающие, что сообщение уже удалено или не может быть удалено
-            if "message to delete not found" in error_str or \
-               "message can't be deleted" in error_str or \
-               "message_id_invalid" in error_str or \
-               "message not found" in error_str or \
-               "chat not found" in error_str:
-                logger.warning(f"Сообщение {msg_id} в чате {chat_id} не найдено/не может быть удалено: {e}. Удаление из списка.")
-
-                if chat_id not in processed_message_ids:
-                    processed_message_ids[chat_id] = set()
-                processed_message_ids[chat_id].add(msg_id)
-                processed_in_this_batch += 1
-            else:
-                # Другие ошибки - оставляем сообщение для следующей попытки
-                logger.error(f"Не удалось удалить сообщение {msg_id} из чата {chat_id}: {e}")
-
-    # Удаляем обработанные сообщения из BotState
+    # Удаляем обработанные сообщения из BotState (вместе с их таймерами удаления)
     for chat_id, msg_ids_to_remove in processed_message_ids.items():
-        if chat_id in bot_state.generic_messages_to_delete:
-            for msg_id in msg_ids_to_remove:
-                bot_state.generic_messages_to_delete[chat_id].pop(msg_id, None)
-
-            # Если словарь чата пустой, помечаем на удаление
-            if not bot_state.generic_messages_to_delete[chat_id]:
-                chats_to_remove_entry_for.append(chat_id)
+        bot_state.remove_messages_from_deletion(chat_id, msg_ids_to_remove)
 
     # Удаляем записи для чатов, у которых не осталось сообщений
     for chat_id_to_remove in chats_to_remove_entry_for:
@@ -121,12 +127,38 @@ async def cleanup_old_messages_job(context: ContextTypes.DEFAULT_TYPE):
     # Автосохранение после очистки
     if processed_in_this_batch > 0 and hasattr(bot_state, 'data_manager') and bot_state.data_manager:
         try:
-            bot_state.data_manager.save_messages_to_delete()
+            bot_state.save_deletion_state(force=True)
             logger.info(f"💾 Автосохранение после очистки {processed_in_this_batch} сообщений")
         except Exception as e:
             logger.error(f"❌ Ошибка автосохранения после очистки: {e}")
 
-    logger.info(f"Задача очистки старых сообщений завершена. Обработано сообщений: {processed_in_this_batch}")
+    remaining = sum(len(messages) for messages in bot_state.generic_messages_to_delete.values())
+    run_metrics = {
+        "started_at": datetime.fromtimestamp(started_at).isoformat(timespec="seconds"),
+        "duration_seconds": round(time.monotonic() - started_monotonic, 2),
+        "pending_before": total_messages_to_process,
+        "aged": total_aged,
+        "chats": len(messages_by_chat),
+        "deleted": processed_in_this_batch,
+        "failed": result.failed_count,
+        "skipped": result.skipped,
+        "remaining": remaining,
+        "api_calls": result.api_calls,
+        "stopped_by_backpressure": result.stopped,
+        "max_concurrency": deletion_service.max_concurrency,
+        "max_in_flight_seen": deletion_service.max_in_flight_seen,
+    }
+    data_manager = getattr(bot_state, 'data_manager', None)
+    try:
+        save_cleanup_metrics(data_manager.system_dir if data_manager else Path("data") / "system", run_metrics)
+    except Exception as e:
+        logger.warning(f"Не удалось сохранить метрики очистки: {e}")
+
+    logger.info(
+        f"Задача очистки старых сообщений завершена за {run_metrics['duration_seconds']} сек. Обработано сообщений: {processed_in_this_batch}/{total_aged}, "
+        f"вызовов API: {result.api_calls}, отложено из-за ошибок: {result.failed_count}, осталось в списке: {remaining}"
+        f"{', остановлена по backpressure' if result.stopped else ''}"
+    )
 
 def schedule_cleanup_job(job_queue: JobQueue, bot_state=None) -> None:
     """Планирует периодическую задачу очистки сообщений."""
@@ -145,17 +177,11 @@ def schedule_cleanup_job(job_queue: JobQueue, bot_state=None) -> None:
 
     job_name = "periodic_message_cleanup" # Уникальное имя для задачи
 
-    # Удаляем старую задачу с таким же именем, если она существует (на случай перезапуска)
-    current_jobs = job_queue.get_jobs_by_name(job_name)
-    if current_jobs:
-        for job in current_jobs:
-            job.schedule_removal()
-        logger.info(f"Удалена существующая задача очистки сообщений '{job_name}'.")
-
     # Передаем bot_state в data задачи
     job_data = {'bot_state': bot_state} if bot_state else {}
 
-    job_queue.run_repeating(
+    # Существующая задача с таким же именем (на случай перезапуска) заменяется реестром
+    get_job_registry(job_queue).run_repeating(
         cleanup_old_messages_job,
         interval=timedelta(hours=interval_hours),
         first=timedelta(seconds=first_run_delay_seconds),
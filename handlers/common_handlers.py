@@ -767,22 +767,10 @@ _Спасибо за ожидание\\!_"""
                         parse_mode=ParseMode.MARKDOWN_V2
                     )
 
-                    # Добавляем сообщение о готовности в список для удаления через 5 минут
+                    # Удаление сообщения о готовности через 5 минут (таймер удаления BotState)
                     bot_state = context.bot_data.get('bot_state')
                     if bot_state:
-                        bot_state.add_message_for_deletion(chat_id, sent_message.message_id)
-
-                        # Планируем удаление через 5 минут
-                        from datetime import timedelta
-                        from telegram.ext import JobQueue
-                        job_queue = context.application.job_queue if hasattr(context, 'application') else None
-                        if job_queue:
-                            job_name = f"delete_ready_msg_{chat_id}_{sent_message.message_id}"
-                            job_queue.run_once(
-                                lambda ctx: self._delete_message_job(ctx, chat_id, sent_message.message_id),
-                                when=timedelta(minutes=5),
-                                name=job_name
-                            )
+                        bot_state.add_message_for_deletion(chat_id, sent_message.message_id, delay_seconds=300)
 
                     logger.info(f"Отправлено сообщение о готовности в чат {chat_id}")
 
@@ -794,14 +782,6 @@ _Спасибо за ожидание\\!_"""
         except Exception as e:
             logger.error(f"❌ Ошибка при очистке уведомлений об обслуживании: {e}")
 
-    async def _delete_message_job(self, context: ContextTypes.DEFAULT_TYPE, chat_id: int, message_id: int) -> None:
-        """Job для удаления сообщения о готовности через 5 минут"""
-        try:
-            await context.bot.delete_message(chat_id=chat_id, message_id=message_id)
-            logger.debug(f"Удалено сообщение о готовности: чат {chat_id}, сообщение {message_id}")
-        except Exception as e:
-            logger.debug(f"Не удалось удалить сообщение о готовности: {e}")
-
     def get_maintenance_handlers(self) -> List[CommandHandler]:
         """
         Возвращает обработчики для режима технического обслуживания.
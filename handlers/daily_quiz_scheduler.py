@@ -1,22 +1,31 @@
 #handlers/daily_quiz_scheduler.py
 from __future__ import annotations
 import logging
-from datetime import time, timedelta
+from collections import deque
+from datetime import datetime, timedelta
 import asyncio
-from typing import TYPE_CHECKING, List, Dict, Any, Optional
+from typing import TYPE_CHECKING, Deque, List, Dict, Any, Optional, Tuple
 
 import pytz
-from telegram.ext import Application, ContextTypes, JobQueue
+from telegram.ext import Application, ContextTypes
 
 from app_config import AppConfig
 from state import BotState
 from data_manager import DataManager
+from modules.daily_schedule import DailySchedule
+from modules.job_registry import get_job_registry
+from modules.quiz_fanout import build_fanout_report, plan_fanout
 
 if TYPE_CHECKING:
     from .quiz_manager import QuizManager
 
 logger = logging.getLogger(__name__)
 
+# Группа задач ежедневной викторины в реестре задач
+DAILY_QUIZ_JOB_GROUP = "daily_quiz"
+# Единственная задача-драйвер расписания ежедневных викторин
+DAILY_SCHEDULE_DRIVER_JOB_NAME = "daily_quiz_schedule_driver"
+
 class DailyQuizScheduler:
     def __init__(
         self,
@@ -33,30 +42,27 @@ class DailyQuizScheduler:
         self.application = application
         self.moscow_tz = pytz.timezone('Europe/Moscow')
 
+        # Группы запусков по слотам (UTC, с точностью до минуты): slot -> {chat_id: вопросы}
+        self._fanout_groups: Dict[datetime, Dict[int, Optional[List[Dict[str, Any]]]]] = {}
+        # Отчеты о последних запусках групп (для статуса планировщика)
+        self.fanout_reports: Deque[Dict[str, Any]] = deque(maxlen=20)
+        # Слоты всех чатов в одной куче; пробуждением управляет одна задача-драйвер
+        self.schedule = DailySchedule(lead_seconds=app_config.daily_quiz_fanout_lead_seconds)
+        self._driver_wake_at: Optional[float] = None
+
     def _get_job_name_for_time_entry(self, chat_id: int, time_entry_index: int) -> str:
         """Генерирует уникальное имя задачи для конкретного времени запуска в чате."""
         return f"daily_quiz_for_chat_{chat_id}_time_idx_{time_entry_index}"
 
-    async def _trigger_daily_quiz_job(self, context: ContextTypes.DEFAULT_TYPE) -> None:
-        if not context.job or not isinstance(context.job.data, dict) or "chat_id" not in context.job.data:
-            logger.error("_trigger_daily_quiz_job вызван без chat_id в context.job.data.")
-            return
-
-        chat_id: int = context.job.data["chat_id"]
-        logger.info(f"Запуск задачи ежедневной викторины для чата {chat_id} (Job: {context.job.name if context.job else 'N/A'}).")
-
-        active_quiz_in_chat = self.state.get_active_quiz(chat_id)
-        if active_quiz_in_chat and not active_quiz_in_chat.is_stopping:
-            logger.warning(f"Запуск ежедневной викторины в чате {chat_id} пропущен: другая викторина уже активна.")
-            return
-
+    def _resolve_daily_quiz_params(self, chat_id: int) -> Optional[Dict[str, Any]]:
+        """Параметры ежедневной викторины чата для _initiate_quiz_session или None, если викторина отключена"""
         chat_settings = self.data_manager.get_chat_settings(chat_id)
         daily_quiz_cfg_chat = chat_settings.get("daily_quiz", {})
         daily_quiz_defaults_app = self.app_config.daily_quiz_defaults
 
         if not daily_quiz_cfg_chat.get("enabled", daily_quiz_defaults_app.get("enabled")):
             logger.info(f"Ежедневная викторина для чата {chat_id} отключена в настройках. Пропуск запуска.")
-            return
+            return None
 
         num_questions = daily_quiz_cfg_chat.get("num_questions", daily_quiz_defaults_app["num_questions"])
         open_period = daily_quiz_cfg_chat.get("poll_open_seconds", daily_quiz_defaults_app.get("poll_open_seconds", 600))
@@ -79,40 +85,179 @@ class DailyQuizScheduler:
 
         daily_quiz_type_config_from_app = self.app_config.quiz_types_config.get("daily", {})
 
+        return {
+            "quiz_type": "daily",
+            "quiz_mode": daily_quiz_type_config_from_app.get("mode", "serial_interval"),
+            "num_questions": num_questions,
+            "open_period_seconds": open_period,
+            "announce": daily_quiz_type_config_from_app.get("announce", True),
+            "announce_delay_seconds": daily_quiz_type_config_from_app.get("announce_delay_seconds", 0),
+            "category_names_for_quiz": category_names_for_quiz,
+            "is_random_categories_mode": is_random_categories_mode_for_quiz,
+            "interval_seconds": interval_seconds,
+        }
+
+    def _is_quiz_active(self, chat_id: int) -> bool:
+        active_quiz_in_chat = self.state.get_active_quiz(chat_id)
+        return bool(active_quiz_in_chat and not active_quiz_in_chat.is_stopping)
+
+    async def _start_daily_quiz(
+        self, context: ContextTypes.DEFAULT_TYPE, chat_id: int,
+        preselected_questions: Optional[List[Dict[str, Any]]] = None
+    ) -> None:
+        if self._is_quiz_active(chat_id):
+            logger.warning(f"Запуск ежедневной викторины в чате {chat_id} пропущен: другая викторина уже активна.")
+            return
+
+        params = self._resolve_daily_quiz_params(chat_id)
+        if params is None:
+            return
+
         await self.quiz_manager._initiate_quiz_session(
             context=context, chat_id=chat_id, initiated_by_user=None,
-            quiz_type="daily",
-            quiz_mode=daily_quiz_type_config_from_app.get("mode", "serial_interval"),
-            num_questions=num_questions, open_period_seconds=open_period,
-            announce=daily_quiz_type_config_from_app.get("announce", True),
-            announce_delay_seconds=daily_quiz_type_config_from_app.get("announce_delay_seconds", 0),
-            category_names_for_quiz=category_names_for_quiz,
-            is_random_categories_mode=is_random_categories_mode_for_quiz,
-            interval_seconds=interval_seconds
+            preselected_questions=preselected_questions,
+            **params
+        )
+
+    async def _drive_daily_schedule_job(self, context: ContextTypes.DEFAULT_TYPE) -> None:
+        """Драйвер расписания: ставит наступившие слоты в группы запуска и засыпает до следующего"""
+        self._driver_wake_at = None
+        for scheduled in self.schedule.pop_due():
+            try:
+                await self._enqueue_daily_quiz(context, scheduled.chat_id, scheduled.fire_at)
+            except Exception as e:
+                logger.error(f"Ошибка постановки ежедневной викторины чата {scheduled.chat_id} в слот: {e}", exc_info=True)
+        self._arm_schedule_driver()
+
+    def _arm_schedule_driver(self) -> None:
+        """Планирует пробуждение драйвера на ближайший слот, если оно раньше уже запланированного"""
+        if not self.application.job_queue:
+            return
+        registry = get_job_registry(self.application.job_queue)
+        next_wake = self.schedule.next_wake()
+        if next_wake is None:
+            registry.cancel(DAILY_SCHEDULE_DRIVER_JOB_NAME)
+            self._driver_wake_at = None
+            return
+        if self._driver_wake_at is not None and self._driver_wake_at <= next_wake \
+                and registry.get(DAILY_SCHEDULE_DRIVER_JOB_NAME) is not None:
+            return
+        self._driver_wake_at = next_wake
+        registry.run_once(
+            self._drive_daily_schedule_job,
+            max(0.0, next_wake - datetime.now(pytz.UTC).timestamp()),
+            name=DAILY_SCHEDULE_DRIVER_JOB_NAME,
+            group=DAILY_QUIZ_JOB_GROUP
         )
 
+    async def _enqueue_daily_quiz(self, context: ContextTypes.DEFAULT_TYPE, chat_id: int, slot: datetime) -> None:
+        """
+        Вызывается драйвером за daily_quiz_fanout_lead_seconds до запуска:
+        подбирает вопросы и добавляет чат в группу своего слота. Первый чат
+        слота планирует запуск всей группы.
+        """
+        now_utc = datetime.now(pytz.UTC)
+
+        if self._is_quiz_active(chat_id):
+            logger.warning(f"Ежедневная викторина в чате {chat_id} не поставлена в слот {slot.strftime('%H:%M')} UTC: другая викторина уже активна.")
+            return
+
+        params = self._resolve_daily_quiz_params(chat_id)
+        if params is None:
+            return
+
+        # Подбор вопросов до открытия окна, чтобы в момент запуска оставалась только отправка
+        preselected_questions: Optional[List[Dict[str, Any]]] = None
+        try:
+            preselected_questions = self.quiz_manager.select_questions_for_session(
+                chat_id, params["num_questions"],
+                params["category_names_for_quiz"], params["is_random_categories_mode"]
+            ) or None
+        except Exception as e:
+            logger.error(f"Ошибка предварительного подбора вопросов для чата {chat_id}: {e}. Вопросы будут подобраны при запуске.")
+
+        group = self._fanout_groups.get(slot)
+        if group is None:
+            group = {}
+            self._fanout_groups[slot] = group
+            delay = max(0.0, (slot - now_utc).total_seconds())
+            get_job_registry(context.job_queue).run_once(
+                self._dispatch_fanout_group_job,
+                delay,
+                data={"slot": slot},
+                name=f"daily_quiz_fanout_{slot.strftime('%Y%m%d_%H%M')}"
+            )
+        group[chat_id] = preselected_questions
+        logger.debug(f"Чат {chat_id} добавлен в группу запуска {slot.strftime('%H:%M')} UTC (чатов в группе: {len(group)}).")
+
+    async def _dispatch_fanout_group_job(self, context: ContextTypes.DEFAULT_TYPE) -> None:
+        """Запускает группу слота, разнося старты по окну daily_quiz_fanout_window_seconds"""
+        if not context.job or not isinstance(context.job.data, dict) or "slot" not in context.job.data:
+            logger.error("_dispatch_fanout_group_job вызван без slot в context.job.data.")
+            return
+
+        slot: datetime = context.job.data["slot"]
+        group = self._fanout_groups.pop(slot, {})
+        if not group:
+            return
+
+        window_seconds = self.app_config.daily_quiz_fanout_window_seconds
+        plan = plan_fanout(group.keys(), slot, window_seconds)
+        logger.info(f"Запуск группы ежедневных викторин {slot.strftime('%H:%M')} UTC: {len(plan)} чатов в окне {window_seconds}с.")
+
+        skews: List[float] = []
+        for chat_id, offset in plan:
+            planned_start = slot + timedelta(seconds=offset)
+            delay = (planned_start - datetime.now(pytz.UTC)).total_seconds()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            skews.append((datetime.now(pytz.UTC) - planned_start).total_seconds())
+            self.application.create_task(
+                self._run_fanout_member(context, chat_id, group[chat_id]),
+                name=f"daily_quiz_start_{chat_id}"
+            )
+
+        report = build_fanout_report(slot, window_seconds, skews, sum(1 for q in group.values() if q))
+        self.fanout_reports.append(report)
+        logger.info(
+            f"Группа ежедневных викторин {report['slot_utc']} UTC запущена: чатов {report['chats']}, "
+            f"вопросы подобраны заранее для {report['preselected']}, "
+            f"отклонение старта макс. {report['max_start_skew']:.3f}с, среднее {report['avg_start_skew']:.3f}с"
+        )
+
+    async def _run_fanout_member(
+        self, context: ContextTypes.DEFAULT_TYPE, chat_id: int,
+        preselected_questions: Optional[List[Dict[str, Any]]]
+    ) -> None:
+        try:
+            logger.info(f"Запуск ежедневной викторины для чата {chat_id} из группы слота.")
+            await self._start_daily_quiz(context, chat_id, preselected_questions)
+        except Exception as e:
+            logger.error(f"Ошибка запуска ежедневной викторины в чате {chat_id}: {e}", exc_info=True)
+
     async def reschedule_job_for_chat(self, chat_id: int) -> None:
         if not self.application.job_queue:
             logger.error("JobQueue не доступен в DailyQuizScheduler. Невозможно перепланировать задачи.")
             return
 
-        job_queue: JobQueue = self.application.job_queue # type: ignore
-
-        prefix_job_name_base = f"daily_quiz_for_chat_{chat_id}_time_idx_"
-        existing_jobs_for_chat = [job for job in job_queue.jobs() if job.name and job.name.startswith(prefix_job_name_base)]
+        planned_count_for_this_chat = self._plan_chat_slots(chat_id)
+        self._arm_schedule_driver()
+        if planned_count_for_this_chat > 0:
+            logger.info(f"Запланировано {planned_count_for_this_chat} запусков ежедневной викторины для чата {chat_id}")
 
-        if existing_jobs_for_chat:
-            for job in existing_jobs_for_chat:
-                job.schedule_removal()
-            logger.debug(f"Удалены существующие задачи ({len(existing_jobs_for_chat)}) с префиксом '{prefix_job_name_base}' для чата {chat_id} перед перепланировкой.")
+    def _plan_chat_slots(self, chat_id: int) -> int:
+        """Заменяет слоты чата в расписании по его настройкам; возвращает количество слотов"""
+        removed_count = self.schedule.remove_chat(chat_id)
+        if removed_count:
+            logger.debug(f"Сняты слоты ({removed_count}) ежедневной викторины для чата {chat_id} перед перепланировкой.")
 
         chat_settings = self.data_manager.get_chat_settings(chat_id)
         daily_quiz_cfg_chat = chat_settings.get("daily_quiz", {})
         daily_quiz_defaults_app = self.app_config.daily_quiz_defaults
 
         if not daily_quiz_cfg_chat.get("enabled", daily_quiz_defaults_app.get("enabled")):
-            logger.info(f"Ежедневная викторина для чата {chat_id} отключена. Задачи не будут запланированы.")
-            return
+            logger.debug(f"Ежедневная викторина для чата {chat_id} отключена. Слоты не планируются.")
+            return 0
 
         # Получаем timezone из настроек чата
         chat_timezone_str = daily_quiz_cfg_chat.get("timezone", "Europe/Moscow")
@@ -130,10 +275,10 @@ class DailyQuizScheduler:
         times_list: List[Dict[str, int]] = daily_quiz_cfg_chat.get("times_msk", daily_quiz_defaults_app.get("times_msk", []))
 
         if not times_list:
-            logger.info(f"Для чата {chat_id} не настроено ни одного времени запуска ежедневной викторины. Задачи не запланированы.")
-            return
+            logger.info(f"Для чата {chat_id} не настроено ни одного времени запуска ежедневной викторины. Слоты не запланированы.")
+            return 0
 
-        planned_count_for_this_chat = 0
+        valid_times: List[Tuple[int, int]] = []
         for i, time_entry in enumerate(times_list):
             hour_msk = time_entry.get("hour")
             minute_msk = time_entry.get("minute")
@@ -141,168 +286,58 @@ class DailyQuizScheduler:
             if hour_msk is None or minute_msk is None:
                 logger.warning(f"Некорректная запись времени (индекс {i}) для чата {chat_id}: {time_entry}. Пропуск.")
                 continue
-
-            job_name_for_this_time = self._get_job_name_for_time_entry(chat_id, i)
-
-            try:
-                # ИСПРАВЛЕНИЕ: Используем timezone из настроек чата вместо жестко заданного Moscow
-                from datetime import datetime
-                now_in_chat_tz = datetime.now(chat_timezone)
-                target_datetime_chat_tz = now_in_chat_tz.replace(hour=hour_msk, minute=minute_msk, second=0, microsecond=0)
-
-                # ОПТИМИЗАЦИЯ: Проверяем, не прошло ли уже время для сегодняшнего дня
-                if target_datetime_chat_tz <= now_in_chat_tz:
-                    # Время уже прошло, планируем на завтра
-                    target_datetime_chat_tz = target_datetime_chat_tz + timedelta(days=1)
-                    logger.debug(f"Время {hour_msk:02d}:{minute_msk:02d} уже прошло для чата {chat_id} в timezone {chat_timezone_str}, планируем на завтра")
-
-                # Конвертируем в UTC для APScheduler
-                target_datetime_utc = target_datetime_chat_tz.astimezone(pytz.UTC)
-                target_time_utc = target_datetime_utc.time()
-
-                # Для логирования создаём время в часовом поясе чата
-                target_time_in_chat_tz = time(hour=hour_msk, minute=minute_msk, tzinfo=chat_timezone)
-
-            except ValueError as e_time_format:
-                logger.error(f"Некорректное время ({hour_msk}:{minute_msk}) для ежедневной викторины (индекс {i}) в чате {chat_id}: {e_time_format}. Задача не запланирована.")
-                continue
-
-            # ОПТИМИЗАЦИЯ: Проверяем, не существует ли уже такая задача
-            existing_job = next((job for job in job_queue.jobs() if job.name == job_name_for_this_time), None)
-            if existing_job and not existing_job.removed:
-                logger.debug(f"Задача {job_name_for_this_time} уже существует и активна, пропускаем создание дубликата")
-                planned_count_for_this_chat += 1
+            if not (0 <= hour_msk <= 23 and 0 <= minute_msk <= 59):
+                logger.error(f"Некорректное время ({hour_msk}:{minute_msk}) для ежедневной викторины (индекс {i}) в чате {chat_id}. Слот не запланирован.")
                 continue
+            valid_times.append((hour_msk, minute_msk))
 
-            # Логируем планируемое время для отладки
-            logger.debug(f"Планируем задачу для чата {chat_id}, время {i+1}: {hour_msk:02d}:{minute_msk:02d} {chat_timezone_str} -> {target_time_utc.strftime('%H:%M')} UTC (что соответствует {target_time_in_chat_tz.strftime('%H:%M %Z')})")
-
-            # ОПТИМИЗАЦИЯ: Добавляем минимальную паузу между созданием задач для снижения нагрузки
-            if i > 0:
-                await asyncio.sleep(0.1)  # ОПТИМИЗАЦИЯ: Уменьшено до 100ms пауза между задачами для одного чата
-            
-            job_queue.run_daily(
-                callback=self._trigger_daily_quiz_job,
-                time=target_time_utc,  # Время уже в UTC
-                data={"chat_id": chat_id, "time_entry_index": i},
-                name=job_name_for_this_time
+        planned_count = self.schedule.set_chat(chat_id, valid_times, chat_timezone)
+        for scheduled in self.schedule.get_chat_slots(chat_id):
+            logger.debug(
+                f"Слот {scheduled.slot_index + 1} чата {chat_id}: {scheduled.hour:02d}:{scheduled.minute:02d} {chat_timezone_str} "
+                f"-> ближайший запуск {scheduled.fire_at.strftime('%Y-%m-%d %H:%M')} UTC"
             )
-            # Для продакшена логируем только итоговую информацию, а не каждую задачу
-            logger.debug(f"Ежедневная викторина для чата {chat_id} (время {i+1}) успешно запланирована на {target_time_in_chat_tz.strftime('%H:%M %Z')}. Имя задачи: {job_name_for_this_time}")
-            planned_count_for_this_chat +=1
-
-        # Логируем итоговую информацию только один раз для всех задач чата
-        if planned_count_for_this_chat > 0:
-            logger.info(f"Запланировано {planned_count_for_this_chat} задач ежедневной викторины для чата {chat_id}")
-        elif times_list :
-            logger.warning(f"Ни одна задача для ежедневной викторины не была запланирована для чата {chat_id}, хотя времена были указаны.")
+        if planned_count == 0:
+            logger.warning(f"Ни один слот ежедневной викторины не был запланирован для чата {chat_id}, хотя времена были указаны.")
+        return planned_count
 
-    # ИЗМЕНЕНИЕ: Переименован для соответствия вызову в bot.py
     async def schedule_all_daily_quizzes_from_startup(self) -> None:
-        logger.info("Инициализация задач для ежедневных викторин при запуске бота...")
+        logger.info("Инициализация расписания ежедневных викторин при запуске бота...")
         if not self.application.job_queue:
-            logger.error("JobQueue не доступен при schedule_all_daily_quizzes_from_startup. Задачи не будут инициализированы.")
+            logger.error("JobQueue не доступен при schedule_all_daily_quizzes_from_startup. Расписание не будет инициализировано.")
             return
 
         all_chat_ids_with_settings = list(self.state.chat_settings.keys())
 
         if not all_chat_ids_with_settings:
-            logger.info("Нет сохраненных настроек чатов. Задачи для ежедневных викторин не инициализируются.")
+            logger.info("Нет сохраненных настроек чатов. Расписание ежедневных викторин пусто.")
             return
 
-        # ОПТИМИЗАЦИЯ: Проверяем существующие задачи перед планированием новых
-        job_queue: JobQueue = self.application.job_queue # type: ignore
-        existing_daily_jobs = [job for job in job_queue.jobs() if job.name and 'daily_quiz_for_chat_' in job.name]
-        
-        if existing_daily_jobs:
-            logger.info(f"Найдено {len(existing_daily_jobs)} существующих задач ежедневных викторин. Очищаем перед перепланированием...")
-            for job in existing_daily_jobs:
-                job.schedule_removal()
-            # ОПТИМИЗАЦИЯ: Увеличиваем время на очистку для снижения нагрузки
-            await asyncio.sleep(1.0)
-
-        # ОПТИМИЗАЦИЯ: Ограничиваем количество одновременно планируемых задач
-        max_concurrent_planning = 1  # Уменьшено до 1 для максимального снижения нагрузки
-        successful_initializations = 0
-        
-        for i in range(0, len(all_chat_ids_with_settings), max_concurrent_planning):
-            batch = all_chat_ids_with_settings[i:i + max_concurrent_planning]
-            
-            # Планируем задачи батчами
-            for chat_id_int in batch:
-                try:
-                    await self.reschedule_job_for_chat(chat_id_int)
-                    successful_initializations += 1
-                except Exception as e:
-                    logger.error(f"Ошибка при инициализации/перепланировке задач для чата {chat_id_int}: {e}", exc_info=e)
-            
-            # ОПТИМИЗАЦИЯ: Уменьшаем паузу между батчами для более быстрой работы
-            if i + max_concurrent_planning < len(all_chat_ids_with_settings):
-                await asyncio.sleep(0.3)  # ОПТИМИЗАЦИЯ: Уменьшено до 300ms пауза между батчами
-
-        logger.info(f"Инициализация/перепланировка задач ежедневных викторин завершена. Попыток: {len(all_chat_ids_with_settings)}, успешных вызовов reschedule_job_for_chat: {successful_initializations}.")
+        # Слоты вычисляются в памяти без создания задач, драйвер планируется один раз
+        planned_slots = 0
+        for chat_id_int in all_chat_ids_with_settings:
+            try:
+                planned_slots += self._plan_chat_slots(chat_id_int)
+            except Exception as e:
+                logger.error(f"Ошибка при инициализации расписания для чата {chat_id_int}: {e}", exc_info=e)
+        self._arm_schedule_driver()
+
+        logger.info(f"Расписание ежедневных викторин инициализировано: чатов {len(all_chat_ids_with_settings)}, слотов {planned_slots}.")
 
     def get_handlers(self) -> list:
         return []
 
     async def adjust_timezone_for_chat(self, chat_id: int, old_timezone: str, new_timezone: str) -> bool:
         """
-        Корректирует время существующих задач при смене часового пояса.
-        Возвращает True если коррекция прошла успешно, False если нужна полная перепланировка.
+        Пересчитывает слоты чата при смене часового пояса.
+        Слоты хранят локальное время, поэтому коррекция - это перепланировка
+        слотов чата; возвращает True при успехе.
         """
-        if not self.application.job_queue:
-            logger.warning(f"JobQueue не доступен для коррекции часового пояса чата {chat_id}")
-            return False
-
-        job_queue: JobQueue = self.application.job_queue # type: ignore
-
-        # Находим все задачи для этого чата
-        chat_jobs = [job for job in job_queue.jobs() if job.name and f'daily_quiz_for_chat_{chat_id}_' in job.name]
-
-        if not chat_jobs:
-            logger.debug(f"Нет активных задач для чата {chat_id}, пропускаем коррекцию часового пояса")
-            return True
-
         try:
-            # Вычисляем разницу между часовыми поясами
-            old_tz = pytz.timezone(old_timezone)
-            new_tz = pytz.timezone(new_timezone)
-            now = datetime.now(pytz.UTC)
-
-            # Разница в часах между поясами
-            old_offset = old_tz.utcoffset(now)
-            new_offset = new_tz.utcoffset(now)
-            offset_diff = (new_offset - old_offset).total_seconds() / 3600
-
-            logger.info(f"Корректировка часового пояса для чата {chat_id}: {old_timezone} -> {new_timezone} (разница: {offset_diff:+.1f} часов)")
-
-            adjusted_count = 0
-            for job in chat_jobs:
-                try:
-                    # Получаем текущее время задачи
-                    current_time = job.trigger.run_date.time() if hasattr(job.trigger, 'run_date') else None
-                    if not current_time:
-                        continue
-
-                    # Создаем datetime с текущим временем в старом поясе
-                    current_datetime = datetime.combine(now.date(), current_time, old_tz)
-
-                    # Конвертируем в новый пояс
-                    new_datetime = current_datetime.astimezone(new_tz)
-
-                    # Обновляем время задачи
-                    new_time = new_datetime.time()
-                    job.trigger.run_date = job.trigger.run_date.replace(hour=new_time.hour, minute=new_time.minute)
-
-                    adjusted_count += 1
-                    logger.debug(f"Задача {job.name} скорректирована: {current_time} -> {new_time}")
-
-                except Exception as e:
-                    logger.error(f"Ошибка при коррекции задачи {job.name}: {e}")
-
-            logger.info(f"Успешно скорректировано {adjusted_count} задач для чата {chat_id}")
+            planned_count = self._plan_chat_slots(chat_id)
+            self._arm_schedule_driver()
+            logger.info(f"Часовой пояс чата {chat_id} изменен: {old_timezone} -> {new_timezone}, пересчитано слотов: {planned_count}")
             return True
-
         except Exception as e:
             logger.error(f"Ошибка при коррекции часового пояса для чата {chat_id}: {e}")
             return False
@@ -312,57 +347,27 @@ class DailyQuizScheduler:
         if not self.application.job_queue:
             return {"error": "JobQueue не доступен"}
 
-        job_queue: JobQueue = self.application.job_queue # type: ignore
-        all_jobs = job_queue.jobs()
-        daily_quiz_jobs = [job for job in all_jobs if job.name and 'daily_quiz_for_chat_' in job.name]
-        
+        slots = sorted(self.schedule.iter_slots(), key=lambda scheduled: scheduled.fire_at)
         status = {
-            "total_jobs": len(all_jobs),
-            "daily_quiz_jobs": len(daily_quiz_jobs),
-            "scheduler_working": True,
-            "daily_quiz_jobs_details": []
+            "total_jobs": len(self.application.job_queue.jobs()),
+            "daily_quiz_jobs": len(slots),
+            "scheduler_working": get_job_registry(self.application.job_queue).get(DAILY_SCHEDULE_DRIVER_JOB_NAME) is not None or not slots,
+            "daily_quiz_jobs_details": [],
+            "fanout_reports": list(self.fanout_reports),
+            "schedule": self.schedule.get_stats()
         }
-        
-        for job in daily_quiz_jobs:
-            next_run = job.next_run_time
-            if next_run:
-                # ИСПРАВЛЕНИЕ: APScheduler планирует в UTC, конвертируем в timezone чата
-                next_run_utc = next_run.replace(tzinfo=pytz.UTC)
-
-                # Для каждого чата определяем его timezone из настроек
-                chat_id_from_job = None
-                for job_name_part in job.name.split('_'):
-                    if job_name_part.isdigit() and len(job_name_part) > 5:  # chat_id обычно длинный
-                        chat_id_from_job = int(job_name_part)
-                        break
-
-                if chat_id_from_job:
-                    chat_settings = self.data_manager.get_chat_settings(chat_id_from_job)
-                    chat_timezone_str = chat_settings.get("daily_quiz", {}).get("timezone", "Europe/Moscow")
-                    try:
-                        chat_timezone = pytz.timezone(chat_timezone_str)
-                        next_run_local = next_run_utc.astimezone(chat_timezone)
-                        timezone_display = chat_timezone_str
-                    except:
-                        chat_timezone = self.moscow_tz
-                        next_run_local = next_run_utc.astimezone(chat_timezone)
-                        timezone_display = "Europe/Moscow"
-                else:
-                    next_run_local = next_run_utc.astimezone(self.moscow_tz)
-                    timezone_display = "Europe/Moscow"
-
-                # Логируем для отладки
-                logger.debug(f"Job {job.name}: next_run (UTC): {next_run_utc}, next_run_local ({timezone_display}): {next_run_local}")
-
-                job_info = {
-                    "name": job.name,
-                    "next_run_utc": next_run_utc.strftime('%Y-%m-%d %H:%M:%S'),
-                    "next_run_local": next_run_local.strftime('%Y-%m-%d %H:%M:%S'),
-                    "timezone": timezone_display,
-                    "enabled": not job.removed
-                }
-                status["daily_quiz_jobs_details"].append(job_info)
-        
+
+        for scheduled in slots:
+            # Имя в прежнем формате задач: по нему статус группируется по чатам
+            job_info = {
+                "name": self._get_job_name_for_time_entry(scheduled.chat_id, scheduled.slot_index),
+                "next_run_utc": scheduled.fire_at.strftime('%Y-%m-%d %H:%M:%S'),
+                "next_run_local": scheduled.fire_at.astimezone(scheduled.tz).strftime('%Y-%m-%d %H:%M:%S'),
+                "timezone": str(scheduled.tz),
+                "enabled": True
+            }
+            status["daily_quiz_jobs_details"].append(job_info)
+
         return status
 
     def log_scheduler_status(self) -> None:
@@ -374,7 +379,6 @@ class DailyQuizScheduler:
             return
         
         # Логируем текущее время сервера для отладки
-        from datetime import datetime
         now_utc = datetime.now(pytz.UTC)
         now_moscow = now_utc.astimezone(self.moscow_tz)
         logger.info(f"📊 СТАТУС ПЛАНИРОВЩИКА ЕЖЕДНЕВНЫХ ВИКТОРИН:")
@@ -8,6 +8,7 @@ from telegram.constants import ParseMode
 
 from utils import escape_markdown_v2
 from modules.telegram_utils import safe_send_message, format_error_message
+from modules.dedup_cache import DedupCache, poll_answer_key
 
 if TYPE_CHECKING:
     from app_config import AppConfig
@@ -32,6 +33,8 @@ class CustomPollAnswerHandler:
         self.score_manager = score_manager
         self.data_manager = data_manager
         self.quiz_manager = quiz_manager
+        # Уже обработанные ответы (poll_id, user_id); час - дольше любого open_period опроса
+        self._processed_answers = DedupCache(max_size=10000, ttl_seconds=3600)
 
     async def handle_poll_answer(self, update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
         if not update.poll_answer:
@@ -42,26 +45,10 @@ class CustomPollAnswerHandler:
         user: TelegramUser = poll_answer.user
         answered_poll_id: str = poll_answer.poll_id
 
-        # ИСПРАВЛЕНО: Проверяем, не обрабатывали ли мы уже этот ответ
-        # Создаем уникальный ключ для ответа
-        answer_key = f"{answered_poll_id}_{user.id}"
-        
-        # Проверяем, не был ли этот ответ уже обработан
-        if hasattr(self, '_processed_answers') and answer_key in self._processed_answers:
-            logger.debug(f"Ответ {answer_key} уже был обработан, игнорируем дублирование")
+        # Повторная доставка того же ответа (например, после ретрая webhook) не обрабатывается
+        if self._processed_answers.check_and_add(poll_answer_key(answered_poll_id, user.id)):
+            logger.debug(f"Ответ {answered_poll_id}_{user.id} уже был обработан, игнорируем дублирование")
             return
-        
-        # Инициализируем множество обработанных ответов, если его нет
-        if not hasattr(self, '_processed_answers'):
-            self._processed_answers = set()
-        
-        # Добавляем текущий ответ в обработанные
-        self._processed_answers.add(answer_key)
-        
-        # Ограничиваем размер множества (очищаем старые записи)
-        if len(self._processed_answers) > 1000:
-            # Оставляем только последние 500 ответов
-            self._processed_answers = set(list(self._processed_answers)[-500:])
 
         poll_info_from_state = self.state.get_current_poll_data(answered_poll_id)
 
@@ -133,7 +120,7 @@ class CustomPollAnswerHandler:
                     # Streak ачивки добавляются в список для удаления
                     active_quiz = self.state.get_active_quiz(chat_id_int)
                     if active_quiz:
-                        active_quiz.message_ids_to_delete.add(streak_msg.message_id)
+                        self.data_manager.add_quiz_message_for_deletion(active_quiz, streak_msg.message_id)
                         logger.info(f"📝 ID сообщения о streak ачивке {streak_msg.message_id} добавлен в список для удаления")
                     
                 except Exception as e:
@@ -178,7 +165,7 @@ class CustomPollAnswerHandler:
         active_quiz_session = self.state.get_active_quiz(chat_id_int)
         if active_quiz_session and answered_poll_id in active_quiz_session.active_poll_ids_in_session: # ИСПРАВЛЕНО ИМЯ
              if self.quiz_manager:
-                 await self.quiz_manager._handle_early_answer_for_session(context, chat_id_int, answered_poll_id)
+                 self.quiz_manager.submit_answer(context, chat_id_int, answered_poll_id)
 
     def get_handler(self) -> PTBPollAnswerHandler:
         return PTBPollAnswerHandler(self.handle_poll_answer)
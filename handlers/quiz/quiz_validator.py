@@ -9,6 +9,8 @@ import re
 from typing import Dict, List, Optional, Any, Union, Set
 from datetime import datetime, timedelta
 
+from modules import question_rules
+
 from .quiz_types import (
     QuizConfig, QuizSession, QuizQuestion, QuizAnswer,
     QuizMode, QuizState, QuizResult
@@ -24,14 +26,14 @@ class QuizValidator:
     MAX_QUESTIONS_PER_SESSION = 50
     MAX_INTERVAL_SECONDS = 3600  # 1 час
     MAX_OPEN_PERIOD_SECONDS = 86400  # 24 часа
-    MAX_QUESTION_TEXT_LENGTH = 4096
-    MAX_OPTION_TEXT_LENGTH = 100
-    MAX_OPTIONS_COUNT = 10
-    MIN_OPTIONS_COUNT = 2
+    MAX_QUESTION_TEXT_LENGTH = question_rules.MAX_QUESTION_TEXT_LENGTH
+    MAX_OPTION_TEXT_LENGTH = question_rules.MAX_OPTION_TEXT_LENGTH
+    MAX_OPTIONS_COUNT = question_rules.MAX_OPTIONS_COUNT
+    MIN_OPTIONS_COUNT = question_rules.MIN_OPTIONS_COUNT
     MAX_CATEGORIES_COUNT = 20
 
     # Паттерны для валидации
-    QUESTION_ID_PATTERN = re.compile(r'^[a-zA-Z0-9_-]{1,100}$')
+    QUESTION_ID_PATTERN = question_rules.QUESTION_ID_PATTERN
     SAFE_TEXT_PATTERN = re.compile(r'^[a-zA-Zа-яА-Я0-9\s\.,!?\-\(\)\[\]{}:;"\'«»\n]*$')
 
     @classmethod
@@ -76,60 +78,19 @@ class QuizValidator:
     @classmethod
     def validate_question(cls, question: QuizQuestion) -> List[str]:
         """Валидировать вопрос викторины"""
-        errors = []
+        return question_rules.validate_question_fields(
+            question_id=question.question_id,
+            text=question.text,
+            options=question.options,
+            correct_option=question.correct_option,
+            category=question.category,
+            explanation=question.explanation
+        )
 
-        # Валидация ID вопроса
-        if not question.question_id or not isinstance(question.question_id, str):
-            errors.append("ID вопроса обязателен")
-        elif not cls.QUESTION_ID_PATTERN.match(question.question_id):
-            errors.append("ID вопроса содержит недопустимые символы")
-
-        # Валидация текста вопроса
-        if not question.text or not isinstance(question.text, str):
-            errors.append("Текст вопроса обязателен")
-        elif len(question.text.strip()) == 0:
-            errors.append("Текст вопроса не может быть пустым")
-        elif len(question.text) > cls.MAX_QUESTION_TEXT_LENGTH:
-            errors.append(f"Текст вопроса слишком длинный (макс. {cls.MAX_QUESTION_TEXT_LENGTH} символов)")
-
-        # Валидация вариантов ответа
-        if not question.options or not isinstance(question.options, list):
-            errors.append("Варианты ответа обязательны")
-        elif len(question.options) < cls.MIN_OPTIONS_COUNT:
-            errors.append(f"Минимум {cls.MIN_OPTIONS_COUNT} варианта ответа")
-        elif len(question.options) > cls.MAX_OPTIONS_COUNT:
-            errors.append(f"Максимум {cls.MAX_OPTIONS_COUNT} вариантов ответа")
-        else:
-            for i, option in enumerate(question.options):
-                if not isinstance(option, str):
-                    errors.append(f"Вариант {i+1} должен быть строкой")
-                elif len(option.strip()) == 0:
-                    errors.append(f"Вариант {i+1} не может быть пустым")
-                elif len(option) > cls.MAX_OPTION_TEXT_LENGTH:
-                    errors.append(f"Вариант {i+1} слишком длинный (макс. {cls.MAX_OPTION_TEXT_LENGTH} символов)")
-
-        # Валидация правильного ответа
-        if not isinstance(question.correct_option, int):
-            errors.append("Индекс правильного ответа должен быть целым числом")
-        elif question.correct_option < 0:
-            errors.append("Индекс правильного ответа не может быть отрицательным")
-        elif question.options and question.correct_option >= len(question.options):
-            errors.append("Индекс правильного ответа выходит за пределы вариантов")
-
-        # Валидация категории
-        if not question.category or not isinstance(question.category, str):
-            errors.append("Категория вопроса обязательна")
-        elif not question.category.strip():
-            errors.append("Категория вопроса не может быть пустой")
-
-        # Валидация объяснения (опционально)
-        if question.explanation is not None:
-            if not isinstance(question.explanation, str):
-                errors.append("Объяснение должно быть строкой")
-            elif len(question.explanation) > cls.MAX_QUESTION_TEXT_LENGTH:
-                errors.append(f"Объяснение слишком длинное (макс. {cls.MAX_QUESTION_TEXT_LENGTH} символов)")
-
-        return errors
+    @classmethod
+    def validate_question_data(cls, data: Dict[str, Any], category: str) -> List[str]:
+        """Валидировать вопрос в формате файла категории (правила в modules/question_rules.py)"""
+        return question_rules.validate_question_data(data, category)
 
     @classmethod
     def validate_answer(cls, answer: QuizAnswer, question: Optional[QuizQuestion] = None) -> List[str]:
@@ -3,7 +3,7 @@ from __future__ import annotations
 import asyncio
 import logging
 import time
-from typing import List, Optional, Union, Dict, Any
+from typing import List, Optional, Tuple, Union, Dict, Any
 from datetime import timedelta
 import datetime as dt 
 import pytz 
@@ -34,6 +34,14 @@ from data_manager import DataManager
 from modules.category_manager import CategoryManager
 from modules.score_manager import ScoreManager
 from modules.quiz_engine import QuizEngine
+from modules.poll_payload import PreparedPoll
+from modules.message_deletion import get_message_deletion_service
+from modules.request_scheduler import get_request_scheduler
+from modules.job_registry import get_job_registry
+from modules.quiz_journal import EVENT_POLL_CLOSED, EVENT_PROGRESSION, EVENT_QUESTION_SENT, EVENT_STOPPING
+from modules.quiz_actors import (
+    EVENT_ANSWER, EVENT_INTERVAL_ELAPSED, EVENT_POLL_END, EVENT_START, EVENT_STOP, ActorEvent, QuizActorPool
+)
 from utils import get_current_utc_time, schedule_job_unique, escape_markdown_v2, is_user_admin_in_update
 from modules.telegram_utils import safe_send_message, format_error_message
 
@@ -74,9 +82,11 @@ class QuizManager:
         self.data_manager = data_manager
         self.application = application
         self.quiz_engine = QuizEngine(state=self.state, app_config=self.app_config, data_manager=self.data_manager)
+        self.request_scheduler = get_request_scheduler()
+        self.message_deletion = get_message_deletion_service()
         self.moscow_tz = pytz.timezone('Europe/Moscow')
-        # Защита от параллельных вызовов _send_next_question для одного чата
-        self._send_question_locks: Dict[int, asyncio.Lock] = {}
+        # Все события сессии чата обрабатываются по очереди актором чата
+        self.actors = QuizActorPool(self._dispatch_actor_event)
         logger.debug(f"QuizManager initialized. Command for quiz: '/{self.app_config.commands.quiz}'")
 
     def _get_effective_quiz_params(self, chat_id: int, num_questions_override: Optional[int] = None) -> Dict[str, Any]:
@@ -132,6 +142,30 @@ class QuizManager:
             "quiz_announce_delay_seconds": quiz_settings.get("default_announce_delay_seconds", default_quiz_settings.get("default_announce_delay_seconds", 5)),
         }
 
+    def _get_categories_mode_for_questions(
+        self, category_names_for_quiz: Optional[List[str]], is_random_categories_mode: bool
+    ) -> str:
+        if is_random_categories_mode:
+            return "random_from_pool"
+        elif category_names_for_quiz:
+            return "specific_only"
+        return "random_from_pool"
+
+    def select_questions_for_session(
+        self, chat_id: int, num_questions: int,
+        category_names_for_quiz: Optional[List[str]] = None,
+        is_random_categories_mode: bool = False
+    ) -> List[Dict[str, Any]]:
+        """Подбирает вопросы для сессии викторины"""
+        cat_mode_for_get_questions = self._get_categories_mode_for_questions(category_names_for_quiz, is_random_categories_mode)
+        logger.debug(f"select_questions_for_session: Получение вопросов. Режим для get_questions: {cat_mode_for_get_questions}, Исходные запрашиваемые категории: {category_names_for_quiz}")
+        return self.category_manager.get_questions(
+            num_questions_needed=num_questions,
+            chat_id=chat_id,
+            allowed_specific_categories=category_names_for_quiz if cat_mode_for_get_questions == "specific_only" else None,
+            mode=cat_mode_for_get_questions
+        )
+
     async def _initiate_quiz_session(
         self, context: ContextTypes.DEFAULT_TYPE, chat_id: int, initiated_by_user: Optional[TelegramUser],
         quiz_type: str, quiz_mode: str, num_questions: int, open_period_seconds: int,
@@ -140,7 +174,8 @@ class QuizManager:
         is_random_categories_mode: bool = False,
         interval_seconds: Optional[int] = None,
         original_command_message_id: Optional[int] = None,
-        interactive_start_message_id: Optional[int] = None
+        interactive_start_message_id: Optional[int] = None,
+        preselected_questions: Optional[List[Dict[str, Any]]] = None
     ):
         logger.info(f"НАЧАЛО _initiate_quiz_session: Чат {chat_id}, Тип: {quiz_type}, Режим: {quiz_mode}, NQ: {num_questions}")
 
@@ -159,21 +194,14 @@ class QuizManager:
                     self.state.add_message_for_deletion(chat_id, already_running_msg.message_id, delay_seconds=30)
             return
 
-        cat_mode_for_get_questions: str
-        if is_random_categories_mode:
-            cat_mode_for_get_questions = "random_from_pool"
-        elif category_names_for_quiz:
-            cat_mode_for_get_questions = "specific_only"
+        cat_mode_for_get_questions = self._get_categories_mode_for_questions(category_names_for_quiz, is_random_categories_mode)
+        if preselected_questions is not None:
+            # Вопросы подобраны заранее (например, до открытия окна ежедневной викторины)
+            questions_for_session = preselected_questions
         else:
-            cat_mode_for_get_questions = "random_from_pool"
-
-        logger.debug(f"_initiate_quiz_session: Получение вопросов. Режим для get_questions: {cat_mode_for_get_questions}, Исходные запрашиваемые категории: {category_names_for_quiz}")
-        questions_for_session = self.category_manager.get_questions(
-            num_questions_needed=num_questions,
-            chat_id=chat_id,
-            allowed_specific_categories=category_names_for_quiz if cat_mode_for_get_questions == "specific_only" else None,
-            mode=cat_mode_for_get_questions
-        )
+            questions_for_session = self.select_questions_for_session(
+                chat_id, num_questions, category_names_for_quiz, is_random_categories_mode
+            )
         logger.debug(f"_initiate_quiz_session: Получено {len(questions_for_session)} вопросов.")
 
         # Определяем множество использованных категорий для анонса
@@ -239,7 +267,7 @@ class QuizManager:
         )
 
         if interactive_start_message_id:
-            current_quiz_state_instance.message_ids_to_delete.add(interactive_start_message_id)
+            self.data_manager.add_quiz_message_for_deletion(current_quiz_state_instance, interactive_start_message_id)
             logger.debug(f"Сообщение о запуске из интерактива ({interactive_start_message_id}) добавлено в список на удаление (служебные).")
 
         if announce:
@@ -284,7 +312,7 @@ class QuizManager:
             parse_mode=ParseMode.MARKDOWN_V2
         )
                     current_quiz_state_instance.announce_message_id = msg.message_id
-                    current_quiz_state_instance.message_ids_to_delete.add(msg.message_id)
+                    self.data_manager.add_quiz_message_for_deletion(current_quiz_state_instance, msg.message_id)
                     # Добавляем в глобальный список для периодической очистки
                     self.state.add_message_for_deletion(chat_id, msg.message_id)
                 except Exception as e_announce:
@@ -319,117 +347,201 @@ class QuizManager:
             self.state.add_active_quiz(chat_id, current_quiz_state_instance)
             logger.info(f"_initiate_quiz_session: QuizState (без анонса) создан и добавлен для чата {chat_id}. Тип: {quiz_type}")
 
+        # Снимок сессии пишется один раз при старте, дальше состояние сохраняется журналом
+        self.data_manager.save_active_quiz_snapshot(current_quiz_state_instance)
+
         logger.info(f"_initiate_quiz_session: Переход к отправке первого вопроса для чата {chat_id}.")
-        await self._send_next_question(context, chat_id)
+        self.actors.post(chat_id, EVENT_START, context)
+
+    async def _dispatch_actor_event(self, chat_id: int, event: ActorEvent) -> None:
+        """Обработчик событий актора чата: единственное место, где меняется ход сессии"""
+        if event.kind == EVENT_START:
+            await self._send_next_question(event.context, chat_id)
+        elif event.kind == EVENT_ANSWER:
+            await self._handle_early_answer_for_session(event.context, chat_id, event.data["poll_id"])
+        elif event.kind == EVENT_POLL_END:
+            await self._on_poll_end(event.context, chat_id, event.data["ended_poll_id"])
+        elif event.kind == EVENT_INTERVAL_ELAPSED:
+            await self._on_interval_elapsed(event.context, chat_id, event.data.get("expected_q_idx"), event.data.get("job_name"))
+        elif event.kind == EVENT_STOP:
+            await self._on_stop(event.context, chat_id, event.data["stopped_by"], event.data.get("stop_message_id"))
+        else:
+            logger.warning(f"Неизвестное событие актора викторины: {event.kind} (чат {chat_id})")
+
+    def submit_answer(self, context: ContextTypes.DEFAULT_TYPE, chat_id: int, answered_poll_id: str) -> None:
+        """Передает ответ на опрос сессии актору чата; повторные ответы на тот же опрос склеиваются"""
+        self.actors.post(chat_id, EVENT_ANSWER, context, coalesce_key=answered_poll_id, poll_id=answered_poll_id)
+
+    def get_actor_metrics(self) -> Dict[str, Any]:
+        """Метрики акторов сессий (глубина почтовых ящиков) для логов и веб-интерфейса"""
+        return self.actors.get_metrics()
 
     async def _send_next_question(self, context: ContextTypes.DEFAULT_TYPE, chat_id: int):
-        # Защита от параллельных вызовов для одного чата
-        if chat_id not in self._send_question_locks:
-            self._send_question_locks[chat_id] = asyncio.Lock()
-        
-        async with self._send_question_locks[chat_id]:
-            logger.debug(f"НАЧАЛО _send_next_question для чата {chat_id}.")
-            quiz_state = self.state.get_active_quiz(chat_id)
+        # Вызывается только из актора чата: параллельных вызовов для одного чата нет
+        logger.debug(f"НАЧАЛО _send_next_question для чата {chat_id}.")
+        quiz_state = self.state.get_active_quiz(chat_id)
+
+        if not quiz_state or quiz_state.is_stopping:
+            logger.warning(f"_send_next_question: Викторина неактивна или останавливается для чата {chat_id}.")
+            return
 
-            if not quiz_state or quiz_state.is_stopping:
-                logger.warning(f"_send_next_question: Викторина неактивна или останавливается для чата {chat_id}.")
+        if quiz_state.current_question_index >= quiz_state.num_questions_to_ask:
+            logger.info(f"_send_next_question: Все {quiz_state.num_questions_to_ask} вопросов для чата {chat_id} уже отправлены.")
+            return
+
+        # Дополнительная проверка: убеждаемся, что вопрос с этим индексом еще не отправлялся
+        # Проверяем по poll_id для текущего индекса
+        expected_q_index = quiz_state.current_question_index
+        for poll_id in list(quiz_state.active_poll_ids_in_session):
+            poll_data = self.state.get_current_poll_data(poll_id)
+            if poll_data and poll_data.get("question_session_index") == expected_q_index:
+                logger.warning(f"_send_next_question: Вопрос с индексом {expected_q_index} уже был отправлен (poll_id: {poll_id}). Пропуск дубликата.")
                 return
 
-            if quiz_state.current_question_index >= quiz_state.num_questions_to_ask:
-                logger.info(f"_send_next_question: Все {quiz_state.num_questions_to_ask} вопросов для чата {chat_id} уже отправлены.")
+        question_data = quiz_state.get_current_question_data()
+        if not question_data:
+            error_msg_text = "Ошибка получения данных вопроса."
+            logger.error(f"_send_next_question: {error_msg_text} Индекс: {quiz_state.current_question_index}, чат: {chat_id}. Завершение.")
+            await self._finalize_quiz_session(context, chat_id, error_occurred=True, error_message=error_msg_text)
+            return
+
+        logger.info(f"_send_next_question: Отправка вопроса {quiz_state.current_question_index + 1}/{quiz_state.num_questions_to_ask} в чате {chat_id}.")
+
+        is_last_q_in_this_session = (quiz_state.current_question_index == quiz_state.num_questions_to_ask - 1)
+        title_prefix_for_poll_unescaped, current_category_name_display_unescaped = self._get_poll_title_parts(quiz_state, question_data)
+        prefetched_poll = await self._take_prefetched_poll(quiz_state)
+
+        sent_poll_id = await self.quiz_engine.send_quiz_poll(
+            context, chat_id, question_data,
+            poll_title_prefix=title_prefix_for_poll_unescaped,
+            open_period_seconds=quiz_state.open_period_seconds,
+            quiz_type=quiz_state.quiz_type,
+            is_last_question=is_last_q_in_this_session,
+            question_session_index=quiz_state.current_question_index,
+            current_category_name=current_category_name_display_unescaped,
+            prepared=prefetched_poll
+        )
+
+        if sent_poll_id:
+            quiz_state_after_poll_send = self.state.get_active_quiz(chat_id)
+            if not quiz_state_after_poll_send or quiz_state_after_poll_send.is_stopping or quiz_state_after_poll_send != quiz_state:
+                logger.warning(f"_send_next_question: Викторина для чата {chat_id} изменилась/остановилась во время отправки опроса. Отмена дальнейших действий для этого вызова.")
                 return
 
-            # Дополнительная проверка: убеждаемся, что вопрос с этим индексом еще не отправлялся
-            # Проверяем по poll_id для текущего индекса
-            expected_q_index = quiz_state.current_question_index
-            for poll_id in list(quiz_state.active_poll_ids_in_session):
-                poll_data = self.state.get_current_poll_data(poll_id)
-                if poll_data and poll_data.get("question_session_index") == expected_q_index:
-                    logger.warning(f"_send_next_question: Вопрос с индексом {expected_q_index} уже был отправлен (poll_id: {poll_id}). Пропуск дубликата.")
-                    return
+            quiz_state.active_poll_ids_in_session.add(sent_poll_id)
+            quiz_state.latest_poll_id_sent = sent_poll_id
+            quiz_state.progression_triggered_for_poll[sent_poll_id] = False
 
-            question_data = quiz_state.get_current_question_data()
-            if not question_data:
-                error_msg_text = "Ошибка получения данных вопроса."
-                logger.error(f"_send_next_question: {error_msg_text} Индекс: {quiz_state.current_question_index}, чат: {chat_id}. Завершение.")
-                await self._finalize_quiz_session(context, chat_id, error_occurred=True, error_message=error_msg_text)
+            poll_data_from_bot_state = self.state.get_current_poll_data(sent_poll_id)
+            if not poll_data_from_bot_state:
+                error_msg_poll_data = "Внутренняя ошибка: потеряны данные опроса при создании (сразу после send_quiz_poll)."
+                logger.error(f"_send_next_question: {error_msg_poll_data} Poll ID: {sent_poll_id}, чат: {chat_id}.")
+                await self._finalize_quiz_session(context, chat_id, error_occurred=True, error_message=error_msg_poll_data)
                 return
 
-            logger.info(f"_send_next_question: Отправка вопроса {quiz_state.current_question_index + 1}/{quiz_state.num_questions_to_ask} в чате {chat_id}.")
-
-            is_last_q_in_this_session = (quiz_state.current_question_index == quiz_state.num_questions_to_ask - 1)
-            q_num_display = quiz_state.current_question_index + 1
-            title_prefix_for_poll_unescaped: str
-            if quiz_state.quiz_type == "single": title_prefix_for_poll_unescaped = "Вопрос"
-            elif quiz_state.quiz_type == "daily": title_prefix_for_poll_unescaped = f"Ежедневный вопрос {q_num_display}/{quiz_state.num_questions_to_ask}"
-            else: title_prefix_for_poll_unescaped = f"Вопрос {q_num_display}/{quiz_state.num_questions_to_ask}"
-
-            current_category_name_display_unescaped = question_data.get('current_category_name_for_quiz', question_data.get('original_category'))
-
-            sent_poll_id = await self.quiz_engine.send_quiz_poll(
-                context, chat_id, question_data,
-                poll_title_prefix=title_prefix_for_poll_unescaped,
-                open_period_seconds=quiz_state.open_period_seconds,
-                quiz_type=quiz_state.quiz_type,
-                is_last_question=is_last_q_in_this_session,
-                question_session_index=quiz_state.current_question_index,
-                current_category_name=current_category_name_display_unescaped if current_category_name_display_unescaped else None
-            )
+            job_name_for_this_poll_end = f"poll_end_chat_{chat_id}_poll_{sent_poll_id}"
+            poll_data_from_bot_state["job_poll_end_name"] = job_name_for_this_poll_end
 
-            if sent_poll_id:
-                quiz_state_after_poll_send = self.state.get_active_quiz(chat_id)
-                if not quiz_state_after_poll_send or quiz_state_after_poll_send.is_stopping or quiz_state_after_poll_send != quiz_state:
-                    logger.warning(f"_send_next_question: Викторина для чата {chat_id} изменилась/остановилась во время отправки опроса. Отмена дальнейших действий для этого вызова.")
-                    return
+            schedule_job_unique(
+                self.application.job_queue,
+                job_name=job_name_for_this_poll_end,
+                callback=self._handle_poll_end_job,
+                when=timedelta(seconds=quiz_state.open_period_seconds + self.app_config.job_grace_period_seconds),
+                data={"chat_id": chat_id, "ended_poll_id": sent_poll_id}
+            )
 
-                quiz_state.active_poll_ids_in_session.add(sent_poll_id)
-                quiz_state.latest_poll_id_sent = sent_poll_id
-                quiz_state.progression_triggered_for_poll[sent_poll_id] = False
+            quiz_state.current_question_index += 1
+            logger.debug(f"_send_next_question: Индекс вопроса в чате {chat_id} увеличен до {quiz_state.current_question_index}.")
+            self.data_manager.journal_quiz_event(
+                chat_id, EVENT_QUESTION_SENT, index=quiz_state.current_question_index, poll_id=sent_poll_id
+            )
 
-                poll_data_from_bot_state = self.state.get_current_poll_data(sent_poll_id)
-                if not poll_data_from_bot_state:
-                    error_msg_poll_data = "Внутренняя ошибка: потеряны данные опроса при создании (сразу после send_quiz_poll)."
-                    logger.error(f"_send_next_question: {error_msg_poll_data} Poll ID: {sent_poll_id}, чат: {chat_id}.")
-                    await self._finalize_quiz_session(context, chat_id, error_occurred=True, error_message=error_msg_poll_data)
-                    return
+            # Серийная викторина: следующий опрос готовится, пока открыт текущий
+            if (quiz_state.quiz_mode in ("serial_immediate", "serial_interval") and
+                quiz_state.current_question_index < quiz_state.num_questions_to_ask):
+                self._prefetch_next_question(chat_id, quiz_state)
 
-                job_name_for_this_poll_end = f"poll_end_chat_{chat_id}_poll_{sent_poll_id}"
-                poll_data_from_bot_state["job_poll_end_name"] = job_name_for_this_poll_end
+            # Планируем следующий вопрос, если есть интервал и это не последний вопрос
+            if (quiz_state.quiz_mode == "serial_interval" and
+                quiz_state.interval_seconds is not None and
+                quiz_state.interval_seconds > 0 and
+                quiz_state.current_question_index < quiz_state.num_questions_to_ask):
 
+                delay_seconds = quiz_state.interval_seconds
+                job_name = f"delayed_next_q_after_send_chat_{chat_id}_qidx_{quiz_state.current_question_index}"
+                quiz_state.next_question_job_name = job_name
                 schedule_job_unique(
                     self.application.job_queue,
-                    job_name=job_name_for_this_poll_end,
-                    callback=self._handle_poll_end_job,
-                    when=timedelta(seconds=quiz_state.open_period_seconds + self.app_config.job_grace_period_seconds),
-                    data={"chat_id": chat_id, "ended_poll_id": sent_poll_id}
+                    job_name=job_name,
+                    callback=self._trigger_next_question_job_after_interval,
+                    when=timedelta(seconds=delay_seconds),
+                    data={"chat_id": chat_id, "expected_q_index_at_trigger": quiz_state.current_question_index}
                 )
+                logger.info(f"Следующий вопрос (индекс {quiz_state.current_question_index}) будет отправлен через {delay_seconds} сек (режим serial_interval).")
+        else:
+            error_msg_text_send_poll = "Ошибка отправки опроса через Telegram API (QuizEngine.send_quiz_poll вернул None)."
+            logger.error(f"_send_next_question: {error_msg_text_send_poll} Вопрос: {quiz_state.current_question_index}, чат: {chat_id}.")
+            await self._finalize_quiz_session(context, chat_id, error_occurred=True, error_message=error_msg_text_send_poll)
 
-                quiz_state.current_question_index += 1
-                logger.debug(f"_send_next_question: Индекс вопроса в чате {chat_id} увеличен до {quiz_state.current_question_index}.")
-
-                # Планируем следующий вопрос, если есть интервал и это не последний вопрос
-                if (quiz_state.quiz_mode == "serial_interval" and
-                    quiz_state.interval_seconds is not None and
-                    quiz_state.interval_seconds > 0 and
-                    quiz_state.current_question_index < quiz_state.num_questions_to_ask):
-
-                    delay_seconds = quiz_state.interval_seconds
-                    job_name = f"delayed_next_q_after_send_chat_{chat_id}_qidx_{quiz_state.current_question_index}"
-                    quiz_state.next_question_job_name = job_name
-                    schedule_job_unique(
-                        self.application.job_queue,
-                        job_name=job_name,
-                        callback=self._trigger_next_question_job_after_interval,
-                        when=timedelta(seconds=delay_seconds),
-                        data={"chat_id": chat_id, "expected_q_index_at_trigger": quiz_state.current_question_index}
-                    )
-                    logger.info(f"Следующий вопрос (индекс {quiz_state.current_question_index}) будет отправлен через {delay_seconds} сек (режим serial_interval).")
-            else:
-                error_msg_text_send_poll = "Ошибка отправки опроса через Telegram API (QuizEngine.send_quiz_poll вернул None)."
-                logger.error(f"_send_next_question: {error_msg_text_send_poll} Вопрос: {quiz_state.current_question_index}, чат: {chat_id}.")
-                await self._finalize_quiz_session(context, chat_id, error_occurred=True, error_message=error_msg_text_send_poll)
+        logger.debug(f"ЗАВЕРШЕНИЕ _send_next_question для чата {chat_id} (вопрос {quiz_state.current_question_index-1 if quiz_state else 'N/A'} отправлен).")
+
+    def _get_poll_title_parts(self, quiz_state: QuizState, question_data: Dict[str, Any]) -> Tuple[str, Optional[str]]:
+        """Заголовок опроса и название категории (без экранирования) для текущего вопроса"""
+        q_num_display = quiz_state.current_question_index + 1
+        if quiz_state.quiz_type == "single": title_prefix = "Вопрос"
+        elif quiz_state.quiz_type == "daily": title_prefix = f"Ежедневный вопрос {q_num_display}/{quiz_state.num_questions_to_ask}"
+        else: title_prefix = f"Вопрос {q_num_display}/{quiz_state.num_questions_to_ask}"
 
-            logger.debug(f"ЗАВЕРШЕНИЕ _send_next_question для чата {chat_id} (вопрос {quiz_state.current_question_index-1 if quiz_state else 'N/A'} отправлен).")
+        category_name = question_data.get('current_category_name_for_quiz', question_data.get('original_category'))
+        return title_prefix, category_name or None
+
+    def _prefetch_next_question(self, chat_id: int, quiz_state: QuizState) -> None:
+        """
+        Готовит опрос для вопроса с индексом current_question_index и заранее
+        выжидает лимит чата для него. Вызывается сразу после отправки опроса.
+        """
+        self._discard_prefetched_poll(quiz_state)
+        question_data = quiz_state.get_current_question_data()
+        if not question_data:
+            return
+        title_prefix, category_name = self._get_poll_title_parts(quiz_state, question_data)
+        prepared = self.quiz_engine.prepare_quiz_poll(
+            chat_id, question_data, title_prefix,
+            question_session_index=quiz_state.current_question_index,
+            current_category_name=category_name
+        )
+        if prepared is None:
+            return
+        quiz_state.prefetched_poll = prepared
+        quiz_state.prefetch_task = asyncio.create_task(
+            self.quiz_engine.request_scheduler.prepay_chat_token(chat_id)
+        )
+        logger.debug(f"Опрос {quiz_state.current_question_index + 1} для чата {chat_id} подготовлен заранее.")
+
+    async def _take_prefetched_poll(self, quiz_state: QuizState) -> Optional[PreparedPoll]:
+        """
+        Забирает заранее подготовленный опрос. Если токен лимита чата еще
+        не оплачен, дожидается его: это то же ожидание, что и при обычной отправке.
+        """
+        prepared, task = quiz_state.prefetched_poll, quiz_state.prefetch_task
+        quiz_state.prefetched_poll = None
+        quiz_state.prefetch_task = None
+        if prepared is None:
+            return None
+        if task is not None and not task.done():
+            # asyncio.wait не пробрасывает отмену задачи в вызывающего
+            await asyncio.wait({task})
+        return prepared
+
+    def _discard_prefetched_poll(self, quiz_state: QuizState) -> None:
+        """Отменяет подготовку следующего опроса и возвращает оплаченный токен лимита"""
+        task = quiz_state.prefetch_task
+        if task is not None and not task.done():
+            task.cancel()
+        if quiz_state.prefetched_poll is not None or task is not None:
+            self.quiz_engine.request_scheduler.release_prepaid_chat_tokens(quiz_state.chat_id)
+        quiz_state.prefetched_poll = None
+        quiz_state.prefetch_task = None
 
     async def _handle_early_answer_for_session(self, context: ContextTypes.DEFAULT_TYPE, chat_id: int, answered_poll_id: str):
         logger.info(f"Обработка ответа на опрос {answered_poll_id} в чате {chat_id}.")
@@ -444,6 +556,7 @@ class QuizManager:
             return
 
         quiz_state.progression_triggered_for_poll[answered_poll_id] = True
+        self.data_manager.journal_quiz_event(chat_id, EVENT_PROGRESSION, poll_id=answered_poll_id)
 
         poll_data_in_state = self.state.get_current_poll_data(answered_poll_id)
         if poll_data_in_state:
@@ -456,8 +569,7 @@ class QuizManager:
 
         if quiz_state.current_question_index < quiz_state.num_questions_to_ask:
             if quiz_state.next_question_job_name: 
-                jobs = self.application.job_queue.get_jobs_by_name(quiz_state.next_question_job_name)
-                for job in jobs: job.schedule_removal()
+                get_job_registry(self.application.job_queue).cancel(quiz_state.next_question_job_name)
                 logger.debug(f"Отменена предыдущая задача отложенной отправки {quiz_state.next_question_job_name}.")
                 quiz_state.next_question_job_name = None
 
@@ -489,6 +601,12 @@ class QuizManager:
             logger.error(f"_trigger_next_question_job_after_interval: chat_id отсутствует. Job: {context.job.name if context.job else 'N/A'}")
             return
 
+        self.actors.post(chat_id, EVENT_INTERVAL_ELAPSED, context, expected_q_idx=expected_q_idx, job_name=context.job.name)
+
+    async def _on_interval_elapsed(
+        self, context: ContextTypes.DEFAULT_TYPE, chat_id: int,
+        expected_q_idx: Optional[int], job_name: Optional[str]
+    ) -> None:
         quiz_state = self.state.get_active_quiz(chat_id)
         if not quiz_state or quiz_state.is_stopping:
             logger.info(f"_trigger_next_question_job_after_interval: Викторина для чата {chat_id} неактивна или останавливается. Пропуск.")
@@ -498,10 +616,10 @@ class QuizManager:
             logger.warning(f"_trigger_next_question_job_after_interval (чат {chat_id}): Ожидаемый индекс вопроса {expected_q_idx} не совпадает с текущим {quiz_state.current_question_index}. Пропуск отправки.")
             return
 
-        if quiz_state.next_question_job_name == (context.job.name if context.job else None):
-            quiz_state.next_question_job_name = None 
+        if quiz_state.next_question_job_name == job_name:
+            quiz_state.next_question_job_name = None
 
-        logger.info(f"Сработала задача отложенной отправки следующего вопроса для чата {chat_id}. Job: {context.job.name if context.job else 'N/A'}.")
+        logger.info(f"Сработала задача отложенной отправки следующего вопроса для чата {chat_id}. Job: {job_name}.")
         await self._send_next_question(context, chat_id)
 
     async def _handle_poll_end_job(self, context: ContextTypes.DEFAULT_TYPE):
@@ -518,7 +636,9 @@ class QuizManager:
             return
 
         logger.info(f"Сработал таймаут для poll_id {ended_poll_id} в чате {chat_id}. Job: {context.job.name}")
+        self.actors.post(chat_id, EVENT_POLL_END, context, ended_poll_id=ended_poll_id)
 
+    async def _on_poll_end(self, context: ContextTypes.DEFAULT_TYPE, chat_id: int, ended_poll_id: str) -> None:
         poll_info_before_removal = self.state.get_current_poll_data(ended_poll_id)
         
         # Защита от повторной обработки: проверяем, что опрос еще существует в state
@@ -550,6 +670,11 @@ class QuizManager:
             logger.info(f"_handle_poll_end_job: Викторина для чата {chat_id} не найдена (возможно, уже завершена).")
             return
 
+        self.data_manager.journal_quiz_event(
+            chat_id, EVENT_POLL_CLOSED, poll_id=ended_poll_id,
+            poll_msg_id=poll_info_before_removal.get("message_id"), solution_msg_id=sent_solution_msg_id
+        )
+
         next_q_was_triggered_by_answer = False
         if poll_info_before_removal:
             next_q_was_triggered_by_answer = poll_info_before_removal.get("next_q_triggered_by_answer", False)
@@ -572,8 +697,7 @@ class QuizManager:
             if not next_q_was_triggered_by_answer:
                 logger.info(f"Таймаут для опроса {ended_poll_id} (чат {chat_id}). Досрочный ответ НЕ инициировал переход. Запуск следующего вопроса.")
                 if quiz_state.next_question_job_name: 
-                    jobs = self.application.job_queue.get_jobs_by_name(quiz_state.next_question_job_name)
-                    for job in jobs: job.schedule_removal()
+                    get_job_registry(self.application.job_queue).cancel(quiz_state.next_question_job_name)
                     quiz_state.next_question_job_name = None
                 await self._send_next_question(context, chat_id)
             else:
@@ -608,27 +732,13 @@ class QuizManager:
         # КОНЕЦ ИЗМЕНЕНИЯ
 
         logger.info(f"Запуск отложенного удаления {len(message_ids_to_delete_list)} СЛУЖЕБНЫХ сообщений в чате {chat_id}. Job: {context.job.name if context.job else 'N/A'}")
-        for msg_id in message_ids_to_delete_list:
-            success = False
-            try:
-                await context.bot.delete_message(chat_id=chat_id, message_id=msg_id)
-                logger.info(f"Сообщение {msg_id} (служебное) удалено отложенно из чата {chat_id}.")
-                success = True
-            except BadRequest as e_br_del:
-                 if "message to delete not found" in str(e_br_del).lower() or \
-                    "message can't be deleted" in str(e_br_del).lower():
-                     logger.debug(f"Сообщение {msg_id} (служебное) уже удалено или не может быть удалено (отложенно): {e_br_del}")
-                     success = True  # Считаем успешным - сообщения нет
-                 else:
-                     logger.warning(f"Ошибка BadRequest при отложенном удалении сообщения {msg_id} (служебное) из чата {chat_id}: {e_br_del}")
-            except Exception as e_del_delayed:
-                logger.warning(f"Не удалось отложенно удалить сообщение {msg_id} (служебное) из чата {chat_id}: {e_del_delayed}")
-
-            # Удаляем из fallback при успехе
-            if success:
-                self.state.remove_message_from_deletion(chat_id, msg_id)
-
-        logger.info(f"Отложенное удаление СЛУЖЕБНЫХ сообщений в чате {chat_id} завершено.")
+        result = await self.message_deletion.delete_chat_messages(context.bot, chat_id, message_ids_to_delete_list)
+        # Удаляем из fallback удаленные и недоступные сообщения, остальные дочистит periodic cleanup
+        self.state.remove_messages_from_deletion(chat_id, result.resolved.get(chat_id, ()))
+        if result.failed_count:
+            logger.warning(f"Не удалось отложенно удалить {result.failed_count} служебных сообщений из чата {chat_id}, они остаются в fallback.")
+
+        logger.info(f"Отложенное удаление СЛУЖЕБНЫХ сообщений в чате {chat_id} завершено. Удалено: {result.resolved_count}/{len(message_ids_to_delete_list)}, вызовов API: {result.api_calls}")
 
     async def _delayed_delete_poll_solution_messages_job(self, context: ContextTypes.DEFAULT_TYPE) -> None:
         """Job-функция для отложенного удаления сообщений викторины (опросы, пояснения, результаты)."""
@@ -654,27 +764,13 @@ class QuizManager:
         # КОНЕЦ ИЗМЕНЕНИЯ
 
         logger.info(f"Запуск отложенного удаления {len(message_ids_to_delete_list)} сообщений викторины в чате {chat_id}. Job: {context.job.name if context.job else 'N/A'}")
-        for msg_id in message_ids_to_delete_list:
-            success = False
-            try:
-                await context.bot.delete_message(chat_id=chat_id, message_id=msg_id)
-                logger.info(f"Сообщение викторины {msg_id} удалено отложенно из чата {chat_id}.")
-                success = True
-            except BadRequest as e_br_del:
-                 if "message to delete not found" in str(e_br_del).lower() or \
-                    "message can't be deleted" in str(e_br_del).lower():
-                     logger.debug(f"Сообщение викторины {msg_id} уже удалено или не может быть удалено (отложенно): {e_br_del}")
-                     success = True  # Считаем успешным - сообщения нет
-                 else:
-                     logger.warning(f"Ошибка BadRequest при отложенном удалении сообщения {msg_id} (викторина) из чата {chat_id}: {e_br_del}")
-            except Exception as e_del_delayed:
-                logger.warning(f"Не удалось отложенно удалить сообщение {msg_id} (викторина) из чата {chat_id}: {e_del_delayed}")
-
-            # Удаляем из fallback при успехе
-            if success:
-                self.state.remove_message_from_deletion(chat_id, msg_id)
-
-        logger.info(f"Отложенное удаление сообщений викторины в чате {chat_id} завершено.")
+        result = await self.message_deletion.delete_chat_messages(context.bot, chat_id, message_ids_to_delete_list)
+        # Удаляем из fallback удаленные и недоступные сообщения, остальные дочистит periodic cleanup
+        self.state.remove_messages_from_deletion(chat_id, result.resolved.get(chat_id, ()))
+        if result.failed_count:
+            logger.warning(f"Не удалось отложенно удалить {result.failed_count} сообщений викторины из чата {chat_id}, они остаются в fallback.")
+
+        logger.info(f"Отложенное удаление сообщений викторины в чате {chat_id} завершено. Удалено: {result.resolved_count}/{len(message_ids_to_delete_list)}, вызовов API: {result.api_calls}")
 
     async def _finalize_quiz_session(
         self, context: ContextTypes.DEFAULT_TYPE, chat_id: int,
@@ -683,21 +779,17 @@ class QuizManager:
         quiz_state = self.state.remove_active_quiz(chat_id)
         if not quiz_state:
             logger.warning(f"Попытка финализировать викторину для чата {chat_id}, но активной сессии QuizState не найдено.")
-            # Очищаем блокировку даже если викторина не найдена
-            self._send_question_locks.pop(chat_id, None)
             return
 
         escaped_error_message = escape_markdown_v2(error_message) if error_message else None
         logger.info(f"Завершение викторины (тип: {quiz_state.quiz_type}, режим: {quiz_state.quiz_mode}) в чате {chat_id}. Остановлена: {was_stopped}, Ошибка: {error_occurred}, Сообщение: {error_message}")
-        
-        # Очищаем блокировку отправки вопросов для этого чата
-        self._send_question_locks.pop(chat_id, None)
+
+        self._discard_prefetched_poll(quiz_state)
 
         job_queue = self.application.job_queue
 
         if quiz_state.next_question_job_name and job_queue:
-            jobs = job_queue.get_jobs_by_name(quiz_state.next_question_job_name)
-            for job in jobs: job.schedule_removal()
+            get_job_registry(job_queue).cancel(quiz_state.next_question_job_name)
             quiz_state.next_question_job_name = None
 
         active_poll_ids_copy = list(quiz_state.active_poll_ids_in_session)
@@ -706,8 +798,7 @@ class QuizManager:
             if poll_data:
                 job_name_to_cancel = poll_data.get("job_poll_end_name")
                 if job_name_to_cancel and job_queue:
-                    jobs = job_queue.get_jobs_by_name(job_name_to_cancel)
-                    for job in jobs: job.schedule_removal()
+                    get_job_registry(job_queue).cancel(job_name_to_cancel)
 
                 message_id_of_poll = poll_data.get("message_id")
                 if message_id_of_poll:
@@ -941,13 +1032,8 @@ class QuizManager:
             else:
                 logger.debug(f"ℹ️ В викторине чата {chat_id} не найдены категории для обновления статистики")
 
-        # Сохраняем состояние викторин после финализации (на случай перезапуска)
-        try:
-            if hasattr(self.data_manager, 'save_active_quizzes'):
-                self.data_manager.save_active_quizzes()
-                logger.debug(f"Состояние викторин сохранено после финализации чата {chat_id}")
-        except Exception as e:
-            logger.error(f"Ошибка сохранения состояния викторин после финализации чата {chat_id}: {e}")
+        # Сессия завершена: снимок и журнал больше не нужны для восстановления
+        self.data_manager.finalize_active_quiz(chat_id)
 
         logger.info(f"Викторина в чате {chat_id} полностью финализирована (основная часть). Отложенные задачи могут выполняться.")
 
@@ -1951,10 +2037,30 @@ class QuizManager:
             await update.message.reply_text(escape_markdown_v2("Только администраторы чата или инициатор (кроме ежедневной викторины) могут остановить текущую викторину."), parse_mode=ParseMode.MARKDOWN_V2)
             return
 
-        quiz_state.is_stopping = True
         stop_confirm_msg = await update.message.reply_text(f"Викторина остановлена пользователем {escape_markdown_v2(user_who_stopped.first_name)}\\. Подведение итогов\\.\\.\\.", parse_mode=ParseMode.MARKDOWN_V2)
-        quiz_state.message_ids_to_delete.add(stop_confirm_msg.message_id) 
+        # Повторные /stopquiz, пока остановка ждет в ящике, склеиваются
+        self.actors.post(
+            chat_id, EVENT_STOP, context, coalesce_key=id(quiz_state),
+            stopped_by=user_who_stopped.id, stop_message_id=stop_confirm_msg.message_id
+        )
 
+    async def _on_stop(
+        self, context: ContextTypes.DEFAULT_TYPE, chat_id: int,
+        stopped_by: int, stop_message_id: Optional[int]
+    ) -> None:
+        quiz_state = self.state.get_active_quiz(chat_id)
+        if not quiz_state:
+            logger.info(f"Остановка викторины в чате {chat_id} (пользователь {stopped_by}): викторина уже завершена.")
+            if stop_message_id:
+                self.state.add_message_for_deletion(chat_id, stop_message_id)
+            return
+        if stop_message_id:
+            self.data_manager.add_quiz_message_for_deletion(quiz_state, stop_message_id)
+        if quiz_state.is_stopping:
+            return
+
+        quiz_state.is_stopping = True
+        self.data_manager.journal_quiz_event(chat_id, EVENT_STOPPING)
         await self._finalize_quiz_session(context, chat_id, was_stopped=True)
 
     def get_handlers(self) -> list:
@@ -2422,6 +2528,8 @@ _Если вы хотите начать новую викторину, снач
                     if restored_quiz:
                         # Добавляем в активные викторины
                         self.state.add_active_quiz(chat_id, restored_quiz)
+                        # Новый снимок сжимает воспроизведенный журнал
+                        self.data_manager.save_active_quiz_snapshot(restored_quiz)
 
                         # Уведомляем пользователей
                         await self.notify_users_about_restored_quiz(chat_id, restored_quiz)
@@ -2431,6 +2539,7 @@ _Если вы хотите начать новую викторину, снач
 
                     else:
                         logger.warning(f"Не удалось восстановить викторину чата {chat_id}")
+                        self.data_manager.finalize_active_quiz(chat_id)
 
                 except Exception as e:
                     logger.error(f"Ошибка при восстановлении викторины чата {chat_id}: {e}", exc_info=True)
@@ -2438,50 +2547,9 @@ _Если вы хотите начать новую викторину, снач
 
             if restored_count > 0:
                 logger.info(f"✅ Восстановлено {restored_count} активных викторин")
-                # Удаляем файл после успешного восстановления
-                self.data_manager.delete_active_quizzes_file()
             else:
                 logger.info("Не удалось восстановить ни одной викторины")
 
         except Exception as e:
             logger.error(f"❌ Ошибка при восстановлении активных викторин: {e}", exc_info=True)
 
-    def schedule_quiz_auto_save(self) -> None:
-        """
-        Настраивает автоматическое сохранение активных викторин.
-        Вызывается при запуске бота.
-        """
-        try:
-            # Создаем job для периодического сохранения (каждые 5 минут)
-            job_name = "auto_save_active_quizzes"
-
-            # Удаляем существующий job если есть
-            if self.application.job_queue:
-                existing_jobs = self.application.job_queue.get_jobs_by_name(job_name)
-                for job in existing_jobs:
-                    job.schedule_removal()
-
-                # Создаем новый job
-                self.application.job_queue.run_repeating(
-                    callback=self._auto_save_quizzes_job,
-                    interval=300,  # 5 минут
-                    first=60,     # Первый запуск через 1 минуту
-                    name=job_name
-                )
-
-                logger.info("✅ Настроено автоматическое сохранение активных викторин (каждые 5 минут)")
-
-        except Exception as e:
-            logger.error(f"❌ Ошибка настройки автоматического сохранения викторин: {e}")
-
-    async def _auto_save_quizzes_job(self, context) -> None:
-        """
-        Job для автоматического сохранения активных викторин.
-        """
-        try:
-            if hasattr(self.data_manager, 'save_active_quizzes'):
-                self.data_manager.save_active_quizzes()
-                logger.debug("Автоматически сохранены активные викторины")
-        except Exception as e:
-            logger.error(f"Ошибка автоматического сохранения викторин: {e}")
-
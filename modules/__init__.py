@@ -4,12 +4,16 @@ Modules package for Morning Quiz Bot
 This package contains core business logic modules.
 """
 
-# Import all modules for easy access
-from .category_manager import CategoryManager
-from .score_manager import ScoreManager
-from .quiz_engine import QuizEngine
-from .logger_config import get_logger
-from .bot_commands_setup import setup_bot_commands
+# Классы импортируются при первом обращении (PEP 562): импорт любого
+# модуля пакета (например, modules.question_rules в процессе пула
+# валидации) не загружает telegram и менеджеры бота.
+_LAZY_EXPORTS = {
+    'CategoryManager': 'category_manager',
+    'ScoreManager': 'score_manager',
+    'QuizEngine': 'quiz_engine',
+    'get_logger': 'logger_config',
+    'setup_bot_commands': 'bot_commands_setup',
+}
 # telegram_utils содержит только функции, не классы
 
 __all__ = [
@@ -19,3 +23,13 @@ __all__ = [
     'get_logger',
     'setup_bot_commands'
 ]
+
+
+def __getattr__(name):
+    module_name = _LAZY_EXPORTS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    import importlib
+    value = getattr(importlib.import_module(f".{module_name}", __name__), name)
+    globals()[name] = value
+    return value
@@ -0,0 +1,169 @@
+# modules/admin_broadcast.py
+"""
+Очередь рассылок админа из веб-панели.
+
+Веб-панель работает в отдельном процессе. Раньше она отправляла
+рассылку собственным экземпляром Bot через собственный планировщик
+запросов: у процессов были независимые бюджеты, и рассылка вместе с
+трафиком бота превышала общий лимит Telegram.
+
+Теперь веб-панель только кладет рассылку файлом в очередь
+(data/system/admin_broadcasts), а бот забирает ее периодической задачей
+и отправляет через общий планировщик с приоритетом BROADCAST. Прогресс
+и результат бот записывает в тот же файл, веб-панель читает его.
+При перегрузке планировщика отправка прерывается и продолжается со
+следующего чата при следующем запуске задачи.
+"""
+
+import json
+import logging
+import re
+import time
+import uuid
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from modules.atomic_io import write_json_atomic
+
+logger = logging.getLogger(__name__)
+
+BROADCASTS_DIR_NAME = "admin_broadcasts"
+STATUS_PENDING = "pending"
+STATUS_DONE = "done"
+
+# Как часто бот проверяет очередь (секунды)
+POLL_INTERVAL_SECONDS = 2.0
+# Сколько хранить файлы завершенных рассылок
+DONE_RETENTION_SECONDS = 24 * 3600
+# Прогресс пишется на диск каждые N чатов
+PROGRESS_SAVE_EVERY = 20
+
+_BROADCAST_ID_RE = re.compile(r"^\d+_[0-9a-f]{8}$")
+
+
+class AdminBroadcastQueue:
+    """
+    Файловая очередь рассылок: один JSON-файл на рассылку.
+
+    Args:
+        directory: Папка очереди
+    """
+
+    def __init__(self, directory: Path):
+        self.directory = Path(directory)
+
+    def _path(self, broadcast_id: str) -> Path:
+        return self.directory / f"{broadcast_id}.json"
+
+    def submit(self, text: str, chat_ids: List[Any], parse_mode: Optional[str] = None) -> str:
+        """Ставит рассылку в очередь; возвращает ее ID"""
+        broadcast_id = f"{int(time.time() * 1000)}_{uuid.uuid4().hex[:8]}"
+        self.save({
+            "id": broadcast_id,
+            "status": STATUS_PENDING,
+            "created_at": time.time(),
+            "finished_at": None,
+            "text": text,
+            "parse_mode": parse_mode,
+            "chat_ids": list(chat_ids),
+            "success": [],
+            "failed": [],
+        })
+        return broadcast_id
+
+    def save(self, broadcast: Dict[str, Any]) -> None:
+        write_json_atomic(self._path(broadcast["id"]), broadcast)
+
+    def load(self, broadcast_id: str) -> Optional[Dict[str, Any]]:
+        """Рассылка по ID или None (неизвестный или некорректный ID)"""
+        if not _BROADCAST_ID_RE.match(broadcast_id):
+            return None
+        try:
+            with open(self._path(broadcast_id), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def pending(self) -> List[Dict[str, Any]]:
+        """Незавершенные рассылки в порядке постановки"""
+        if not self.directory.exists():
+            return []
+        broadcasts = []
+        for path in sorted(self.directory.glob("*.json")):
+            broadcast = self.load(path.stem)
+            if broadcast is not None and broadcast.get("status") == STATUS_PENDING:
+                broadcasts.append(broadcast)
+        return broadcasts
+
+    def cleanup(self, now: Optional[float] = None) -> int:
+        """Удаляет файлы рассылок, завершенных дольше DONE_RETENTION_SECONDS назад"""
+        if not self.directory.exists():
+            return 0
+        now = time.time() if now is None else now
+        removed = 0
+        for path in self.directory.glob("*.json"):
+            broadcast = self.load(path.stem)
+            if broadcast is None or broadcast.get("status") != STATUS_DONE:
+                continue
+            if now - (broadcast.get("finished_at") or now) >= DONE_RETENTION_SECONDS:
+                path.unlink(missing_ok=True)
+                removed += 1
+        return removed
+
+
+def remaining_chat_ids(broadcast: Dict[str, Any]) -> List[Any]:
+    """Чаты рассылки, по которым еще нет результата"""
+    handled = {str(chat_id) for chat_id in broadcast["success"]}
+    handled.update(str(entry["chat_id"]) for entry in broadcast["failed"])
+    return [chat_id for chat_id in broadcast["chat_ids"] if str(chat_id) not in handled]
+
+
+async def deliver_pending_broadcasts(queue: AdminBroadcastQueue, bot: Any) -> int:
+    """
+    Отправляет рассылки из очереди через общий планировщик запросов.
+
+    Returns:
+        Количество отправленных в этом запуске сообщений
+    """
+    from modules.rate_limiter import RequestPriority
+    from modules.request_scheduler import RequestBackpressureError, get_request_scheduler
+    from modules.telegram_utils import safe_send_message
+
+    scheduler = get_request_scheduler()
+    sent = 0
+    for broadcast in queue.pending():
+        unsaved = 0
+        for chat_id in remaining_chat_ids(broadcast):
+            if scheduler.is_congested(RequestPriority.BROADCAST):
+                # Доотправим при следующем запуске, начиная с этого чата
+                queue.save(broadcast)
+                return sent
+            try:
+                await safe_send_message(
+                    bot=bot,
+                    chat_id=int(chat_id),
+                    text=broadcast["text"],
+                    parse_mode=broadcast.get("parse_mode"),
+                    priority=RequestPriority.BROADCAST
+                )
+                broadcast["success"].append(chat_id)
+                sent += 1
+            except RequestBackpressureError:
+                queue.save(broadcast)
+                return sent
+            except Exception as e:
+                broadcast["failed"].append({"chat_id": chat_id, "error": str(e)})
+                logger.warning(f"Не удалось отправить рассылку админа в чат {chat_id}: {e}")
+            unsaved += 1
+            if unsaved >= PROGRESS_SAVE_EVERY:
+                queue.save(broadcast)
+                unsaved = 0
+
+        broadcast["status"] = STATUS_DONE
+        broadcast["finished_at"] = time.time()
+        queue.save(broadcast)
+        logger.info(
+            f"📢 Рассылка админа {broadcast['id']}: отправлено {len(broadcast['success'])} "
+            f"из {len(broadcast['chat_ids'])}, ошибок {len(broadcast['failed'])}"
+        )
+    return sent
@@ -0,0 +1,382 @@
+# modules/analytics_views.py
+"""
+Материализованные представления аналитики для веб-панели.
+
+Раньше каждый эндпоинт аналитики веб-панели обходил data/chats и
+заново собирал итоги, рейтинг и распределение очков из stats.json всех
+чатов, повторяя логику DataManager._update_global_stats_file.
+
+Теперь бот держит агрегаты в памяти: они строятся один раз из
+state.user_scores при запуске и дальше обновляются по изменению очков
+участника и по использованию категорий. Готовые представления
+(итоги dashboard, рейтинг, категории, распределение очков, активность по
+дням) пишутся атомарно в data/statistics/views/ только при изменениях,
+так что эндпоинт читает один небольшой файл.
+
+Каждый файл содержит номер схемы и возрастающую версию: веб-панель
+игнорирует файлы с незнакомой схемой и переходит на прежний обход чатов.
+"""
+
+import heapq
+import json
+import logging
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Set, Tuple
+
+from modules.atomic_io import write_json_atomic
+
+logger = logging.getLogger(__name__)
+
+SCHEMA_VERSION = 1
+VIEWS_DIR_NAME = "views"
+
+VIEW_DASHBOARD = "dashboard"
+VIEW_LEADERBOARD = "leaderboard"
+VIEW_CATEGORIES = "categories"
+VIEW_SCORE_DISTRIBUTION = "score_distribution"
+VIEW_ACTIVITY = "activity"
+ALL_VIEWS = (VIEW_DASHBOARD, VIEW_LEADERBOARD, VIEW_CATEGORIES, VIEW_SCORE_DISTRIBUTION, VIEW_ACTIVITY)
+
+LEADERBOARD_SIZE = 100
+ACTIVITY_DAYS = 90
+# Полная пересборка исправляет расхождения от изменений очков в обход ответов
+REBUILD_INTERVAL_SECONDS = 3600
+
+# Диапазоны распределения очков (участник в чате), как в графике веб-панели
+SCORE_BUCKETS: Tuple[Tuple[str, Optional[float]], ...] = (
+    ("0-50", 50),
+    ("51-200", 200),
+    ("201-500", 500),
+    ("501-1000", 1000),
+    ("1000+", None),
+)
+
+
+def score_bucket(score: float) -> str:
+    for label, upper in SCORE_BUCKETS:
+        if upper is None or score <= upper:
+            return label
+    return SCORE_BUCKETS[-1][0]
+
+
+def _today() -> str:
+    return datetime.now(timezone.utc).date().isoformat()
+
+
+class AnalyticsViews:
+    """
+    Агрегаты аналитики и запись представлений.
+
+    Args:
+        directory: Папка представлений (data/statistics/views)
+        leaderboard_size: Сколько участников попадает в рейтинг
+    """
+
+    def __init__(self, directory: Path, leaderboard_size: int = LEADERBOARD_SIZE):
+        self.directory = Path(directory)
+        self.leaderboard_size = leaderboard_size
+        # (chat_id, user_id) -> очки, ответы и лучшая серия участника в чате
+        self._entries: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        # user_id -> суммарные значения по всем чатам
+        self._users: Dict[str, Dict[str, Any]] = {}
+        self._chats: Dict[str, Dict[str, Any]] = {}
+        self._buckets: Dict[str, int] = {label: 0 for label, _ in SCORE_BUCKETS}
+        self._categories: Dict[str, Dict[str, Any]] = {}
+        self._days: Dict[str, Dict[str, Any]] = {}
+        self._dirty: Set[str] = set()
+        self.version = 0
+        self.flushes = 0
+        self.views_written = 0
+        self.last_flush_duration = 0.0
+
+    # ===== ПОСТРОЕНИЕ =====
+
+    def rebuild(
+        self, user_scores: Mapping[Any, Mapping[str, Dict[str, Any]]],
+        chat_settings: Optional[Mapping[Any, Dict[str, Any]]] = None,
+        category_stats: Optional[Mapping[str, Dict[str, Any]]] = None,
+    ) -> None:
+        """Полностью пересобирает агрегаты (при запуске и для исправления расхождений)"""
+        self._entries.clear()
+        self._users.clear()
+        self._chats.clear()
+        self._buckets = {label: 0 for label, _ in SCORE_BUCKETS}
+
+        for chat_id, chat_settings_data in (chat_settings or {}).items():
+            self.update_chat_info(chat_id, chat_settings_data)
+        for chat_id, chat_users in user_scores.items():
+            for user_id, user_data in chat_users.items():
+                self._apply_user(
+                    str(chat_id), str(user_id), user_data.get("name"),
+                    user_data.get("score", 0), len(user_data.get("answered_polls", ())),
+                    user_data.get("max_consecutive_correct", 0),
+                )
+
+        if category_stats is not None:
+            self._categories = {}
+            for name, stats in category_stats.items():
+                chat_usage = stats.get("chat_usage")
+                self._categories[name] = {
+                    "usage": stats.get("global_usage", 0),
+                    "chat_usage": dict(chat_usage) if isinstance(chat_usage, dict) else {},
+                    "last_used": stats.get("last_used", 0),
+                }
+        if not self._days:
+            self._load_activity()
+        self._load_version()
+        self._dirty.update(ALL_VIEWS)
+        logger.info(f"Представления аналитики пересобраны: {len(self._users)} участников, {len(self._chats)} чатов")
+
+    def _load_activity(self) -> None:
+        """Активность по дням не восстанавливается из очков - берем ее из прошлого представления"""
+        data = self._read_view(VIEW_ACTIVITY)
+        if not data:
+            return
+        today = _today()
+        self._days = {}
+        for day in data.get("days", []):
+            self._days[day["date"]] = {
+                "answers": day.get("answers", 0),
+                "correct": day.get("correct", 0),
+                "active_users": day.get("active_users", 0),
+                "users": set(data.get("current_day_users", [])) if day["date"] == today else set(),
+            }
+
+    def _load_version(self) -> None:
+        for name in ALL_VIEWS:
+            path = self.directory / f"{name}.json"
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    self.version = max(self.version, int(json.load(f).get("version", 0)))
+            except (OSError, ValueError, TypeError, AttributeError):
+                continue
+
+    def _read_view(self, name: str) -> Optional[Dict[str, Any]]:
+        try:
+            with open(self.directory / f"{name}.json", "r", encoding="utf-8") as f:
+                view = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if not isinstance(view, dict) or view.get("schema") != SCHEMA_VERSION:
+            return None
+        return view.get("data")
+
+    # ===== ИНКРЕМЕНТАЛЬНЫЕ ОБНОВЛЕНИЯ =====
+
+    def _chat(self, chat_id: str) -> Dict[str, Any]:
+        chat = self._chats.get(chat_id)
+        if chat is None:
+            chat = self._chats[chat_id] = {
+                "title": None, "daily_enabled": False, "users_count": 0, "answered": 0, "score": 0.0,
+            }
+        return chat
+
+    def update_chat_info(self, chat_id: Any, settings: Mapping[str, Any]) -> None:
+        """Название и подписка чата из его настроек"""
+        chat = self._chat(str(chat_id))
+        title = settings.get("title")
+        daily_enabled = bool((settings.get("daily_quiz") or {}).get("enabled", False))
+        if chat["title"] != title or chat["daily_enabled"] != daily_enabled:
+            chat["title"] = title
+            chat["daily_enabled"] = daily_enabled
+            self._dirty.add(VIEW_DASHBOARD)
+
+    def _apply_user(
+        self, chat_id: str, user_id: str, name: Optional[str],
+        score: float, answered: int, max_streak: int,
+    ) -> None:
+        entry = self._entries.get((chat_id, user_id))
+        chat = self._chat(chat_id)
+        user = self._users.get(user_id)
+        if user is None:
+            user = self._users[user_id] = {
+                "name": name or f"User {user_id}", "score": 0.0, "answered": 0, "max_streak": 0, "chats": set(),
+            }
+        if entry is None:
+            entry = self._entries[(chat_id, user_id)] = {"score": 0.0, "answered": 0, "max_streak": 0}
+            chat["users_count"] += 1
+            user["chats"].add(chat_id)
+        else:
+            self._buckets[score_bucket(entry["score"])] -= 1
+        self._buckets[score_bucket(score)] += 1
+
+        score_delta = score - entry["score"]
+        answered_delta = answered - entry["answered"]
+        chat["score"] += score_delta
+        chat["answered"] += answered_delta
+        user["score"] += score_delta
+        user["answered"] += answered_delta
+        if name:
+            user["name"] = name
+        user["max_streak"] = max(user["max_streak"], max_streak)
+        entry.update(score=score, answered=answered, max_streak=max_streak)
+
+    def record_user(
+        self, chat_id: Any, user_id: Any, user_data: Mapping[str, Any],
+        is_correct: Optional[bool] = None,
+    ) -> None:
+        """
+        Применяет текущее состояние участника в чате после ответа.
+
+        Args:
+            user_data: Запись участника из state.user_scores (абсолютные значения)
+            is_correct: Результат засчитанного ответа; None - очки не начислялись
+        """
+        chat_id, user_id = str(chat_id), str(user_id)
+        self._apply_user(
+            chat_id, user_id, user_data.get("name"), user_data.get("score", 0),
+            len(user_data.get("answered_polls", ())), user_data.get("max_consecutive_correct", 0),
+        )
+        self._dirty.update((VIEW_DASHBOARD, VIEW_LEADERBOARD, VIEW_SCORE_DISTRIBUTION))
+        if is_correct is not None:
+            day = self._days.setdefault(_today(), {"answers": 0, "correct": 0, "active_users": 0, "users": set()})
+            day["answers"] += 1
+            if is_correct:
+                day["correct"] += 1
+            if user_id not in day["users"]:
+                day["users"].add(user_id)
+                day["active_users"] += 1
+            self._dirty.add(VIEW_ACTIVITY)
+
+    def record_category_use(self, category: str, chat_id: Optional[Any] = None) -> None:
+        """Категория выбрана для вопроса"""
+        stats = self._categories.setdefault(category, {"usage": 0, "chat_usage": {}, "last_used": 0})
+        stats["usage"] += 1
+        stats["last_used"] = time.time()
+        if chat_id is not None:
+            chat_id = str(chat_id)
+            stats["chat_usage"][chat_id] = stats["chat_usage"].get(chat_id, 0) + 1
+        self._dirty.add(VIEW_CATEGORIES)
+
+    # ===== ПРЕДСТАВЛЕНИЯ =====
+
+    def _build_dashboard(self) -> Dict[str, Any]:
+        chats = [
+            {
+                "chat_id": chat_id,
+                "title": chat["title"] or f"Чат {chat_id}",
+                "users_count": chat["users_count"],
+                "answered": chat["answered"],
+                "score": round(chat["score"], 1),
+                "daily_enabled": chat["daily_enabled"],
+            }
+            for chat_id, chat in self._chats.items()
+        ]
+        total_users = len(self._users)
+        total_answered = sum(chat["answered"] for chat in self._chats.values())
+        total_score = sum(chat["score"] for chat in self._chats.values())
+        return {
+            "total_users": total_users,
+            "total_chats": len(chats),
+            "active_chats_with_subscription": sum(1 for chat in chats if chat["daily_enabled"]),
+            "total_answered": total_answered,
+            "total_score": round(total_score, 1),
+            "avg_answered_per_user": round(total_answered / total_users, 1) if total_users else 0,
+            "avg_score_per_user": round(total_score / total_users, 2) if total_users else 0,
+            "chats": chats,
+        }
+
+    def _build_leaderboard(self) -> Dict[str, Any]:
+        top = heapq.nlargest(self.leaderboard_size, self._users.items(), key=lambda item: item[1]["score"])
+        leaderboard = []
+        for rank, (user_id, user) in enumerate(top, start=1):
+            chats = [
+                {
+                    "chat_id": chat_id,
+                    "score": round(self._entries[(chat_id, user_id)]["score"], 1),
+                    "answered": self._entries[(chat_id, user_id)]["answered"],
+                }
+                for chat_id in sorted(user["chats"])
+            ]
+            leaderboard.append({
+                "rank": rank,
+                "user_id": user_id,
+                "name": user["name"],
+                "total_score": round(user["score"], 1),
+                "total_answered": user["answered"],
+                "max_consecutive_correct": user["max_streak"],
+                "chats": chats,
+            })
+        return {"leaderboard": leaderboard, "total_users": len(self._users)}
+
+    def _build_categories(self) -> Dict[str, Any]:
+        categories = [
+            {
+                "name": name,
+                "usage": stats["usage"],
+                "chats_count": len(stats["chat_usage"]),
+                "chat_usage": stats["chat_usage"],
+                "last_used": stats["last_used"],
+            }
+            for name, stats in self._categories.items()
+        ]
+        categories.sort(key=lambda category: category["usage"], reverse=True)
+        return {"categories": categories, "total_usage": sum(c["usage"] for c in categories)}
+
+    def _build_score_distribution(self) -> Dict[str, Any]:
+        return {"buckets": dict(self._buckets), "total_entries": len(self._entries)}
+
+    def _build_activity(self) -> Dict[str, Any]:
+        days = sorted(self._days)[-ACTIVITY_DAYS:]
+        for stale in set(self._days) - set(days):
+            del self._days[stale]
+        today = self._days.get(_today())
+        return {
+            "days": [
+                {"date": day, "answers": self._days[day]["answers"], "correct": self._days[day]["correct"],
+                 "active_users": self._days[day]["active_users"]}
+                for day in days
+            ],
+            # Нужны, чтобы после перезапуска не посчитать участника дважды за день
+            "current_day_users": sorted(today["users"]) if today else [],
+        }
+
+    _BUILDERS = {
+        VIEW_DASHBOARD: _build_dashboard,
+        VIEW_LEADERBOARD: _build_leaderboard,
+        VIEW_CATEGORIES: _build_categories,
+        VIEW_SCORE_DISTRIBUTION: _build_score_distribution,
+        VIEW_ACTIVITY: _build_activity,
+    }
+
+    @property
+    def dirty_views(self) -> List[str]:
+        return sorted(self._dirty)
+
+    def flush(self, views: Optional[Iterable[str]] = None) -> int:
+        """Атомарно пишет измененные представления; возвращает число записанных файлов"""
+        names = [name for name in (views or ALL_VIEWS) if name in self._dirty]
+        if not names:
+            return 0
+        started = time.perf_counter()
+        self.version += 1
+        generated_at = datetime.now(timezone.utc).isoformat()
+        self.directory.mkdir(parents=True, exist_ok=True)
+        for name in names:
+            payload = {
+                "schema": SCHEMA_VERSION,
+                "version": self.version,
+                "generated_at": generated_at,
+                "data": self._BUILDERS[name](self),
+            }
+            write_json_atomic(self.directory / f"{name}.json", payload)
+            self._dirty.discard(name)
+        self.flushes += 1
+        self.views_written += len(names)
+        self.last_flush_duration = round(time.perf_counter() - started, 4)
+        return len(names)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Объем агрегатов и записи для логов"""
+        return {
+            "version": self.version,
+            "users": len(self._users),
+            "chats": len(self._chats),
+            "entries": len(self._entries),
+            "dirty_views": self.dirty_views,
+            "flushes": self.flushes,
+            "views_written": self.views_written,
+            "last_flush_duration": self.last_flush_duration,
+        }
@@ -0,0 +1,37 @@
+# modules/atomic_io.py
+"""
+Атомарная запись файлов: временный файл в той же папке, fsync и os.replace.
+
+Читатель (бот, веб-панель) видит либо старое, либо новое содержимое
+целиком, а сбой посреди записи не оставляет обрезанный файл.
+"""
+
+import json
+import os
+import tempfile
+from pathlib import Path
+from typing import Any
+
+
+def write_bytes_atomic(file_path: Path, content: bytes) -> None:
+    """Атомарно заменяет содержимое файла (создает папку при необходимости)"""
+    file_path = Path(file_path)
+    file_path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_name = tempfile.mkstemp(dir=str(file_path.parent), prefix=f".{file_path.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(content)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_name, file_path)
+    except BaseException:
+        try:
+            os.unlink(tmp_name)
+        except OSError:
+            pass
+        raise
+
+
+def write_json_atomic(file_path: Path, data: Any) -> None:
+    """Атомарная запись JSON в формате хранилища бота (UTF-8, отступ 2)"""
+    write_bytes_atomic(file_path, json.dumps(data, ensure_ascii=False, indent=2).encode("utf-8"))
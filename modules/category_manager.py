@@ -7,6 +7,8 @@ import threading
 from pathlib import Path
 from typing import List, Dict, Any, Set, Optional, Union, TYPE_CHECKING
 
+from modules.atomic_io import write_json_atomic
+
 if TYPE_CHECKING:
     from app_config import AppConfig
     from state import BotState
@@ -98,8 +100,7 @@ class CategoryManager:
                         "total_questions": total_questions_in_category
                     }
             
-            with open(stats_file, 'w', encoding='utf-8') as f:
-                json.dump(chat_stats, f, ensure_ascii=False, indent=2)
+            write_json_atomic(stats_file, chat_stats)
             
             logger.debug(f"Чатовые статистики категорий для чата {chat_id} сохранены в файл")
             
@@ -218,8 +219,7 @@ class CategoryManager:
             # Создаем директорию, если её нет
             stats_file.parent.mkdir(parents=True, exist_ok=True)
             
-            with open(stats_file, 'w', encoding='utf-8') as f:
-                json.dump(self._category_usage_stats, f, ensure_ascii=False, indent=2)
+            write_json_atomic(stats_file, self._category_usage_stats)
             
             logger.debug("Глобальная статистика использования категорий сохранена в файл")
             
@@ -269,6 +269,7 @@ class CategoryManager:
                 # Обновляем общую статистику
                 self._category_usage_stats[category_name]["last_used"] = time.time()
                 self._category_usage_stats[category_name]["global_usage"] += 1
+                self.data_manager.analytics_views.record_category_use(category_name, chat_id)
 
                 # total_questions не должен быть в глобальной статистике
                 # Он вычисляется динамически при выводе
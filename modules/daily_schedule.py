@@ -0,0 +1,171 @@
+# modules/daily_schedule.py
+"""
+Расписание ежедневных викторин на одной min-куче.
+
+Раньше каждое время запуска каждого чата было отдельной задачей
+run_daily в JobQueue, и при запуске бота все они создавались заново.
+Расписание хранит для каждого слота (chat_id, индекс времени) ближайший
+момент запуска в UTC, вычисленный в часовом поясе чата, и кладет момент
+пробуждения (запуск минус упреждение) в min-кучу. Один драйвер спит до
+ближайшего пробуждения, забирает наступившие слоты и переносит каждый
+на следующее локальное наступление того же времени. Переход на летнее
+и зимнее время учитывается при каждом переносе: несуществующее время
+сдвигается вперед, неоднозначное берется первым.
+
+Изменение настроек чата стоит O(слотов чата · log n); замененные
+элементы кучи не удаляются, а пропускаются драйвером и убираются при
+перестройке (как в PollRegistry).
+"""
+
+import heapq
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from datetime import time as dt_time
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import pytz
+
+# Куча перестраивается, когда устаревших элементов в ней больше, чем живых
+_COMPACT_MIN_HEAP_SIZE = 64
+
+
+def next_local_occurrence(hour: int, minute: int, tz: Any, after: datetime) -> datetime:
+    """
+    Ближайший после after (aware datetime) момент, когда в часовом поясе tz
+    наступает hour:minute. Возвращает aware datetime в UTC.
+    """
+    local_date = after.astimezone(tz).date()
+    for day_offset in range(3):
+        naive = datetime.combine(local_date + timedelta(days=day_offset), dt_time(hour, minute))
+        try:
+            local = tz.localize(naive, is_dst=None)
+        except pytz.exceptions.AmbiguousTimeError:
+            # Время повторяется при переходе на зимнее: берем первое наступление
+            local = tz.localize(naive, is_dst=True)
+        except pytz.exceptions.NonExistentTimeError:
+            # Время пропускается при переходе на летнее: сдвигаем вперед на величину перехода
+            local = tz.normalize(tz.localize(naive, is_dst=False))
+        fire_at = local.astimezone(pytz.UTC)
+        if fire_at > after:
+            return fire_at
+    raise ValueError(f"Не найдено наступление {hour:02d}:{minute:02d} в {tz} после {after}")
+
+
+@dataclass
+class ScheduledSlot:
+    """Слот расписания: время чата и ближайший запуск"""
+    chat_id: int
+    slot_index: int
+    hour: int
+    minute: int
+    tz: Any
+    fire_at: datetime  # UTC
+    wake_at: float  # timestamp пробуждения драйвера (fire_at минус упреждение)
+
+
+class DailySchedule:
+    """
+    Ежедневные слоты всех чатов с индексом ближайшего пробуждения.
+
+    Args:
+        lead_seconds: Упреждение: слот выдается драйверу за столько секунд до запуска
+    """
+
+    def __init__(self, lead_seconds: float = 0.0):
+        self.lead_seconds = lead_seconds
+        self._slots: Dict[Tuple[int, int], ScheduledSlot] = {}
+        self._chat_slot_counts: Dict[int, int] = {}
+        self._heap: List[Tuple[float, int, int]] = []
+        self.fired_total = 0
+
+    def __len__(self) -> int:
+        return len(self._slots)
+
+    def _push(self, slot: ScheduledSlot) -> None:
+        self._slots[(slot.chat_id, slot.slot_index)] = slot
+        heapq.heappush(self._heap, (slot.wake_at, slot.chat_id, slot.slot_index))
+
+    def _plan(self, slot: ScheduledSlot, after: datetime) -> None:
+        slot.fire_at = next_local_occurrence(slot.hour, slot.minute, slot.tz, after)
+        slot.wake_at = slot.fire_at.timestamp() - self.lead_seconds
+        self._push(slot)
+
+    def set_chat(
+        self, chat_id: int, times: Sequence[Tuple[int, int]], tz: Any,
+        now: Optional[datetime] = None
+    ) -> int:
+        """
+        Заменяет слоты чата. Если до ближайшего запуска осталось меньше
+        упреждения, слот выдается драйверу сразу.
+
+        Returns:
+            Количество запланированных слотов
+        """
+        now = now or datetime.now(pytz.UTC)
+        self.remove_chat(chat_id)
+        for slot_index, (hour, minute) in enumerate(times):
+            slot = ScheduledSlot(chat_id, slot_index, hour, minute, tz, now, 0.0)
+            self._plan(slot, now)
+        if times:
+            self._chat_slot_counts[chat_id] = len(times)
+        self._maybe_compact()
+        return len(times)
+
+    def remove_chat(self, chat_id: int) -> int:
+        """Снимает слоты чата; элементы кучи отбрасываются лениво"""
+        count = self._chat_slot_counts.pop(chat_id, 0)
+        for slot_index in range(count):
+            self._slots.pop((chat_id, slot_index), None)
+        return count
+
+    def get_chat_slots(self, chat_id: int) -> List[ScheduledSlot]:
+        return [self._slots[(chat_id, i)] for i in range(self._chat_slot_counts.get(chat_id, 0))]
+
+    def _is_live(self, entry: Tuple[float, int, int]) -> bool:
+        slot = self._slots.get((entry[1], entry[2]))
+        return slot is not None and slot.wake_at == entry[0]
+
+    def _maybe_compact(self) -> None:
+        if len(self._heap) > _COMPACT_MIN_HEAP_SIZE and len(self._heap) > 2 * len(self._slots):
+            self._heap = [(slot.wake_at, slot.chat_id, slot.slot_index) for slot in self._slots.values()]
+            heapq.heapify(self._heap)
+
+    def next_wake(self) -> Optional[float]:
+        """Timestamp ближайшего пробуждения драйвера"""
+        while self._heap and not self._is_live(self._heap[0]):
+            heapq.heappop(self._heap)
+        return self._heap[0][0] if self._heap else None
+
+    def pop_due(self, now: Optional[float] = None) -> List[ScheduledSlot]:
+        """
+        Слоты, время пробуждения которых наступило. Каждый слот переносится
+        на следующее наступление; возвращаются копии с текущим запуском.
+        """
+        now = time.time() if now is None else now
+        now_dt = datetime.fromtimestamp(now, pytz.UTC)
+        due: List[ScheduledSlot] = []
+        while self._heap and self._heap[0][0] <= now:
+            entry = heapq.heappop(self._heap)
+            if not self._is_live(entry):
+                continue
+            slot = self._slots[(entry[1], entry[2])]
+            due.append(ScheduledSlot(**slot.__dict__))
+            # Пропущенные запуски (драйвер опоздал больше чем на сутки) не догоняются
+            self._plan(slot, max(slot.fire_at, now_dt))
+        self.fired_total += len(due)
+        return due
+
+    def iter_slots(self) -> Iterator[ScheduledSlot]:
+        return iter(list(self._slots.values()))
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Размер расписания для логов и статуса планировщика"""
+        next_wake = self.next_wake()
+        return {
+            "slots": len(self._slots),
+            "chats": len(self._chat_slot_counts),
+            "heap_size": len(self._heap),
+            "fired_total": self.fired_total,
+            "next_wake_in": round(next_wake - time.time(), 1) if next_wake is not None else None,
+        }
@@ -0,0 +1,76 @@
+# modules/dedup_cache.py
+"""
+Ограниченный по размеру и времени кэш для отсева повторных обновлений.
+
+Ключи хранятся в порядке вставки (OrderedDict), поэтому самые старые
+записи всегда в начале: вытеснение по TTL и по размеру стоит O(1) на
+запись. Проверка и добавление выполняются одним вызовом без await,
+поэтому в одном цикле событий конкурентные обработчики (concurrent_updates)
+не могут одновременно пропустить один и тот же ключ.
+"""
+
+import hashlib
+import time
+from collections import OrderedDict
+from typing import Dict, Hashable, Optional
+
+
+def poll_answer_key(poll_id: str, user_id: int) -> tuple:
+    """Целочисленный ключ ответа на опрос: (poll_id, user_id)"""
+    try:
+        poll_key = int(poll_id)
+    except (TypeError, ValueError):
+        # poll_id Telegram - число в строке; на случай иного формата берем хеш
+        poll_key = int.from_bytes(hashlib.blake2b(str(poll_id).encode("utf-8"), digest_size=8).digest(), "big")
+    return (poll_key, int(user_id))
+
+
+class DedupCache:
+    """
+    Кэш уже обработанных ключей.
+
+    Args:
+        max_size: Максимальное количество ключей
+        ttl_seconds: Время жизни ключа
+    """
+
+    def __init__(self, max_size: int = 10000, ttl_seconds: float = 3600.0):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._seen: "OrderedDict[Hashable, float]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evicted = 0
+
+    def __len__(self) -> int:
+        return len(self._seen)
+
+    def _evict(self, now: float) -> None:
+        deadline = now - self.ttl_seconds
+        while self._seen:
+            oldest_key, added_at = next(iter(self._seen.items()))
+            if added_at > deadline and len(self._seen) <= self.max_size:
+                break
+            del self._seen[oldest_key]
+            self.evicted += 1
+
+    def check_and_add(self, key: Hashable, now: Optional[float] = None) -> bool:
+        """
+        Отмечает ключ как обработанный.
+
+        Returns:
+            True, если ключ уже встречался в пределах TTL (повтор)
+        """
+        now = time.monotonic() if now is None else now
+        self._evict(now)
+        if key in self._seen:
+            self.hits += 1
+            return True
+        self._seen[key] = now
+        self.misses += 1
+        self._evict(now)
+        return False
+
+    def get_stats(self) -> Dict[str, int]:
+        """Счетчики для логов и веб-интерфейса"""
+        return {"size": len(self._seen), "hits": self.hits, "misses": self.misses, "evicted": self.evicted}
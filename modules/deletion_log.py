@@ -0,0 +1,205 @@
+# modules/deletion_log.py
+"""
+Журнал добавлений в список сообщений на удаление (messages_to_delete).
+
+Раньше любое изменение списка переписывало messages_to_delete.json
+целиком. Теперь файл JSON - это снимок, а изменения после него
+дописываются в журнал messages_to_delete.log по одной JSON-строке:
+["a", chat_id, message_id, timestamp] - сообщение добавлено,
+["r", chat_id, [message_id, ...]] - сообщения удалены из списка.
+Записи копятся в буфере и дописываются одной записью в файл при
+сохранении состояния удаления.
+
+Сжатие выполняется в фоне: журнал переименовывается в .compacting
+(новые записи идут в свежий журнал), копия списка пишется снимком в
+потоке исполнителя, после чего .compacting удаляется. При загрузке
+снимок дополняется обоими журналами, так что сбой посреди сжатия
+ничего не теряет.
+
+Каждая ротация получает номер поколения. Снимок пишется под блокировкой
+и только если он новее уже записанного, а .compacting удаляется только
+снимком последней ротации: фоновое сжатие, завершившееся после
+синхронного сохранения при остановке, не перезапишет более новый снимок.
+"""
+
+import json
+import logging
+import threading
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from modules.atomic_io import write_json_atomic
+
+logger = logging.getLogger(__name__)
+
+# Сжатие нужно, когда записей в журнале больше, чем max(минимум, 2 * живых сообщений)
+COMPACT_MIN_RECORDS = 1000
+
+MessagesToDelete = Dict[int, Dict[int, float]]  # chat_id -> {message_id: timestamp}
+
+
+def snapshot_payload(messages: MessagesToDelete) -> Dict[str, Dict[str, float]]:
+    """Формат снимка messages_to_delete.json: ключи - строки"""
+    return {
+        str(chat_id): {str(msg_id): timestamp for msg_id, timestamp in chat_messages.items()}
+        for chat_id, chat_messages in messages.items() if chat_messages
+    }
+
+
+class DeletionLog:
+    """
+    Снимок и журнал списка сообщений на удаление.
+
+    Args:
+        snapshot_path: Путь снимка (messages_to_delete.json)
+        log_path: Путь журнала
+    """
+
+    def __init__(self, snapshot_path: Path, log_path: Path, compact_min_records: int = COMPACT_MIN_RECORDS):
+        self.snapshot_path = Path(snapshot_path)
+        self.log_path = Path(log_path)
+        self.compacting_path = self.log_path.with_name(self.log_path.name + ".compacting")
+        self.compact_min_records = compact_min_records
+        self._buffer: List[str] = []
+        self._snapshot_lock = threading.Lock()
+        self._rotated_generation = 0
+        self._written_generation = 0
+        self.records_in_log = 0
+        self.records_written = 0
+        self.bytes_written = 0
+        self.compactions = 0
+        self.stale_snapshots_skipped = 0
+
+    @property
+    def pending(self) -> int:
+        return len(self._buffer)
+
+    def _record(self, record: List[Any]) -> None:
+        self._buffer.append(json.dumps(record, separators=(",", ":")))
+
+    def record_add(self, chat_id: int, message_id: int, timestamp: float) -> None:
+        self._record(["a", chat_id, message_id, round(timestamp, 3)])
+
+    def record_remove(self, chat_id: int, message_ids: Iterable[int]) -> None:
+        message_ids = list(message_ids)
+        if message_ids:
+            self._record(["r", chat_id, message_ids])
+
+    def flush(self) -> int:
+        """Дописывает буфер в журнал одной записью; возвращает число записей"""
+        if not self._buffer:
+            return 0
+        payload = ("\n".join(self._buffer) + "\n").encode("utf-8")
+        self.log_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.log_path, "ab") as f:
+            f.write(payload)
+        count = len(self._buffer)
+        self._buffer.clear()
+        self.records_in_log += count
+        self.records_written += count
+        self.bytes_written += len(payload)
+        return count
+
+    def needs_compaction(self, live_messages: int) -> bool:
+        return self.records_in_log > max(self.compact_min_records, 2 * live_messages)
+
+    def rotate(self) -> int:
+        """
+        Начинает сжатие: сбрасывает буфер и откладывает текущий журнал.
+        Вызывается в том же шаге цикла событий, в котором снимается копия списка.
+
+        Returns:
+            Поколение снимка, который должен завершить это сжатие
+        """
+        self.flush()
+        with self._snapshot_lock:
+            self._rotated_generation += 1
+            generation = self._rotated_generation
+        if self.log_path.exists():
+            if self.compacting_path.exists():
+                # Предыдущее сжатие не завершилось: оба журнала покроет новый снимок
+                with open(self.log_path, "rb") as src, open(self.compacting_path, "ab") as dst:
+                    dst.write(src.read())
+                self.log_path.unlink()
+            else:
+                self.log_path.replace(self.compacting_path)
+        self.records_in_log = 0
+        return generation
+
+    def write_snapshot(self, payload: Dict[str, Dict[str, float]], generation: Optional[int] = None) -> bool:
+        """
+        Завершает сжатие поколения generation (по умолчанию - последней ротации):
+        пишет снимок и удаляет отложенный журнал. Можно вызывать из потока.
+
+        Returns:
+            False, если уже записан более новый снимок и этот пропущен
+        """
+        with self._snapshot_lock:
+            if generation is None:
+                generation = self._rotated_generation
+            if generation <= self._written_generation:
+                self.stale_snapshots_skipped += 1
+                logger.debug(f"Снимок поколения {generation} устарел (записано {self._written_generation}), пропущен")
+                return False
+            write_json_atomic(self.snapshot_path, payload)
+            self._written_generation = generation
+            if generation == self._rotated_generation:
+                # После этой ротации других не было: снимок покрывает весь отложенный журнал
+                self.compacting_path.unlink(missing_ok=True)
+            self.compactions += 1
+            return True
+
+    def _iter_records(self) -> Iterable[Tuple[Path, Any]]:
+        for path in (self.compacting_path, self.log_path):
+            if not path.exists():
+                continue
+            with open(path, "rb") as f:
+                for raw_line in f:
+                    try:
+                        yield path, json.loads(raw_line)
+                    except ValueError:
+                        # Оборванная при сбое последняя строка
+                        logger.warning(f"Пропущена поврежденная запись журнала {path.name}")
+
+    def replay(self, messages: MessagesToDelete, min_timestamp: Optional[float] = None) -> int:
+        """
+        Применяет журналы к загруженному снимку.
+
+        Returns:
+            Количество примененных записей
+        """
+        applied = 0
+        for path, record in self._iter_records():
+            try:
+                if record[0] == "a":
+                    _, chat_id, message_id, timestamp = record
+                    if min_timestamp is None or timestamp >= min_timestamp:
+                        messages.setdefault(chat_id, {})[message_id] = timestamp
+                elif record[0] == "r":
+                    _, chat_id, message_ids = record
+                    chat_messages = messages.get(chat_id)
+                    if chat_messages is not None:
+                        for message_id in message_ids:
+                            chat_messages.pop(message_id, None)
+                        if not chat_messages:
+                            del messages[chat_id]
+                else:
+                    logger.warning(f"Неизвестная запись журнала {path.name}: {record}")
+                    continue
+            except (TypeError, ValueError, IndexError) as e:
+                logger.warning(f"Некорректная запись журнала {path.name}: {record} ({e})")
+                continue
+            applied += 1
+        self.records_in_log = applied
+        return applied
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Объем журнала для логов"""
+        return {
+            "records_in_log": self.records_in_log,
+            "pending": len(self._buffer),
+            "records_written": self.records_written,
+            "bytes_written": self.bytes_written,
+            "compactions": self.compactions,
+            "stale_snapshots_skipped": self.stale_snapshots_skipped,
+        }
@@ -0,0 +1,125 @@
+# modules/deletion_timer.py
+"""
+Колесо таймеров (hashed timer wheel) для отложенного удаления сообщений.
+
+Вместо отдельной задачи JobQueue на каждое сообщение все отложенные
+удаления хранятся в одном колесе: слот определяется временем удаления,
+добавление и перепланирование выполняются за O(1), а одна повторяющаяся
+задача раз в тик забирает созревшие сообщения пачкой, сгруппированной
+по чатам. Содержимое колеса сохраняется как словарь
+chat_id -> {message_id: время удаления}.
+"""
+
+import logging
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+TimerKey = Tuple[int, int]  # (chat_id, message_id)
+
+
+class DeletionTimerWheel:
+    """
+    Колесо таймеров удаления сообщений.
+
+    Args:
+        tick_seconds: Длительность тика (точность срабатывания)
+        slots: Количество слотов; таймеры дальше одного оборота остаются
+            в слоте и проверяются на следующих оборотах
+    """
+
+    def __init__(self, tick_seconds: float = 1.0, slots: int = 512):
+        self.tick_seconds = tick_seconds
+        self.slots = slots
+        self._wheel: List[Dict[TimerKey, float]] = [{} for _ in range(slots)]
+        self._due: Dict[TimerKey, Tuple[float, int]] = {}  # ключ -> (время удаления, слот)
+        self._last_tick: Optional[int] = None
+        self.dirty = False
+
+    def __len__(self) -> int:
+        return len(self._due)
+
+    def _tick_of(self, timestamp: float) -> int:
+        return int(timestamp // self.tick_seconds)
+
+    def _slot_for(self, due_at: float) -> int:
+        tick = self._tick_of(due_at)
+        if self._last_tick is not None and tick <= self._last_tick:
+            # Тик уже пройден - таймер сработает при следующем вызове pop_due
+            tick = self._last_tick + 1
+        return tick % self.slots
+
+    def schedule(self, chat_id: int, message_id: int, due_at: float) -> None:
+        """Планирует (или перепланирует) удаление сообщения на момент due_at"""
+        key = (chat_id, message_id)
+        previous = self._due.get(key)
+        if previous is not None:
+            self._wheel[previous[1]].pop(key, None)
+        slot = self._slot_for(due_at)
+        self._due[key] = (due_at, slot)
+        self._wheel[slot][key] = due_at
+        self.dirty = True
+
+    def cancel(self, chat_id: int, message_id: int) -> bool:
+        """Отменяет удаление сообщения; True, если таймер был"""
+        key = (chat_id, message_id)
+        entry = self._due.pop(key, None)
+        if entry is None:
+            return False
+        self._wheel[entry[1]].pop(key, None)
+        self.dirty = True
+        return True
+
+    def pop_due(self, now: float) -> Dict[int, List[int]]:
+        """
+        Забирает все созревшие к моменту now таймеры.
+        Просматриваются только слоты тиков, прошедших с прошлого вызова
+        (не больше одного оборота колеса).
+
+        Returns:
+            ID сообщений по чатам
+        """
+        current_tick = self._tick_of(now)
+        if self._last_tick is None:
+            # Первый вызов: просматриваем все колесо (таймеры после загрузки могли уже созреть)
+            first_tick = current_tick - self.slots + 1
+        else:
+            first_tick = max(self._last_tick + 1, current_tick - self.slots + 1)
+        # Текущий тик остается открытым: его таймеры с due_at > now проверятся в следующий раз
+        self._last_tick = current_tick - 1
+
+        due_by_chat: Dict[int, List[int]] = {}
+        for tick in range(first_tick, current_tick + 1):
+            bucket = self._wheel[tick % self.slots]
+            if not bucket:
+                continue
+            ripe = [key for key, due_at in bucket.items() if due_at <= now]
+            for key in ripe:
+                del bucket[key]
+                del self._due[key]
+                due_by_chat.setdefault(key[0], []).append(key[1])
+
+        if due_by_chat:
+            self.dirty = True
+        return due_by_chat
+
+    def to_dict(self) -> Dict[str, Dict[str, float]]:
+        """Содержимое колеса в JSON-совместимом виде"""
+        data: Dict[str, Dict[str, float]] = {}
+        for (chat_id, message_id), (due_at, _) in self._due.items():
+            data.setdefault(str(chat_id), {})[str(message_id)] = due_at
+        return data
+
+    def load(self, data: Dict[str, Dict[str, float]]) -> int:
+        """Загружает таймеры из to_dict(); возвращает количество загруженных"""
+        loaded = 0
+        for chat_id_str, messages in data.items():
+            try:
+                chat_id = int(chat_id_str)
+                for message_id_str, due_at in messages.items():
+                    self.schedule(chat_id, int(message_id_str), float(due_at))
+                    loaded += 1
+            except (ValueError, TypeError, AttributeError) as e:
+                logger.warning(f"Пропущены некорректные таймеры удаления для чата {chat_id_str}: {e}")
+        self.dirty = False
+        return loaded
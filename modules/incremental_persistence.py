@@ -0,0 +1,321 @@
+# modules/incremental_persistence.py
+"""
+Инкрементальная persistence для Application на SQLite.
+
+PicklePersistence при каждом сохранении заново сериализует весь bot_data,
+chat_data, user_data и диалоги в один файл и при запуске читает его
+целиком. Здесь каждая запись хранится отдельной строкой (вид, ключ):
+ключ верхнего уровня bot_data, чат, пользователь, состояние диалога.
+При сохранении пишутся только записи, хеш сериализации которых
+изменился; chat_data и user_data загружаются при первом обращении к
+чату или пользователю (refresh_chat_data / refresh_user_data).
+
+Служебные объекты бота в bot_data (BotState, менеджеры, планировщики)
+не сохраняются: у них собственное сохранение, а их копия из файла
+persistence после перезапуска устарела бы. BotData исключает их и из
+deepcopy, которую Application делает перед каждым сохранением.
+"""
+
+import hashlib
+import json
+import logging
+import pickle
+import sqlite3
+from copy import deepcopy
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from telegram.ext import BasePersistence, PersistenceInput, PicklePersistence
+
+logger = logging.getLogger(__name__)
+
+# Ключи bot_data с живыми объектами бота: не сериализуются и не копируются
+RUNTIME_BOT_DATA_KEYS = frozenset({
+    "bot_state", "app_config", "data_manager", "daily_quiz_scheduler", "wisdom_scheduler",
+})
+
+_KIND_BOT = "bot"
+_KIND_CHAT = "chat"
+_KIND_USER = "user"
+_KIND_CALLBACK = "callback"
+_KIND_CONVERSATION_PREFIX = "conversation:"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    kind TEXT NOT NULL,
+    key TEXT NOT NULL,
+    value BLOB NOT NULL,
+    PRIMARY KEY (kind, key)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+
+class BotData(dict):
+    """bot_data, копия которого для сохранения не содержит служебных объектов"""
+
+    def __deepcopy__(self, memo: Dict[int, Any]) -> "BotData":
+        return BotData({
+            key: deepcopy(value, memo) for key, value in self.items() if key not in RUNTIME_BOT_DATA_KEYS
+        })
+
+
+def _digest(payload: bytes) -> bytes:
+    return hashlib.blake2b(payload, digest_size=16).digest()
+
+
+class IncrementalPersistence(BasePersistence):
+    """
+    Persistence с построчным хранением записей в SQLite.
+
+    Args:
+        filepath: Файл базы SQLite
+        legacy_pickle_path: Файл PicklePersistence для однократного переноса данных
+        store_data: Какие данные сохранять
+        update_interval: Интервал сохранения Application (сек)
+    """
+
+    def __init__(
+        self,
+        filepath: Path,
+        legacy_pickle_path: Optional[Path] = None,
+        store_data: Optional[PersistenceInput] = None,
+        update_interval: float = 60
+    ):
+        super().__init__(store_data=store_data, update_interval=update_interval)
+        self.filepath = Path(filepath)
+        self.legacy_pickle_path = Path(legacy_pickle_path) if legacy_pickle_path else None
+        self._conn: Optional[sqlite3.Connection] = None
+        self._digests: Dict[Tuple[str, str], bytes] = {}
+        self._loaded_chats: Set[int] = set()
+        self._loaded_users: Set[int] = set()
+        self._legacy_checked = False
+
+        self.entries_written = 0
+        self.entries_deleted = 0
+        self.entries_unchanged = 0
+        self.bytes_written = 0
+        self.lazy_loads = 0
+        self.last_write: Dict[str, int] = {"entries": 0, "bytes": 0}
+
+    # --- база ---
+
+    def _db(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self.filepath.parent.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(self.filepath)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.executescript(_SCHEMA)
+        return self._conn
+
+    def _load_kind(self, kind: str) -> List[Tuple[str, bytes]]:
+        rows = self._db().execute("SELECT key, value FROM entries WHERE kind = ?", (kind,)).fetchall()
+        for key, value in rows:
+            self._digests[(kind, key)] = _digest(value)
+        return rows
+
+    def _load_entry(self, kind: str, key: str) -> Optional[Any]:
+        row = self._db().execute("SELECT value FROM entries WHERE kind = ? AND key = ?", (kind, key)).fetchone()
+        if row is None:
+            return None
+        self._digests[(kind, key)] = _digest(row[0])
+        return self._unpickle(kind, key, row[0])
+
+    @staticmethod
+    def _unpickle(kind: str, key: str, value: bytes) -> Optional[Any]:
+        try:
+            return pickle.loads(value)
+        except Exception as e:
+            logger.error(f"Не удалось прочитать запись persistence {kind}/{key}: {e}")
+            return None
+
+    def _write(self, upserts: Dict[Tuple[str, str], Any], deletes: Iterable[Tuple[str, str]] = ()) -> None:
+        """Записывает изменившиеся записи и удаляет снятые одной транзакцией"""
+        rows: List[Tuple[str, str, bytes]] = []
+        for (kind, key), value in upserts.items():
+            try:
+                payload = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+            except Exception as e:
+                logger.warning(f"Запись persistence {kind}/{key} не сериализуется и пропущена: {e}")
+                continue
+            digest = _digest(payload)
+            if self._digests.get((kind, key)) == digest:
+                self.entries_unchanged += 1
+                continue
+            self._digests[(kind, key)] = digest
+            rows.append((kind, key, payload))
+
+        delete_rows = [entry for entry in deletes if self._digests.pop(entry, None) is not None]
+        if not rows and not delete_rows:
+            return
+
+        conn = self._db()
+        with conn:
+            if rows:
+                conn.executemany("INSERT OR REPLACE INTO entries (kind, key, value) VALUES (?, ?, ?)", rows)
+            if delete_rows:
+                conn.executemany("DELETE FROM entries WHERE kind = ? AND key = ?", delete_rows)
+
+        written_bytes = sum(len(row[2]) for row in rows)
+        self.entries_written += len(rows)
+        self.entries_deleted += len(delete_rows)
+        self.bytes_written += written_bytes
+        self.last_write = {"entries": len(rows), "bytes": written_bytes}
+        logger.debug(f"Persistence: записано {len(rows)} записей ({written_bytes:,} байт), удалено {len(delete_rows)}")
+
+    # --- перенос из PicklePersistence ---
+
+    async def _import_legacy(self) -> None:
+        if self._legacy_checked:
+            return
+        self._legacy_checked = True
+        if not self.legacy_pickle_path or not self.legacy_pickle_path.exists():
+            return
+        conn = self._db()
+        if conn.execute("SELECT 1 FROM meta WHERE key = 'legacy_imported'").fetchone():
+            return
+
+        legacy = PicklePersistence(filepath=self.legacy_pickle_path)
+        if getattr(self, "bot", None) is not None:
+            legacy.set_bot(self.bot)
+        try:
+            upserts: Dict[Tuple[str, str], Any] = {}
+            for chat_id, data in (await legacy.get_chat_data()).items():
+                upserts[(_KIND_CHAT, str(chat_id))] = data
+            for user_id, data in (await legacy.get_user_data()).items():
+                upserts[(_KIND_USER, str(user_id))] = data
+            for key, value in (await legacy.get_bot_data()).items():
+                if isinstance(key, str) and key not in RUNTIME_BOT_DATA_KEYS:
+                    upserts[(_KIND_BOT, key)] = value
+            callback_data = await legacy.get_callback_data()
+            if callback_data is not None:
+                upserts[(_KIND_CALLBACK, "")] = callback_data
+            for name, conversations in (legacy.conversations or {}).items():
+                for conversation_key, state in conversations.items():
+                    upserts[(_KIND_CONVERSATION_PREFIX + name, json.dumps(list(conversation_key)))] = state
+        except Exception as e:
+            logger.error(f"Не удалось перенести данные из {self.legacy_pickle_path}: {e}", exc_info=True)
+            return
+
+        self._write(upserts)
+        with conn:
+            conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('legacy_imported', ?)", (str(self.legacy_pickle_path),))
+        logger.info(f"Данные PicklePersistence перенесены из {self.legacy_pickle_path}: {len(upserts)} записей")
+
+    # --- загрузка ---
+
+    async def get_bot_data(self) -> BotData:
+        await self._import_legacy()
+        bot_data = BotData()
+        for key, value in self._load_kind(_KIND_BOT):
+            restored = self._unpickle(_KIND_BOT, key, value)
+            if restored is not None:
+                bot_data[key] = restored
+        return bot_data
+
+    async def get_chat_data(self) -> Dict[int, Any]:
+        # Данные чатов загружаются в refresh_chat_data при первом обращении
+        await self._import_legacy()
+        return {}
+
+    async def get_user_data(self) -> Dict[int, Any]:
+        await self._import_legacy()
+        return {}
+
+    async def get_callback_data(self) -> Optional[Any]:
+        await self._import_legacy()
+        return self._load_entry(_KIND_CALLBACK, "")
+
+    async def get_conversations(self, name: str) -> Dict[Tuple[Any, ...], object]:
+        await self._import_legacy()
+        conversations: Dict[Tuple[Any, ...], object] = {}
+        kind = _KIND_CONVERSATION_PREFIX + name
+        for key, value in self._load_kind(kind):
+            conversations[tuple(json.loads(key))] = self._unpickle(kind, key, value)
+        return conversations
+
+    def _load_lazily(self, kind: str, entity_id: int, data: Dict[Any, Any], loaded: Set[int]) -> None:
+        if entity_id in loaded:
+            return
+        loaded.add(entity_id)
+        stored = self._load_entry(kind, str(entity_id))
+        if isinstance(stored, dict):
+            self.lazy_loads += 1
+            for key, value in stored.items():
+                data.setdefault(key, value)
+
+    async def refresh_chat_data(self, chat_id: int, chat_data: Dict[Any, Any]) -> None:
+        self._load_lazily(_KIND_CHAT, chat_id, chat_data, self._loaded_chats)
+
+    async def refresh_user_data(self, user_id: int, user_data: Dict[Any, Any]) -> None:
+        self._load_lazily(_KIND_USER, user_id, user_data, self._loaded_users)
+
+    async def refresh_bot_data(self, bot_data: Dict[Any, Any]) -> None:
+        return None
+
+    # --- сохранение ---
+
+    async def update_bot_data(self, data: Dict[Any, Any]) -> None:
+        upserts = {
+            (_KIND_BOT, key): value for key, value in data.items()
+            if isinstance(key, str) and key not in RUNTIME_BOT_DATA_KEYS
+        }
+        deletes = [entry for entry in self._digests if entry[0] == _KIND_BOT and entry not in upserts]
+        self._write(upserts, deletes)
+
+    async def update_chat_data(self, chat_id: int, data: Dict[Any, Any]) -> None:
+        # Несохраненные ранее поля чата не затираются, если он еще не загружался
+        self._load_lazily(_KIND_CHAT, chat_id, data, self._loaded_chats)
+        self._write({(_KIND_CHAT, str(chat_id)): data})
+
+    async def update_user_data(self, user_id: int, data: Dict[Any, Any]) -> None:
+        self._load_lazily(_KIND_USER, user_id, data, self._loaded_users)
+        self._write({(_KIND_USER, str(user_id)): data})
+
+    async def update_callback_data(self, data: Any) -> None:
+        self._write({(_KIND_CALLBACK, ""): data})
+
+    async def update_conversation(self, name: str, key: Tuple[Any, ...], new_state: Optional[object]) -> None:
+        entry = (_KIND_CONVERSATION_PREFIX + name, json.dumps(list(key)))
+        if new_state is None:
+            self._write({}, [entry])
+        else:
+            self._write({entry: new_state})
+
+    async def drop_chat_data(self, chat_id: int) -> None:
+        self._loaded_chats.add(chat_id)
+        self._drop(_KIND_CHAT, str(chat_id))
+
+    async def drop_user_data(self, user_id: int) -> None:
+        self._loaded_users.add(user_id)
+        self._drop(_KIND_USER, str(user_id))
+
+    def _drop(self, kind: str, key: str) -> None:
+        self._digests.pop((kind, key), None)
+        conn = self._db()
+        with conn:
+            deleted = conn.execute("DELETE FROM entries WHERE kind = ? AND key = ?", (kind, key)).rowcount
+        self.entries_deleted += deleted
+
+    async def flush(self) -> None:
+        """Вызывается Application при остановке: данные уже записаны, закрываем базу"""
+        logger.info(f"Persistence: {self.get_stats()}")
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Объем записи для логов и веб-интерфейса"""
+        return {
+            "entries_written": self.entries_written,
+            "entries_deleted": self.entries_deleted,
+            "entries_unchanged": self.entries_unchanged,
+            "bytes_written": self.bytes_written,
+            "last_write": dict(self.last_write),
+            "lazy_loads": self.lazy_loads,
+            "tracked_entries": len(self._digests),
+        }
@@ -0,0 +1,183 @@
+# modules/job_registry.py
+"""
+Индекс задач JobQueue по имени, чату и группе.
+
+JobQueue.get_jobs_by_name и JobQueue.jobs() перебирают все задачи
+планировщика, поэтому перепланирование одного чата при десятках тысяч
+задач стоило O(всех задач). Реестр планирует задачи через JobQueue и
+поддерживает индексы name -> задача, chat_id -> имена, группа -> имена:
+поиск задачи по имени - O(1), задачи чата - O(задач чата).
+
+Имена задач уникальны: новая задача с занятым именем заменяет старую.
+Однократные задачи удаляются из индекса после выполнения, задачи,
+снятые напрямую через job.schedule_removal(), - при следующем обращении.
+"""
+
+import functools
+import logging
+from datetime import time as dt_time
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+from apscheduler.jobstores.base import JobLookupError
+from telegram.ext import Job, JobQueue
+
+logger = logging.getLogger(__name__)
+
+_IndexEntry = Tuple[Job, Optional[int], Optional[str]]  # (задача, chat_id, группа)
+
+
+class JobRegistry:
+    """
+    Планирование задач с индексами по имени, чату и группе.
+
+    Args:
+        job_queue: JobQueue приложения
+    """
+
+    def __init__(self, job_queue: JobQueue):
+        self.job_queue = job_queue
+        self._by_name: Dict[str, _IndexEntry] = {}
+        self._by_chat: Dict[int, Set[str]] = {}
+        self._by_group: Dict[str, Set[str]] = {}
+        self.scheduled_total = 0
+        self.cancelled_total = 0
+
+    def __len__(self) -> int:
+        return len(self._by_name)
+
+    def _register(self, name: str, job: Job, chat_id: Optional[int], group: Optional[str]) -> None:
+        self._by_name[name] = (job, chat_id, group)
+        if chat_id is not None:
+            self._by_chat.setdefault(chat_id, set()).add(name)
+        if group is not None:
+            self._by_group.setdefault(group, set()).add(name)
+        self.scheduled_total += 1
+
+    def _forget(self, name: str, job: Optional[Job] = None) -> Optional[Job]:
+        entry = self._by_name.get(name)
+        if entry is None or (job is not None and entry[0] is not job):
+            return None
+        del self._by_name[name]
+        indexed_job, chat_id, group = entry
+        for index, key in ((self._by_chat, chat_id), (self._by_group, group)):
+            if key is None:
+                continue
+            names = index.get(key)
+            if names is not None:
+                names.discard(name)
+                if not names:
+                    del index[key]
+        return indexed_job
+
+    def _forget_after_run(self, name: str, callback: Callable[..., Any]) -> Callable[..., Any]:
+        @functools.wraps(callback)
+        async def run_and_forget(context: Any) -> Any:
+            try:
+                return await callback(context)
+            finally:
+                self._forget(name, context.job)
+        return run_and_forget
+
+    def run_once(
+        self, callback: Callable[..., Any], when: Any, *, name: str,
+        data: Any = None, chat_id: Optional[int] = None, group: Optional[str] = None
+    ) -> Job:
+        """Однократная задача; задача с тем же именем снимается"""
+        self.cancel(name)
+        job = self.job_queue.run_once(self._forget_after_run(name, callback), when, data=data, name=name)
+        self._register(name, job, chat_id, group)
+        return job
+
+    def run_daily(
+        self, callback: Callable[..., Any], time: dt_time, *, name: str,
+        data: Any = None, days: Tuple[int, ...] = tuple(range(7)),
+        chat_id: Optional[int] = None, group: Optional[str] = None
+    ) -> Job:
+        """Ежедневная задача; задача с тем же именем снимается"""
+        self.cancel(name)
+        job = self.job_queue.run_daily(callback, time, days=days, data=data, name=name)
+        self._register(name, job, chat_id, group)
+        return job
+
+    def run_repeating(
+        self, callback: Callable[..., Any], interval: Any, *, name: str,
+        first: Any = None, data: Any = None,
+        chat_id: Optional[int] = None, group: Optional[str] = None
+    ) -> Job:
+        """Повторяющаяся задача; задача с тем же именем снимается"""
+        self.cancel(name)
+        job = self.job_queue.run_repeating(callback, interval, first=first, data=data, name=name)
+        self._register(name, job, chat_id, group)
+        return job
+
+    def get(self, name: str) -> Optional[Job]:
+        """Активная задача по имени"""
+        entry = self._by_name.get(name)
+        if entry is None:
+            return None
+        if entry[0].removed:
+            self._forget(name)
+            return None
+        return entry[0]
+
+    def _jobs_for_names(self, names: Optional[Set[str]]) -> List[Job]:
+        jobs: List[Job] = []
+        for name in list(names or ()):
+            job = self.get(name)
+            if job is not None:
+                jobs.append(job)
+        return jobs
+
+    def get_chat_jobs(self, chat_id: int, group: Optional[str] = None) -> List[Job]:
+        """Активные задачи чата (при необходимости - только заданной группы)"""
+        jobs = self._jobs_for_names(self._by_chat.get(chat_id))
+        if group is None:
+            return jobs
+        return [job for job in jobs if self._by_name.get(job.name, (None, None, None))[2] == group]
+
+    def get_group_jobs(self, group: str) -> List[Job]:
+        """Активные задачи группы"""
+        return self._jobs_for_names(self._by_group.get(group))
+
+    def cancel(self, name: str) -> bool:
+        """Снимает задачу по имени; True, если задача была"""
+        job = self._forget(name)
+        if job is None:
+            return False
+        if not job.removed:
+            try:
+                job.schedule_removal()
+            except JobLookupError:
+                # Однократная задача уже сработала (снятие из собственного callback)
+                pass
+        self.cancelled_total += 1
+        return True
+
+    def cancel_chat(self, chat_id: int, group: Optional[str] = None) -> int:
+        """Снимает задачи чата; возвращает количество снятых"""
+        return sum(self.cancel(job.name) for job in self.get_chat_jobs(chat_id, group))
+
+    def cancel_group(self, group: str) -> int:
+        """Снимает задачи группы; возвращает количество снятых"""
+        return sum(self.cancel(job.name) for job in self.get_group_jobs(group))
+
+    def get_stats(self) -> Dict[str, int]:
+        """Размер индексов и счетчики для логов и веб-интерфейса"""
+        return {
+            "indexed_jobs": len(self._by_name),
+            "chats": len(self._by_chat),
+            "groups": len(self._by_group),
+            "scheduled_total": self.scheduled_total,
+            "cancelled_total": self.cancelled_total,
+        }
+
+
+_registry: Optional[JobRegistry] = None
+
+
+def get_job_registry(job_queue: JobQueue) -> JobRegistry:
+    """Возвращает реестр задач для JobQueue приложения"""
+    global _registry
+    if _registry is None or _registry.job_queue is not job_queue:
+        _registry = JobRegistry(job_queue)
+    return _registry
@@ -0,0 +1,324 @@
+# modules/log_index.py
+"""
+Индекс лог-файлов бота по времени для /api/logs веб-панели.
+
+Раньше запрос логов разбирал регулярным выражением и strptime каждую
+строку каждого bot_*.log, копил до 2*limit записей и сортировал их:
+запрос за последний час большого дневного лога читал весь файл.
+
+Теперь для каждого файла строится разреженный индекс: примерно через
+каждые stride байт запоминается смещение, номер строки и время первой
+строки с меткой времени. Индекс достраивается только по дописанному
+хвосту файла, а при ротации (другой inode или файл стал короче)
+строится заново. Запрос по диапазону времени бинарным поиском находит
+участок файла и читает только его, а запрос "последние N" читает
+участок блоками с конца и останавливается, набрав N записей.
+
+Метки времени сравниваются как строки формата
+"YYYY-MM-DD HH:MM:SS,mmm" - лог пишется по возрастанию времени.
+"""
+
+import bisect
+import logging
+import os
+import re
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_STRIDE_BYTES = 64 * 1024
+READ_BLOCK_BYTES = 64 * 1024
+
+# Формат: 2026-01-02 08:19:32,096 - modules.quiz_engine - ERROR - ...
+LOG_LINE_PATTERN = re.compile(r'^(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}(?:,\d+)?)\s+-\s+(\S+)\s+-\s+(\w+)\s+-\s+(.*)$')
+TIMESTAMP_PREFIX = re.compile(rb'^(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}(?:,\d+)?) ')
+
+
+def timestamp_key(dt: datetime) -> str:
+    """Ключ сравнения в формате меток времени лога"""
+    key = dt.strftime('%Y-%m-%d %H:%M:%S')
+    if dt.microsecond:
+        key += f",{dt.microsecond // 1000:03d}"
+    return key
+
+
+def key_to_isoformat(key: str) -> str:
+    """'2026-01-02 08:19:32,096' -> '2026-01-02T08:19:32.096000' (как datetime.isoformat())"""
+    date_part, _, fraction = key.partition(',')
+    iso = date_part.replace(' ', 'T', 1)
+    if fraction and int(fraction):
+        iso += '.' + fraction.ljust(6, '0')[:6]
+    return iso
+
+
+@dataclass
+class IndexPoint:
+    key: str
+    offset: int
+    line: int  # номер строки (с 1), которая начинается по offset
+
+
+class LogFileIndex:
+    """
+    Разреженный индекс одного лог-файла.
+
+    Args:
+        path: Путь к файлу
+        stride: Примерное расстояние между точками индекса (байт)
+    """
+
+    def __init__(self, path: Path, stride: int = DEFAULT_STRIDE_BYTES):
+        self.path = Path(path)
+        self.stride = stride
+        self._reset(None)
+
+    def _reset(self, identity: Optional[Tuple[int, int]]) -> None:
+        self._identity = identity
+        self.points: List[IndexPoint] = []
+        self._keys: List[str] = []
+        # Проиндексирован префикс [0, indexed_size) из indexed_lines целых строк
+        self.indexed_size = 0
+        self.indexed_lines = 0
+        self.first_key: Optional[str] = None
+        self.last_key: Optional[str] = None
+        self._next_point_at = 0
+
+    def refresh(self) -> bool:
+        """Достраивает индекс по дописанному хвосту; False, если файла нет"""
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            self._reset(None)
+            return False
+        identity = (st.st_dev, st.st_ino)
+        if identity != self._identity or st.st_size < self.indexed_size:
+            self._reset(identity)
+        if st.st_size > self.indexed_size:
+            self._scan()
+        return True
+
+    def _scan(self) -> None:
+        last_key = None
+        with open(self.path, 'rb') as f:
+            f.seek(self.indexed_size)
+            offset = self.indexed_size
+            line_no = self.indexed_lines
+            for raw_line in f:
+                if not raw_line.endswith(b'\n'):
+                    # Строка еще дописывается: проиндексируем ее в следующий раз
+                    break
+                line_no += 1
+                match = TIMESTAMP_PREFIX.match(raw_line) if offset >= self._next_point_at or self.first_key is None else None
+                if match:
+                    key = match.group(1).decode('ascii')
+                    if self.first_key is None:
+                        self.first_key = key
+                    if offset >= self._next_point_at:
+                        self.points.append(IndexPoint(key, offset, line_no))
+                        self._keys.append(key)
+                        self._next_point_at = offset + self.stride
+                offset += len(raw_line)
+        if offset > self.indexed_size:
+            last_key = self._find_last_key(self.indexed_size, offset)
+        self.indexed_size = offset
+        self.indexed_lines = line_no
+        if last_key:
+            self.last_key = last_key
+
+    def _find_last_key(self, start: int, end: int) -> Optional[str]:
+        for _, raw_line in self._iter_backward_raw(start, end):
+            match = TIMESTAMP_PREFIX.match(raw_line)
+            if match:
+                return match.group(1).decode('ascii')
+        return None
+
+    def overlaps(self, since_key: Optional[str], until_key: Optional[str]) -> bool:
+        """Может ли файл содержать записи диапазона"""
+        if self.first_key is None:
+            return self.indexed_size > 0
+        if since_key and self.last_key and self.last_key < since_key:
+            return False
+        if until_key and self.first_key > until_key:
+            return False
+        return True
+
+    def region(self, since_key: Optional[str], until_key: Optional[str]) -> Tuple[int, int, int, int]:
+        """
+        Участок файла, который может содержать записи диапазона.
+
+        Returns:
+            (начальное смещение, номер первой строки, конечное смещение, номер строки после участка)
+        """
+        start, start_line = 0, 1
+        if since_key:
+            idx = bisect.bisect_left(self._keys, since_key)
+            if idx > 0:
+                point = self.points[idx - 1]
+                start, start_line = point.offset, point.line
+        end, end_line = self.indexed_size, self.indexed_lines + 1
+        if until_key:
+            idx = bisect.bisect_right(self._keys, until_key)
+            if idx < len(self.points):
+                point = self.points[idx]
+                end, end_line = point.offset, point.line
+        return start, start_line, end, end_line
+
+    def _iter_backward_raw(self, start: int, end: int) -> Iterator[Tuple[int, bytes]]:
+        """Строки участка [start, end) с конца: (сколько строк от конца, строка); читает блоками"""
+        with open(self.path, 'rb') as f:
+            position = end
+            tail = b''
+            from_end = 0
+            while position > start:
+                read_size = min(READ_BLOCK_BYTES, position - start)
+                position -= read_size
+                f.seek(position)
+                chunk = f.read(read_size) + tail
+                lines = chunk.split(b'\n')
+                # Первый кусок может быть неполной строкой - доклеим к следующему блоку
+                tail = lines[0]
+                for raw_line in reversed(lines[1:]):
+                    if from_end == 0 and raw_line == b'':
+                        # Пустой хвост после завершающего перевода строки
+                        from_end = 1
+                        continue
+                    from_end = max(from_end, 1)
+                    yield from_end, raw_line
+                    from_end += 1
+            if tail:
+                yield max(from_end, 1), tail
+
+    def iter_backward(self, start: int, end: int, end_line: int) -> Iterator[Tuple[int, bytes]]:
+        """Строки участка [start, end) от новых к старым: (номер строки, строка)"""
+        for from_end, raw_line in self._iter_backward_raw(start, end):
+            yield end_line - from_end, raw_line
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "file": self.path.name,
+            "indexed_size": self.indexed_size,
+            "lines": self.indexed_lines,
+            "points": len(self.points),
+            "first": self.first_key,
+            "last": self.last_key,
+        }
+
+
+LogEntry = Dict[str, Any]
+
+
+class LogIndex:
+    """
+    Индексы лог-файлов папки и запросы к ним.
+
+    Args:
+        directory: Папка логов
+        pattern: Маска лог-файлов
+        stride: Расстояние между точками индекса (байт)
+    """
+
+    def __init__(self, directory: Path, pattern: str = "bot_*.log", stride: int = DEFAULT_STRIDE_BYTES):
+        self.directory = Path(directory)
+        self.pattern = pattern
+        self.stride = stride
+        self._files: Dict[str, LogFileIndex] = {}
+        self.lines_read = 0
+
+    def refresh(self) -> List[LogFileIndex]:
+        """Достраивает индексы; возвращает индексы существующих файлов"""
+        paths = {str(path): path for path in self.directory.glob(self.pattern)}
+        for removed in set(self._files) - set(paths):
+            del self._files[removed]
+        indexes = []
+        for key, path in paths.items():
+            index = self._files.get(key)
+            if index is None:
+                index = self._files[key] = LogFileIndex(path, self.stride)
+            try:
+                if index.refresh():
+                    indexes.append(index)
+            except OSError as e:
+                logger.warning(f"Не удалось проиндексировать {path.name}: {e}")
+        return indexes
+
+    def query(
+        self, since: Optional[datetime] = None, until: Optional[datetime] = None,
+        levels: Optional[set] = None, limit: int = 1000,
+    ) -> List[LogEntry]:
+        """
+        Записи диапазона с фильтром по уровням, от новых к старым, не более limit.
+
+        Строки без метки времени (трассировки) попадают в ответ, только если
+        фильтр содержит ERROR или CRITICAL и строка упоминает один из уровней
+        фильтра, - как и при прежнем полном разборе.
+        """
+        since_key = timestamp_key(since) if since else None
+        until_key = timestamp_key(until) if until else None
+        indexes = [index for index in self.refresh() if index.overlaps(since_key, until_key)]
+        # Сначала файлы с более свежими записями
+        indexes.sort(key=lambda index: index.last_key or "", reverse=True)
+
+        entries: List[LogEntry] = []
+        for index in indexes:
+            start, _, end, end_line = index.region(since_key, until_key)
+            collected = 0
+            try:
+                for line_no, raw_line in index.iter_backward(start, end, end_line):
+                    self.lines_read += 1
+                    entry = self._parse(raw_line, since_key, until_key, levels)
+                    if entry is None:
+                        continue
+                    entry["file"] = index.path.name
+                    entry["line"] = line_no
+                    entries.append(entry)
+                    collected += 1
+                    if collected >= limit:
+                        break
+            except OSError as e:
+                logger.warning(f"Ошибка чтения лог-файла {index.path.name}: {e}")
+
+        entries.sort(key=lambda x: x["timestamp"] if x["timestamp"] else "", reverse=True)
+        return entries[:limit]
+
+    @staticmethod
+    def _parse(
+        raw_line: bytes, since_key: Optional[str], until_key: Optional[str], levels: Optional[set],
+    ) -> Optional[LogEntry]:
+        line = raw_line.decode('utf-8', errors='replace').rstrip('\n\r')
+        if not line.strip():
+            return None
+        match = LOG_LINE_PATTERN.match(line)
+        if match:
+            key, logger_name, log_level, message = match.groups()
+            if levels and log_level.upper() not in levels:
+                return None
+            if since_key and key < since_key:
+                return None
+            if until_key and key > until_key:
+                return None
+            return {
+                "timestamp": key_to_isoformat(key),
+                "level": log_level.upper(),
+                "logger": logger_name,
+                "message": message,
+            }
+        if levels and any(lvl in ('ERROR', 'CRITICAL') for lvl in levels):
+            upper_line = line.upper()
+            detected_level = next((lvl for lvl in levels if lvl in upper_line), None)
+            if detected_level:
+                return {
+                    "timestamp": None,
+                    "level": detected_level,
+                    "logger": None,
+                    "message": line,
+                }
+        return None
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "files": [index.get_stats() for index in self._files.values()],
+            "lines_read": self.lines_read,
+        }
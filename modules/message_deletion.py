@@ -0,0 +1,238 @@
+# modules/message_deletion.py
+"""
+Пакетное удаление сообщений через deleteMessages.
+
+Bot API позволяет удалить до 100 сообщений одного чата одним вызовом
+(уже удаленные сообщения при этом пропускаются). Сервис группирует ID по
+чатам, удаляет пачками и при ошибке пачки переходит на удаление по одному,
+чтобы отделить недоступные сообщения от временных ошибок.
+Все вызовы идут через планировщик запросов с приоритетом очистки.
+
+Пачки выполняются параллельно: семафоры ограничивают число вызовов
+в полете на весь сервис и на один чат, поэтому задержка сети
+до Bot API перекрывается, а темп по-прежнему задает ограничитель
+скорости планировщика.
+"""
+
+import asyncio
+import logging
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Union
+
+from modules.rate_limiter import RequestPriority
+from modules.request_scheduler import BotRequestScheduler, RequestBackpressureError, get_request_scheduler
+from modules.retry_policy import ErrorClass, classify_error
+
+logger = logging.getLogger(__name__)
+
+# Лимит Bot API на количество ID в одном вызове deleteMessages
+MAX_MESSAGES_PER_BATCH = 100
+
+# Одновременных вызовов удаления: всего и в одном чате
+DEFAULT_MAX_CONCURRENCY = 8
+DEFAULT_PER_CHAT_CONCURRENCY = 2
+
+_GONE_MARKERS = (
+    "message to delete not found",
+    "message can't be deleted",
+    "message_id_invalid",
+    "message not found",
+)
+
+
+def is_message_gone_error(error: BaseException) -> bool:
+    """Сообщение уже удалено или не может быть удалено - повторять бессмысленно"""
+    if classify_error(error) == ErrorClass.CHAT_UNAVAILABLE:
+        return True
+    message = str(error).lower()
+    return any(marker in message for marker in _GONE_MARKERS)
+
+
+@dataclass
+class DeletionResult:
+    """
+    Результат удаления сообщений одного или нескольких чатов.
+
+    resolved: Сообщения, которые больше не нужно удалять (удалены или недоступны)
+    failed: Сообщения, удаление которых стоит повторить позже
+    skipped: Сообщения, до которых не дошла очередь (остановка по backpressure)
+    """
+    resolved: Dict[Union[int, str], Set[int]] = field(default_factory=dict)
+    failed: Dict[Union[int, str], Set[int]] = field(default_factory=dict)
+    api_calls: int = 0
+    stopped: bool = False
+    skipped: int = 0
+
+    def add_resolved(self, chat_id: Union[int, str], message_ids: Iterable[int]) -> None:
+        self.resolved.setdefault(chat_id, set()).update(message_ids)
+
+    def add_failed(self, chat_id: Union[int, str], message_ids: Iterable[int]) -> None:
+        self.failed.setdefault(chat_id, set()).update(message_ids)
+
+    @property
+    def resolved_count(self) -> int:
+        return sum(len(ids) for ids in self.resolved.values())
+
+    @property
+    def failed_count(self) -> int:
+        return sum(len(ids) for ids in self.failed.values())
+
+
+class MessageDeletionService:
+    """
+    Сервис пакетного удаления сообщений.
+
+    Args:
+        scheduler: Планировщик запросов (по умолчанию общий планировщик процесса)
+        batch_size: Максимум ID в одном вызове deleteMessages
+        max_concurrency: Максимум вызовов удаления в полете
+        per_chat_concurrency: Максимум вызовов удаления в полете для одного чата
+    """
+
+    def __init__(
+        self, scheduler: Optional[BotRequestScheduler] = None, batch_size: int = MAX_MESSAGES_PER_BATCH,
+        max_concurrency: int = DEFAULT_MAX_CONCURRENCY, per_chat_concurrency: int = DEFAULT_PER_CHAT_CONCURRENCY
+    ):
+        self.scheduler = scheduler or get_request_scheduler()
+        self.batch_size = max(1, min(batch_size, MAX_MESSAGES_PER_BATCH))
+        self.max_concurrency = max(1, max_concurrency)
+        self.per_chat_concurrency = max(1, per_chat_concurrency)
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._semaphore_loop: Optional[asyncio.AbstractEventLoop] = None
+        self.in_flight = 0
+        self.max_in_flight_seen = 0
+
+        self.batch_calls = 0
+        self.single_calls = 0
+        self.batch_fallbacks = 0
+        self.messages_resolved = 0
+
+    def _get_semaphore(self) -> asyncio.Semaphore:
+        # Семафор привязан к циклу событий, как в планировщике запросов
+        loop = asyncio.get_running_loop()
+        if self._semaphore is None or self._semaphore_loop is not loop:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+            self._semaphore_loop = loop
+        return self._semaphore
+
+    async def _delete_single(self, bot: Any, chat_id: Union[int, str], message_id: int, result: DeletionResult) -> None:
+        self.single_calls += 1
+        result.api_calls += 1
+        try:
+            await self.scheduler.delete_message(bot, chat_id, message_id)
+            result.add_resolved(chat_id, (message_id,))
+        except RequestBackpressureError:
+            raise
+        except Exception as e:
+            if is_message_gone_error(e):
+                logger.debug(f"Сообщение {message_id} в чате {chat_id} уже удалено или недоступно: {e}")
+                result.add_resolved(chat_id, (message_id,))
+            else:
+                logger.warning(f"Не удалось удалить сообщение {message_id} из чата {chat_id}: {e}")
+                result.add_failed(chat_id, (message_id,))
+
+    async def _delete_batch(self, bot: Any, chat_id: Union[int, str], batch: List[int], result: DeletionResult) -> None:
+        if len(batch) == 1:
+            await self._delete_single(bot, chat_id, batch[0], result)
+            return
+
+        self.batch_calls += 1
+        result.api_calls += 1
+        try:
+            await self.scheduler.call(
+                chat_id, RequestPriority.CLEANUP, bot.delete_messages,
+                chat_id=chat_id, message_ids=batch, chat_limited=False
+            )
+            result.add_resolved(chat_id, batch)
+            return
+        except RequestBackpressureError:
+            raise
+        except Exception as e:
+            if classify_error(e) == ErrorClass.CHAT_UNAVAILABLE:
+                logger.warning(f"Чат {chat_id} недоступен, {len(batch)} сообщений исключены из удаления: {e}")
+                result.add_resolved(chat_id, batch)
+                return
+            logger.info(f"Пакетное удаление {len(batch)} сообщений в чате {chat_id} не удалось ({e}), удаляем по одному")
+            self.batch_fallbacks += 1
+
+        for message_id in batch:
+            await self._delete_single(bot, chat_id, message_id, result)
+
+    async def delete_messages(
+        self,
+        bot: Any,
+        messages_by_chat: Dict[Union[int, str], Iterable[int]],
+        should_stop: Optional[Callable[[], bool]] = None
+    ) -> DeletionResult:
+        """
+        Удаляет сообщения нескольких чатов пачками.
+
+        Args:
+            messages_by_chat: ID сообщений по чатам (порядок чатов сохраняется)
+            should_stop: Проверяется перед каждой пачкой; True - остальные сообщения
+                остаются в ожидании (например, при backpressure планировщика)
+        """
+        result = DeletionResult()
+        global_semaphore = self._get_semaphore()
+        # Пик параллельности - за последний запуск, а не за все время работы
+        # (удаления, уже идущие из другого запуска, учитываются)
+        self.max_in_flight_seen = self.in_flight
+
+        async def run_batch(chat_id: Union[int, str], batch: List[int], chat_semaphore: asyncio.Semaphore) -> None:
+            # Сначала слот чата, потом общий: пачки одного чата не держат общие слоты в ожидании
+            async with chat_semaphore, global_semaphore:
+                if not result.stopped and should_stop is not None and should_stop():
+                    result.stopped = True
+                if result.stopped:
+                    result.skipped += len(batch)
+                    return
+                self.in_flight += 1
+                self.max_in_flight_seen = max(self.max_in_flight_seen, self.in_flight)
+                try:
+                    await self._delete_batch(bot, chat_id, batch, result)
+                except RequestBackpressureError as e:
+                    if not result.stopped:
+                        logger.info(f"Очередь очистки переполнена, удаление отложено: {e}")
+                    result.stopped = True
+                    done = result.resolved.get(chat_id, set()) | result.failed.get(chat_id, set())
+                    result.skipped += sum(1 for message_id in batch if message_id not in done)
+                finally:
+                    self.in_flight -= 1
+
+        tasks = []
+        for chat_id, message_ids in messages_by_chat.items():
+            unique_ids = sorted(set(message_ids))
+            chat_semaphore = asyncio.Semaphore(self.per_chat_concurrency)
+            for start in range(0, len(unique_ids), self.batch_size):
+                tasks.append(run_batch(chat_id, unique_ids[start:start + self.batch_size], chat_semaphore))
+        # Порядок создания сохраняется семафорами: чаты из начала словаря обслуживаются первыми
+        await asyncio.gather(*tasks)
+
+        self.messages_resolved += result.resolved_count
+        return result
+
+    async def delete_chat_messages(self, bot: Any, chat_id: Union[int, str], message_ids: Iterable[int]) -> DeletionResult:
+        """Удаляет сообщения одного чата"""
+        return await self.delete_messages(bot, {chat_id: message_ids})
+
+    def get_stats(self) -> Dict[str, int]:
+        """Статистика для логов и веб-интерфейса"""
+        return {
+            "batch_calls": self.batch_calls,
+            "single_calls": self.single_calls,
+            "batch_fallbacks": self.batch_fallbacks,
+            "messages_resolved": self.messages_resolved,
+            "max_concurrency": self.max_concurrency,
+            "max_in_flight_seen": self.max_in_flight_seen,
+        }
+
+
+_deletion_service: Optional[MessageDeletionService] = None
+
+
+def get_message_deletion_service() -> MessageDeletionService:
+    """Возвращает общий сервис удаления сообщений процесса"""
+    global _deletion_service
+    if _deletion_service is None:
+        _deletion_service = MessageDeletionService()
+    return _deletion_service
@@ -14,8 +14,14 @@ from typing import Dict, List, Optional, Tuple, Set
 
 from telegram import Update
 from telegram.constants import ParseMode
+from telegram.error import BadRequest
 from telegram.ext import ContextTypes
 
+from modules.message_deletion import get_message_deletion_service
+from modules.rate_limiter import RequestPriority
+from modules.request_scheduler import get_request_scheduler
+from modules.photo_variants import PhotoVariantIndex
+from modules.telegram_file_cache import TelegramFileIdCache, is_stale_file_id_error
 from utils import escape_markdown_v2, schedule_job_unique
 
 logger = logging.getLogger(__name__)
@@ -60,6 +66,10 @@ class PhotoQuizManager:
         self.images_metadata: Dict[str, Dict] = {}
         self.images_dir = Path("data/images")
         self.metadata_file = Path("data/photo_quiz_metadata.json")
+        # Изображения отправляются по file_id после первой загрузки
+        self.file_id_cache = TelegramFileIdCache(Path("data/system/photo_file_ids.json"))
+        # Оптимизированные варианты (scripts/convert_and_metadata.py), при отсутствии - исходники
+        self.variant_index = PhotoVariantIndex()
         
         # Настройки фото-викторины по умолчанию
         self._default_time_limit = 45  # секунд
@@ -260,15 +270,9 @@ class PhotoQuizManager:
                 await self._force_finish(chat_id, context)
                 return
 
-            with open(image_path, "rb") as photo:
-                message = await context.bot.send_photo(
-                    chat_id=chat_id,
-                    photo=photo,
-                    caption=caption,
-                    parse_mode=ParseMode.MARKDOWN_V2,
-                )
+            message = await self._send_photo(context, chat_id, self.variant_index.resolve(Path(image_path)), caption)
 
-            state.message_ids_to_delete.add(message.message_id)
+            self._track_message_for_deletion(state, message.message_id)
 
             logger.debug(
                 f"Отправлено изображение: {Path(image_path).name}, правильный ответ: {current_question['display_answer']}"
@@ -286,6 +290,44 @@ class PhotoQuizManager:
             if chat_id in self.active_photo_quizzes:
                 await self._force_finish(chat_id, context)
 
+    async def _send_photo(self, context: ContextTypes.DEFAULT_TYPE, chat_id: int, image_path: Path, caption: str):
+        """
+        Отправляет изображение по сохраненному file_id; если file_id нет
+        или Telegram его отклонил - загружает файл и запоминает новый file_id.
+        """
+        try:
+            bot_id = context.bot.id
+        except Exception:
+            bot_id = None  # Бот еще не инициализирован (get_me не вызывался)
+        file_id = self.file_id_cache.get(image_path, bot_id)
+        if file_id:
+            try:
+                return await get_request_scheduler().call(
+                    chat_id, RequestPriority.POLL, context.bot.send_photo,
+                    chat_id=chat_id,
+                    photo=file_id,
+                    caption=caption,
+                    parse_mode=ParseMode.MARKDOWN_V2,
+                )
+            except BadRequest as e:
+                if not is_stale_file_id_error(e):
+                    raise
+                logger.warning(f"[PhotoQuiz] file_id для {image_path.name} отклонен ({e}), загружаем файл заново")
+                self.file_id_cache.invalidate(image_path)
+
+        with open(image_path, "rb") as photo:
+            message = await get_request_scheduler().call(
+                chat_id, RequestPriority.POLL, context.bot.send_photo,
+                chat_id=chat_id,
+                photo=photo,
+                caption=caption,
+                parse_mode=ParseMode.MARKDOWN_V2,
+            )
+        if message and message.photo:
+            largest = message.photo[-1]
+            self.file_id_cache.put(image_path, largest.file_id, bot_id, largest.file_unique_id)
+        return message
+
     def _check_almost_correct(self, user_answer: str, correct_answer: str) -> bool:
         """Проверяет, является ли ответ 'почти правильным'"""
         try:
@@ -467,7 +509,7 @@ class PhotoQuizManager:
                 )
                 current_state.hints_given.append(hint_mask)
                 current_state.current_hint_level = idx
-                current_state.message_ids_to_delete.add(message.message_id)
+                self._track_message_for_deletion(current_state, message.message_id)
 
             remaining = state.time_limit - (datetime.now() - start_time).total_seconds()
             if remaining > 0:
@@ -689,7 +731,7 @@ class PhotoQuizManager:
                     chat_id,
                     result_message_obj.message_id,
                 )
-                quiz_state.message_ids_to_delete.add(result_message_obj.message_id)
+                self._track_message_for_deletion(quiz_state, result_message_obj.message_id)
             except Exception as send_error:
                 logger.error(
                     "[PhotoQuiz] Ошибка отправки сообщения о результате (chat=%s): %s | text=%s",
@@ -761,7 +803,7 @@ class PhotoQuizManager:
                 parse_mode=ParseMode.MARKDOWN_V2,
             )
 
-            state.message_ids_to_delete.add(message.message_id)
+            self._track_message_for_deletion(state, message.message_id)
 
             logger.info(f"[PhotoQuiz] Отправлено итоговое сообщение серии в чате {chat_id}")
 
@@ -785,6 +827,17 @@ class PhotoQuizManager:
             parse_mode=ParseMode.MARKDOWN_V2,
         )
 
+    def _track_message_for_deletion(self, quiz_state: PhotoQuizState, message_id: int) -> None:
+        """
+        Добавляет сообщение в список удаления серии. Фото-викторины не журналируются
+        и не восстанавливаются после перезапуска, поэтому ID сразу попадает и в
+        сохраняемый fallback-список: при сбое посреди серии его удалит периодическая очистка.
+        """
+        quiz_state.message_ids_to_delete.add(message_id)
+        bot_state = getattr(self.data_manager, "state", None)
+        if bot_state is not None:
+            bot_state.add_message_for_deletion(quiz_state.chat_id, message_id, delay_seconds=0)
+
     async def _schedule_photo_quiz_cleanup(self, chat_id: int, message_ids: List[int], context: ContextTypes.DEFAULT_TYPE):
         """Планирует отложенное удаление сообщений фото-викторины"""
         try:
@@ -837,26 +890,13 @@ class PhotoQuizManager:
 
             logger.info(f"Начинаем отложенное удаление {len(message_ids)} сообщений фото-викторины в чате {chat_id}")
 
-            deleted_count = 0
-            for msg_id in message_ids:
-                success = False
-                try:
-                    await context.bot.delete_message(chat_id=chat_id, message_id=msg_id)
-                    deleted_count += 1
-                    success = True
-                    logger.debug(f"Сообщение фото-викторины {msg_id} удалено из чата {chat_id}")
-                except Exception as e:
-                    error_str = str(e).lower()
-                    if "message to delete not found" in error_str or \
-                       "message can't be deleted" in error_str:
-                        logger.debug(f"Сообщение фото-викторины {msg_id} уже удалено или недоступно: {e}")
-                        success = True  # Считаем успешным - сообщения нет
-                    else:
-                        logger.warning(f"Не удалось удалить сообщение фото-викторины {msg_id} из чата {chat_id}: {e}")
-
-                # Удаляем из fallback при успехе
-                if success:
-                    bot_state.remove_message_from_deletion(chat_id, msg_id)
+            result = await get_message_deletion_service().delete_chat_messages(context.bot, chat_id, message_ids)
+            deleted_count = result.resolved_count
+
+            # Удаляем из fallback удаленные и недоступные сообщения
+            bot_state.remove_messages_from_deletion(chat_id, result.resolved.get(chat_id, ()))
+            if result.failed_count:
+                logger.warning(f"Не удалось удалить {result.failed_count} сообщений фото-викторины из чата {chat_id}, они остаются в fallback.")
 
             logger.info(f"Отложенное удаление сообщений фото-викторины в чате {chat_id} завершено. Удалено: {deleted_count}/{len(message_ids)}")
 
@@ -0,0 +1,309 @@
+# modules/photo_variants.py
+"""
+Оптимизированные варианты изображений фото-викторины.
+
+Telegram показывает фото не больше 1280 px по длинной стороне, поэтому
+загружать исходники большего размера бессмысленно. Вариант изображения -
+WebP с ограниченным размером, сохраненный в кэше под именем по хешу
+содержимого исходника. Качество подбирается: начиная с заданного, оно
+снижается (не ниже min_quality), пока вариант не уложится в target_bytes.
+Если вариант все равно не меньше исходника, в манифест записывается
+отправка исходника. Манифест связывает исходный файл с вариантом;
+неизмененные исходники (тот же хеш и параметры) повторно не
+обрабатываются. Варианты строятся в пуле процессов скриптом
+scripts/convert_and_metadata.py; бот читает манифест и перечитывает его,
+когда файл манифеста меняется.
+"""
+
+import hashlib
+import io
+import json
+import logging
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+from modules.atomic_io import write_bytes_atomic, write_json_atomic
+
+logger = logging.getLogger(__name__)
+
+VARIANTS_DIR = Path("data/cache/photo_variants")
+MANIFEST_FILE_NAME = "manifest.json"
+MANIFEST_VERSION = 2
+
+# Telegram уменьшает фото до 1280 px по длинной стороне
+DEFAULT_MAX_SIDE = 1280
+DEFAULT_QUALITY = 80
+# Подбор качества: вариант должен уложиться в target_bytes, качество не ниже min_quality
+DEFAULT_TARGET_BYTES = 300 * 1024
+DEFAULT_MIN_QUALITY = 50
+QUALITY_STEP = 10
+
+# Меньше файлов - пул процессов не окупает запуск
+MIN_FILES_FOR_PROCESS_POOL = 4
+
+
+def source_content_hash(path: Path) -> str:
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 16), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def load_manifest(variants_dir: Path = VARIANTS_DIR) -> Dict[str, Any]:
+    """Манифест вариантов: {"version", "max_side", "quality", "files": {имя исходника: запись}}"""
+    manifest_file = Path(variants_dir) / MANIFEST_FILE_NAME
+    if not manifest_file.exists():
+        return {"version": MANIFEST_VERSION, "files": {}}
+    try:
+        with open(manifest_file, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+        if manifest.get("version") != MANIFEST_VERSION:
+            logger.warning(f"Версия манифеста вариантов {manifest.get('version')} не поддерживается, варианты будут пересозданы")
+            return {"version": MANIFEST_VERSION, "files": {}}
+        return manifest
+    except Exception as e:
+        logger.warning(f"Не удалось прочитать манифест вариантов {manifest_file}: {e}")
+        return {"version": MANIFEST_VERSION, "files": {}}
+
+
+def _encode_webp(img: Any, quality: int) -> bytes:
+    buffer = io.BytesIO()
+    img.save(buffer, "WEBP", quality=quality, method=6)
+    return buffer.getvalue()
+
+
+def render_variant(
+    source_path: str, target_path: str, max_side: int, quality: int,
+    target_bytes: int = DEFAULT_TARGET_BYTES, min_quality: int = DEFAULT_MIN_QUALITY
+) -> Dict[str, Any]:
+    """
+    Создает вариант изображения (выполняется в процессе пула).
+    Pillow импортируется здесь, чтобы бот не зависел от него при чтении манифеста.
+
+    Returns:
+        width, height, bytes, quality и use_source - True, если вариант не меньше
+        исходника и отправлять нужно исходник (файл варианта тогда не создается)
+    """
+    from PIL import Image
+
+    source_size = Path(source_path).stat().st_size
+
+    with Image.open(source_path) as img:
+        if img.mode in ("RGBA", "LA", "P"):
+            # Прозрачность заменяется белым фоном, как при конвертации исходников
+            rgba = img.convert("RGBA")
+            background = Image.new("RGB", rgba.size, (255, 255, 255))
+            background.paste(rgba, mask=rgba.split()[-1])
+            img = background
+        elif img.mode != "RGB":
+            img = img.convert("RGB")
+
+        if max(img.size) > max_side:
+            img.thumbnail((max_side, max_side), Image.Resampling.LANCZOS)
+
+        content = _encode_webp(img, quality)
+        while len(content) > target_bytes and quality > min_quality:
+            quality = max(min_quality, quality - QUALITY_STEP)
+            content = _encode_webp(img, quality)
+        width, height = img.size
+
+    if len(content) >= source_size:
+        return {"width": width, "height": height, "bytes": source_size, "quality": quality, "use_source": True}
+    write_bytes_atomic(Path(target_path), content)
+    return {"width": width, "height": height, "bytes": len(content), "quality": quality, "use_source": False}
+
+
+class PhotoVariantBuilder:
+    """
+    Построение вариантов для набора исходных изображений.
+
+    Args:
+        variants_dir: Папка кэша вариантов (в ней же манифест)
+        max_side: Максимальный размер длинной стороны
+        quality: Начальное (максимальное) качество WebP
+        workers: Количество процессов (0 - по числу CPU)
+        target_bytes: Желаемый размер варианта в байтах
+        min_quality: Ниже этого качество при подборе не снижается
+    """
+
+    def __init__(
+        self,
+        variants_dir: Path = VARIANTS_DIR,
+        max_side: int = DEFAULT_MAX_SIDE,
+        quality: int = DEFAULT_QUALITY,
+        workers: int = 0,
+        target_bytes: int = DEFAULT_TARGET_BYTES,
+        min_quality: int = DEFAULT_MIN_QUALITY
+    ):
+        self.variants_dir = Path(variants_dir)
+        self.max_side = max_side
+        self.quality = quality
+        self.target_bytes = target_bytes
+        self.min_quality = min(min_quality, quality)
+        self.workers = workers or (os.cpu_count() or 1)
+
+    def _settings(self) -> Dict[str, int]:
+        return {
+            "max_side": self.max_side,
+            "max_quality": self.quality,
+            "min_quality": self.min_quality,
+            "target_bytes": self.target_bytes,
+        }
+
+    def _is_fresh(self, entry: Optional[Dict[str, Any]], source_hash: str) -> bool:
+        return bool(
+            entry
+            and entry.get("source_hash") == source_hash
+            and all(entry.get(key) == value for key, value in self._settings().items())
+            and (entry.get("use_source") or (self.variants_dir / entry.get("variant", "")).is_file())
+        )
+
+    def _render(self, job: Dict[str, Any]) -> Dict[str, Any]:
+        return render_variant(
+            str(job["source"]), str(self.variants_dir / job["variant"]),
+            self.max_side, self.quality, self.target_bytes, self.min_quality
+        )
+
+    def build(self, source_files: Iterable[Path]) -> Dict[str, Any]:
+        """
+        Создает недостающие и устаревшие варианты, обновляет манифест.
+
+        Returns:
+            Сводка: built, skipped, failed, source_bytes, variant_bytes, duration_ms
+        """
+        started = time.perf_counter()
+        self.variants_dir.mkdir(parents=True, exist_ok=True)
+        manifest = load_manifest(self.variants_dir)
+        old_files: Dict[str, Any] = manifest.get("files", {})
+        new_files: Dict[str, Any] = {}
+
+        pending: List[Dict[str, Any]] = []
+        for source in sorted(Path(p) for p in source_files):
+            stat = source.stat()
+            source_hash = source_content_hash(source)
+            entry = old_files.get(source.name)
+            base = {
+                "source_hash": source_hash,
+                "source_size": stat.st_size,
+                "source_mtime_ns": stat.st_mtime_ns,
+                **self._settings(),
+                "variant": f"{source_hash}.webp",
+            }
+            if self._is_fresh(entry, source_hash):
+                # Обновляем size/mtime: бот по ним проверяет актуальность без хеширования
+                new_files[source.name] = {**entry, "source_size": stat.st_size, "source_mtime_ns": stat.st_mtime_ns}
+            else:
+                pending.append({"source": source, **base})
+
+        failed = 0
+        if pending:
+            use_pool = len(pending) >= MIN_FILES_FOR_PROCESS_POOL and self.workers > 1
+            if use_pool:
+                with ProcessPoolExecutor(max_workers=min(self.workers, len(pending))) as executor:
+                    futures = {
+                        executor.submit(
+                            render_variant, str(job["source"]), str(self.variants_dir / job["variant"]),
+                            self.max_side, self.quality, self.target_bytes, self.min_quality
+                        ): job
+                        for job in pending
+                    }
+                    for future in as_completed(futures):
+                        failed += not self._collect(futures[future], future.result, new_files)
+            else:
+                for job in pending:
+                    failed += not self._collect(job, lambda job=job: self._render(job), new_files)
+
+        # Варианты, на которые больше не ссылается манифест, удаляются
+        referenced = {entry["variant"] for entry in new_files.values() if not entry.get("use_source")}
+        for variant_file in self.variants_dir.glob("*.webp"):
+            if variant_file.name not in referenced:
+                variant_file.unlink()
+
+        manifest = {"version": MANIFEST_VERSION, **self._settings(), "files": new_files}
+        write_json_atomic(self.variants_dir / MANIFEST_FILE_NAME, manifest)
+
+        return {
+            "built": len(pending) - failed,
+            "skipped": len(new_files) - (len(pending) - failed),
+            "failed": failed,
+            "kept_source": sum(1 for e in new_files.values() if e.get("use_source")),
+            "source_bytes": sum(e["source_size"] for e in new_files.values()),
+            "variant_bytes": sum(e.get("bytes", 0) for e in new_files.values()),
+            "duration_ms": int((time.perf_counter() - started) * 1000),
+        }
+
+    def _collect(self, job: Dict[str, Any], get_result, new_files: Dict[str, Any]) -> bool:
+        source: Path = job["source"]
+        try:
+            info = get_result()
+        except Exception as e:
+            logger.error(f"❌ Не удалось создать вариант {source.name}: {e}")
+            return False
+        entry = {k: v for k, v in job.items() if k != "source"}
+        entry.update(info)
+        new_files[source.name] = entry
+        if info["use_source"]:
+            logger.info(f"ℹ️ {source.name}: вариант не меньше исходника ({job['source_size']:,} байт), отправляется исходник")
+        else:
+            logger.info(
+                f"✅ {source.name}: {job['source_size']:,} -> {info['bytes']:,} байт "
+                f"({info['width']}x{info['height']}, качество {info['quality']})"
+            )
+        return True
+
+
+class PhotoVariantIndex:
+    """
+    Выбор варианта для отправки. Вариант используется, только если размер
+    и mtime исходника совпадают с манифестом; иначе отправляется исходник.
+    Манифест перечитывается, когда меняется его mtime (пересборка вариантов
+    скриптом во время работы бота).
+    """
+
+    def __init__(self, variants_dir: Path = VARIANTS_DIR):
+        self.variants_dir = Path(variants_dir)
+        self.manifest_file = self.variants_dir / MANIFEST_FILE_NAME
+        self.files: Dict[str, Any] = {}
+        self._manifest_mtime_ns: Optional[int] = None
+        self.reloads = 0
+        self.reload()
+
+    def _current_mtime_ns(self) -> Optional[int]:
+        try:
+            return self.manifest_file.stat().st_mtime_ns
+        except OSError:
+            return None
+
+    def reload(self) -> None:
+        self._manifest_mtime_ns = self._current_mtime_ns()
+        self.files = load_manifest(self.variants_dir).get("files", {})
+        self.reloads += 1
+        if self.files:
+            logger.info(f"Загружен манифест оптимизированных изображений: {len(self.files)} вариантов")
+
+    def refresh(self) -> bool:
+        """Перечитывает манифест, если он изменился; True, если перечитан"""
+        if self._current_mtime_ns() == self._manifest_mtime_ns:
+            return False
+        self.reload()
+        return True
+
+    def resolve(self, source_path: Path) -> Path:
+        """Путь к оптимизированному варианту или к исходнику, если варианта нет"""
+        source_path = Path(source_path)
+        self.refresh()
+        entry = self.files.get(source_path.name)
+        if not entry or entry.get("use_source"):
+            return source_path
+        try:
+            stat = source_path.stat()
+        except OSError:
+            return source_path
+        if stat.st_size != entry.get("source_size") or stat.st_mtime_ns != entry.get("source_mtime_ns"):
+            return source_path
+        variant = self.variants_dir / entry.get("variant", "")
+        return variant if variant.is_file() else source_path
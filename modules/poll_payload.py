@@ -0,0 +1,140 @@
+# modules/poll_payload.py
+"""
+Предвычисленные данные опросов (poll payload) для вопросов викторины.
+
+Усечение вариантов ответа, поиск индекса правильного ответа и экранирование
+MarkdownV2 не зависят от чата, поэтому выполняются один раз при загрузке
+вопросов. При отправке опроса остаётся только перемешать индексы вариантов
+и добавить заголовок конкретного чата.
+"""
+
+import logging
+import random
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from modules.question_rules import make_question_id
+from utils import escape_markdown_v2
+
+logger = logging.getLogger(__name__)
+
+
+def _truncate(text: str, max_length: int) -> str:
+    if len(text) > max_length:
+        return text[:max_length - 3] + "..."
+    return text
+
+
+@dataclass(frozen=True)
+class PollPayload:
+    """Неизменяемые, не зависящие от чата данные опроса"""
+    question_id: str
+    body_plain: str
+    body_escaped: str
+    options_plain: Tuple[str, ...]
+    options_escaped: Tuple[str, ...]
+    correct_index: int
+
+    @property
+    def is_valid(self) -> bool:
+        return bool(self.options_plain) and 0 <= self.correct_index < len(self.options_plain)
+
+    def shuffled(self) -> Tuple[List[str], int]:
+        """
+        Перемешивает перестановку индексов вариантов.
+        Возвращает экранированные варианты в новом порядке и новый индекс правильного ответа.
+        """
+        permutation = list(range(len(self.options_escaped)))
+        random.shuffle(permutation)
+        options = [self.options_escaped[i] for i in permutation]
+        return options, permutation.index(self.correct_index)
+
+    def build_question_text(self, header_plain: str, max_question_length: int) -> str:
+        """
+        Собирает экранированный текст вопроса с заголовком чата.
+        Экранирование посимвольное, поэтому без усечения используется готовое тело.
+        """
+        full_plain = f"{header_plain}\n{self.body_plain}"
+        if len(full_plain) <= max_question_length:
+            return f"{escape_markdown_v2(header_plain)}\n{self.body_escaped}"
+        truncated = full_plain[:max_question_length - 3] + "..."
+        logger.warning(
+            f"Текст вопроса {self.question_id} был усечен. "
+            f"Оригинал (начало): '{full_plain[:50]}', Усеченный: '{truncated[:50]}'"
+        )
+        return escape_markdown_v2(truncated)
+
+
+@dataclass(frozen=True)
+class PreparedPoll:
+    """
+    Готовые к отправке аргументы send_poll для конкретного вопроса сессии.
+    Готовится заранее, пока открыт предыдущий опрос серийной викторины.
+    """
+    question_id: str
+    question_session_index: int
+    question_text: str
+    options: Tuple[str, ...]
+    correct_option_id: int
+    prepared_at: float  # time.monotonic()
+
+    def matches(self, question_id: str, question_session_index: int) -> bool:
+        return self.question_id == question_id and self.question_session_index == question_session_index
+
+    def lead_time(self, now: Optional[float] = None) -> float:
+        """Сколько секунд прошло от подготовки до отправки"""
+        return (time.monotonic() if now is None else now) - self.prepared_at
+
+
+def build_poll_payload(
+    question: Dict[str, Any],
+    question_id: str,
+    max_option_length: int,
+    sanitize: Callable[[str], str]
+) -> PollPayload:
+    """Строит PollPayload для одного вопроса"""
+    body_plain = sanitize(question.get("question", ""))
+    original_options: List[str] = [str(opt) for opt in (question.get("options") or [])]
+    options_plain = tuple(_truncate(opt, max_option_length) for opt in original_options)
+
+    correct_text = question.get("correct_option_text", question.get("correct"))
+    try:
+        correct_index = original_options.index(correct_text)
+    except ValueError:
+        logger.error(
+            f"Текст правильного ответа '{correct_text}' не найден в опциях {original_options}. "
+            f"Вопрос: {body_plain[:50]}"
+        )
+        correct_index = -1
+
+    return PollPayload(
+        question_id=question_id,
+        body_plain=body_plain,
+        body_escaped=escape_markdown_v2(body_plain),
+        options_plain=options_plain,
+        options_escaped=tuple(escape_markdown_v2(opt) for opt in options_plain),
+        correct_index=correct_index,
+    )
+
+
+def get_or_build_poll_payload(
+    payloads: Dict[str, PollPayload],
+    question: Dict[str, Any],
+    max_option_length: int,
+    sanitize: Callable[[str], str]
+) -> PollPayload:
+    """
+    Возвращает предвычисленный payload вопроса.
+    Вопросы без ID (например, восстановленные из старых сохранений) получают его здесь.
+    """
+    question_id: Optional[str] = question.get("question_id")
+    if not question_id:
+        category = question.get("original_category") or question.get("current_category_name_for_quiz") or ""
+        question_id = make_question_id(category, question)
+        question["question_id"] = question_id
+    payload = payloads.get(question_id)
+    if payload is None:
+        payload = build_poll_payload(question, question_id, max_option_length, sanitize)
+        payloads[question_id] = payload
+    return payload
@@ -0,0 +1,133 @@
+# modules/poll_registry.py
+"""
+Реестр открытых опросов (BotState.current_polls) с индексом истечения.
+
+Записи опросов компактные: вопрос хранится ссылкой (question_id и индекс
+вопроса в сессии), а не копией словаря вопроса. Каждая запись получает
+срок годности open_timestamp + open_period_seconds + запас; сроки лежат
+в min-куче, поэтому периодическое вытеснение опросов брошенных или
+упавших сессий стоит O(число истекших · log n) без полного обхода.
+Удаление и перезапись записи не трогают кучу: устаревшие элементы кучи
+пропускаются при вытеснении и убираются при перестройке.
+"""
+
+import heapq
+import logging
+import time
+from collections.abc import MutableMapping
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Запас после закрытия опроса: задача окончания опроса срабатывает через
+# несколько секунд, все, что висит дольше, считается брошенным
+DEFAULT_GRACE_SECONDS = 600.0
+
+# Куча перестраивается, когда устаревших элементов в ней больше, чем живых
+_COMPACT_MIN_HEAP_SIZE = 64
+
+
+class PollRegistry(MutableMapping):
+    """
+    Словарь poll_id -> данные опроса с вытеснением по сроку годности.
+
+    Args:
+        grace_seconds: Запас после закрытия опроса до вытеснения
+    """
+
+    def __init__(self, grace_seconds: float = DEFAULT_GRACE_SECONDS):
+        self.grace_seconds = grace_seconds
+        self._polls: Dict[str, Dict[str, Any]] = {}
+        self._expires_at: Dict[str, float] = {}
+        self._heap: List[Tuple[float, str]] = []
+        self.evicted_total = 0
+
+    def expires_at_for(self, poll_data: Dict[str, Any]) -> float:
+        """Срок годности записи; у записей без времени открытия отсчет идет от текущего момента"""
+        opened = poll_data.get("open_timestamp") or time.time()
+        open_period = poll_data.get("open_period_seconds") or 0
+        return float(opened) + float(open_period) + self.grace_seconds
+
+    def __getitem__(self, poll_id: str) -> Dict[str, Any]:
+        return self._polls[poll_id]
+
+    def __setitem__(self, poll_id: str, poll_data: Dict[str, Any]) -> None:
+        self._polls[poll_id] = poll_data
+        expires_at = self.expires_at_for(poll_data)
+        if self._expires_at.get(poll_id) != expires_at:
+            self._expires_at[poll_id] = expires_at
+            heapq.heappush(self._heap, (expires_at, poll_id))
+            self._maybe_compact()
+
+    def __delitem__(self, poll_id: str) -> None:
+        del self._polls[poll_id]
+        del self._expires_at[poll_id]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._polls)
+
+    def __len__(self) -> int:
+        return len(self._polls)
+
+    def __contains__(self, poll_id: object) -> bool:
+        return poll_id in self._polls
+
+    def _maybe_compact(self) -> None:
+        if len(self._heap) > _COMPACT_MIN_HEAP_SIZE and len(self._heap) > 2 * len(self._polls):
+            self._heap = [(expires_at, poll_id) for poll_id, expires_at in self._expires_at.items()]
+            heapq.heapify(self._heap)
+
+    def next_expiry(self) -> Optional[float]:
+        """Ближайший срок годности среди живых записей"""
+        while self._heap and self._expires_at.get(self._heap[0][1]) != self._heap[0][0]:
+            heapq.heappop(self._heap)
+        return self._heap[0][0] if self._heap else None
+
+    def evict_expired(self, now: Optional[float] = None) -> Dict[str, Dict[str, Any]]:
+        """
+        Удаляет записи с истекшим сроком годности.
+
+        Returns:
+            Вытесненные записи по poll_id
+        """
+        now = time.time() if now is None else now
+        evicted: Dict[str, Dict[str, Any]] = {}
+        while self._heap and self._heap[0][0] <= now:
+            expires_at, poll_id = heapq.heappop(self._heap)
+            if self._expires_at.get(poll_id) != expires_at:
+                continue  # запись удалена или перезаписана
+            del self._expires_at[poll_id]
+            evicted[poll_id] = self._polls.pop(poll_id)
+        self.evicted_total += len(evicted)
+        return evicted
+
+    def to_dict(self) -> Dict[str, Dict[str, Any]]:
+        return dict(self._polls)
+
+    @classmethod
+    def from_dict(cls, polls: Dict[str, Dict[str, Any]], grace_seconds: float = DEFAULT_GRACE_SECONDS) -> "PollRegistry":
+        registry = cls(grace_seconds)
+        for poll_id, poll_data in polls.items():
+            if isinstance(poll_data, dict):
+                registry[poll_id] = poll_data
+            else:
+                logger.warning(f"Пропущен невалидный poll_data для {poll_id}: {type(poll_data)}")
+        return registry
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Размер реестра и вытеснения для логов и веб-интерфейса"""
+        next_expiry = self.next_expiry()
+        return {
+            "open_polls": len(self._polls),
+            "heap_size": len(self._heap),
+            "evicted_total": self.evicted_total,
+            "next_expiry_in": round(next_expiry - time.time(), 1) if next_expiry is not None else None,
+        }
+
+    def __getstate__(self) -> Dict[str, Any]:
+        # Куча восстанавливается из записей
+        return {"grace_seconds": self.grace_seconds, "polls": self._polls}
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        restored = PollRegistry.from_dict(state.get("polls", {}), state.get("grace_seconds", DEFAULT_GRACE_SECONDS))
+        self.__dict__.update(restored.__dict__)
@@ -0,0 +1,113 @@
+# modules/question_rules.py
+"""
+Правила валидации вопроса викторины без зависимостей от бота.
+
+Используются QuizValidator (handlers/quiz) и валидацией файлов вопросов
+(modules/question_validation.py). Модуль импортирует только стандартную
+библиотеку: процессы пула валидации и веб-панель не загружают telegram,
+data_manager и пакет handlers ради одного набора правил.
+"""
+
+import hashlib
+import re
+from typing import Any, Dict, List
+
+MAX_QUESTION_TEXT_LENGTH = 4096
+MAX_OPTION_TEXT_LENGTH = 100
+MAX_OPTIONS_COUNT = 10
+MIN_OPTIONS_COUNT = 2
+
+QUESTION_ID_PATTERN = re.compile(r'^[a-zA-Z0-9_-]{1,100}$')
+
+
+def make_question_id(category: str, question: Dict[str, Any]) -> str:
+    """
+    Возвращает стабильный ID вопроса на основе его содержимого.
+    Одинаковые вопросы в одной категории получают одинаковый ID.
+    """
+    options = question.get("options") or []
+    correct = question.get("correct_option_text", question.get("correct", ""))
+    raw = "\x1f".join([category, str(question.get("question", "")), *map(str, options), str(correct)])
+    return hashlib.blake2b(raw.encode("utf-8"), digest_size=8).hexdigest()
+
+
+def validate_question_fields(
+    question_id: Any, text: Any, options: Any, correct_option: Any,
+    category: Any, explanation: Any
+) -> List[str]:
+    """Общие правила валидации вопроса"""
+    errors = []
+
+    # Валидация ID вопроса
+    if not question_id or not isinstance(question_id, str):
+        errors.append("ID вопроса обязателен")
+    elif not QUESTION_ID_PATTERN.match(question_id):
+        errors.append("ID вопроса содержит недопустимые символы")
+
+    # Валидация текста вопроса
+    if not text or not isinstance(text, str):
+        errors.append("Текст вопроса обязателен")
+    elif len(text.strip()) == 0:
+        errors.append("Текст вопроса не может быть пустым")
+    elif len(text) > MAX_QUESTION_TEXT_LENGTH:
+        errors.append(f"Текст вопроса слишком длинный (макс. {MAX_QUESTION_TEXT_LENGTH} символов)")
+
+    # Валидация вариантов ответа
+    if not options or not isinstance(options, list):
+        errors.append("Варианты ответа обязательны")
+    elif len(options) < MIN_OPTIONS_COUNT:
+        errors.append(f"Минимум {MIN_OPTIONS_COUNT} варианта ответа")
+    elif len(options) > MAX_OPTIONS_COUNT:
+        errors.append(f"Максимум {MAX_OPTIONS_COUNT} вариантов ответа")
+    else:
+        for i, option in enumerate(options):
+            if not isinstance(option, str):
+                errors.append(f"Вариант {i+1} должен быть строкой")
+            elif len(option.strip()) == 0:
+                errors.append(f"Вариант {i+1} не может быть пустым")
+            elif len(option) > MAX_OPTION_TEXT_LENGTH:
+                errors.append(f"Вариант {i+1} слишком длинный (макс. {MAX_OPTION_TEXT_LENGTH} символов)")
+
+    # Валидация правильного ответа
+    if not isinstance(correct_option, int):
+        errors.append("Индекс правильного ответа должен быть целым числом")
+    elif correct_option < 0:
+        errors.append("Индекс правильного ответа не может быть отрицательным")
+    elif options and correct_option >= len(options):
+        errors.append("Индекс правильного ответа выходит за пределы вариантов")
+
+    # Валидация категории
+    if not category or not isinstance(category, str):
+        errors.append("Категория вопроса обязательна")
+    elif not category.strip():
+        errors.append("Категория вопроса не может быть пустой")
+
+    # Валидация объяснения (опционально)
+    if explanation is not None:
+        if not isinstance(explanation, str):
+            errors.append("Объяснение должно быть строкой")
+        elif len(explanation) > MAX_QUESTION_TEXT_LENGTH:
+            errors.append(f"Объяснение слишком длинное (макс. {MAX_QUESTION_TEXT_LENGTH} символов)")
+
+    return errors
+
+
+def validate_question_data(data: Dict[str, Any], category: str) -> List[str]:
+    """
+    Валидировать вопрос в формате файла категории (словарь с полями
+    question/options/correct). Те же правила, что и для QuizQuestion,
+    но без создания QuizQuestion, который падает на невалидных данных.
+    """
+    options = data.get("options")
+    correct_text = data.get("correct_option_text", data.get("correct"))
+    correct_option: Any = -1
+    if isinstance(options, list) and correct_text in options:
+        correct_option = options.index(correct_text)
+    return validate_question_fields(
+        question_id=data.get("question_id"),
+        text=data.get("question"),
+        options=options,
+        correct_option=correct_option,
+        category=category,
+        explanation=data.get("solution", data.get("explanation"))
+    )
@@ -0,0 +1,195 @@
+# modules/question_validation.py
+"""
+Параллельная потоковая валидация файлов вопросов.
+
+Каждый файл категории читается один раз в отдельном процессе: разбор JSON,
+классификация непригодных записей (как раньше делал DataManager), проверка
+правилами modules/question_rules.py (их же применяет QuizValidator), контрольная сумма и размер для categories.json.
+Результаты отдаются по мере готовности, поэтому загрузка не ждёт самый
+медленный файл. Исправимые файлы (BOM, мусорные пробелы в конце)
+перезаписываются атомарно (modules/atomic_io.py).
+"""
+
+import hashlib
+import json
+import logging
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from modules.atomic_io import write_bytes_atomic
+from modules.question_rules import make_question_id, validate_question_data
+
+logger = logging.getLogger(__name__)
+
+# Ниже этого количества файлов пул процессов не окупает свой запуск
+MIN_FILES_FOR_PROCESS_POOL = 4
+# Максимум примеров предупреждений на файл в отчёте
+MAX_WARNING_SAMPLES_PER_FILE = 20
+
+
+@dataclass
+class FileValidationResult:
+    """Результат валидации одного файла категории"""
+    category: str
+    file_path: str
+    questions: List[Dict[str, Any]] = field(default_factory=list)
+    malformed: List[Dict[str, Any]] = field(default_factory=list)
+    warnings: List[Dict[str, Any]] = field(default_factory=list)
+    warnings_count: int = 0
+    file_size: int = 0
+    checksum: str = ""
+    duration_ms: float = 0.0
+    auto_fixed: bool = False
+    fix_description: Optional[str] = None
+
+    def to_report_entry(self) -> Dict[str, Any]:
+        """Запись для машинно-читаемого отчёта (без самих вопросов)"""
+        return {
+            "category": self.category,
+            "file": self.file_path,
+            "questions": len(self.questions),
+            "malformed": len(self.malformed),
+            "error_types": sorted({entry.get("error_type", "") for entry in self.malformed}),
+            "warnings_count": self.warnings_count,
+            "warnings": self.warnings,
+            "file_size": self.file_size,
+            "checksum": self.checksum,
+            "duration_ms": round(self.duration_ms, 3),
+            "auto_fixed": self.auto_fixed,
+            "fix_description": self.fix_description,
+        }
+
+
+def _try_fix_content(raw: bytes) -> Optional[Tuple[bytes, Any, str]]:
+    """
+    Пытается исправить файл, который не разбирается как JSON.
+    Возвращает (исправленные байты, разобранные данные, описание) или None.
+    """
+    text = raw.decode("utf-8-sig", errors="strict")
+    fixes = []
+    if raw.startswith(b"\xef\xbb\xbf"):
+        fixes.append("удалён BOM")
+    cleaned = text.strip()
+    if cleaned != text:
+        fixes.append("удалены лишние пробелы")
+    if not fixes:
+        return None
+    data = json.loads(cleaned)
+    return cleaned.encode("utf-8"), data, ", ".join(fixes)
+
+
+def validate_category_file(path_str: str, auto_fix: bool = True) -> FileValidationResult:
+    """
+    Валидирует один файл категории. Функция верхнего уровня, чтобы её можно
+    было передать в ProcessPoolExecutor.
+    """
+    started = time.perf_counter()
+    path = Path(path_str)
+    category = path.stem
+    result = FileValidationResult(category=category, file_path=path.as_posix())
+
+    try:
+        raw = path.read_bytes()
+        try:
+            data = json.loads(raw.decode("utf-8"))
+        except (UnicodeDecodeError, json.JSONDecodeError) as parse_error:
+            fixed = _try_fix_content(raw) if auto_fix else None
+            if fixed is None:
+                raise parse_error
+            raw, data, result.fix_description = fixed
+            write_bytes_atomic(path, raw)
+            result.auto_fixed = True
+    except Exception as e:
+        result.malformed.append({"error_type": "load_error", "category": category, "error": str(e)})
+        result.duration_ms = (time.perf_counter() - started) * 1000
+        return result
+
+    result.file_size = len(raw)
+    result.checksum = hashlib.md5(raw).hexdigest()
+
+    if not isinstance(data, list):
+        result.malformed.append({"error_type": "category_not_list", "category": category, "data": data})
+        result.duration_ms = (time.perf_counter() - started) * 1000
+        return result
+
+    for index, question in enumerate(data):
+        if not (isinstance(question, dict) and 'question' in question):
+            result.malformed.append({"error_type": "invalid_question", "category": category, "data": question})
+            continue
+        # Создаем поле correct_option_text из correct для совместимости
+        if 'correct' in question and 'correct_option_text' not in question:
+            question['correct_option_text'] = question['correct']
+        # Добавляем поле категории для корректного обновления статистики
+        question['original_category'] = category
+        question['question_id'] = make_question_id(category, question)
+
+        errors = validate_question_data(question, category)
+        if errors:
+            result.warnings_count += 1
+            if len(result.warnings) < MAX_WARNING_SAMPLES_PER_FILE:
+                result.warnings.append({"index": index, "errors": errors})
+        result.questions.append(question)
+
+    result.duration_ms = (time.perf_counter() - started) * 1000
+    return result
+
+
+def iter_validate_question_files(
+    files: Iterable[Path],
+    workers: int = 0,
+    auto_fix: bool = True
+) -> Iterator[FileValidationResult]:
+    """
+    Валидирует файлы и отдаёт результаты по мере готовности.
+    workers=0 — по числу CPU; при малом числе файлов или ошибке пула
+    валидация выполняется в текущем процессе.
+    """
+    paths = [str(p) for p in files]
+    if workers <= 0:
+        workers = os.cpu_count() or 1
+    workers = min(workers, len(paths))
+
+    if workers <= 1 or len(paths) < MIN_FILES_FOR_PROCESS_POOL:
+        for path_str in paths:
+            yield validate_category_file(path_str, auto_fix)
+        return
+
+    pending = set(paths)
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = {executor.submit(validate_category_file, p, auto_fix): p for p in paths}
+            for future in as_completed(futures):
+                result = future.result()
+                pending.discard(futures[future])
+                yield result
+    except Exception as e:
+        logger.warning(f"Пул процессов валидации недоступен ({e}), продолжаем в текущем процессе")
+        for path_str in sorted(pending):
+            yield validate_category_file(path_str, auto_fix)
+
+
+def build_validation_report(
+    results: List[FileValidationResult],
+    total_duration_ms: float,
+    workers: int
+) -> Dict[str, Any]:
+    """Собирает машинно-читаемый отчёт о валидации"""
+    files = sorted((r.to_report_entry() for r in results), key=lambda e: e["duration_ms"], reverse=True)
+    return {
+        "generated_at": datetime.now().isoformat(),
+        "workers": workers,
+        "total_duration_ms": round(total_duration_ms, 3),
+        "totals": {
+            "files": len(results),
+            "questions": sum(len(r.questions) for r in results),
+            "malformed": sum(len(r.malformed) for r in results),
+            "warnings": sum(r.warnings_count for r in results),
+            "auto_fixed": sorted(r.category for r in results if r.auto_fixed),
+        },
+        "files": files,
+    }
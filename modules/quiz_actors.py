@@ -0,0 +1,152 @@
+# modules/quiz_actors.py
+"""
+Акторы сессий викторин: по одному обработчику событий на чат.
+
+Раньше QuizManager защищал только _send_next_question блокировкой
+чата, а задачи окончания опросов, досрочные ответы, /stopquiz и
+финализация меняли один и тот же QuizState параллельно (обработчики
+PTB работают с concurrent_updates). Теперь все события сессии
+(старт, ответ, окончание опроса, истечение интервала, остановка)
+кладутся в почтовый ящик чата, а одна задача-актор обрабатывает их
+строго по очереди - переходы состояния сериализованы без блокировок.
+
+Актор запускается при первом событии и завершается, когда ящик пуст,
+поэтому число задач не превышает число чатов с необработанными
+событиями. Ответы на один и тот же опрос, еще ждущие в ящике,
+склеиваются в одно событие: переход по ответу нужен только первый раз,
+так что работа на чат ограничена числом открытых опросов, а не числом
+участников.
+"""
+
+import asyncio
+import logging
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Deque, Dict, Hashable, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+EVENT_START = "start"
+EVENT_ANSWER = "answer"
+EVENT_POLL_END = "poll_end"
+EVENT_INTERVAL_ELAPSED = "interval_elapsed"
+EVENT_STOP = "stop"
+
+# Глубина ящика, после которой пишется предупреждение
+MAILBOX_WARN_DEPTH = 32
+# Как часто бот пишет метрики акторов в лог (секунды)
+METRICS_LOG_INTERVAL_SECONDS = 300
+
+
+@dataclass
+class ActorEvent:
+    """Событие сессии в почтовом ящике чата"""
+    kind: str
+    context: Any
+    data: Dict[str, Any] = field(default_factory=dict)
+    coalesce_key: Optional[Hashable] = None
+    enqueued_at: float = field(default_factory=time.monotonic)
+
+
+ActorHandler = Callable[[int, ActorEvent], Awaitable[None]]
+
+
+class QuizActorPool:
+    """
+    Почтовые ящики и задачи-акторы сессий викторин.
+
+    Args:
+        handler: Корутина обработки события (chat_id, событие)
+    """
+
+    def __init__(self, handler: ActorHandler):
+        self.handler = handler
+        self._mailboxes: Dict[int, Deque[ActorEvent]] = {}
+        self._pending_keys: Dict[int, Set[Tuple[str, Hashable]]] = {}
+        self._tasks: Dict[int, asyncio.Task] = {}
+        self.posted_total = 0
+        self.coalesced_total = 0
+        self.processed_total = 0
+        self.errors_total = 0
+        self.max_depth_seen = 0
+        self.total_wait_time = 0.0
+
+    def post(
+        self, chat_id: int, kind: str, context: Any,
+        coalesce_key: Optional[Hashable] = None, **data: Any
+    ) -> bool:
+        """
+        Кладет событие в ящик чата и при необходимости запускает актор.
+
+        Returns:
+            False, если такое же событие (kind, coalesce_key) уже ждет в ящике
+        """
+        pending = self._pending_keys.setdefault(chat_id, set())
+        if coalesce_key is not None:
+            if (kind, coalesce_key) in pending:
+                self.coalesced_total += 1
+                return False
+            pending.add((kind, coalesce_key))
+
+        mailbox = self._mailboxes.setdefault(chat_id, deque())
+        mailbox.append(ActorEvent(kind, context, data, coalesce_key))
+        self.posted_total += 1
+        depth = len(mailbox)
+        self.max_depth_seen = max(self.max_depth_seen, depth)
+        if depth == MAILBOX_WARN_DEPTH:
+            logger.warning(f"Почтовый ящик викторины чата {chat_id} достиг {depth} событий")
+
+        if chat_id not in self._tasks:
+            self._tasks[chat_id] = asyncio.create_task(self._run(chat_id), name=f"quiz_actor_{chat_id}")
+        return True
+
+    async def _run(self, chat_id: int) -> None:
+        mailbox = self._mailboxes[chat_id]
+        try:
+            while mailbox:
+                event = mailbox.popleft()
+                if event.coalesce_key is not None:
+                    self._pending_keys[chat_id].discard((event.kind, event.coalesce_key))
+                self.total_wait_time += time.monotonic() - event.enqueued_at
+                try:
+                    await self.handler(chat_id, event)
+                except Exception as e:
+                    self.errors_total += 1
+                    logger.error(f"Ошибка обработки события {event.kind} викторины чата {chat_id}: {e}", exc_info=True)
+                self.processed_total += 1
+        finally:
+            # Между проверкой пустого ящика и выходом нет await: новое событие
+            # либо уже в ящике и будет обработано, либо запустит новый актор
+            self._tasks.pop(chat_id, None)
+            if not mailbox:
+                self._mailboxes.pop(chat_id, None)
+                self._pending_keys.pop(chat_id, None)
+
+    def get_depth(self, chat_id: int) -> int:
+        """Число необработанных событий чата"""
+        return len(self._mailboxes.get(chat_id, ()))
+
+    async def drain(self, timeout: Optional[float] = None) -> bool:
+        """Ждет обработки всех событий; False, если таймаут истек раньше"""
+        tasks = list(self._tasks.values())
+        if not tasks:
+            return True
+        _, still_running = await asyncio.wait(tasks, timeout=timeout)
+        return not still_running
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Глубина ящиков и счетчики для логов и веб-интерфейса"""
+        depths = {chat_id: len(mailbox) for chat_id, mailbox in self._mailboxes.items() if mailbox}
+        deepest = sorted(depths.items(), key=lambda item: item[1], reverse=True)[:5]
+        return {
+            "active_actors": len(self._tasks),
+            "mailbox_depth": sum(depths.values()),
+            "deepest_mailboxes": dict(deepest),
+            "max_depth_seen": self.max_depth_seen,
+            "posted_total": self.posted_total,
+            "coalesced_total": self.coalesced_total,
+            "processed_total": self.processed_total,
+            "errors_total": self.errors_total,
+            "avg_wait_time": round(self.total_wait_time / self.processed_total, 4) if self.processed_total else 0,
+        }
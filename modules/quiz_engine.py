@@ -1,10 +1,12 @@
 # modules/quiz_engine.py
-import random
 import logging
-from typing import List, Dict, Any, Tuple, Optional, TYPE_CHECKING
+import time
+from typing import Dict, Any, Optional, TYPE_CHECKING
 
-from utils import escape_markdown_v2
-from modules.rate_limiter import TelegramRateLimiter
+from modules.poll_payload import PollPayload, PreparedPoll, get_or_build_poll_payload
+from modules.rate_limiter import RequestPriority
+from modules.request_scheduler import get_request_scheduler
+from modules.retry_policy import CircuitOpenError, ErrorClass, classify_error, get_retry_policy
 from modules.telegram_utils import safe_send_message
 
 if TYPE_CHECKING:
@@ -15,8 +17,7 @@ if TYPE_CHECKING:
 from telegram import Poll, Message
 from telegram.ext import ContextTypes
 from telegram.constants import ParseMode
-from telegram.error import BadRequest, TimedOut, NetworkError
-import asyncio
+from telegram.error import BadRequest
 
 logger = logging.getLogger(__name__)
 
@@ -27,142 +28,144 @@ class QuizEngine:
         self.data_manager = data_manager
         logger.debug("QuizEngine initialized.")
         
-        # Инициализируем rate limiter для соблюдения лимитов Telegram API
-        self.rate_limiter = TelegramRateLimiter(
-            max_requests_per_second=25,  # Консервативное значение (Telegram ~30)
-            max_requests_per_minute_per_chat=18  # Консервативное значение (Telegram ~20)
+        # Общий планировщик запросов Bot API (лимиты Telegram и приоритеты)
+        self.request_scheduler = get_request_scheduler()
+        # Общая политика повторов с circuit breaker'ами
+        self.retry_policy = get_retry_policy()
+
+        # Статистика заранее подготовленных опросов серийных викторин
+        self.prefetch_hits = 0
+        self.prefetch_misses = 0
+        self.prefetch_lead_total = 0.0
+        self.prefetch_lead_last = 0.0
+
+    def get_poll_payload(self, question_details: Dict[str, Any]) -> PollPayload:
+        """Возвращает предвычисленный при загрузке вопросов payload опроса"""
+        return get_or_build_poll_payload(
+            self.state.poll_payloads,
+            question_details,
+            self.app_config.max_poll_option_length,
+            self.data_manager._sanitize_text_for_telegram
         )
 
-    def _prepare_poll_options(self, question_details: Dict[str, Any]) -> Tuple[str, List[str], int, str]:
-        q_text: str = question_details["question"]
-        original_options: List[str] = question_details["options"]
-        correct_answer_text_original: str = question_details["correct_option_text"]
+    def prepare_quiz_poll(
+        self, chat_id: int, question_data: Dict[str, Any],
+        poll_title_prefix: str, question_session_index: int = 0,
+        current_category_name: Optional[str] = None
+    ) -> Optional[PreparedPoll]:
+        """
+        Готовит аргументы send_poll: перемешивание вариантов, заголовок, экранирование.
+        Возвращает None, если вопрос некорректен.
+        """
+        payload = self.get_poll_payload(question_data)
+
+        if not payload.is_valid:
+            logger.error(f"Не удалось подготовить варианты/правильный ответ для вопроса в чате {chat_id}. Вопрос: {question_data['question'][:50]}")
+            return None
 
-        processed_options_plain_truncated: List[str] = []
-        for opt_text in original_options:
-            if len(opt_text) > self.app_config.max_poll_option_length:
-                processed_options_plain_truncated.append(opt_text[:self.app_config.max_poll_option_length - 3] + "...")
-            else:
-                processed_options_plain_truncated.append(opt_text)
+        options_for_api, correct_option_idx_shuffled = payload.shuffled()
 
-        correct_answer_text_for_matching_in_processed: Optional[str] = None
-        try:
-            original_correct_idx = original_options.index(correct_answer_text_original)
-            correct_answer_text_for_matching_in_processed = processed_options_plain_truncated[original_correct_idx]
-        except ValueError:
-            logger.error(f"Критическая ошибка: текст правильного ответа '{correct_answer_text_original}' не найден в оригинальных опциях {original_options}. Вопрос: {q_text[:50]}")
-            return q_text, [], -1, ""
+        sanitized_poll_title_prefix = self.data_manager._sanitize_text_for_telegram(poll_title_prefix)
+        sanitized_current_category_name = self.data_manager._sanitize_text_for_telegram(current_category_name) if current_category_name else None
 
-        final_shuffled_options_plain_truncated: List[str] = list(processed_options_plain_truncated)
-        random.shuffle(final_shuffled_options_plain_truncated)
+        poll_header_parts = [sanitized_poll_title_prefix]
+        if sanitized_current_category_name:
+            poll_header_parts.append(f"Категория: {sanitized_current_category_name}")
 
-        try:
-            new_correct_idx_in_shuffled = final_shuffled_options_plain_truncated.index(correct_answer_text_for_matching_in_processed)
-        except ValueError:
-            logger.warning(f"Текст правильного ответа '{correct_answer_text_for_matching_in_processed}' (ориг: '{correct_answer_text_original}') не найден в перемешанных и обработанных опциях: {final_shuffled_options_plain_truncated}. Ошибка может повлиять на определение правильного ответа.")
-            new_correct_idx_in_shuffled = -1
+        question_for_api = payload.build_question_text(
+            "\n".join(poll_header_parts), self.app_config.max_poll_question_length
+        )
+        return PreparedPoll(
+            question_id=payload.question_id,
+            question_session_index=question_session_index,
+            question_text=question_for_api,
+            options=tuple(options_for_api),
+            correct_option_id=correct_option_idx_shuffled,
+            prepared_at=time.monotonic()
+        )
 
-        return q_text, final_shuffled_options_plain_truncated, new_correct_idx_in_shuffled, correct_answer_text_original
+    def get_prefetch_stats(self) -> Dict[str, Any]:
+        """Статистика использования заранее подготовленных опросов"""
+        return {
+            "hits": self.prefetch_hits,
+            "misses": self.prefetch_misses,
+            "avg_lead_time": round(self.prefetch_lead_total / self.prefetch_hits, 3) if self.prefetch_hits else 0,
+            "last_lead_time": round(self.prefetch_lead_last, 3),
+        }
 
     async def send_quiz_poll(
         self, context: ContextTypes.DEFAULT_TYPE, chat_id: int, question_data: Dict[str, Any],
         poll_title_prefix: str,
         open_period_seconds: int, quiz_type: str,
         is_last_question: bool = False, question_session_index: int = 0,
-        current_category_name: Optional[str] = None
+        current_category_name: Optional[str] = None,
+        prepared: Optional[PreparedPoll] = None
     ) -> Optional[str]:
-        original_plain_question_text = question_data['question']
-        _, plain_truncated_shuffled_options, correct_option_idx_shuffled, _ = self._prepare_poll_options(question_data)
-
-        if not plain_truncated_shuffled_options or correct_option_idx_shuffled == -1 :
-            logger.error(f"Не удалось подготовить варианты/правильный ответ для вопроса в чате {chat_id}. Вопрос: {original_plain_question_text[:50]}")
-            return None
-
-        sanitized_poll_title_prefix = self.data_manager._sanitize_text_for_telegram(poll_title_prefix)
-        sanitized_current_category_name = self.data_manager._sanitize_text_for_telegram(current_category_name) if current_category_name else None
-
-        poll_header_parts = [sanitized_poll_title_prefix]
-        if sanitized_current_category_name:
-            poll_header_parts.append(f"Категория: {sanitized_current_category_name}")
-
-        temp_header_plain = "\n".join(poll_header_parts)
-        full_question_text_plain = f"{temp_header_plain}\n{self.data_manager._sanitize_text_for_telegram(original_plain_question_text)}"
-
-        truncated_full_question_text_plain: str
-        if len(full_question_text_plain) > self.app_config.max_poll_question_length:
-            truncated_full_question_text_plain = full_question_text_plain[:self.app_config.max_poll_question_length - 3] + "..."
-            logger.warning(f"Простой текст вопроса для poll в чате {chat_id} был усечен. Оригинал (начало): '{full_question_text_plain[:50]}', Усеченный: '{truncated_full_question_text_plain[:50]}'")
+        """
+        Отправляет опрос. prepared - заранее подготовленный опрос (серийные
+        викторины); используется, только если относится к этому же вопросу,
+        вместе с заранее оплаченным токеном лимита чата.
+        """
+        # Оплаченный токен принадлежит чату, а не вопросу: используется и при промахе
+        has_prepaid_token = prepared is not None
+        use_prepared = prepared is not None and prepared.matches(
+            self.get_poll_payload(question_data).question_id, question_session_index
+        )
+        if use_prepared:
+            lead_time = prepared.lead_time()
+            self.prefetch_hits += 1
+            self.prefetch_lead_total += lead_time
+            self.prefetch_lead_last = lead_time
+            logger.debug(f"Опрос {question_session_index + 1} для чата {chat_id} подготовлен заранее (за {lead_time:.2f}с до отправки).")
         else:
-            truncated_full_question_text_plain = full_question_text_plain
+            if prepared is not None:
+                self.prefetch_misses += 1
+                logger.debug(f"Заранее подготовленный опрос для чата {chat_id} не подходит к вопросу {question_session_index + 1}, готовим заново.")
+            prepared = self.prepare_quiz_poll(
+                chat_id, question_data, poll_title_prefix,
+                question_session_index=question_session_index,
+                current_category_name=current_category_name
+            )
+            if prepared is None:
+                return None
 
-        question_for_api = escape_markdown_v2(truncated_full_question_text_plain)
-        options_for_api = [escape_markdown_v2(opt) for opt in plain_truncated_shuffled_options]
+        question_for_api = prepared.question_text
+        options_for_api = list(prepared.options)
+        correct_option_idx_shuffled = prepared.correct_option_id
 
-        # Retry механизм для отправки опроса (важно для таймаутов в России)
-        max_retries = 4  # 1 основная попытка + 4 повтора = всего 5 попыток (best practice 2025)
-        base_delay = 2.0  # Увеличенная начальная задержка для нестабильных сетей
-        max_delay = 15.0  # Максимальная задержка 15 секунд (рекомендация для RU→EU)
-        
-        sent_poll_msg: Optional[Message] = None
-        last_exception = None
-        
-        for attempt in range(max_retries + 1):
-            # Применяем rate limiting перед каждой попыткой
-            await self.rate_limiter.acquire(chat_id)
-            try:
-                sent_poll_msg = await context.bot.send_poll(
-                    chat_id=chat_id,
-                    question=question_for_api,
-                    options=options_for_api,
-                    type=Poll.QUIZ,
-                    correct_option_id=correct_option_idx_shuffled,
-                    open_period=open_period_seconds,
-                    is_anonymous=False
+        # Повторы, backoff и circuit breaker'ы - общая политика (важно для таймаутов в России)
+        max_attempts = 5
+        try:
+            # Rate limiting применяется планировщиком перед каждой попыткой
+            sent_poll_msg: Message = await self.retry_policy.execute(
+                chat_id, self.request_scheduler.call,
+                chat_id, RequestPriority.POLL, context.bot.send_poll,
+                max_attempts=max_attempts,
+                use_prepaid_token=has_prepaid_token,
+                chat_id=chat_id,
+                question=question_for_api,
+                options=options_for_api,
+                type=Poll.QUIZ,
+                correct_option_id=correct_option_idx_shuffled,
+                open_period=open_period_seconds,
+                is_anonymous=False
+            )
+        except CircuitOpenError as e:
+            logger.warning(f"Опрос (тип: {quiz_type}) в чат {chat_id} не отправлен: {e}")
+            return None
+        except Exception as e:
+            error_class = classify_error(e)
+            logger.error(f"Ошибка при отправке опроса (тип: {quiz_type}) в чате {chat_id} ({error_class.value}): {e}", exc_info=True)
+            logger.error(f"Текст вопроса (экранированный), который вызвал ошибку: {question_for_api}")
+            logger.error(f"Опции (экранированные), которые вызвали ошибку: {options_for_api}")
+
+            # Автоматическое отключение рассылки при блокировке или недоступности чата
+            if error_class == ErrorClass.CHAT_UNAVAILABLE and quiz_type == "daily":
+                logger.warning(f"⚠️ Обнаружена блокировка/недоступность чата {chat_id} при отправке опроса. Автоматически отключаю ежедневную рассылку.")
+                self.data_manager.disable_daily_quiz_for_chat(
+                    chat_id,
+                    reason="blocked" if "blocked" in str(e).lower() else "not_found"
                 )
-                # Успешно отправлено, выходим из цикла retry
-                break
-            except Exception as e:
-                last_exception = e
-                error_message = str(e).lower()
-                error_type = type(e).__name__
-                
-                # Не повторяем для ошибок блокировки/недоступности чата
-                if "blocked" in error_message or "not found" in error_message or "forbidden" in error_message:
-                    logger.error(f"Ошибка при отправке опроса (тип: {quiz_type}) в чате {chat_id}: {e}", exc_info=True)
-                    logger.error(f"Текст вопроса (экранированный), который вызвал ошибку: {question_for_api}")
-                    logger.error(f"Опции (экранированные), которые вызвали ошибку: {options_for_api}")
-                    
-                    # Автоматическое отключение рассылки при блокировке или недоступности чата
-                    if quiz_type == "daily":
-                        logger.warning(f"⚠️ Обнаружена блокировка/недоступность чата {chat_id} при отправке опроса. Автоматически отключаю ежедневную рассылку.")
-                        self.data_manager.disable_daily_quiz_for_chat(
-                            chat_id,
-                            reason="blocked" if "blocked" in error_message else "not_found"
-                        )
-                    return None
-                
-                # Повторяем только для таймаутов и сетевых ошибок
-                if isinstance(e, (TimedOut, NetworkError)) and attempt < max_retries:
-                    # Exponential backoff с коэффициентом 2.0 (best practice)
-                    base_delay_calc = min(base_delay * (2.0 ** attempt), max_delay)
-                    # Добавляем jitter (±30%) для избежания синхронных повторов
-                    jitter = random.uniform(-0.3 * base_delay_calc, 0.3 * base_delay_calc)
-                    delay = max(0.5, base_delay_calc + jitter)  # Минимум 0.5 секунды
-                    logger.warning(f"Таймаут/сетевая ошибка при отправке опроса в чате {chat_id}, повтор через {delay:.1f}с (попытка {attempt + 1}/{max_retries + 1}): {e}")
-                    await asyncio.sleep(delay)
-                    continue  # Повторяем попытку
-                
-                # Для других ошибок или исчерпания попыток - логируем и возвращаем None
-                logger.error(f"Ошибка при отправке опроса (тип: {quiz_type}) в чате {chat_id} (попытка {attempt + 1}/{max_retries + 1}): {e}", exc_info=True)
-                logger.error(f"Текст вопроса (экранированный), который вызвал ошибку: {question_for_api}")
-                logger.error(f"Опции (экранированные), которые вызвали ошибку: {options_for_api}")
-                
-                # Для других ошибок (не TimedOut/NetworkError) не повторяем
-                return None
-        
-        # Проверяем, была ли успешная отправка
-        if sent_poll_msg is None:
-            logger.error(f"Все попытки отправки опроса исчерпаны для чата {chat_id}: {last_exception}")
             return None
 
         if not sent_poll_msg.poll:
@@ -180,7 +183,8 @@ class QuizEngine:
         current_poll_entry_data = {
             "chat_id": chat_id,
             "message_id": sent_poll_msg.message_id,
-            "question_details": question_data,
+            # Вопрос хранится ссылкой: question_id + question_session_index
+            "question_id": prepared.question_id,
             "correct_option_index": correct_option_idx_shuffled,
             "quiz_type": quiz_type,
             "is_last_question_in_series": is_last_question,
@@ -188,6 +192,7 @@ class QuizEngine:
             "solution_placeholder_message_id": None,
             "processed_by_early_answer": False,
             "open_timestamp": sent_poll_msg.date.timestamp(),
+            "open_period_seconds": open_period_seconds,
             "next_q_triggered_by_answer": False, # ИЗМЕНЕНО: Добавлен флаг
             "job_poll_end_name": None
         }
@@ -204,7 +209,8 @@ class QuizEngine:
                         bot=context.bot,
                         chat_id=chat_id,
                         text="💡",
-                        parse_mode=None
+                        parse_mode=None,
+                        priority=RequestPriority.POLL
                     )
                     if poll_id_str in self.state.current_polls:
                         self.state.current_polls[poll_id_str]["solution_placeholder_message_id"] = placeholder_msg.message_id
@@ -228,7 +234,8 @@ class QuizEngine:
             logger.debug(f"Решение для poll_id {poll_id} уже было отправлено ранее. Пропускаем повторную отправку.")
             return poll_info.get("solution_message_id")
 
-        solution_text_raw = poll_info.get("question_details", {}).get("solution")
+        question_details = self.state.get_poll_question(poll_info) or {}
+        solution_text_raw = question_details.get("solution")
         if not solution_text_raw:
             return None
 
@@ -238,7 +245,7 @@ class QuizEngine:
             logger.warning(f"Текст решения слишком длинный ({len(solution_text_raw)} символов), обрезаем до {max_solution_length}")
             solution_text_raw = solution_text_raw[:max_solution_length] + "..."
 
-        q_text_short_plain_for_log = poll_info.get("question_details", {}).get("question", "вопросу")[:30]
+        q_text_short_plain_for_log = question_details.get("question", "вопросу")[:30]
         idx_session_for_log = poll_info.get("question_session_index", -1)
         log_q_ref_text_plain = f"«{self.data_manager._sanitize_text_for_telegram(q_text_short_plain_for_log)}...»"
         if idx_session_for_log != -1:
@@ -266,7 +273,9 @@ class QuizEngine:
 
         try:
             if placeholder_msg_id:
-                await context.bot.edit_message_text(
+                await self.request_scheduler.call(
+                    chat_id, RequestPriority.SOLUTION, context.bot.edit_message_text,
+                    chat_limited=False,
                     text=solution_message_full_truncated,
                     chat_id=chat_id,
                     message_id=placeholder_msg_id,
@@ -278,7 +287,8 @@ class QuizEngine:
                     bot=context.bot,
                     chat_id=chat_id,
                     text=solution_message_full_truncated,
-                    parse_mode=None
+                    parse_mode=None,
+                    priority=RequestPriority.SOLUTION
                 )
                 solution_sent_or_edited_msg_id = new_solution_msg.message_id
             
@@ -294,14 +304,15 @@ class QuizEngine:
 
             if placeholder_msg_id and isinstance(e, BadRequest) and "message to edit not found" in str(e).lower() or "message is not modified" not in str(e).lower() :
                 try:
-                    await context.bot.delete_message(chat_id=chat_id, message_id=placeholder_msg_id)
+                    await self.request_scheduler.delete_message(context.bot, chat_id, placeholder_msg_id)
                 except Exception: pass
                 try:
                     new_fallback_solution_msg = await safe_send_message(
                         bot=context.bot,
                         chat_id=chat_id,
                         text=solution_message_full_truncated,
-                        parse_mode=None
+                        parse_mode=None,
+                        priority=RequestPriority.SOLUTION
                     )
                     solution_sent_or_edited_msg_id = new_fallback_solution_msg.message_id
                     logger.info(f"Пояснение для {log_q_ref_text_plain} отправлено как новое сообщение (fallback, parse_mode=None). ID: {solution_sent_or_edited_msg_id}")
@@ -0,0 +1,49 @@
+# modules/quiz_fanout.py
+"""
+Разнесение запусков ежедневных викторин, назначенных на одну минуту.
+
+Если много чатов выбрали одно время (например, 09:00), все опросы
+уходили в Bot API одним всплеском. Группа запусков одного слота
+раскладывается по окну window_seconds: порядок чатов определяется
+хешем (chat_id, слот), поэтому он детерминирован для конкретного дня,
+но не ставит один и тот же чат всегда в конец окна.
+"""
+
+import hashlib
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Tuple
+
+
+def fanout_order_key(chat_id: int, slot: datetime) -> bytes:
+    """Ключ сортировки чата внутри слота"""
+    return hashlib.blake2b(f"{chat_id}:{slot.isoformat()}".encode("utf-8"), digest_size=8).digest()
+
+
+def plan_fanout(chat_ids: Iterable[int], slot: datetime, window_seconds: float) -> List[Tuple[int, float]]:
+    """
+    Возвращает план запуска: список (chat_id, смещение от начала слота в секундах).
+    Смещения равномерно распределены по окну, первый чат стартует в момент слота.
+    """
+    ordered = sorted(set(chat_ids), key=lambda chat_id: fanout_order_key(chat_id, slot))
+    if len(ordered) <= 1 or window_seconds <= 0:
+        return [(chat_id, 0.0) for chat_id in ordered]
+    step = window_seconds / len(ordered)
+    return [(chat_id, index * step) for index, chat_id in enumerate(ordered)]
+
+
+def build_fanout_report(slot: datetime, window_seconds: float, skews: List[float], preselected: int) -> Dict[str, Any]:
+    """
+    Отчет о запуске группы.
+
+    Args:
+        skews: Отклонения фактического старта от планового по каждому чату (секунды)
+        preselected: Сколько чатов получили вопросы, подобранные до открытия окна
+    """
+    return {
+        "slot_utc": slot.strftime('%Y-%m-%d %H:%M'),
+        "chats": len(skews),
+        "window_seconds": window_seconds,
+        "preselected": preselected,
+        "max_start_skew": round(max(skews), 3) if skews else 0.0,
+        "avg_start_skew": round(sum(skews) / len(skews), 3) if skews else 0.0,
+    }
@@ -0,0 +1,202 @@
+# modules/quiz_journal.py
+"""
+Журнал состояния активных викторин.
+
+Раньше все активные викторины вместе со списками вопросов раз в 5 минут
+целиком сериализовались в active_quizzes.json: при сбое терялось до
+5 минут прогресса, а стоимость сохранения росла с числом викторин.
+
+Теперь у каждой сессии есть снимок, записываемый при старте (и при
+восстановлении или остановке бота), и журнал переходов - по одной
+JSON-строке на событие: отправлен вопрос, закрыт опрос, изменились очки
+участника, сообщения на удаление, остановка. При восстановлении снимок
+дополняется событиями журнала. После финализации файлы сессии удаляются.
+
+Формат восстановленного состояния совпадает с прежним форматом
+active_quizzes.json, поэтому QuizManager.restore_quiz_from_saved_data
+не меняется.
+"""
+
+import json
+import logging
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from modules.atomic_io import write_json_atomic
+
+logger = logging.getLogger(__name__)
+
+JOURNAL_DIR_NAME = "active_quizzes"
+SNAPSHOT_SUFFIX = ".snapshot.json"
+JOURNAL_SUFFIX = ".journal"
+
+EVENT_QUESTION_SENT = "question_sent"
+EVENT_PROGRESSION = "progression"
+EVENT_POLL_CLOSED = "poll_closed"
+EVENT_SCORE = "score"
+EVENT_MESSAGES = "messages"
+EVENT_STOPPING = "stopping"
+EVENT_FINALIZED = "finalized"
+
+
+def apply_event(quiz_data: Dict[str, Any], event: Dict[str, Any]) -> bool:
+    """
+    Применяет событие журнала к состоянию викторины (формат снимка).
+
+    Returns:
+        False, если сессия финализирована и восстанавливать ее не нужно
+    """
+    kind = event.get("e")
+    if kind == EVENT_QUESTION_SENT:
+        poll_id = event["poll_id"]
+        quiz_data["current_question_index"] = event["index"]
+        if poll_id not in quiz_data["active_poll_ids_in_session"]:
+            quiz_data["active_poll_ids_in_session"].append(poll_id)
+        quiz_data["latest_poll_id_sent"] = poll_id
+        quiz_data["progression_triggered_for_poll"][poll_id] = False
+    elif kind == EVENT_PROGRESSION:
+        quiz_data["progression_triggered_for_poll"][event["poll_id"]] = True
+    elif kind == EVENT_POLL_CLOSED:
+        poll_id = event["poll_id"]
+        if poll_id in quiz_data["active_poll_ids_in_session"]:
+            quiz_data["active_poll_ids_in_session"].remove(poll_id)
+        quiz_data["progression_triggered_for_poll"].pop(poll_id, None)
+        if event.get("poll_msg_id"):
+            quiz_data["poll_and_solution_message_ids"].append({
+                "poll_msg_id": event["poll_msg_id"],
+                "solution_msg_id": event.get("solution_msg_id"),
+            })
+    elif kind == EVENT_SCORE:
+        quiz_data["scores"][event["user_id"]] = event["entry"]
+    elif kind == EVENT_MESSAGES:
+        known = set(quiz_data["message_ids_to_delete"])
+        quiz_data["message_ids_to_delete"].extend(i for i in event["message_ids"] if i not in known)
+    elif kind == EVENT_STOPPING:
+        quiz_data["is_stopping"] = True
+    elif kind == EVENT_FINALIZED:
+        return False
+    else:
+        logger.warning(f"Неизвестное событие журнала викторины: {kind}")
+    return True
+
+
+class QuizJournal:
+    """
+    Снимки и журналы активных викторин в отдельной папке.
+
+    Args:
+        directory: Папка файлов сессий
+    """
+
+    def __init__(self, directory: Path):
+        self.directory = Path(directory)
+        self.events_written = 0
+        self.bytes_written = 0
+        self.snapshots_written = 0
+
+    def _snapshot_path(self, chat_id: int) -> Path:
+        return self.directory / f"{chat_id}{SNAPSHOT_SUFFIX}"
+
+    def _journal_path(self, chat_id: int) -> Path:
+        return self.directory / f"{chat_id}{JOURNAL_SUFFIX}"
+
+    def write_snapshot(self, chat_id: int, quiz_data: Dict[str, Any]) -> None:
+        """Записывает снимок сессии и начинает журнал заново"""
+        write_json_atomic(self._snapshot_path(chat_id), quiz_data)
+        # Журнал после снимка пуст: события до снимка в нем уже учтены
+        self._journal_path(chat_id).unlink(missing_ok=True)
+        self.snapshots_written += 1
+
+    def append(self, chat_id: int, event: str, **fields: Any) -> None:
+        """Добавляет событие в журнал сессии; без снимка событие не пишется"""
+        if not self._snapshot_path(chat_id).exists():
+            return
+        line = json.dumps({"e": event, "t": round(time.time(), 3), **fields}, ensure_ascii=False, separators=(",", ":"))
+        payload = (line + "\n").encode("utf-8")
+        with open(self._journal_path(chat_id), "ab") as f:
+            f.write(payload)
+        self.events_written += 1
+        self.bytes_written += len(payload)
+
+    def remove(self, chat_id: int) -> None:
+        """Удаляет файлы завершенной сессии"""
+        self._journal_path(chat_id).unlink(missing_ok=True)
+        self._snapshot_path(chat_id).unlink(missing_ok=True)
+
+    def chat_ids(self) -> List[int]:
+        if not self.directory.exists():
+            return []
+        chat_ids: List[int] = []
+        for path in self.directory.glob(f"*{SNAPSHOT_SUFFIX}"):
+            try:
+                chat_ids.append(int(path.name[:-len(SNAPSHOT_SUFFIX)]))
+            except ValueError:
+                logger.warning(f"Пропущен файл с некорректным именем: {path}")
+        return chat_ids
+
+    def _read_events(self, chat_id: int) -> Tuple[List[Dict[str, Any]], int]:
+        journal_path = self._journal_path(chat_id)
+        if not journal_path.exists():
+            return [], 0
+        events: List[Dict[str, Any]] = []
+        skipped = 0
+        with open(journal_path, "rb") as f:
+            for raw_line in f:
+                try:
+                    events.append(json.loads(raw_line))
+                except ValueError:
+                    # Оборванная при сбое последняя строка
+                    skipped += 1
+        return events, skipped
+
+    def replay(self, chat_id: int) -> Optional[Dict[str, Any]]:
+        """Состояние сессии: снимок + события журнала; None для финализированной или поврежденной"""
+        try:
+            with open(self._snapshot_path(chat_id), "r", encoding="utf-8") as f:
+                quiz_data = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.error(f"Не удалось прочитать снимок викторины чата {chat_id}: {e}")
+            return None
+
+        events, skipped = self._read_events(chat_id)
+        if skipped:
+            logger.warning(f"Журнал викторины чата {chat_id}: пропущено {skipped} поврежденных строк")
+        for event in events:
+            try:
+                if not apply_event(quiz_data, event):
+                    return None
+            except (KeyError, TypeError, ValueError) as e:
+                logger.warning(f"Журнал викторины чата {chat_id}: событие {event.get('e')} не применено: {e}")
+        logger.debug(f"Викторина чата {chat_id}: применено {len(events)} событий журнала")
+        return quiz_data
+
+    def load_all(self) -> Dict[int, Dict[str, Any]]:
+        """Состояния всех незавершенных сессий"""
+        sessions: Dict[int, Dict[str, Any]] = {}
+        for chat_id in self.chat_ids():
+            quiz_data = self.replay(chat_id)
+            if quiz_data is None:
+                self.remove(chat_id)
+                continue
+            sessions[chat_id] = quiz_data
+        return sessions
+
+    def retain(self, chat_ids: Iterable[int]) -> int:
+        """Удаляет файлы сессий, не входящих в chat_ids; возвращает количество удаленных"""
+        keep = set(chat_ids)
+        removed = 0
+        for chat_id in self.chat_ids():
+            if chat_id not in keep:
+                self.remove(chat_id)
+                removed += 1
+        return removed
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Объем журналов для логов"""
+        return {
+            "sessions": len(self.chat_ids()),
+            "events_written": self.events_written,
+            "bytes_written": self.bytes_written,
+            "snapshots_written": self.snapshots_written,
+        }
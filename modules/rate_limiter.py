@@ -1,22 +1,81 @@
 # modules/rate_limiter.py
 """
 Rate Limiter для соблюдения лимитов Telegram Bot API.
-Telegram API ограничивает до ~30 сообщений в секунду.
-Best practice 2025: использовать token bucket или sliding window алгоритм.
+Telegram API ограничивает до ~30 сообщений в секунду и ~20 сообщений в минуту в один чат.
+
+Token bucket на time.monotonic(): acquire выполняется за O(1) независимо от
+количества чатов, простаивающие чаты вытесняются, глобальная очередь
+обслуживает запросы по классам приоритета (опросы раньше решений, решения
+раньше удаления сообщений) и в порядке поступления внутри класса.
+
+Per-chat токен можно оплатить заранее (prepay_chat_token): серийная
+викторина выжидает лимит чата, пока открыт текущий опрос, и следующий
+опрос использует готовый токен. Глобальный токен заранее не берется -
+это отняло бы пропускную способность у других чатов.
 """
 
 import asyncio
 import logging
-from datetime import datetime, timedelta
-from typing import Dict, List
-from collections import deque
+import time
+from collections import OrderedDict, deque
+from enum import IntEnum
+from typing import Any, Deque, Dict, List, Optional
 
 logger = logging.getLogger(__name__)
 
 
+class RequestPriority(IntEnum):
+    """Классы приоритета запросов (меньше - важнее)"""
+    POLL = 0
+    SOLUTION = 1
+    MESSAGE = 2
+    BROADCAST = 3
+    CLEANUP = 4
+
+
+class TokenBucket:
+    """Ведро токенов с ленивым пополнением по монотонным часам"""
+
+    __slots__ = ("capacity", "rate", "tokens", "updated")
+
+    def __init__(self, capacity: float, rate: float, now: float):
+        self.capacity = capacity
+        self.rate = rate
+        self.tokens = capacity
+        self.updated = now
+
+    def _refill(self, now: float) -> None:
+        elapsed = now - self.updated
+        if elapsed > 0:
+            self.tokens = min(self.capacity, self.tokens + elapsed * self.rate)
+            self.updated = now
+
+    def reserve(self, now: float) -> float:
+        """
+        Забирает токен, допуская долг. Возвращает время ожидания до момента,
+        когда зарезервированный токен станет доступен (0 - можно сразу).
+        Конкурентные резервации одного ведра обслуживаются в порядке вызова.
+        """
+        self._refill(now)
+        self.tokens -= 1
+        return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+    def wait_time(self, now: float) -> float:
+        """Время до появления целого токена (без списания)"""
+        self._refill(now)
+        return 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+    def take(self) -> None:
+        self.tokens -= 1
+
+    def full_at(self) -> float:
+        """Момент, когда ведро полностью пополнится"""
+        return self.updated + (self.capacity - self.tokens) / self.rate
+
+
 class TelegramRateLimiter:
     """
-    Rate limiter для Telegram Bot API с использованием sliding window алгоритма.
+    Rate limiter для Telegram Bot API на основе token bucket.
 
     Telegram API лимиты:
     - Максимум ~30 сообщений в секунду
@@ -27,6 +86,12 @@ class TelegramRateLimiter:
         max_requests_per_minute_per_chat: Максимальное количество запросов в минуту на чат (default: 18)
     """
 
+    # Сколько простаивающих чатов проверяется на вытеснение за один acquire
+    EVICTIONS_PER_ACQUIRE = 2
+    # Срок жизни заранее оплаченного токена чата: за минуту ведро чата
+    # полностью пополняется, и старый токен дал бы всплеск сверх лимита
+    PREPAID_TOKEN_TTL_SECONDS = 60.0
+
     def __init__(
         self,
         max_requests_per_second: int = 25,  # Консервативное значение (Telegram лимит ~30)
@@ -35,16 +100,31 @@ class TelegramRateLimiter:
         self.max_global_rps = max_requests_per_second
         self.max_chat_rpm = max_requests_per_minute_per_chat
 
-        # Глобальный sliding window для всех запросов (за последнюю секунду)
-        self.global_requests: deque = deque()
+        now = time.monotonic()
+        # Глобальное ведро: всплеск до max_rps запросов, пополнение max_rps в секунду
+        self.global_bucket = TokenBucket(max_requests_per_second, max_requests_per_second, now)
+
+        # Ведра чатов в порядке последнего обращения (для вытеснения простаивающих)
+        self.chat_buckets: "OrderedDict[int, TokenBucket]" = OrderedDict()
+
+        # Очереди ожидания глобального токена по классам приоритета
+        self._queues: List[Deque[asyncio.Future]] = [deque() for _ in RequestPriority]
+        self._drainer: Optional[asyncio.Task] = None
 
-        # Per-chat sliding windows (за последнюю минуту)
-        self.chat_requests: Dict[int, deque] = {}
+        # Выданные за последнюю секунду разрешения (для current_rps)
+        self._recent_grants: Deque[float] = deque()
+
+        # Заранее оплаченные токены чатов: chat_id -> сроки годности
+        self._prepaid_chat_tokens: Dict[int, Deque[float]] = {}
 
         # Метрики для отслеживания
         self.total_requests = 0
         self.total_delays = 0
         self.total_delay_time = 0.0
+        self.evicted_chats = 0
+        self.prepaid_issued = 0
+        self.prepaid_used = 0
+        self.prepaid_expired = 0
 
         logger.info(
             f"TelegramRateLimiter инициализирован: "
@@ -52,119 +132,205 @@ class TelegramRateLimiter:
             f"per_chat={self.max_chat_rpm} req/min"
         )
 
-    async def acquire(self, chat_id: int) -> bool:
+    def _get_chat_bucket(self, chat_id: int, now: float) -> TokenBucket:
+        bucket = self.chat_buckets.get(chat_id)
+        if bucket is None:
+            bucket = TokenBucket(self.max_chat_rpm, self.max_chat_rpm / 60.0, now)
+            self.chat_buckets[chat_id] = bucket
+        else:
+            self.chat_buckets.move_to_end(chat_id)
+        return bucket
+
+    def _evict_idle_chats(self, now: float) -> None:
+        """
+        Вытесняет чаты, ведра которых уже полностью пополнились: такое ведро
+        неотличимо от нового. Проверяются только самые давние чаты, поэтому
+        стоимость O(1) на вызов, а задержка вытеснения не больше минуты.
+        """
+        for _ in range(self.EVICTIONS_PER_ACQUIRE):
+            if not self.chat_buckets:
+                return
+            chat_id, bucket = next(iter(self.chat_buckets.items()))
+            if bucket.full_at() > now:
+                return
+            del self.chat_buckets[chat_id]
+            self.evicted_chats += 1
+
+    def _take_prepaid_chat_token(self, chat_id: int, now: float) -> bool:
+        tokens = self._prepaid_chat_tokens.get(chat_id)
+        while tokens and tokens[0] <= now:
+            tokens.popleft()
+            self.prepaid_expired += 1
+        if not tokens:
+            self._prepaid_chat_tokens.pop(chat_id, None)
+            return False
+        tokens.popleft()
+        if not tokens:
+            del self._prepaid_chat_tokens[chat_id]
+        self.prepaid_used += 1
+        return True
+
+    async def prepay_chat_token(self, chat_id: int) -> float:
+        """
+        Заранее резервирует и выжидает per-chat токен. Токен используется
+        первым запросом в чат с use_prepaid_token=True в течение
+        PREPAID_TOKEN_TTL_SECONDS.
+
+        Returns:
+            Время ожидания лимита чата в секундах
+        """
+        now = time.monotonic()
+        bucket = self._get_chat_bucket(chat_id, now)
+        chat_wait = bucket.reserve(now)
+        if chat_wait > 0:
+            try:
+                await asyncio.sleep(chat_wait)
+            except asyncio.CancelledError:
+                # Токен не понадобился - возвращаем его в ведро
+                bucket.tokens = min(bucket.capacity, bucket.tokens + 1)
+                raise
+        self._prepaid_chat_tokens.setdefault(chat_id, deque()).append(
+            time.monotonic() + self.PREPAID_TOKEN_TTL_SECONDS
+        )
+        self.prepaid_issued += 1
+        return chat_wait
+
+    def release_prepaid_chat_tokens(self, chat_id: int) -> int:
+        """Возвращает неиспользованные оплаченные токены чата в его ведро"""
+        tokens = self._prepaid_chat_tokens.pop(chat_id, None)
+        if not tokens:
+            return 0
+        now = time.monotonic()
+        alive = sum(1 for expires_at in tokens if expires_at > now)
+        bucket = self.chat_buckets.get(chat_id)
+        if bucket is not None and alive:
+            bucket.tokens = min(bucket.capacity, bucket.tokens + alive)
+        self.prepaid_expired += len(tokens) - alive
+        return alive
+
+    def _has_waiters(self) -> bool:
+        return any(self._queues)
+
+    def _pop_next_waiter(self) -> Optional[asyncio.Future]:
+        for queue in self._queues:
+            while queue:
+                waiter = queue.popleft()
+                if not waiter.done():
+                    return waiter
+        return None
+
+    async def _drain_queues(self) -> None:
+        """Выдает глобальные токены ожидающим: сначала по приоритету, затем FIFO"""
+        try:
+            while self._has_waiters():
+                wait = self.global_bucket.wait_time(time.monotonic())
+                if wait > 0:
+                    await asyncio.sleep(wait)
+                    continue
+                # Следующий ожидающий выбирается только когда токен готов,
+                # чтобы поступивший за время ожидания опрос обогнал удаления
+                waiter = self._pop_next_waiter()
+                if waiter is None:
+                    break
+                self.global_bucket.take()
+                waiter.set_result(None)
+        finally:
+            self._drainer = None
+
+    def _record_grant(self, now: float) -> None:
+        self.total_requests += 1
+        self._recent_grants.append(now)
+        while self._recent_grants and now - self._recent_grants[0] > 1.0:
+            self._recent_grants.popleft()
+
+    async def acquire(
+        self,
+        chat_id: int,
+        priority: RequestPriority = RequestPriority.MESSAGE,
+        chat_limited: bool = True,
+        use_prepaid_token: bool = False
+    ) -> bool:
         """
         Запрашивает разрешение на отправку запроса.
         Блокирует выполнение если достигнуты лимиты.
 
         Args:
             chat_id: ID чата, в который отправляется запрос
+            priority: Класс приоритета запроса
+            chat_limited: Учитывать per-chat лимит (False для запросов, не создающих сообщений)
+            use_prepaid_token: Использовать заранее оплаченный токен чата, если он есть
 
         Returns:
             True когда можно отправлять запрос
         """
-        now = datetime.now()
-        delay_applied = False
-
-        # Проверяем глобальный лимит (запросов в секунду)
-        while True:
-            # Очищаем старые записи (старше 1 секунды)
-            while self.global_requests and (now - self.global_requests[0]) > timedelta(seconds=1):
-                self.global_requests.popleft()
-
-            # Если не превышен лимит - выходим
-            if len(self.global_requests) < self.max_global_rps:
-                break
-
-            # Иначе ждем минимальное время до освобождения слота
-            oldest_request = self.global_requests[0]
-            wait_until = oldest_request + timedelta(seconds=1)
-            wait_time = (wait_until - now).total_seconds()
-
-            if wait_time > 0:
-                if not delay_applied:
-                    logger.debug(
-                        f"Rate limit: глобальный лимит достигнут ({len(self.global_requests)}/{self.max_global_rps}), "
-                        f"ожидание {wait_time:.2f}с"
-                    )
-                    delay_applied = True
-                    self.total_delays += 1
-                    self.total_delay_time += wait_time
-
-                await asyncio.sleep(wait_time)
-                now = datetime.now()
-            else:
-                break
-
-        # Проверяем per-chat лимит (запросов в минуту)
-        if chat_id not in self.chat_requests:
-            self.chat_requests[chat_id] = deque()
-
-        chat_queue = self.chat_requests[chat_id]
-
-        while True:
-            # Очищаем старые записи (старше 1 минуты)
-            while chat_queue and (now - chat_queue[0]) > timedelta(minutes=1):
-                chat_queue.popleft()
-
-            # Если не превышен лимит - выходим
-            if len(chat_queue) < self.max_chat_rpm:
-                break
-
-            # Иначе ждем минимальное время до освобождения слота
-            oldest_request = chat_queue[0]
-            wait_until = oldest_request + timedelta(minutes=1)
-            wait_time = (wait_until - now).total_seconds()
-
-            if wait_time > 0:
-                if not delay_applied:
-                    logger.debug(
-                        f"Rate limit: лимит для чата {chat_id} достигнут ({len(chat_queue)}/{self.max_chat_rpm}), "
-                        f"ожидание {wait_time:.2f}с"
-                    )
-                    delay_applied = True
-                    self.total_delays += 1
-                    self.total_delay_time += wait_time
-
-                await asyncio.sleep(wait_time)
-                now = datetime.now()
-            else:
-                break
-
-        # Регистрируем запрос
-        self.global_requests.append(now)
-        chat_queue.append(now)
-        self.total_requests += 1
-
+        now = time.monotonic()
+        self._evict_idle_chats(now)
+        delay = 0.0
+
+        # Per-chat лимит: резервируем токен, конкурентные запросы в чат идут по очереди
+        if chat_limited and use_prepaid_token and self._take_prepaid_chat_token(chat_id, now):
+            chat_limited = False
+        chat_wait = self._get_chat_bucket(chat_id, now).reserve(now) if chat_limited else 0.0
+        if chat_wait > 0:
+            logger.debug(f"Rate limit: лимит для чата {chat_id} достигнут, ожидание {chat_wait:.2f}с")
+            await asyncio.sleep(chat_wait)
+            delay += chat_wait
+            now = time.monotonic()
+
+        # Глобальный лимит: быстрый путь, если никто не ждет и токен есть
+        if not self._has_waiters() and self.global_bucket.wait_time(now) == 0:
+            self.global_bucket.take()
+        else:
+            waiter = asyncio.get_running_loop().create_future()
+            self._queues[priority].append(waiter)
+            if self._drainer is None:
+                self._drainer = asyncio.create_task(self._drain_queues())
+            queued_at = time.monotonic()
+            await waiter
+            now = time.monotonic()
+            delay += now - queued_at
+
+        if delay > 0:
+            self.total_delays += 1
+            self.total_delay_time += delay
+
+        self._record_grant(now)
         return True
 
-    def get_stats(self) -> Dict[str, any]:
+    def get_queue_depth(self) -> Dict[str, int]:
+        """Количество запросов, ожидающих глобальный токен, по классам приоритета"""
+        return {p.name.lower(): len(self._queues[p]) for p in RequestPriority}
+
+    def get_stats(self) -> Dict[str, Any]:
         """
         Возвращает статистику работы rate limiter для отображения в веб-интерфейсе.
 
         Returns:
             Словарь с метриками
         """
-        now = datetime.now()
+        now = time.monotonic()
 
-        # Очищаем старые записи для точной статистики
-        while self.global_requests and (now - self.global_requests[0]) > timedelta(seconds=1):
-            self.global_requests.popleft()
+        while self._recent_grants and now - self._recent_grants[0] > 1.0:
+            self._recent_grants.popleft()
 
-        active_chats = 0
-        for chat_id, chat_queue in self.chat_requests.items():
-            while chat_queue and (now - chat_queue[0]) > timedelta(minutes=1):
-                chat_queue.popleft()
-            if len(chat_queue) > 0:
-                active_chats += 1
+        active_chats = sum(1 for bucket in self.chat_buckets.values() if bucket.full_at() > now)
 
         avg_delay = self.total_delay_time / self.total_delays if self.total_delays > 0 else 0
 
         return {
             "total_requests": self.total_requests,
-            "current_rps": len(self.global_requests),
+            "current_rps": len(self._recent_grants),
             "max_rps": self.max_global_rps,
             "active_chats": active_chats,
+            "tracked_chats": len(self.chat_buckets),
+            "evicted_chats": self.evicted_chats,
+            "prepaid_tokens": {
+                "issued": self.prepaid_issued,
+                "used": self.prepaid_used,
+                "expired": self.prepaid_expired,
+                "outstanding": sum(len(t) for t in self._prepaid_chat_tokens.values()),
+            },
+            "queue_depth": self.get_queue_depth(),
             "total_delays": self.total_delays,
             "total_delay_time": round(self.total_delay_time, 2),
             "avg_delay_time": round(avg_delay, 3),
@@ -176,4 +342,8 @@ class TelegramRateLimiter:
         self.total_requests = 0
         self.total_delays = 0
         self.total_delay_time = 0.0
+        self.evicted_chats = 0
+        self.prepaid_issued = 0
+        self.prepaid_used = 0
+        self.prepaid_expired = 0
         logger.info("Rate limiter статистика сброшена")
@@ -0,0 +1,85 @@
+# modules/read_model_cache.py
+"""
+Кэш разобранных JSON-файлов для веб-панели (модель чтения).
+
+Файл перечитывается, только когда меняется его версия
+(mtime_ns, size, inode); остальные запросы обходятся одним stat().
+"""
+
+import json
+import logging
+from pathlib import Path
+from typing import Any, Callable, Dict, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class ReadModelCache:
+    """
+    Кэш разобранных JSON-файлов для эндпоинтов аналитики.
+
+    Раньше каждый запрос обходил CHATS_DIR и заново разбирал все stats.json
+    и settings.json, а dashboard загружал все файлы вопросов ради их
+    количества. Теперь первый запрос разбирает файлы, а следующие
+    проверяют только stat() и перечитывают изменившиеся. Ключ версии -
+    (mtime_ns, size, inode): атомарная запись через os.replace меняет inode,
+    поэтому перезапись в пределах разрешения mtime тоже замечается.
+
+    Возвращаемые объекты общие для всех запросов - их нельзя изменять.
+    Эндпоинты, которые меняют файлы, читают их напрямую; кэш увидит
+    изменения по новой версии файла.
+    """
+
+    def __init__(self):
+        self._entries: Dict[Tuple[str, str], Tuple[Tuple[int, int, int], Any]] = {}
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+
+    def _get(self, path: Path, kind: str, build: Callable[[Any], Any], default: Any) -> Any:
+        key = (str(path), kind)
+        try:
+            st = path.stat()
+        except OSError:
+            self._entries.pop(key, None)
+            return default
+        version = (st.st_mtime_ns, st.st_size, st.st_ino)
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] == version:
+            self.hits += 1
+            return entry[1]
+
+        self.misses += 1
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                value = build(json.load(f))
+        except (OSError, ValueError) as e:
+            # Поврежденный (или записываемый сейчас) файл: запоминаем версию, чтобы не разбирать его на каждом запросе
+            self.errors += 1
+            logger.warning(f"Не удалось прочитать {path}: {e}")
+            value = default
+        self._entries[key] = (version, value)
+        return value
+
+    def load_json(self, path: Path, default: Any = None) -> Any:
+        """
+        Разобранное содержимое файла или default, если файла нет или он поврежден.
+
+        Возвращается общий для всех вызовов объект из кэша: его нельзя изменять
+        (эндпоинты отдают его в ответ как есть). Для изменения - copy.deepcopy.
+        """
+        return self._get(path, "json", lambda data: data, default)
+
+    def count_items(self, path: Path) -> int:
+        """Количество элементов JSON-файла (сам файл в кэше не хранится)"""
+        return self._get(path, "len", len, 0)
+
+    def get_stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "errors": self.errors,
+            "hit_rate": round(self.hits / total, 3) if total else 0,
+        }
@@ -0,0 +1,261 @@
+# modules/request_scheduler.py
+"""
+Единый планировщик исходящих запросов к Telegram Bot API.
+
+Все вызовы Bot API (опросы, сообщения, редактирование, удаление, фото,
+рассылки админа) проходят через один экземпляр планировщика:
+- per-chat и глобальный бюджеты обеспечивает TelegramRateLimiter;
+- ожидание глобального токена идет по классам приоритета, поэтому всплеск
+  очистки не может задержать опросы ежедневной викторины;
+- число одновременных запросов ограничено;
+- вызывающие получают сигнал backpressure (is_congested) или
+  RequestBackpressureError, если очередь их класса переполнена;
+- глубина очередей и счетчики по классам доступны через get_metrics().
+
+Явные вызовы идут через BotRequestScheduler.call с нужным приоритетом.
+Все остальные (прямые context.bot.*) перехватывает на уровне HTTP
+ScheduledHTTPXRequest, который Application использует как транспорт:
+приоритет и per-chat бюджет определяются по методу Bot API.
+"""
+
+import asyncio
+import logging
+import time
+from contextvars import ContextVar
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple, TypeVar, Union
+
+from telegram.request import HTTPXRequest, RequestData
+
+from modules.rate_limiter import RequestPriority, TelegramRateLimiter
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Лимиты ожидающих запросов для классов, которые можно отложить до следующего запуска
+DEFAULT_MAX_PENDING: Dict[RequestPriority, int] = {
+    RequestPriority.BROADCAST: 1000,
+    RequestPriority.CLEANUP: 300,
+}
+
+
+# Метод выполняется внутри BotRequestScheduler.call: транспорт не планирует его повторно
+_inside_scheduler: ContextVar[bool] = ContextVar("inside_request_scheduler", default=False)
+
+# Длинный опрос держит соединение десятки секунд и не расходует бюджет отправки
+UNSCHEDULED_METHODS = frozenset({"getUpdates"})
+_POLL_METHODS = frozenset({"sendPoll", "stopPoll"})
+_CLEANUP_METHODS = frozenset({"deleteMessage", "deleteMessages"})
+# Методы, создающие сообщения в чате (учитываются в per-chat бюджете)
+_CHAT_MESSAGE_PREFIXES = ("send", "copyMessage", "forwardMessage")
+
+
+def classify_api_method(method: str) -> Tuple[RequestPriority, bool]:
+    """Класс приоритета и учет per-chat бюджета для метода Bot API"""
+    if method in _POLL_METHODS:
+        return RequestPriority.POLL, method == "sendPoll"
+    if method in _CLEANUP_METHODS:
+        return RequestPriority.CLEANUP, False
+    chat_limited = method.startswith(_CHAT_MESSAGE_PREFIXES) and method != "sendChatAction"
+    return RequestPriority.MESSAGE, chat_limited
+
+
+class RequestBackpressureError(Exception):
+    """Очередь класса приоритета переполнена, запрос следует отложить"""
+    pass
+
+
+class BotRequestScheduler:
+    """
+    Планировщик исходящих запросов Bot API.
+
+    Args:
+        max_requests_per_second: Глобальный бюджет запросов в секунду
+        max_requests_per_minute_per_chat: Бюджет сообщений в минуту на чат
+        max_in_flight: Максимум одновременно выполняющихся запросов
+        max_pending: Лимиты ожидающих запросов по классам приоритета
+    """
+
+    def __init__(
+        self,
+        max_requests_per_second: int = 25,  # Консервативное значение (Telegram ~30)
+        max_requests_per_minute_per_chat: int = 18,  # Консервативное значение (Telegram ~20)
+        max_in_flight: int = 20,
+        max_pending: Optional[Dict[RequestPriority, int]] = None
+    ):
+        self.rate_limiter = TelegramRateLimiter(max_requests_per_second, max_requests_per_minute_per_chat)
+        self.max_in_flight = max_in_flight
+        self.max_pending = dict(DEFAULT_MAX_PENDING if max_pending is None else max_pending)
+
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._semaphore_loop: Optional[asyncio.AbstractEventLoop] = None
+
+        self.in_flight = 0
+        self.pending: Dict[RequestPriority, int] = {p: 0 for p in RequestPriority}
+        self.max_pending_seen: Dict[RequestPriority, int] = {p: 0 for p in RequestPriority}
+        self.submitted: Dict[RequestPriority, int] = {p: 0 for p in RequestPriority}
+        self.failed: Dict[RequestPriority, int] = {p: 0 for p in RequestPriority}
+        self.rejected: Dict[RequestPriority, int] = {p: 0 for p in RequestPriority}
+        self.total_wait_time: Dict[RequestPriority, float] = {p: 0.0 for p in RequestPriority}
+        # Вызовы, спланированные транспортом (не через call), по методам Bot API
+        self.transport_routed: Dict[str, int] = {}
+
+    def _get_semaphore(self) -> asyncio.Semaphore:
+        # Семафор привязан к циклу событий; веб-панель и тесты могут запускать несколько циклов
+        loop = asyncio.get_running_loop()
+        if self._semaphore is None or self._semaphore_loop is not loop:
+            self._semaphore = asyncio.Semaphore(self.max_in_flight)
+            self._semaphore_loop = loop
+        return self._semaphore
+
+    def is_congested(self, priority: RequestPriority) -> bool:
+        """
+        Сигнал backpressure: True, если запросы более важных классов ждут
+        глобальный токен или очередь класса заполнена. Фоновые задачи
+        (очистка, рассылки) должны прекращать отправку и доделывать позже.
+        """
+        depth = self.rate_limiter.get_queue_depth()
+        if any(depth[p.name.lower()] for p in RequestPriority if p < priority):
+            return True
+        limit = self.max_pending.get(priority)
+        return limit is not None and self.pending[priority] >= limit
+
+    async def call(
+        self,
+        chat_id: Union[int, str],
+        priority: RequestPriority,
+        func: Callable[..., Awaitable[T]],
+        /,
+        *args: Any,
+        chat_limited: bool = True,
+        use_prepaid_token: bool = False,
+        **kwargs: Any
+    ) -> T:
+        """
+        Выполняет вызов Bot API с учетом бюджетов и приоритета.
+
+        Args:
+            chat_id: ID чата, к которому относится запрос
+            priority: Класс приоритета
+            func: Метод бота (например, bot.send_message)
+            chat_limited: Учитывать ли per-chat бюджет сообщений (удаление не учитывается)
+            use_prepaid_token: Использовать токен чата, оплаченный через prepay_chat_token
+
+        Первые три аргумента только позиционные: chat_id=... передается в func.
+
+        Raises:
+            RequestBackpressureError: Очередь класса переполнена
+        """
+        limit = self.max_pending.get(priority)
+        if limit is not None and self.pending[priority] >= limit:
+            self.rejected[priority] += 1
+            raise RequestBackpressureError(
+                f"Очередь {priority.name} переполнена ({self.pending[priority]}/{limit})"
+            )
+
+        self.submitted[priority] += 1
+        self.pending[priority] += 1
+        if self.pending[priority] > self.max_pending_seen[priority]:
+            self.max_pending_seen[priority] = self.pending[priority]
+        queued_at = time.monotonic()
+        try:
+            await self.rate_limiter.acquire(
+                chat_id, priority, chat_limited=chat_limited, use_prepaid_token=use_prepaid_token
+            )
+            semaphore = self._get_semaphore()
+            await semaphore.acquire()
+        finally:
+            self.pending[priority] -= 1
+            self.total_wait_time[priority] += time.monotonic() - queued_at
+
+        self.in_flight += 1
+        inside_token = _inside_scheduler.set(True)
+        try:
+            return await func(*args, **kwargs)
+        except Exception:
+            self.failed[priority] += 1
+            raise
+        finally:
+            _inside_scheduler.reset(inside_token)
+            self.in_flight -= 1
+            semaphore.release()
+
+    async def prepay_chat_token(self, chat_id: int) -> float:
+        """Заранее выжидает per-chat лимит для следующего запроса в чат"""
+        return await self.rate_limiter.prepay_chat_token(chat_id)
+
+    def release_prepaid_chat_tokens(self, chat_id: int) -> int:
+        """Возвращает неиспользованные оплаченные токены чата"""
+        return self.rate_limiter.release_prepaid_chat_tokens(chat_id)
+
+    async def delete_message(self, bot: Any, chat_id: Union[int, str], message_id: int) -> bool:
+        """Удаление сообщения с приоритетом очистки"""
+        return await self.call(
+            chat_id, RequestPriority.CLEANUP, bot.delete_message,
+            chat_id=chat_id, message_id=message_id, chat_limited=False
+        )
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Метрики планировщика для логов и веб-интерфейса"""
+        by_priority = {}
+        for p in RequestPriority:
+            by_priority[p.name.lower()] = {
+                "pending": self.pending[p],
+                "max_pending_seen": self.max_pending_seen[p],
+                "submitted": self.submitted[p],
+                "failed": self.failed[p],
+                "rejected": self.rejected[p],
+                "avg_wait_time": round(self.total_wait_time[p] / self.submitted[p], 3) if self.submitted[p] else 0,
+            }
+        return {
+            "in_flight": self.in_flight,
+            "max_in_flight": self.max_in_flight,
+            "queue_depth": self.rate_limiter.get_queue_depth(),
+            "priorities": by_priority,
+            "transport_routed": dict(self.transport_routed),
+            "rate_limiter": self.rate_limiter.get_stats(),
+        }
+
+
+class ScheduledHTTPXRequest(HTTPXRequest):
+    """
+    Транспорт Bot API, который пропускает через планировщик каждый запрос,
+    пришедший не через BotRequestScheduler.call.
+
+    Args:
+        scheduler: Планировщик (по умолчанию общий планировщик процесса)
+        *args, **kwargs: Параметры HTTPXRequest (таймауты, размер пула)
+    """
+
+    def __init__(self, *args: Any, scheduler: Optional[BotRequestScheduler] = None, **kwargs: Any):
+        super().__init__(*args, **kwargs)
+        self._scheduler = scheduler
+
+    @property
+    def scheduler(self) -> BotRequestScheduler:
+        return self._scheduler or get_request_scheduler()
+
+    async def post(self, url: str, request_data: Optional[RequestData] = None, **kwargs: Any) -> Any:
+        method = url.rsplit("/", 1)[-1]
+        if _inside_scheduler.get() or method in UNSCHEDULED_METHODS:
+            return await super().post(url, request_data, **kwargs)
+
+        chat_id = request_data.parameters.get("chat_id") if request_data is not None else None
+        priority, chat_limited = classify_api_method(method)
+        scheduler = self.scheduler
+        scheduler.transport_routed[method] = scheduler.transport_routed.get(method, 0) + 1
+        return await scheduler.call(
+            chat_id, priority, super().post, url, request_data,
+            chat_limited=chat_limited and chat_id is not None, **kwargs
+        )
+
+
+_scheduler: Optional[BotRequestScheduler] = None
+
+
+def get_request_scheduler() -> BotRequestScheduler:
+    """Возвращает общий планировщик запросов процесса"""
+    global _scheduler
+    if _scheduler is None:
+        _scheduler = BotRequestScheduler()
+    return _scheduler
@@ -0,0 +1,332 @@
+# modules/retry_policy.py
+"""
+Единая политика повторов для вызовов Telegram Bot API.
+
+- Классификация ошибок: flood control, сетевые/таймауты, недоступный чат,
+  ошибка запроса, прочее.
+- Адаптивная задержка между попытками по наблюдаемой задержке ответов
+  (EWMA, как RTO в TCP): при деградации маршрута паузы растут сами.
+- Circuit breaker на чат и глобальный: пока маршрут до API таймаутит,
+  новые вызовы сразу получают CircuitOpenError вместо очередного ожидания
+  60-секундного read_timeout.
+"""
+
+import asyncio
+import logging
+import random
+import time
+from datetime import timedelta
+from enum import Enum
+from typing import Any, Awaitable, Callable, Dict, Optional, TypeVar, Union
+
+from telegram.error import BadRequest, ChatMigrated, Forbidden, NetworkError, RetryAfter, TimedOut
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class ErrorClass(str, Enum):
+    """Класс ошибки вызова Bot API"""
+    FLOOD = "flood"                  # RetryAfter: ждем указанное время
+    TRANSIENT = "transient"          # Таймаут/сеть: повтор с backoff, учитывается breaker'ами
+    CHAT_UNAVAILABLE = "chat_unavailable"  # Бот заблокирован, чат не найден: не повторяем
+    BAD_REQUEST = "bad_request"      # Ошибка запроса: не повторяем
+    UNKNOWN = "unknown"
+
+
+_CHAT_UNAVAILABLE_MARKERS = ("chat not found", "bot was blocked", "bot was kicked", "user is deactivated", "forbidden")
+
+
+def classify_error(error: BaseException) -> ErrorClass:
+    """Определяет класс ошибки (BadRequest проверяется раньше NetworkError - это его подкласс)"""
+    if isinstance(error, RetryAfter):
+        return ErrorClass.FLOOD
+    if isinstance(error, (Forbidden, ChatMigrated)):
+        return ErrorClass.CHAT_UNAVAILABLE
+    if isinstance(error, BadRequest):
+        message = str(error).lower()
+        if any(marker in message for marker in _CHAT_UNAVAILABLE_MARKERS):
+            return ErrorClass.CHAT_UNAVAILABLE
+        return ErrorClass.BAD_REQUEST
+    if isinstance(error, (TimedOut, NetworkError, asyncio.TimeoutError, ConnectionError)):
+        return ErrorClass.TRANSIENT
+    return ErrorClass.UNKNOWN
+
+
+def retry_after_seconds(error: RetryAfter) -> float:
+    value = error.retry_after
+    return value.total_seconds() if isinstance(value, timedelta) else float(value)
+
+
+class CircuitOpenError(Exception):
+    """Цепь разомкнута: маршрут или чат сейчас недоступен, вызов не выполнялся"""
+
+    def __init__(self, scope: str, retry_in: float):
+        super().__init__(f"Circuit breaker '{scope}' разомкнут, повтор через {retry_in:.1f}с")
+        self.scope = scope
+        self.retry_in = retry_in
+
+
+class CircuitBreaker:
+    """
+    Классический breaker: closed -> open после failure_threshold подряд
+    transient-ошибок, через recovery_timeout - half_open с одним пробным
+    вызовом, успех замыкает цепь, ошибка снова размыкает.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    __slots__ = ("failure_threshold", "recovery_timeout", "state", "failures", "opened_at", "probe_in_flight", "times_opened")
+
+    def __init__(self, failure_threshold: int, recovery_timeout: float):
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.probe_in_flight = False
+        self.times_opened = 0
+
+    def retry_in(self, now: float) -> float:
+        return max(0.0, self.opened_at + self.recovery_timeout - now)
+
+    def allow(self, now: float) -> bool:
+        """Можно ли выполнить вызов сейчас"""
+        if self.state == self.CLOSED:
+            return True
+        if self.state == self.OPEN:
+            if self.retry_in(now) > 0:
+                return False
+            self.state = self.HALF_OPEN
+            self.probe_in_flight = False
+        # HALF_OPEN: пропускаем только один пробный вызов
+        if self.probe_in_flight:
+            return False
+        self.probe_in_flight = True
+        return True
+
+    def record_success(self) -> None:
+        self.state = self.CLOSED
+        self.failures = 0
+        self.probe_in_flight = False
+
+    def record_failure(self, now: float) -> None:
+        self.failures += 1
+        self.probe_in_flight = False
+        if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+            if self.state != self.OPEN:
+                self.times_opened += 1
+            self.state = self.OPEN
+            self.opened_at = now
+
+
+class LatencyEstimator:
+    """Сглаженная задержка ответа и ее разброс (алгоритм Якобсона)"""
+
+    __slots__ = ("srtt", "rttvar")
+
+    def __init__(self):
+        self.srtt: Optional[float] = None
+        self.rttvar = 0.0
+
+    def observe(self, sample: float) -> None:
+        if self.srtt is None:
+            self.srtt = sample
+            self.rttvar = sample / 2
+        else:
+            self.rttvar = 0.75 * self.rttvar + 0.25 * abs(self.srtt - sample)
+            self.srtt = 0.875 * self.srtt + 0.125 * sample
+
+    def timeout_estimate(self) -> float:
+        """Оценка «нормального» времени ответа с запасом"""
+        if self.srtt is None:
+            return 0.0
+        return self.srtt + 4 * self.rttvar
+
+
+class RetryPolicy:
+    """
+    Движок повторов с адаптивным backoff и circuit breaker'ами.
+
+    Args:
+        min_delay: Минимальная пауза между попытками (секунды)
+        max_delay: Максимальная пауза между попытками (секунды)
+        max_flood_wait: Максимальное ожидание по RetryAfter внутри одного вызова
+        global_failure_threshold: Ошибок подряд для размыкания глобальной цепи
+        global_recovery_timeout: Время до пробного вызова после размыкания глобальной цепи
+        chat_failure_threshold: Ошибок подряд для размыкания цепи чата
+        chat_recovery_timeout: Время до пробного вызова в чат
+    """
+
+    def __init__(
+        self,
+        min_delay: float = 0.2,
+        max_delay: float = 15.0,  # Рекомендация для RU→EU
+        max_flood_wait: float = 60.0,
+        global_failure_threshold: int = 6,
+        global_recovery_timeout: float = 30.0,
+        chat_failure_threshold: int = 3,
+        chat_recovery_timeout: float = 60.0
+    ):
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self.max_flood_wait = max_flood_wait
+        self.chat_failure_threshold = chat_failure_threshold
+        self.chat_recovery_timeout = chat_recovery_timeout
+
+        self.global_breaker = CircuitBreaker(global_failure_threshold, global_recovery_timeout)
+        # Храним breaker только для чатов с недавними ошибками
+        self.chat_breakers: Dict[Union[int, str], CircuitBreaker] = {}
+        self.latency = LatencyEstimator()
+
+        self.attempts = 0
+        self.retries = 0
+        self.short_circuited = 0
+        self.errors_by_class: Dict[str, int] = {c.value: 0 for c in ErrorClass}
+
+    def backoff_delay(self, attempt: int) -> float:
+        """
+        Пауза перед повтором: база - наблюдаемая задержка ответа, рост
+        экспоненциальный, jitter ±30% против синхронных повторов
+        """
+        base = max(self.min_delay, self.latency.timeout_estimate())
+        delay = min(self.max_delay, base * (2.0 ** attempt))
+        return max(self.min_delay, delay * random.uniform(0.7, 1.3))
+
+    def _check_breakers(self, chat_id: Optional[Union[int, str]], now: float) -> None:
+        if not self.global_breaker.allow(now):
+            self.short_circuited += 1
+            raise CircuitOpenError("global", self.global_breaker.retry_in(now))
+        breaker = self.chat_breakers.get(chat_id) if chat_id is not None else None
+        if breaker is not None and not breaker.allow(now):
+            # Пробный глобальный вызов не состоялся - освобождаем слот
+            self.global_breaker.probe_in_flight = False
+            self.short_circuited += 1
+            raise CircuitOpenError(f"chat:{chat_id}", breaker.retry_in(now))
+
+    def _record_success(self, chat_id: Optional[Union[int, str]]) -> None:
+        self.global_breaker.record_success()
+        if chat_id is not None:
+            self.chat_breakers.pop(chat_id, None)
+
+    def _release_probe(self, chat_id: Optional[Union[int, str]]) -> None:
+        self.global_breaker.probe_in_flight = False
+        breaker = self.chat_breakers.get(chat_id) if chat_id is not None else None
+        if breaker is not None:
+            breaker.probe_in_flight = False
+
+    def _record_transient_failure(self, chat_id: Optional[Union[int, str]], now: float) -> None:
+        self.global_breaker.record_failure(now)
+        if chat_id is None:
+            return
+        breaker = self.chat_breakers.get(chat_id)
+        if breaker is None:
+            breaker = CircuitBreaker(self.chat_failure_threshold, self.chat_recovery_timeout)
+            self.chat_breakers[chat_id] = breaker
+        breaker.record_failure(now)
+
+    async def execute(
+        self,
+        chat_id: Optional[Union[int, str]],
+        func: Callable[..., Awaitable[T]],
+        /,
+        *args: Any,
+        max_attempts: int = 3,
+        **kwargs: Any
+    ) -> T:
+        """
+        Выполняет вызов с повторами.
+
+        Raises:
+            CircuitOpenError: Цепь разомкнута, вызов не выполнялся
+            Исходное исключение: Ошибка не подлежит повтору или попытки исчерпаны
+        """
+        attempt = 0
+        while True:
+            now = time.monotonic()
+            self._check_breakers(chat_id, now)
+            self.attempts += 1
+            started = time.monotonic()
+            try:
+                result = await func(*args, **kwargs)
+            except asyncio.CancelledError:
+                # Пробный вызов отменен - не блокируем цепь навсегда
+                self._release_probe(chat_id)
+                raise
+            except Exception as e:
+                error_class = classify_error(e)
+                self.errors_by_class[error_class.value] += 1
+                finished = time.monotonic()
+
+                if error_class == ErrorClass.FLOOD:
+                    # Маршрут работает, просто превышен лимит
+                    self._record_success(chat_id)
+                    wait = retry_after_seconds(e)
+                    attempt += 1
+                    if attempt >= max_attempts or wait > self.max_flood_wait:
+                        raise
+                    logger.warning(f"Telegram API просит подождать {wait:.0f} секунд (попытка {attempt}/{max_attempts})")
+                    self.retries += 1
+                    await asyncio.sleep(wait)
+                    continue
+
+                if error_class in (ErrorClass.BAD_REQUEST, ErrorClass.CHAT_UNAVAILABLE):
+                    # Ответ от API получен - маршрут исправен
+                    self.latency.observe(finished - started)
+                    self._record_success(chat_id)
+                    raise
+
+                if error_class == ErrorClass.UNKNOWN:
+                    # Локальная ошибка (сериализация, баг вызывающего): о маршруте
+                    # ничего не известно - ни успех, ни сбой, только освобождаем пробу
+                    self._release_probe(chat_id)
+                    raise
+
+                self.latency.observe(finished - started)
+                self._record_transient_failure(chat_id, finished)
+                attempt += 1
+                if attempt >= max_attempts:
+                    raise
+                delay = self.backoff_delay(attempt - 1)
+                logger.warning(
+                    f"Таймаут/сетевая ошибка (чат {chat_id}), повтор через {delay:.1f}с "
+                    f"(попытка {attempt}/{max_attempts}): {e}"
+                )
+                self.retries += 1
+                await asyncio.sleep(delay)
+                continue
+
+            self.latency.observe(time.monotonic() - started)
+            self._record_success(chat_id)
+            return result
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Статистика для логов и веб-интерфейса"""
+        now = time.monotonic()
+        open_chats = sum(1 for b in self.chat_breakers.values() if b.state != CircuitBreaker.CLOSED and b.retry_in(now) > 0)
+        return {
+            "attempts": self.attempts,
+            "retries": self.retries,
+            "short_circuited": self.short_circuited,
+            "errors_by_class": dict(self.errors_by_class),
+            "latency_srtt": round(self.latency.srtt, 3) if self.latency.srtt is not None else None,
+            "latency_rttvar": round(self.latency.rttvar, 3),
+            "global_breaker": self.global_breaker.state,
+            "global_breaker_opened": self.global_breaker.times_opened,
+            "open_chat_breakers": open_chats,
+            "tracked_chat_breakers": len(self.chat_breakers),
+        }
+
+
+_retry_policy: Optional[RetryPolicy] = None
+
+
+def get_retry_policy() -> RetryPolicy:
+    """Возвращает общую политику повторов процесса"""
+    global _retry_policy
+    if _retry_policy is None:
+        _retry_policy = RetryPolicy()
+    return _retry_policy
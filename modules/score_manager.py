@@ -64,6 +64,7 @@ class ScoreManager:
             user_name_for_state = f"User {user_id_str}"
 
         score_updated_in_global_state = False
+        answer_scored = False
         motivational_message_text: Optional[str] = None
 
         # Обновление очков в активной сессии викторины (QuizState.scores)
@@ -81,6 +82,7 @@ class ScoreManager:
                 else:
                     active_quiz.scores[user_id_str]["score"] -= 0.5  # Отнимаем 0.5 очка за неправильный ответ
                 active_quiz.scores[user_id_str]["answered_this_session"].add(poll_id)
+                self.data_manager.journal_quiz_score(chat_id, user_id_str, active_quiz.scores[user_id_str])
 
         # Обновление очков в глобальной статистике (BotState.user_scores)
         # ИСПРАВЛЕНО: Используем правильную структуру данных
@@ -249,6 +251,7 @@ class ScoreManager:
                 logger.info(f"Пользователь {user_id_str} сбросил серию правильных ответов в чате {chat_id}")
             
             score_updated_in_global_state = True
+            answer_scored = True
             
             # НОВОЕ: Увеличиваем счетчик правильных ответов если ответ правильный
             if is_correct:
@@ -325,6 +328,10 @@ class ScoreManager:
                 score_updated_in_global_state = True  # Сохраняем при обновлении времени
 
         if score_updated_in_global_state:
+            # Представления аналитики веб-панели обновляются по изменению, без обхода чатов
+            self.data_manager.analytics_views.record_user(
+                chat_id, user_id_str, current_user_data_global, is_correct if answer_scored else None
+            )
             # Сохраняем данные для конкретного чата
             self.data_manager.save_user_data(chat_id)
             # Обновляем глобальную статистику
@@ -0,0 +1,204 @@
+# modules/shutdown_coordinator.py
+"""
+Координатор корректной остановки бота.
+
+Раньше при остановке сохранялись только сообщения для удаления, а
+остальное (активные викторины, статистика категорий, измененные
+настройки чатов, очки) зависело от периодических задач и
+последовательного блока finally в main(). SIGTERM, который посылает
+systemd или контейнерная среда, и вовсе завершал процесс без finally.
+
+Каждое хранилище регистрирует хук с приоритетом и дедлайном. По
+сигналу координатор выставляет флаг остановки (главный цикл перестает
+принимать обновления), затем выполняет хуки группами по возрастанию
+приоритета: сначала остановка приема и дообработка ответов, потом
+сброс хранилищ. Хуки одной группы выполняются параллельно, если
+помечены parallel (синхронные - в потоках), остальные по очереди.
+Хук, не уложившийся в дедлайн, или хуки, до которых не дошла очередь
+из-за общего дедлайна, попадают в отчет как несохраненные.
+"""
+
+import asyncio
+import inspect
+import logging
+import signal
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Приоритеты групп хуков
+PRIORITY_STOP_INTAKE = 0
+PRIORITY_DRAIN = 10
+PRIORITY_FLUSH = 100
+PRIORITY_CLOSE = 200
+
+DEFAULT_HOOK_DEADLINE_SECONDS = 5.0
+# Контейнерная среда по умолчанию ждет 10 секунд перед SIGKILL
+DEFAULT_TOTAL_DEADLINE_SECONDS = 8.0
+
+STATUS_OK = "ok"
+STATUS_FAILED = "failed"
+STATUS_TIMEOUT = "timeout"
+STATUS_SKIPPED = "skipped"
+
+
+@dataclass
+class ShutdownHook:
+    """Хук остановки: синхронная функция или корутина без аргументов"""
+    name: str
+    func: Callable[[], Any]
+    priority: int = PRIORITY_FLUSH
+    deadline: float = DEFAULT_HOOK_DEADLINE_SECONDS
+    parallel: bool = True
+
+
+@dataclass
+class HookOutcome:
+    name: str
+    status: str
+    duration: float = 0.0
+    error: Optional[str] = None
+
+
+@dataclass
+class ShutdownReport:
+    reason: Optional[str]
+    outcomes: List[HookOutcome] = field(default_factory=list)
+    duration: float = 0.0
+
+    @property
+    def persisted(self) -> List[str]:
+        return [o.name for o in self.outcomes if o.status == STATUS_OK]
+
+    @property
+    def not_persisted(self) -> List[str]:
+        return [o.name for o in self.outcomes if o.status != STATUS_OK]
+
+
+class ShutdownCoordinator:
+    """
+    Реестр хуков остановки и их выполнение с дедлайнами.
+
+    Args:
+        total_deadline: Общий бюджет времени на все хуки (секунды)
+    """
+
+    def __init__(self, total_deadline: float = DEFAULT_TOTAL_DEADLINE_SECONDS):
+        self.total_deadline = total_deadline
+        self._hooks: Dict[str, ShutdownHook] = {}
+        self._stop_event: Optional[asyncio.Event] = None
+        self.stop_reason: Optional[str] = None
+        self._ran = False
+
+    def register(
+        self, name: str, func: Callable[[], Any], priority: int = PRIORITY_FLUSH,
+        deadline: float = DEFAULT_HOOK_DEADLINE_SECONDS, parallel: bool = True
+    ) -> None:
+        """Регистрирует (или заменяет) хук остановки"""
+        self._hooks[name] = ShutdownHook(name, func, priority, deadline, parallel)
+
+    def unregister(self, name: str) -> None:
+        self._hooks.pop(name, None)
+
+    def is_registered(self, name: str) -> bool:
+        return name in self._hooks
+
+    def _get_stop_event(self) -> asyncio.Event:
+        if self._stop_event is None:
+            self._stop_event = asyncio.Event()
+        return self._stop_event
+
+    @property
+    def stop_requested(self) -> bool:
+        return self.stop_reason is not None
+
+    def request_stop(self, reason: str) -> None:
+        """Запрашивает остановку: главный цикл перестает ждать и переходит к хукам"""
+        if self.stop_reason is None:
+            self.stop_reason = reason
+            logger.info(f"🛑 Запрошена остановка бота: {reason}")
+        self._get_stop_event().set()
+
+    async def wait(self, timeout: Optional[float] = None) -> bool:
+        """Ждет запроса остановки; True, если остановка запрошена"""
+        try:
+            await asyncio.wait_for(self._get_stop_event().wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        return self.stop_requested
+
+    def install_signal_handlers(self) -> None:
+        """SIGTERM и SIGINT запрашивают остановку вместо немедленного завершения процесса"""
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGTERM, signal.SIGINT):
+            try:
+                loop.add_signal_handler(sig, self.request_stop, sig.name)
+            except (NotImplementedError, RuntimeError):
+                # Windows и не главный поток: остается обработка KeyboardInterrupt
+                logger.debug(f"Обработчик {sig.name} не установлен")
+
+    async def _run_hook(self, hook: ShutdownHook, deadline: float) -> HookOutcome:
+        started = time.monotonic()
+        try:
+            if inspect.iscoroutinefunction(hook.func):
+                await asyncio.wait_for(hook.func(), deadline)
+            else:
+                await asyncio.wait_for(asyncio.to_thread(hook.func), deadline)
+            status, error = STATUS_OK, None
+        except asyncio.TimeoutError:
+            status, error = STATUS_TIMEOUT, f"не уложился в {deadline:.1f} сек"
+        except Exception as e:
+            status, error = STATUS_FAILED, str(e)
+            logger.error(f"Ошибка хука остановки '{hook.name}': {e}", exc_info=True)
+        return HookOutcome(hook.name, status, round(time.monotonic() - started, 3), error)
+
+    async def run(self) -> ShutdownReport:
+        """Выполняет хуки по группам приоритета и логирует, что сохранено, а что нет"""
+        report = ShutdownReport(self.stop_reason)
+        if self._ran:
+            return report
+        self._ran = True
+        started = time.monotonic()
+
+        for priority in sorted({hook.priority for hook in self._hooks.values()}):
+            group = [hook for hook in self._hooks.values() if hook.priority == priority]
+            left = self.total_deadline - (time.monotonic() - started)
+            if left <= 0:
+                report.outcomes.extend(HookOutcome(hook.name, STATUS_SKIPPED, error="исчерпан общий дедлайн") for hook in group)
+                continue
+            parallel = [hook for hook in group if hook.parallel]
+            if parallel:
+                report.outcomes.extend(await asyncio.gather(
+                    *(self._run_hook(hook, min(hook.deadline, left)) for hook in parallel)
+                ))
+            for hook in group:
+                if hook.parallel:
+                    continue
+                left = self.total_deadline - (time.monotonic() - started)
+                if left <= 0:
+                    report.outcomes.append(HookOutcome(hook.name, STATUS_SKIPPED, error="исчерпан общий дедлайн"))
+                    continue
+                report.outcomes.append(await self._run_hook(hook, min(hook.deadline, left)))
+
+        report.duration = round(time.monotonic() - started, 3)
+        self._log_report(report)
+        return report
+
+    def _log_report(self, report: ShutdownReport) -> None:
+        logger.info(f"💾 Остановка за {report.duration} сек. Выполнено: {', '.join(report.persisted) or 'ничего'}")
+        for outcome in report.outcomes:
+            if outcome.status != STATUS_OK:
+                logger.error(f"❌ Не выполнено при остановке (данные могут быть не сохранены): {outcome.name} ({outcome.status}: {outcome.error})")
+
+
+_coordinator: Optional[ShutdownCoordinator] = None
+
+
+def get_shutdown_coordinator() -> ShutdownCoordinator:
+    """Возвращает координатор остановки процесса"""
+    global _coordinator
+    if _coordinator is None:
+        _coordinator = ShutdownCoordinator()
+    return _coordinator
@@ -0,0 +1,143 @@
+# modules/telegram_file_cache.py
+"""
+Кэш file_id Telegram для локальных файлов (изображения фото-викторины).
+
+После первой загрузки файла Telegram возвращает file_id, по которому
+тот же файл можно отправлять повторно без передачи байтов. Ключ кэша -
+хеш содержимого файла, поэтому переименование файла не сбрасывает кэш,
+а замена содержимого приводит к новой загрузке. Хеш файла вычисляется
+один раз для пары (размер, mtime). file_id действителен только для
+бота, который загрузил файл, поэтому кэш привязан к ID бота.
+"""
+
+import hashlib
+import json
+import logging
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+from modules.atomic_io import write_json_atomic
+
+logger = logging.getLogger(__name__)
+
+# Признаки ошибки BadRequest, при которой сохраненный file_id больше не принимается
+_STALE_FILE_ID_MARKERS = (
+    "wrong file identifier",
+    "wrong remote file",
+    "file reference",
+    "file_id",
+    "failed to get http url content",
+    "wrong type of the web page content",
+)
+
+
+def is_stale_file_id_error(error: BaseException) -> bool:
+    """Ошибка означает, что file_id нужно забыть и загрузить файл заново"""
+    message = str(error).lower()
+    return any(marker in message for marker in _STALE_FILE_ID_MARKERS)
+
+
+def file_content_hash(path: Path) -> str:
+    """Хеш содержимого файла (blake2b, 128 бит)"""
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 16), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class TelegramFileIdCache:
+    """
+    Постоянный кэш: хеш содержимого файла -> file_id.
+
+    Args:
+        cache_file: JSON-файл кэша
+    """
+
+    def __init__(self, cache_file: Path):
+        self.cache_file = Path(cache_file)
+        self.bot_id: Optional[int] = None
+        self.entries: Dict[str, Dict[str, Any]] = {}
+        # path -> (size, mtime_ns, hash): не перечитываем неизмененные файлы
+        self._hash_memo: Dict[str, Tuple[int, int, str]] = {}
+
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self._load()
+
+    def _load(self) -> None:
+        if not self.cache_file.exists():
+            return
+        try:
+            with open(self.cache_file, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            self.bot_id = data.get("bot_id")
+            self.entries = data.get("files", {})
+            logger.info(f"Загружен кэш file_id: {len(self.entries)} файлов")
+        except Exception as e:
+            logger.warning(f"Не удалось загрузить кэш file_id {self.cache_file}: {e}. Файлы будут загружены заново.")
+            self.entries = {}
+
+    def _save(self) -> None:
+        try:
+            write_json_atomic(self.cache_file, {"bot_id": self.bot_id, "files": self.entries})
+        except Exception as e:
+            logger.error(f"Ошибка сохранения кэша file_id: {e}")
+
+    def _bind_bot(self, bot_id: Optional[int]) -> None:
+        """file_id другого бота недействителен - сбрасываем кэш при смене токена"""
+        if bot_id is None or bot_id == self.bot_id:
+            return
+        if self.entries:
+            logger.info(f"Кэш file_id создан для бота {self.bot_id}, текущий бот {bot_id}: кэш сброшен")
+        self.bot_id = bot_id
+        self.entries = {}
+
+    def content_hash(self, path: Path) -> str:
+        stat = path.stat()
+        key = str(path)
+        memo = self._hash_memo.get(key)
+        if memo and memo[0] == stat.st_size and memo[1] == stat.st_mtime_ns:
+            return memo[2]
+        content_hash = file_content_hash(path)
+        self._hash_memo[key] = (stat.st_size, stat.st_mtime_ns, content_hash)
+        return content_hash
+
+    def get(self, path: Path, bot_id: Optional[int] = None) -> Optional[str]:
+        """file_id для файла или None, если файл еще не загружался"""
+        self._bind_bot(bot_id)
+        entry = self.entries.get(self.content_hash(Path(path)))
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return entry.get("file_id")
+
+    def put(self, path: Path, file_id: str, bot_id: Optional[int] = None, file_unique_id: Optional[str] = None) -> None:
+        """Запоминает file_id после загрузки файла"""
+        self._bind_bot(bot_id)
+        path = Path(path)
+        self.entries[self.content_hash(path)] = {
+            "file_id": file_id,
+            "file_unique_id": file_unique_id,
+            "name": path.name,
+            "uploaded_at": time.time(),
+        }
+        self._save()
+
+    def invalidate(self, path: Path) -> None:
+        """Забывает file_id файла (Telegram его отклонил)"""
+        if self.entries.pop(self.content_hash(Path(path)), None) is not None:
+            self.invalidations += 1
+            self._save()
+
+    def get_stats(self) -> Dict[str, int]:
+        """Статистика для логов и веб-интерфейса"""
+        return {
+            "cached_files": len(self.entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "invalidations": self.invalidations,
+        }
@@ -9,7 +9,6 @@
 """
 
 import logging
-import asyncio
 from functools import wraps
 from typing import Optional, Union, List, Callable, Any
 from telegram import Bot, Message, Update
@@ -19,6 +18,10 @@ from telegram.error import (
 )
 from telegram.constants import ParseMode
 
+from modules.rate_limiter import RequestPriority
+from modules.request_scheduler import get_request_scheduler
+from modules.retry_policy import CircuitOpenError, get_retry_policy
+
 logger = logging.getLogger(__name__)
 
 class TelegramMessageError(Exception):
@@ -37,103 +40,89 @@ class ChatNotFoundError(TelegramMessageError):
     """Чат не найден"""
     pass
 
-def safe_telegram_call(
-    max_retries: int = 1,  # Уменьшено с 2 до 1 (всего 2 попытки) - сеть работает быстро
-    base_delay: float = 0.1,  # Уменьшено с 0.2 - быстрый retry
-    max_delay: float = 0.5,  # Уменьшено с 1.0 - быстрый retry
-    exponential_base: float = 1.5  # База для экспоненциального backoff
-):
+def safe_telegram_call(max_retries: int = 1):
     """
-    Декоратор для безопасного вызова Telegram API с retry
+    Декоратор для безопасного вызова Telegram API с retry.
+    Повторы, backoff и circuit breaker'ы берутся из общей политики
+    (modules/retry_policy.py), чтобы все вызовы учитывали состояние маршрута.
     
     Args:
-        max_retries: Максимальное количество попыток
-        base_delay: Базовая задержка между попытками (секунды)
-        max_delay: Максимальная задержка между попытками (секунды)
-        exponential_base: База для экспоненциального backoff
+        max_retries: Максимальное количество повторов после первой попытки
     """
     def decorator(func: Callable) -> Callable:
         @wraps(func)
         async def wrapper(*args, **kwargs) -> Any:
-            last_exception = None
-            
-            for attempt in range(max_retries + 1):
-                try:
-                    return await func(*args, **kwargs)
+            chat_id = kwargs.get("chat_id", args[1] if len(args) > 1 else None)
+            try:
+                return await get_retry_policy().execute(
+                    chat_id, func, *args, max_attempts=max_retries + 1, **kwargs
+                )
+
+            except CircuitOpenError as e:
+                logger.warning(f"Вызов {func.__name__} пропущен: {e}")
+                raise TelegramMessageError(str(e))
+
+            except RetryAfter as e:
+                logger.error(f"Flood control не снят после {max_retries + 1} попыток: {e}")
+                raise TelegramMessageError(f"Операция не удалась после {max_retries + 1} попыток. Последняя ошибка: {e}")
+
+            except BadRequest as e:
+                # Ошибки запроса - не повторяем
+                error_message = str(e).lower()
+                
+                if "message to edit not found" in error_message:
+                    logger.warning(f"Сообщение для редактирования не найдено: {e}")
+                    raise TelegramMessageError("Сообщение для редактирования не найдено")
                     
-                except RetryAfter as e:
-                    # Telegram просит подождать
-                    wait_time = e.retry_after
-                    logger.warning(f"Telegram API просит подождать {wait_time} секунд (попытка {attempt + 1}/{max_retries + 1})")
-                    await asyncio.sleep(wait_time)
-                    last_exception = e
+                elif "message can't be deleted" in error_message:
+                    logger.warning(f"Сообщение не может быть удалено: {e}")
+                    raise TelegramMessageError("Сообщение не может быть удалено")
                     
-                except (NetworkError, TimedOut) as e:
-                    # Сетевые ошибки - пробуем снова
-                    if attempt < max_retries:
-                        delay = min(base_delay * (exponential_base ** attempt), max_delay)
-                        logger.warning(f"Сетевая ошибка, повтор через {delay:.1f}с (попытка {attempt + 1}/{max_retries + 1}): {e}")
-                        await asyncio.sleep(delay)
-                        last_exception = e
-                    else:
-                        logger.error(f"Исчерпаны попытки после сетевых ошибок: {e}")
-                        raise TelegramMessageError(f"Не удалось выполнить операцию после {max_retries + 1} попыток: {e}")
-                        
-                except TelegramError as e:
-                    # Общие ошибки Telegram API
-                    if "unauthorized" in str(e).lower() or "bot was blocked" in str(e).lower():
-                        logger.error(f"Бот не авторизован или заблокирован: {e}")
-                        raise TelegramMessageError(f"Проблема с авторизацией бота: {e}")
-                    else:
-                        logger.error(f"Ошибка Telegram API: {e}")
-                        raise TelegramMessageError(f"Ошибка Telegram API: {e}")
+                elif "chat not found" in error_message:
+                    logger.warning(f"Чат не найден: {e}")
+                    raise ChatNotFoundError(f"Чат не найден: {e}")
                     
-                except BadRequest as e:
-                    # Ошибки запроса - не повторяем
-                    error_message = str(e).lower()
+                elif "bot was blocked by the user" in error_message:
+                    logger.info(f"Пользователь заблокировал бота: {e}")
+                    raise UserBlockedError(f"Пользователь заблокировал бота: {e}")
                     
-                    if "message to edit not found" in error_message:
-                        logger.warning(f"Сообщение для редактирования не найдено: {e}")
-                        raise TelegramMessageError("Сообщение для редактирования не найдено")
-                        
-                    elif "message can't be deleted" in error_message:
-                        logger.warning(f"Сообщение не может быть удалено: {e}")
-                        raise TelegramMessageError("Сообщение не может быть удалено")
-                        
-                    elif "chat not found" in error_message:
-                        logger.warning(f"Чат не найден: {e}")
-                        raise ChatNotFoundError(f"Чат не найден: {e}")
-                        
-                    elif "bot was blocked by the user" in error_message:
-                        logger.info(f"Пользователь заблокировал бота: {e}")
-                        raise UserBlockedError(f"Пользователь заблокировал бота: {e}")
-                        
-                    elif "message is too long" in error_message:
-                        logger.warning(f"Сообщение слишком длинное: {e}")
-                        raise MessageTooLongError(f"Сообщение слишком длинное для Telegram")
-                        
-                    else:
-                        logger.error(f"Ошибка запроса Telegram API: {e}")
-                        raise TelegramMessageError(f"Ошибка запроса: {e}")
-                        
-                except Exception as e:
-                    # Неожиданные ошибки
-                    logger.error(f"Неожиданная ошибка при вызове {func.__name__}: {e}", exc_info=True)
-                    raise TelegramMessageError(f"Неожиданная ошибка: {e}")
-            
-            # Если дошли до сюда, значит все попытки исчерпаны
-            if last_exception:
-                raise TelegramMessageError(f"Операция не удалась после {max_retries + 1} попыток. Последняя ошибка: {last_exception}")
+                elif "message is too long" in error_message:
+                    logger.warning(f"Сообщение слишком длинное: {e}")
+                    raise MessageTooLongError(f"Сообщение слишком длинное для Telegram")
+                    
+                else:
+                    logger.error(f"Ошибка запроса Telegram API: {e}")
+                    raise TelegramMessageError(f"Ошибка запроса: {e}")
+
+            except (NetworkError, TimedOut) as e:
+                # Сетевые ошибки - попытки исчерпаны
+                logger.error(f"Исчерпаны попытки после сетевых ошибок: {e}")
+                raise TelegramMessageError(f"Не удалось выполнить операцию после {max_retries + 1} попыток: {e}")
+                    
+            except TelegramError as e:
+                # Общие ошибки Telegram API
+                if "unauthorized" in str(e).lower() or "bot was blocked" in str(e).lower():
+                    logger.error(f"Бот не авторизован или заблокирован: {e}")
+                    raise TelegramMessageError(f"Проблема с авторизацией бота: {e}")
+                else:
+                    logger.error(f"Ошибка Telegram API: {e}")
+                    raise TelegramMessageError(f"Ошибка Telegram API: {e}")
+                    
+            except Exception as e:
+                # Неожиданные ошибки
+                logger.error(f"Неожиданная ошибка при вызове {func.__name__}: {e}", exc_info=True)
+                raise TelegramMessageError(f"Неожиданная ошибка: {e}")
             
         return wrapper
     return decorator
 
-@safe_telegram_call(max_retries=2, base_delay=0.1)
+@safe_telegram_call(max_retries=2)
 async def safe_send_message(
     bot: Bot,
     chat_id: Union[int, str],
     text: str,
     parse_mode: Optional[ParseMode] = None,
+    priority: RequestPriority = RequestPriority.MESSAGE,
     **kwargs
 ) -> Message:
     """
@@ -144,6 +133,7 @@ async def safe_send_message(
         chat_id: ID чата
         text: Текст сообщения
         parse_mode: Режим парсинга (Markdown, HTML)
+        priority: Класс приоритета в планировщике запросов
         **kwargs: Дополнительные параметры для send_message
         
     Returns:
@@ -155,10 +145,12 @@ async def safe_send_message(
     """
     # Максимальная длина сообщения для Telegram
     MAX_MESSAGE_LENGTH = 4096
+    scheduler = get_request_scheduler()
     
     if len(text) <= MAX_MESSAGE_LENGTH:
         # Сообщение нормальной длины
-        return await bot.send_message(
+        return await scheduler.call(
+            chat_id, priority, bot.send_message,
             chat_id=chat_id,
             text=text,
             parse_mode=parse_mode,
@@ -192,7 +184,8 @@ async def safe_send_message(
             part = part[:MAX_MESSAGE_LENGTH - 3] + "..."
             logger.warning(f"Часть {i+1} обрезана до {MAX_MESSAGE_LENGTH} символов")
         
-        message = await bot.send_message(
+        message = await scheduler.call(
+            chat_id, priority, bot.send_message,
             chat_id=chat_id,
             text=part,
             parse_mode=parse_mode,
@@ -209,13 +202,14 @@ async def safe_send_message(
     # Возвращаем первое сообщение (для совместимости)
     return messages[0]
 
-@safe_telegram_call(max_retries=1, base_delay=0.1)
+@safe_telegram_call(max_retries=1)
 async def safe_edit_message(
     bot: Bot,
     chat_id: Union[int, str],
     message_id: int,
     text: str,
     parse_mode: Optional[ParseMode] = None,
+    priority: RequestPriority = RequestPriority.MESSAGE,
     **kwargs
 ) -> Message:
     """
@@ -227,12 +221,15 @@ async def safe_edit_message(
         message_id: ID сообщения для редактирования
         text: Новый текст
         parse_mode: Режим парсинга
+        priority: Класс приоритета в планировщике запросов
         **kwargs: Дополнительные параметры
         
     Returns:
         Message: Отредактированное сообщение
     """
-    return await bot.edit_message_text(
+    return await get_request_scheduler().call(
+        chat_id, priority, bot.edit_message_text,
+        chat_limited=False,
         chat_id=chat_id,
         message_id=message_id,
         text=text,
@@ -240,7 +237,7 @@ async def safe_edit_message(
         **kwargs
     )
 
-@safe_telegram_call(max_retries=1, base_delay=0.1)
+@safe_telegram_call(max_retries=1)
 async def safe_delete_message(
     bot: Bot,
     chat_id: Union[int, str],
@@ -258,7 +255,7 @@ async def safe_delete_message(
         bool: True если сообщение удалено, False если не найдено
     """
     try:
-        await bot.delete_message(chat_id=chat_id, message_id=message_id)
+        await get_request_scheduler().delete_message(bot, chat_id, message_id)
         return True
     except BadRequest as e:
         if "message to delete not found" in str(e).lower():
@@ -0,0 +1,286 @@
+# modules/webhook_server.py
+"""
+Прием обновлений Telegram через webhook на встроенном ASGI-сервере.
+
+Вместо long polling Telegram сам отправляет обновления POST-запросом
+на публичный URL (обычно через reverse proxy рядом с веб-панелью).
+WebhookIngress - минимальное ASGI-приложение:
+- проверяет заголовок X-Telegram-Bot-Api-Secret-Token;
+- кладет обновление в ограниченную очередь (очередь обновлений
+  Application); при переполнении отвечает 503, и Telegram повторит
+  доставку позже, вместо неограниченного роста памяти;
+- отдает состояние очереди и счетчики на маршруте здоровья.
+
+WebhookServer запускает приложение в uvicorn внутри цикла событий бота.
+Обработчики сигналов uvicorn не устанавливаются: остановкой управляет бот.
+"""
+
+import asyncio
+import hmac
+import json
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+SECRET_TOKEN_HEADER = b"x-telegram-bot-api-secret-token"
+
+DEFAULT_WEBHOOK_PATH = "/telegram/webhook"
+DEFAULT_HEALTH_PATH = "/healthz"
+# Telegram не присылает обновления больше нескольких сотен КБ
+DEFAULT_MAX_BODY_BYTES = 1 << 20
+# Доля заполнения очереди, после которой маршрут здоровья сообщает "degraded"
+DEGRADED_QUEUE_RATIO = 0.9
+
+ASGIReceive = Callable[[], Awaitable[Dict[str, Any]]]
+ASGISend = Callable[[Dict[str, Any]], Awaitable[None]]
+
+
+class WebhookIngress:
+    """
+    ASGI-приложение приема обновлений.
+
+    Args:
+        update_queue: Ограниченная очередь (asyncio.Queue с maxsize)
+        decode: Преобразование JSON обновления в объект для очереди (Update.de_json)
+        secret_token: Ожидаемое значение заголовка секрета
+        webhook_path: Путь приема обновлений
+        health_path: Путь проверки состояния
+        max_body_bytes: Максимальный размер тела запроса
+    """
+
+    def __init__(
+        self,
+        update_queue: "asyncio.Queue[Any]",
+        decode: Callable[[Dict[str, Any]], Any],
+        secret_token: str,
+        webhook_path: str = DEFAULT_WEBHOOK_PATH,
+        health_path: str = DEFAULT_HEALTH_PATH,
+        max_body_bytes: int = DEFAULT_MAX_BODY_BYTES
+    ):
+        if not secret_token:
+            raise ValueError("Для webhook требуется секретный токен")
+        self.update_queue = update_queue
+        self.decode = decode
+        self._secret = secret_token.encode("utf-8")
+        self.webhook_path = webhook_path
+        self.health_path = health_path
+        self.max_body_bytes = max_body_bytes
+
+        self.accepted = 0
+        self.rejected_auth = 0
+        self.rejected_full = 0
+        self.rejected_invalid = 0
+        self.last_update_at: Optional[float] = None
+
+    async def __call__(self, scope: Dict[str, Any], receive: ASGIReceive, send: ASGISend) -> None:
+        if scope["type"] == "lifespan":
+            await self._lifespan(receive, send)
+            return
+        if scope["type"] != "http":
+            return
+
+        path = scope.get("path", "")
+        method = scope.get("method", "GET")
+
+        if path == self.health_path:
+            if method not in ("GET", "HEAD"):
+                await _respond(send, 405, b"method not allowed")
+                return
+            health = self.get_health()
+            status = 200 if health["status"] != "full" else 503
+            await _respond_json(send, status, health, include_body=method == "GET")
+            return
+
+        if path != self.webhook_path:
+            await _respond(send, 404, b"not found")
+            return
+        if method != "POST":
+            await _respond(send, 405, b"method not allowed")
+            return
+
+        headers = dict(scope.get("headers") or [])
+        if not hmac.compare_digest(headers.get(SECRET_TOKEN_HEADER, b""), self._secret):
+            self.rejected_auth += 1
+            logger.warning(f"Webhook: запрос с неверным секретом от {_client_address(scope)} отклонен")
+            await _respond(send, 403, b"forbidden")
+            return
+
+        content_length = headers.get(b"content-length")
+        if content_length is not None and content_length.isdigit() and int(content_length) > self.max_body_bytes:
+            self.rejected_invalid += 1
+            await _respond(send, 413, b"payload too large")
+            return
+
+        body = await self._read_body(receive)
+        if body is None:
+            self.rejected_invalid += 1
+            await _respond(send, 413, b"payload too large")
+            return
+
+        try:
+            update = self.decode(json.loads(body))
+        except Exception as e:
+            self.rejected_invalid += 1
+            logger.warning(f"Webhook: некорректное обновление отклонено: {e}")
+            await _respond(send, 400, b"bad request")
+            return
+
+        try:
+            self.update_queue.put_nowait(update)
+        except asyncio.QueueFull:
+            # Telegram повторит доставку: обновление не теряется
+            self.rejected_full += 1
+            logger.warning(f"Webhook: очередь обновлений заполнена ({self.update_queue.qsize()}), ответ 503")
+            await _respond(send, 503, b"busy", extra_headers=[(b"retry-after", b"1")])
+            return
+
+        self.accepted += 1
+        self.last_update_at = time.time()
+        await _respond(send, 200, b"ok")
+
+    async def _read_body(self, receive: ASGIReceive) -> Optional[bytes]:
+        chunks: List[bytes] = []
+        size = 0
+        while True:
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                break
+            chunk = message.get("body", b"")
+            size += len(chunk)
+            if size > self.max_body_bytes:
+                return None
+            chunks.append(chunk)
+            if not message.get("more_body", False):
+                break
+        return b"".join(chunks)
+
+    async def _lifespan(self, receive: ASGIReceive, send: ASGISend) -> None:
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    def get_health(self) -> Dict[str, Any]:
+        """Состояние приема обновлений для маршрута здоровья и логов"""
+        depth = self.update_queue.qsize()
+        capacity = self.update_queue.maxsize
+        if capacity and depth >= capacity:
+            status = "full"
+        elif capacity and depth >= capacity * DEGRADED_QUEUE_RATIO:
+            status = "degraded"
+        else:
+            status = "ok"
+        return {
+            "status": status,
+            "queue_depth": depth,
+            "queue_capacity": capacity,
+            "accepted": self.accepted,
+            "rejected_auth": self.rejected_auth,
+            "rejected_full": self.rejected_full,
+            "rejected_invalid": self.rejected_invalid,
+            "last_update_at": self.last_update_at,
+        }
+
+
+def _client_address(scope: Dict[str, Any]) -> str:
+    client = scope.get("client")
+    return f"{client[0]}:{client[1]}" if client else "неизвестного адреса"
+
+
+async def _respond(
+    send: ASGISend, status: int, body: bytes,
+    content_type: bytes = b"text/plain; charset=utf-8",
+    extra_headers: Optional[List[Tuple[bytes, bytes]]] = None,
+    include_body: bool = True
+) -> None:
+    headers = [(b"content-type", content_type), (b"content-length", str(len(body)).encode())]
+    headers.extend(extra_headers or [])
+    await send({"type": "http.response.start", "status": status, "headers": headers})
+    await send({"type": "http.response.body", "body": body if include_body else b""})
+
+
+async def _respond_json(send: ASGISend, status: int, data: Dict[str, Any], include_body: bool = True) -> None:
+    body = json.dumps(data, ensure_ascii=False).encode("utf-8")
+    await _respond(send, status, body, content_type=b"application/json", include_body=include_body)
+
+
+class WebhookServer:
+    """
+    Встроенный uvicorn-сервер для WebhookIngress.
+
+    Args:
+        app: ASGI-приложение
+        host: Адрес прослушивания (за reverse proxy - 127.0.0.1)
+        port: Порт
+    """
+
+    STARTUP_TIMEOUT_SECONDS = 10.0
+
+    def __init__(self, app: WebhookIngress, host: str = "127.0.0.1", port: int = 8081):
+        self.app = app
+        self.host = host
+        self.port = port
+        self._server: Any = None
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def _create_server(self) -> Any:
+        # uvicorn нужен только в режиме webhook
+        import uvicorn
+
+        class _EmbeddedServer(uvicorn.Server):
+            def capture_signals(self):
+                # Сигналы обрабатывает бот, а не сервер
+                import contextlib
+                return contextlib.nullcontext()
+
+        config = uvicorn.Config(
+            self.app, host=self.host, port=self.port,
+            lifespan="off", ws="none", access_log=False, log_level="warning",
+            proxy_headers=True
+        )
+        return _EmbeddedServer(config)
+
+    async def _serve(self) -> None:
+        try:
+            await self._server.serve()
+        except SystemExit as e:
+            # uvicorn вызывает sys.exit, если не может занять порт
+            raise RuntimeError(f"Webhook-сервер не запустился на {self.host}:{self.port} (код {e.code})") from None
+
+    async def start(self) -> None:
+        """Запускает сервер и ждет, пока он начнет принимать соединения"""
+        self._server = self._create_server()
+        self._task = asyncio.create_task(self._serve())
+        deadline = time.monotonic() + self.STARTUP_TIMEOUT_SECONDS
+        while not self._server.started:
+            if self._task.done():
+                self._task.result()
+                raise RuntimeError(f"Webhook-сервер не запустился на {self.host}:{self.port}")
+            if time.monotonic() > deadline:
+                raise RuntimeError(f"Webhook-сервер не запустился за {self.STARTUP_TIMEOUT_SECONDS} сек")
+            await asyncio.sleep(0.05)
+        if self.port == 0 and self._server.servers:
+            # Порт 0 - выбранный системой порт (тесты)
+            self.port = self._server.servers[0].sockets[0].getsockname()[1]
+        logger.info(f"🌐 Webhook-сервер слушает {self.host}:{self.port} (путь {self.app.webhook_path}, здоровье {self.app.health_path})")
+
+    async def stop(self) -> None:
+        """Останавливает сервер, дожидаясь завершения текущих запросов"""
+        if self._server is None or self._task is None:
+            return
+        self._server.should_exit = True
+        try:
+            await asyncio.wait_for(self._task, timeout=self.STARTUP_TIMEOUT_SECONDS)
+        except asyncio.TimeoutError:
+            self._server.force_exit = True
+            await self._task
+        logger.info(f"Webhook-сервер остановлен. Статистика: {self.app.get_health()}")
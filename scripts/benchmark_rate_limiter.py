@@ -0,0 +1,43 @@
+#!/usr/bin/env python3
+"""
+Микро-бенчмарк TelegramRateLimiter.acquire
+Измеряет стоимость одного вызова при разном количестве чатов (до 10k),
+лимиты выставлены так, чтобы ожиданий не было и измерялись только накладные расходы
+"""
+
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from modules.rate_limiter import RequestPriority, TelegramRateLimiter
+
+
+async def measure(num_chats: int, calls: int) -> float:
+    """Возвращает среднюю стоимость acquire в микросекундах"""
+    limiter = TelegramRateLimiter(max_requests_per_second=10**9, max_requests_per_minute_per_chat=10**9)
+    # Прогрев: все чаты уже отслеживаются
+    for chat_id in range(num_chats):
+        await limiter.acquire(chat_id)
+
+    priorities = list(RequestPriority)
+    started = time.perf_counter()
+    for i in range(calls):
+        await limiter.acquire(i % num_chats, priorities[i % len(priorities)])
+    elapsed = time.perf_counter() - started
+    return elapsed / calls * 1_000_000
+
+
+async def main():
+    calls = 200_000
+    print(f"{'чатов':>8} | {'мкс/acquire':>12}")
+    print("-" * 23)
+    for num_chats in (10, 100, 1_000, 10_000):
+        cost = await measure(num_chats, calls)
+        print(f"{num_chats:>8} | {cost:>12.3f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -24,6 +24,12 @@ except ImportError:
     print("   pip install --break-system-packages Pillow")
     sys.exit(1)
 
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from modules.photo_variants import (
+    DEFAULT_MAX_SIDE, DEFAULT_MIN_QUALITY, DEFAULT_QUALITY, DEFAULT_TARGET_BYTES, VARIANTS_DIR, PhotoVariantBuilder
+)
+
 # Настройка логирования
 logging.basicConfig(level=logging.INFO, format='%(levelname)s: %(message)s')
 logger = logging.getLogger(__name__)
@@ -239,12 +245,53 @@ def add_metadata_for_existing_webp(source_dir="data/images"):
     
     logger.info(f"📝 Добавлено метаданных: {added_metadata} записей")
 
+def build_photo_variants(source_dir="data/images", max_side=DEFAULT_MAX_SIDE, quality=DEFAULT_QUALITY, workers=0,
+                         target_bytes=DEFAULT_TARGET_BYTES, min_quality=DEFAULT_MIN_QUALITY):
+    """
+    Создает оптимизированные варианты WebP для отправки в Telegram
+    (длинная сторона не больше max_side) и обновляет манифест.
+    Неизмененные изображения пропускаются по хешу содержимого.
+
+    Args:
+        source_dir: Папка с исходными WebP
+        max_side: Максимальный размер длинной стороны (px)
+        quality: Начальное качество WebP (1-100)
+        workers: Количество процессов (0 - по числу CPU)
+        target_bytes: Желаемый размер варианта; качество снижается до min_quality, пока вариант больше
+        min_quality: Минимальное качество при подборе
+    """
+    images_dir = Path(source_dir)
+    if not images_dir.exists():
+        logger.error(f"Папка {source_dir} не найдена!")
+        return
+
+    webp_files = [f for f in images_dir.iterdir() if f.is_file() and f.suffix.lower() == '.webp']
+    logger.info(
+        f"Подготовка вариантов для {len(webp_files)} изображений в {VARIANTS_DIR} "
+        f"(макс. {max_side}px, качество {min_quality}-{quality}, цель {target_bytes // 1024} КБ)"
+    )
+
+    summary = PhotoVariantBuilder(
+        max_side=max_side, quality=quality, workers=workers, target_bytes=target_bytes, min_quality=min_quality
+    ).build(webp_files)
+
+    logger.info(
+        f"🖼️ Создано вариантов: {summary['built']}, без изменений: {summary['skipped']}, ошибок: {summary['failed']}, "
+        f"отправляется исходник: {summary['kept_source']}"
+    )
+    if summary['source_bytes']:
+        ratio = summary['variant_bytes'] / summary['source_bytes'] * 100
+        logger.info(f"💾 Исходники: {summary['source_bytes'] / 1024 / 1024:.2f} MB, варианты: {summary['variant_bytes'] / 1024 / 1024:.2f} MB ({ratio:.0f}%)")
+    logger.info(f"⏱️ Время: {summary['duration_ms']} мс")
+
 if __name__ == "__main__":
-    import sys
-    
     if len(sys.argv) > 1 and sys.argv[1] == "--metadata-only":
         # Режим только добавления метаданных для существующих WebP
         add_metadata_for_existing_webp()
+    elif len(sys.argv) > 1 and sys.argv[1] == "--variants-only":
+        # Только оптимизированные варианты для отправки
+        build_photo_variants()
     else:
-        # Обычный режим конвертации + метаданные
+        # Обычный режим конвертации + метаданные + варианты
         convert_and_add_metadata()
+        build_photo_variants()
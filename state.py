@@ -1,15 +1,21 @@
 #state.py
+import asyncio
 import copy
-from typing import Dict, Any, Set, Optional, List, TYPE_CHECKING
+from typing import Dict, Any, Iterable, Set, Optional, List, TYPE_CHECKING
 from collections import defaultdict
-from datetime import datetime, timedelta
+from datetime import datetime
 from modules.logger_config import get_logger
 
 from utils import get_current_utc_time # utils.py должен быть доступен
+from modules.deletion_timer import DeletionTimerWheel
+from modules.job_registry import get_job_registry
+from modules.poll_registry import DEFAULT_GRACE_SECONDS, PollRegistry
+from modules.message_deletion import get_message_deletion_service
 
 if TYPE_CHECKING:
     from app_config import AppConfig
     from telegram.ext import Application
+    from modules.poll_payload import PollPayload, PreparedPoll
 
 logger = get_logger(__name__)
 
@@ -59,6 +65,9 @@ class QuizState:
         self.next_question_job_name: Optional[str] = None # Для отложенной отправки следующего вопроса в режиме serial_interval после раннего ответа
         self.poll_and_solution_message_ids: List[Dict[str, Optional[int]]] = []
         self.results_message_ids: Set[int] = set() # ID сообщений с результатами викторины для удаления через 2 мин
+        # Заранее подготовленный следующий опрос серийной викторины и задача оплаты его токена лимита
+        self.prefetched_poll: Optional['PreparedPoll'] = None
+        self.prefetch_task: Optional[asyncio.Task] = None
 
     def get_current_question_data(self) -> Optional[Dict[str, Any]]:
         if 0 <= self.current_question_index < len(self.questions):
@@ -75,6 +84,9 @@ class QuizState:
         # Исключаем несериализуемые объекты
         if 'next_question_job_name' in state:
             del state['next_question_job_name']
+        # Подготовленный опрос действителен только в текущем процессе
+        state.pop('prefetched_poll', None)
+        state.pop('prefetch_task', None)
             
         logger.debug(f"QuizState для чата {self.chat_id} подготовлен для сериализации")
         return state
@@ -88,19 +100,29 @@ class QuizState:
         
         # Восстанавливаем несериализуемые объекты как None
         self.next_question_job_name = None
+        self.prefetched_poll = None
+        self.prefetch_task = None
         
         logger.debug(f"QuizState для чата {self.chat_id} восстановлен после десериализации")
 
 class BotState:
+    DELETION_TICK_SECONDS = 1.0
+    DELETION_DRIVER_JOB_NAME = "deletion_timer_driver"
+    POLL_EVICTION_JOB_NAME = "poll_registry_eviction"
+    POLL_EVICTION_INTERVAL_SECONDS = 60
+
     def __init__(self, app_config: 'AppConfig'):
         self.app_config: 'AppConfig' = app_config
         self.application: Optional['Application'] = None
         self.data_manager: Optional['DataManager'] = None  # Добавляем data_manager
 
         self.active_quizzes: Dict[int, QuizState] = {}
-        self.current_polls: Dict[str, Dict[str, Any]] = {} # poll_id -> poll_data (включая chat_id, message_id, question_details, job_poll_end_name)
+        # poll_id -> poll_data (chat_id, message_id, question_id, job_poll_end_name, ...) с вытеснением по сроку годности
+        self.current_polls: PollRegistry = PollRegistry(grace_seconds=app_config.poll_registry_grace_seconds)
 
         self.quiz_data: Dict[str, List[Dict[str, Any]]] = {}
+        self.poll_payloads: Dict[str, 'PollPayload'] = {}  # question_id -> предвычисленные данные опроса
+        self.questions_by_id: Dict[str, Dict[str, Any]] = {}  # question_id -> вопрос (для компактных записей опросов)
         self.user_scores: Dict[str, Any] = {}
         self.chat_settings: Dict[int, Dict[str, Any]] = {}
         self.global_settings: Dict[str, Any] = {}  # Глобальные настройки (статистика категорий и др.)
@@ -108,6 +130,13 @@ class BotState:
         self.global_command_cooldowns: Dict[str, Dict[int, datetime]] = defaultdict(dict)
         self.generic_messages_to_delete: Dict[int, Dict[int, float]] = defaultdict(dict)  # chat_id -> {message_id: timestamp}
 
+        # Отложенные удаления: одно колесо таймеров и одна повторяющаяся задача вместо job на сообщение
+        self.deletion_timers = DeletionTimerWheel(tick_seconds=self.DELETION_TICK_SECONDS)
+        self.messages_to_delete_dirty = False
+        self._last_deletion_save_time = 0.0
+        self._deletion_driver_started = False
+        self._deletion_tick_running = False
+
     def get_active_quiz(self, chat_id: int) -> Optional[QuizState]:
         return self.active_quizzes.get(chat_id)
 
@@ -126,6 +155,54 @@ class BotState:
     def remove_current_poll(self, poll_id: str) -> Optional[Dict[str, Any]]:
         return self.current_polls.pop(poll_id, None)
 
+    def get_poll_question(self, poll_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        Вопрос опроса по ссылке из записи: сначала вопрос сессии по индексу,
+        затем общий индекс вопросов. Записи старых сохранений содержат копию вопроса.
+        """
+        question_id = poll_data.get("question_id")
+        quiz_state = self.active_quizzes.get(poll_data.get("chat_id"))
+        index = poll_data.get("question_session_index")
+        if quiz_state and isinstance(index, int) and 0 <= index < len(quiz_state.questions):
+            question = quiz_state.questions[index]
+            if question_id is None or question.get("question_id") == question_id:
+                return question
+        if question_id and question_id in self.questions_by_id:
+            return self.questions_by_id[question_id]
+        return poll_data.get("question_details")
+
+    def evict_expired_polls(self, now: Optional[float] = None) -> int:
+        """Вытесняет опросы брошенных сессий, срок годности которых истек"""
+        evicted = self.current_polls.evict_expired(now)
+        for poll_id, poll_data in evicted.items():
+            quiz_state = self.active_quizzes.get(poll_data.get("chat_id"))
+            if quiz_state:
+                quiz_state.active_poll_ids_in_session.discard(poll_id)
+        if evicted:
+            logger.warning(
+                f"Вытеснено {len(evicted)} просроченных опросов (чаты: {sorted({p.get('chat_id') for p in evicted.values()}, key=str)}). "
+                f"Осталось открытых опросов: {len(self.current_polls)}"
+            )
+        return len(evicted)
+
+    async def _poll_eviction_job(self, context) -> None:
+        self.evict_expired_polls()
+
+    def start_poll_eviction_job(self) -> None:
+        """Запускает периодическое вытеснение просроченных опросов"""
+        job_queue = getattr(self.application, "job_queue", None) if self.application else None
+        if not job_queue:
+            return
+        registry = get_job_registry(job_queue)
+        if registry.get(self.POLL_EVICTION_JOB_NAME):
+            return
+        registry.run_repeating(
+            self._poll_eviction_job,
+            interval=self.POLL_EVICTION_INTERVAL_SECONDS,
+            first=self.POLL_EVICTION_INTERVAL_SECONDS,
+            name=self.POLL_EVICTION_JOB_NAME
+        )
+
     def get_chat_settings(self, chat_id: int) -> Dict[str, Any]:
         if not hasattr(self, 'app_config') or self.app_config is None:
             logger.critical("CRITICAL: BotState.app_config не инициализирован!")
@@ -153,93 +230,101 @@ class BotState:
         import time
         timestamp = time.time()
         self.generic_messages_to_delete[chat_id][message_id] = timestamp
+        if self.data_manager:
+            self.data_manager.deletion_log.record_add(chat_id, message_id, timestamp)
+        self.messages_to_delete_dirty = True
         logger.debug(f"Сообщение {message_id} добавлено для удаления в чате {chat_id} с timestamp {timestamp}")
 
-        # Автосохранение каждые 60 секунд (проверка по времени последнего сохранения)
-        if not hasattr(self, '_last_autosave_time'):
-            self._last_autosave_time = 0
-
-        if timestamp - self._last_autosave_time >= 60:
-            if self.data_manager:
-                try:
-                    self.data_manager.save_messages_to_delete()
-                    self._last_autosave_time = timestamp
-                    logger.debug(f"💾 Автосохранение сообщений для удаления выполнено")
-                except Exception as e:
-                    logger.warning(f"⚠️ Ошибка автосохранения: {e}")
-
-        # Планируем удаление через N секунд если есть application и delay_seconds > 0
-        # Если delay_seconds=0, то это означает только добавление в fallback без планирования delayed задачи
-        if delay_seconds > 0 and self.application and hasattr(self.application, "job_queue") and self.application.job_queue:
-            job_name = f"del_msg_{chat_id}_{message_id}"
-            # Удаляем старый job если есть
-            existing = self.application.job_queue.get_jobs_by_name(job_name)
-            for job in existing:
-                job.schedule_removal()
-            # Планируем новый
-            self.application.job_queue.run_once(
-                self._delete_message_job,
-                when=timedelta(seconds=delay_seconds),
-                name=job_name,
-                data={"chat_id": chat_id, "message_id": message_id}
-            )
+        # Если delay_seconds=0, сообщение добавляется только в fallback без таймера
+        if delay_seconds > 0:
+            self.deletion_timers.schedule(chat_id, message_id, timestamp + delay_seconds)
+            self.start_deletion_timer_driver()
             logger.debug(f"Запланировано удаление сообщения {message_id} через {delay_seconds} сек")
 
-    async def _delete_message_job(self, context) -> None:
-        """Job для удаления одного сообщения через запланированное время"""
-        data = context.job.data
-        chat_id = data["chat_id"]
-        message_id = data["message_id"]
-
-        success = False
+    def start_deletion_timer_driver(self) -> None:
+        """Запускает повторяющуюся задачу, обслуживающую колесо таймеров удаления"""
+        if self._deletion_driver_started:
+            return
+        job_queue = getattr(self.application, "job_queue", None) if self.application else None
+        if not job_queue:
+            return
+        get_job_registry(job_queue).run_repeating(
+            self._deletion_timer_tick,
+            interval=self.DELETION_TICK_SECONDS,
+            first=self.DELETION_TICK_SECONDS,
+            name=self.DELETION_DRIVER_JOB_NAME
+        )
+        self._deletion_driver_started = True
+        logger.info(f"Запущен драйвер отложенного удаления сообщений (таймеров: {len(self.deletion_timers)})")
+
+    async def _deletion_timer_tick(self, context) -> None:
+        """Тик колеса: удаляет созревшие сообщения пачками и периодически сохраняет состояние"""
+        import time
+        if self._deletion_tick_running:
+            return  # Предыдущий тик еще удаляет сообщения
+        self._deletion_tick_running = True
         try:
-            await context.bot.delete_message(chat_id=chat_id, message_id=message_id)
-            logger.debug(f"Удалено сообщение {message_id} из чата {chat_id}")
-            success = True
+            due_by_chat = self.deletion_timers.pop_due(time.time())
+            if due_by_chat:
+                result = await get_message_deletion_service().delete_messages(context.bot, due_by_chat)
+                for chat_id, message_ids in result.resolved.items():
+                    self.remove_messages_from_deletion(chat_id, message_ids)
+                # Неудаленные (и отложенные по backpressure) сообщения остаются в fallback для periodic cleanup
+                logger.debug(
+                    f"Тик удаления: {sum(len(ids) for ids in due_by_chat.values())} сообщений в {len(due_by_chat)} чатах, "
+                    f"удалено {result.resolved_count}, вызовов API {result.api_calls}"
+                )
+            self.save_deletion_state()
+        finally:
+            self._deletion_tick_running = False
+
+    def save_deletion_state(self, force: bool = False) -> None:
+        """
+        Сохраняет изменения fallback-списка (дозапись в журнал, на каждом тике)
+        и колесо таймеров. Колесо без force сохраняется не чаще data_save_throttle_seconds.
+        """
+        import time
+        if not self.data_manager:
+            return
+        if self.messages_to_delete_dirty:
+            self.data_manager.flush_messages_to_delete_log()
+            self.messages_to_delete_dirty = False
+        now = time.time()
+        throttle = getattr(self.app_config, "data_save_throttle_seconds", 30) if self.app_config else 30
+        if not force and now - self._last_deletion_save_time < throttle:
+            return
+        try:
+            if self.deletion_timers.dirty:
+                self.data_manager.save_deletion_timers()
+                self.deletion_timers.dirty = False
+            self._last_deletion_save_time = now
         except Exception as e:
-            error_str = str(e).lower()
-            if "not found" in error_str or "cant be deleted" in error_str:
-                logger.debug(f"Сообщение {message_id} уже удалено или недоступно")
-                success = True  # Считаем успешным - сообщения нет
-            else:
-                logger.warning(f"Не удалось удалить сообщение {message_id}: {e}")
-                # При других ошибках оставляем в fallback для periodic cleanup
-
-        # Удаляем из fallback только при успехе
-        if success:
-            if chat_id in self.generic_messages_to_delete:
-                self.generic_messages_to_delete[chat_id].pop(message_id, None)
-                if not self.generic_messages_to_delete[chat_id]:
-                    del self.generic_messages_to_delete[chat_id]
-
-                # Сохраняем изменения
-                if self.data_manager:
-                    try:
-                        self.data_manager.save_messages_to_delete()
-                        logger.debug(f"💾 Сообщение {message_id} удалено из fallback и сохранено")
-                    except Exception as e:
-                        logger.warning(f"⚠️ Ошибка сохранения после удаления из fallback: {e}")
-
+            logger.warning(f"⚠️ Ошибка сохранения сообщений для удаления: {e}")
 
     def remove_message_from_deletion(self, chat_id: int, message_id: int) -> None:
         """Удаляет сообщение из списка для периодического удаления"""
-        if chat_id in self.generic_messages_to_delete:
-            self.generic_messages_to_delete[chat_id].pop(message_id, None)
-            logger.info(f"❌ Сообщение {message_id} удалено из списка для удаления в чате {chat_id}. Осталось: {len(self.generic_messages_to_delete[chat_id])}")
-
-            # Удаляем запись чата если она пустая
-            if not self.generic_messages_to_delete[chat_id]:
-                del self.generic_messages_to_delete[chat_id]
-
-            # Автоматически сохраняем данные при удалении сообщения
-            try:
-                if self.data_manager:
-                    self.data_manager.save_messages_to_delete()
-                    logger.info(f"💾 Данные сообщений для удаления автоматически сохранены")
-                else:
-                    logger.warning(f"⚠️ data_manager не доступен в BotState")
-            except Exception as e:
-                logger.error(f"❌ Не удалось автоматически сохранить сообщения для удаления: {e}")
+        self.remove_messages_from_deletion(chat_id, (message_id,))
+
+    def remove_messages_from_deletion(self, chat_id: int, message_ids: Iterable[int]) -> None:
+        """
+        Удаляет сообщения чата из списка для периодического удаления и отменяет их таймеры.
+        Изменения сохраняются драйвером удаления (save_deletion_state).
+        """
+        chat_messages = self.generic_messages_to_delete.get(chat_id)
+        removed: List[int] = []
+        for message_id in message_ids:
+            self.deletion_timers.cancel(chat_id, message_id)
+            if chat_messages and chat_messages.pop(message_id, None) is not None:
+                removed.append(message_id)
+        if not removed:
+            return
+        if self.data_manager:
+            self.data_manager.deletion_log.record_remove(chat_id, removed)
+        self.messages_to_delete_dirty = True
+        logger.debug(f"❌ {len(removed)} сообщений удалено из списка для удаления в чате {chat_id}. Осталось: {len(chat_messages)}")
+
+        if not chat_messages:
+            del self.generic_messages_to_delete[chat_id]
 
     def __getstate__(self):
         """
@@ -255,10 +340,18 @@ class BotState:
             del state['data_manager']
         if 'app_config' in state:
             del state['app_config']
+        # Payload'ы и индекс вопросов пересчитываются при загрузке вопросов
+        if 'poll_payloads' in state:
+            del state['poll_payloads']
+        state.pop('questions_by_id', None)
+        # Таймеры удаления сохраняются в deletion_timers.json, флаги драйвера относятся к процессу
+        for key in ('deletion_timers', '_deletion_driver_started', '_deletion_tick_running'):
+            state.pop(key, None)
         
         # Дополнительная очистка current_polls от потенциально проблемных данных
         if 'current_polls' in state:
             cleaned_polls = {}
+            # Реестр сохраняется как обычный словарь; куча сроков строится заново при загрузке
             for poll_id, poll_data in state['current_polls'].items():
                 if isinstance(poll_data, dict):
                     # Создаем копию без потенциально проблемных полей
@@ -286,6 +379,12 @@ class BotState:
         self.application = None
         self.data_manager = None
         self.app_config = None
+        self.poll_payloads = {}
+        self.questions_by_id = {}
+        self.current_polls = PollRegistry.from_dict(dict(state.get('current_polls') or {}))
+        self.deletion_timers = DeletionTimerWheel(tick_seconds=self.DELETION_TICK_SECONDS)
+        self._deletion_driver_started = False
+        self._deletion_tick_running = False
         
         logger.debug("BotState восстановлен после десериализации (несериализуемые объекты установлены в None)")
 
@@ -308,7 +407,9 @@ class BotState:
                     cleaned_poll.pop('job_poll_end_name', None)
                     cleaned_poll.pop('next_question_job_name', None)
                     cleaned_polls[poll_id] = cleaned_poll
-            self.current_polls = cleaned_polls
+            self.current_polls = PollRegistry.from_dict(
+                cleaned_polls, getattr(self.current_polls, 'grace_seconds', DEFAULT_GRACE_SECONDS)
+            )
         
         logger.debug("BotState подготовлен для persistence (временная очистка)")
         
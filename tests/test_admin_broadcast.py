@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Тест очереди рассылок админа
+"""
+
+import asyncio
+import shutil
+import tempfile
+import time
+import unittest
+from pathlib import Path
+from unittest import mock
+
+import sys
+sys.path.append('.')
+
+from modules.admin_broadcast import (
+    DONE_RETENTION_SECONDS, STATUS_DONE, STATUS_PENDING, AdminBroadcastQueue, deliver_pending_broadcasts,
+)
+from modules.request_scheduler import BotRequestScheduler
+
+
+class _FakeBot:
+    def __init__(self, fail_chats=()):
+        self.sent = []
+        self.fail_chats = set(fail_chats)
+
+    async def send_message(self, chat_id, text, parse_mode=None, **kwargs):
+        if chat_id in self.fail_chats:
+            raise RuntimeError("Chat not found")
+        self.sent.append((chat_id, text, parse_mode))
+        return chat_id
+
+
+class TestAdminBroadcastQueue(unittest.TestCase):
+    """Тест постановки, отправки ботом и очистки рассылок"""
+
+    def setUp(self):
+        self.temp_dir = Path(tempfile.mkdtemp())
+        self.queue = AdminBroadcastQueue(self.temp_dir)
+        patcher = mock.patch("modules.request_scheduler._scheduler", BotRequestScheduler())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_delivery_records_results(self):
+        """Бот отправляет рассылку через планировщик и записывает результат в файл очереди"""
+        broadcast_id = self.queue.submit("Привет", ["-100", "-200", "-300"], parse_mode="MarkdownV2")
+        self.assertEqual(self.queue.load(broadcast_id)["status"], STATUS_PENDING)
+        self.assertIsNone(self.queue.load("../settings"))
+
+        bot = _FakeBot(fail_chats={-200})
+        sent = asyncio.run(deliver_pending_broadcasts(self.queue, bot))
+        self.assertEqual(sent, 2)
+        self.assertEqual(bot.sent, [(-100, "Привет", "MarkdownV2"), (-300, "Привет", "MarkdownV2")])
+
+        broadcast = self.queue.load(broadcast_id)
+        self.assertEqual(broadcast["status"], STATUS_DONE)
+        self.assertEqual(broadcast["success"], ["-100", "-300"])
+        self.assertEqual([entry["chat_id"] for entry in broadcast["failed"]], ["-200"])
+        self.assertIn("Chat not found", broadcast["failed"][0]["error"])
+        self.assertEqual(self.queue.pending(), [])
+
+        self.assertEqual(self.queue.cleanup(now=time.time()), 0)
+        self.assertEqual(self.queue.cleanup(now=time.time() + DONE_RETENTION_SECONDS), 1)
+        self.assertIsNone(self.queue.load(broadcast_id))
+
+    def test_congestion_resumes_from_next_chat(self):
+        """При перегрузке планировщика отправка продолжается со следующего чата"""
+        broadcast_id = self.queue.submit("Привет", ["1", "2", "3"])
+        bot = _FakeBot()
+        congested = iter([False, True])
+        with mock.patch.object(BotRequestScheduler, "is_congested", lambda self, priority: next(congested, False)):
+            self.assertEqual(asyncio.run(deliver_pending_broadcasts(self.queue, bot)), 1)
+            self.assertEqual(self.queue.load(broadcast_id)["success"], ["1"])
+            self.assertEqual(asyncio.run(deliver_pending_broadcasts(self.queue, bot)), 2)
+        self.assertEqual([chat_id for chat_id, _, _ in bot.sent], [1, 2, 3])
+        self.assertEqual(self.queue.load(broadcast_id)["status"], STATUS_DONE)
+
+
+if __name__ == '__main__':
+    unittest.main()
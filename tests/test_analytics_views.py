@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Тест материализованных представлений аналитики
+"""
+
+import json
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+
+import sys
+sys.path.append('.')
+
+from modules.analytics_views import (
+    SCHEMA_VERSION, VIEW_ACTIVITY, VIEW_CATEGORIES, VIEW_DASHBOARD, VIEW_LEADERBOARD,
+    VIEW_SCORE_DISTRIBUTION, AnalyticsViews,
+)
+
+
+def user(name, score, answered, max_streak=0):
+    return {"name": name, "score": score, "answered_polls": {f"p{i}" for i in range(answered)}, "max_consecutive_correct": max_streak}
+
+
+class TestAnalyticsViews(unittest.TestCase):
+    """Тест пересборки, инкрементальных обновлений и записи представлений"""
+
+    def setUp(self):
+        self.temp_dir = Path(tempfile.mkdtemp())
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def read(self, name):
+        with open(self.temp_dir / f"{name}.json", encoding="utf-8") as f:
+            return json.load(f)
+
+    def test_incremental_updates_match_rebuild(self):
+        """Обновления по ответам дают те же итоги, что и полная пересборка"""
+        user_scores = {
+            -100: {"1": user("Анна", 10, 12, 4), "2": user("Борис", 300, 320)},
+            -200: {"1": user("Анна", 45, 50, 7)},
+        }
+        chat_settings = {-100: {"title": "Утро", "daily_quiz": {"enabled": True}}}
+        views = AnalyticsViews(self.temp_dir)
+        views.rebuild(user_scores, chat_settings, {"История": {"global_usage": 3, "chat_usage": {"-100": 3}, "last_used": 1.0}})
+
+        # Новый участник и ответ существующего
+        user_scores[-200]["3"] = user("Вера", 1, 1)
+        views.record_user(-200, "3", user_scores[-200]["3"], is_correct=True)
+        user_scores[-100]["1"] = user("Анна", 60, 13, 5)
+        views.record_user(-100, "1", user_scores[-100]["1"], is_correct=False)
+        views.record_category_use("История", -200)
+        self.assertEqual(views.flush(), 5)
+
+        dashboard = self.read(VIEW_DASHBOARD)
+        self.assertEqual(dashboard["schema"], SCHEMA_VERSION)
+        incremental = {name: self.read(name)["data"] for name in (VIEW_DASHBOARD, VIEW_LEADERBOARD, VIEW_SCORE_DISTRIBUTION)}
+
+        rebuilt = AnalyticsViews(self.temp_dir / "rebuilt")
+        rebuilt.rebuild(user_scores, chat_settings)
+        self.assertEqual(rebuilt._build_dashboard(), incremental[VIEW_DASHBOARD])
+        self.assertEqual(rebuilt._build_leaderboard(), incremental[VIEW_LEADERBOARD])
+        self.assertEqual(rebuilt._build_score_distribution(), incremental[VIEW_SCORE_DISTRIBUTION])
+
+        self.assertEqual(incremental[VIEW_DASHBOARD]["total_users"], 3)
+        self.assertEqual(incremental[VIEW_DASHBOARD]["active_chats_with_subscription"], 1)
+        top = incremental[VIEW_LEADERBOARD]["leaderboard"]
+        self.assertEqual([u["user_id"] for u in top], ["2", "1", "3"])
+        self.assertEqual(top[1]["total_score"], 105)
+        self.assertEqual(top[1]["max_consecutive_correct"], 7)
+        self.assertEqual(incremental[VIEW_SCORE_DISTRIBUTION]["buckets"], {"0-50": 2, "51-200": 1, "201-500": 1, "501-1000": 0, "1000+": 0})
+
+        categories = self.read(VIEW_CATEGORIES)["data"]["categories"]
+        self.assertEqual(categories[0]["usage"], 4)
+        self.assertEqual(categories[0]["chat_usage"], {"-100": 3, "-200": 1})
+
+        activity = self.read(VIEW_ACTIVITY)["data"]
+        self.assertEqual(len(activity["days"]), 1)
+        self.assertEqual(activity["days"][0]["answers"], 2)
+        self.assertEqual(activity["days"][0]["correct"], 1)
+        self.assertEqual(activity["days"][0]["active_users"], 2)
+
+    def test_flush_writes_only_changed_views_and_keeps_activity(self):
+        """Пишутся только измененные представления; версия и активность переживают перезапуск"""
+        views = AnalyticsViews(self.temp_dir, leaderboard_size=1)
+        scores = {1: {"10": user("Анна", 1, 1), "11": user("Борис", 2, 2)}}
+        views.rebuild(scores)
+        views.flush()
+        first_version = self.read(VIEW_LEADERBOARD)["version"]
+        self.assertEqual(len(self.read(VIEW_LEADERBOARD)["data"]["leaderboard"]), 1)
+        self.assertEqual(views.flush(), 0)
+
+        views.record_user(1, "10", user("Анна", 2, 2), is_correct=True)
+        self.assertEqual(views.dirty_views, [VIEW_ACTIVITY, VIEW_DASHBOARD, VIEW_LEADERBOARD, VIEW_SCORE_DISTRIBUTION])
+        self.assertEqual(views.flush(), 4)
+        self.assertEqual(self.read(VIEW_CATEGORIES)["version"], first_version)
+        self.assertEqual(self.read(VIEW_LEADERBOARD)["version"], first_version + 1)
+
+        # После перезапуска тот же участник за день не считается повторно
+        restarted = AnalyticsViews(self.temp_dir)
+        restarted.rebuild({1: {"10": user("Анна", 2, 2), "11": user("Борис", 2, 2)}})
+        restarted.record_user(1, "10", user("Анна", 3, 3), is_correct=True)
+        restarted.flush()
+        day = self.read(VIEW_ACTIVITY)["data"]["days"][-1]
+        self.assertEqual(day["answers"], 2)
+        self.assertEqual(day["active_users"], 1)
+        self.assertGreater(self.read(VIEW_DASHBOARD)["version"], first_version + 1)
+        self.assertFalse(list(self.temp_dir.glob("*.tmp")))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Тест расписания ежедневных викторин на min-куче
+"""
+
+import unittest
+from datetime import datetime
+
+import sys
+sys.path.append('.')
+
+import pytz
+
+from modules.daily_schedule import DailySchedule, next_local_occurrence
+
+UTC = pytz.UTC
+BERLIN = pytz.timezone("Europe/Berlin")
+MOSCOW = pytz.timezone("Europe/Moscow")
+
+
+class TestNextLocalOccurrence(unittest.TestCase):
+    """Тест вычисления ближайшего локального времени"""
+
+    def test_dst_transitions(self):
+        """Летнее время меняет смещение, несуществующее время сдвигается, неоднозначное берется первым"""
+        # 09:00 в Берлине: зимой 08:00 UTC, летом 07:00 UTC
+        self.assertEqual(next_local_occurrence(9, 0, BERLIN, datetime(2024, 3, 30, 12, 0, tzinfo=UTC)),
+                         datetime(2024, 3, 31, 7, 0, tzinfo=UTC))
+        # 02:30 31.03.2024 в Берлине не существует: запуск в 03:30 летнего времени
+        self.assertEqual(next_local_occurrence(2, 30, BERLIN, datetime(2024, 3, 30, 12, 0, tzinfo=UTC)),
+                         datetime(2024, 3, 31, 1, 30, tzinfo=UTC))
+        # 02:30 27.10.2024 наступает дважды: берется первое (летнее) наступление
+        self.assertEqual(next_local_occurrence(2, 30, BERLIN, datetime(2024, 10, 26, 12, 0, tzinfo=UTC)),
+                         datetime(2024, 10, 27, 0, 30, tzinfo=UTC))
+
+
+class TestDailySchedule(unittest.TestCase):
+    """Тест кучи слотов"""
+
+    def test_pop_due_and_reschedule(self):
+        """Наступившие слоты выдаются с упреждением и переносятся на следующие сутки"""
+        schedule = DailySchedule(lead_seconds=60)
+        now = datetime(2024, 6, 1, 5, 0, tzinfo=UTC)  # 08:00 МСК
+        schedule.set_chat(1, [(9, 0), (21, 0)], MOSCOW, now=now)
+        schedule.set_chat(2, [(8, 30)], MOSCOW, now=now)
+
+        first_fire = datetime(2024, 6, 1, 5, 30, tzinfo=UTC)
+        self.assertEqual(schedule.next_wake(), first_fire.timestamp() - 60)
+        self.assertEqual(schedule.pop_due(first_fire.timestamp() - 61), [])
+
+        due = schedule.pop_due(first_fire.timestamp() - 60)
+        self.assertEqual([(s.chat_id, s.slot_index, s.fire_at) for s in due], [(2, 0, first_fire)])
+        self.assertEqual(schedule.get_chat_slots(2)[0].fire_at, datetime(2024, 6, 2, 5, 30, tzinfo=UTC))
+        self.assertEqual(schedule.next_wake(), datetime(2024, 6, 1, 6, 0, tzinfo=UTC).timestamp() - 60)
+
+    def test_settings_change_replaces_slots(self):
+        """Новые настройки заменяют слоты чата, старые элементы кучи не срабатывают"""
+        schedule = DailySchedule(lead_seconds=60)
+        now = datetime(2024, 6, 1, 5, 0, tzinfo=UTC)
+        schedule.set_chat(1, [(9, 0), (10, 0)], MOSCOW, now=now)
+        schedule.set_chat(1, [(12, 0)], MOSCOW, now=now)
+        self.assertEqual(len(schedule), 1)
+
+        # Время уже внутри окна упреждения: слот выдается сразу
+        schedule.set_chat(3, [(8, 0)], MOSCOW, now=datetime(2024, 6, 1, 4, 59, 30, tzinfo=UTC))
+        due = schedule.pop_due(datetime(2024, 6, 1, 10, 0, tzinfo=UTC).timestamp())
+        self.assertEqual([(s.chat_id, s.fire_at.hour) for s in due], [(3, 5), (1, 9)])
+
+        self.assertEqual(schedule.remove_chat(1), 1)
+        self.assertEqual(schedule.get_stats()["chats"], 1)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Тест кэша повторных ответов на опросы
+"""
+
+import unittest
+
+import sys
+sys.path.append('.')
+
+from modules.dedup_cache import DedupCache, poll_answer_key
+
+
+class TestDedupCache(unittest.TestCase):
+    """Тест повтора, вытеснения по TTL и по размеру"""
+
+    def test_duplicate_within_ttl(self):
+        """Повтор в пределах TTL отсеивается, после TTL ключ снова новый"""
+        cache = DedupCache(max_size=100, ttl_seconds=10)
+        key = poll_answer_key("5321", 42)
+        self.assertFalse(cache.check_and_add(key, now=0.0))
+        self.assertTrue(cache.check_and_add(key, now=5.0))
+        self.assertFalse(cache.check_and_add(key, now=11.0))
+        self.assertEqual(cache.get_stats()["hits"], 1)
+        self.assertEqual(cache.get_stats()["misses"], 2)
+
+    def test_size_bound_evicts_oldest(self):
+        """При переполнении вытесняются самые старые ключи, недавние остаются"""
+        cache = DedupCache(max_size=3, ttl_seconds=100)
+        for i in range(5):
+            cache.check_and_add((i, 1), now=float(i))
+        self.assertEqual(len(cache), 3)
+        self.assertTrue(cache.check_and_add((4, 1), now=5.0))
+        self.assertTrue(cache.check_and_add((2, 1), now=5.0))
+        self.assertFalse(cache.check_and_add((0, 1), now=5.0))
+
+    def test_integer_key(self):
+        """Ключ целочисленный и для нечислового poll_id"""
+        self.assertEqual(poll_answer_key("123", 7), (123, 7))
+        key = poll_answer_key("abc", 7)
+        self.assertIsInstance(key[0], int)
+        self.assertEqual(key, poll_answer_key("abc", 7))
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Тест журнала сообщений на удаление
+"""
+
+import json
+import tempfile
+import unittest
+from pathlib import Path
+
+import sys
+sys.path.append('.')
+
+from modules.deletion_log import DeletionLog, snapshot_payload
+
+
+class TestDeletionLog(unittest.TestCase):
+    """Тест дозаписи, воспроизведения и сжатия"""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        system_dir = Path(self.tmp_dir.name)
+        self.snapshot_path = system_dir / "messages_to_delete.json"
+        self.log_path = system_dir / "messages_to_delete.log"
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def _new_log(self, compact_min_records=1000):
+        return DeletionLog(self.snapshot_path, self.log_path, compact_min_records=compact_min_records)
+
+    def _load(self, min_timestamp=None):
+        messages = {}
+        if self.snapshot_path.exists():
+            data = json.loads(self.snapshot_path.read_text(encoding="utf-8"))
+            messages = {int(c): {int(m): ts for m, ts in msgs.items()} for c, msgs in data.items()}
+        self._new_log().replay(messages, min_timestamp=min_timestamp)
+        return messages
+
+    def test_replay_after_flush_and_torn_line(self):
+        """Записи журнала восстанавливают список, оборванная строка и старые сообщения пропускаются"""
+        log = self._new_log()
+        log.record_add(-1, 10, 1000.0)
+        log.record_add(-1, 11, 1001.0)
+        log.record_add(-2, 20, 5.0)
+        log.record_remove(-1, [10])
+        self.assertEqual(log.pending, 4)
+        self.assertEqual(log.flush(), 4)
+        self.assertEqual(log.pending, 0)
+        with open(self.log_path, "ab") as f:
+            f.write(b'["a",-1,12')
+
+        self.assertEqual(self._load(min_timestamp=100.0), {-1: {11: 1001.0}})
+
+    def test_compaction_keeps_records_written_during_snapshot(self):
+        """Записи, сделанные между ротацией и снимком, не теряются; после сжатия журнал пуст"""
+        log = self._new_log(compact_min_records=2)
+        messages = {}
+        for message_id in range(5):
+            messages.setdefault(-1, {})[message_id] = 1000.0 + message_id
+            log.record_add(-1, message_id, 1000.0 + message_id)
+        log.flush()
+        self.assertTrue(log.needs_compaction(live_messages=1))
+
+        log.rotate()
+        payload = snapshot_payload(messages)
+        # Пока снимок пишется, список меняется
+        del messages[-1][0]
+        log.record_remove(-1, [0])
+        log.flush()
+        self.assertEqual(self._load(), messages)  # сбой до записи снимка
+
+        log.write_snapshot(payload)
+        self.assertEqual(self._load(), messages)
+        self.assertFalse(log.compacting_path.exists())
+        self.assertEqual(log.get_stats()["compactions"], 1)
+
+    def test_late_background_snapshot_does_not_overwrite_shutdown_save(self):
+        """Фоновое сжатие, завершившееся после сохранения при остановке, не затирает его снимок"""
+        log = self._new_log()
+        messages = {-1: {1: 1001.0}}
+        log.record_add(-1, 1, 1001.0)
+
+        background = log.rotate()
+        stale_payload = snapshot_payload(messages)
+        # Пока фоновый снимок пишется, появляется новое сообщение и бот останавливается
+        messages[-1][2] = 1002.0
+        log.record_add(-1, 2, 1002.0)
+        shutdown = log.rotate()
+        self.assertTrue(log.write_snapshot(snapshot_payload(messages), shutdown))
+        self.assertFalse(log.compacting_path.exists())
+
+        self.assertFalse(log.write_snapshot(stale_payload, background))
+        self.assertEqual(self._load(), messages)
+        self.assertEqual(log.get_stats()["stale_snapshots_skipped"], 1)
+
+    def test_older_snapshot_keeps_compacting_log_of_newer_rotation(self):
+        """Снимок старой ротации не удаляет отложенный журнал, дополненный более новой ротацией"""
+        log = self._new_log()
+        messages = {-1: {1: 1001.0}}
+        log.record_add(-1, 1, 1001.0)
+
+        background = log.rotate()
+        stale_payload = snapshot_payload(messages)
+        messages[-1][2] = 1002.0
+        log.record_add(-1, 2, 1002.0)
+        log.rotate()  # вторая ротация, ее снимок еще не записан
+
+        self.assertTrue(log.write_snapshot(stale_payload, background))
+        self.assertTrue(log.compacting_path.exists())
+        self.assertEqual(self._load(), messages)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
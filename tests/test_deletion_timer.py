@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Тест колеса таймеров отложенного удаления сообщений
+"""
+
+import unittest
+
+import sys
+sys.path.append('.')
+
+from modules.deletion_timer import DeletionTimerWheel
+
+
+class TestDeletionTimerWheel(unittest.TestCase):
+    """Тест планирования, срабатывания и сохранения таймеров"""
+
+    def test_pop_due_groups_by_chat(self):
+        """Созревшие таймеры возвращаются пачкой по чатам, остальные ждут"""
+        wheel = DeletionTimerWheel(tick_seconds=1.0, slots=8)
+        wheel.pop_due(100.0)
+        wheel.schedule(-1, 10, 101.5)
+        wheel.schedule(-1, 11, 101.2)
+        wheel.schedule(-2, 20, 101.9)
+        wheel.schedule(-2, 21, 105.0)
+
+        self.assertEqual(wheel.pop_due(101.3), {-1: [11]})
+        due = wheel.pop_due(102.0)
+        self.assertEqual(sorted(due[-1]), [10])
+        self.assertEqual(due[-2], [20])
+        self.assertEqual(len(wheel), 1)
+        self.assertEqual(wheel.pop_due(105.0), {-2: [21]})
+
+    def test_timers_beyond_one_revolution(self):
+        """Таймер дальше оборота колеса не срабатывает раньше срока"""
+        wheel = DeletionTimerWheel(tick_seconds=1.0, slots=4)
+        wheel.pop_due(0.0)
+        wheel.schedule(-1, 1, 9.0)
+        for now in range(1, 9):
+            self.assertEqual(wheel.pop_due(float(now)), {})
+        self.assertEqual(wheel.pop_due(9.0), {-1: [1]})
+
+    def test_reschedule_cancel_and_past_due(self):
+        """Перепланирование и отмена, просроченный таймер срабатывает на ближайшем тике"""
+        wheel = DeletionTimerWheel(tick_seconds=1.0, slots=8)
+        wheel.pop_due(50.0)
+        wheel.schedule(-1, 1, 52.0)
+        wheel.schedule(-1, 1, 60.0)
+        wheel.schedule(-1, 2, 53.0)
+        self.assertTrue(wheel.cancel(-1, 2))
+        self.assertFalse(wheel.cancel(-1, 2))
+        self.assertEqual(wheel.pop_due(54.0), {})
+
+        wheel.schedule(-3, 7, 10.0)
+        self.assertEqual(wheel.pop_due(54.5), {-3: [7]})
+
+    def test_persistence_roundtrip(self):
+        """Содержимое колеса восстанавливается, просроченные срабатывают на первом вызове"""
+        wheel = DeletionTimerWheel(slots=16)
+        wheel.schedule(-1, 1, 10.0)
+        wheel.schedule(-2, 2, 1000.0)
+        restored = DeletionTimerWheel(slots=16)
+        self.assertEqual(restored.load(wheel.to_dict()), 2)
+        self.assertFalse(restored.dirty)
+        self.assertEqual(restored.pop_due(500.0), {-1: [1]})
+        self.assertEqual(len(restored), 1)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
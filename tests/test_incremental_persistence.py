@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Тест инкрементальной persistence на SQLite
+"""
+
+import asyncio
+import tempfile
+import unittest
+from copy import deepcopy
+from pathlib import Path
+
+import sys
+sys.path.append('.')
+
+from modules.incremental_persistence import BotData, IncrementalPersistence
+
+
+class TestIncrementalPersistence(unittest.TestCase):
+    """Тест построчной записи, ленивой загрузки и служебных ключей bot_data"""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.db_path = Path(self.tmp_dir.name) / "persistence.sqlite3"
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_writes_only_changed_entries(self):
+        """Неизмененные записи не переписываются, служебные объекты не сохраняются"""
+        async def scenario():
+            persistence = IncrementalPersistence(self.db_path)
+            bot_data = BotData({"bot_state": object(), "counter": 1, "names": ["a"]})
+            await persistence.update_bot_data(deepcopy(bot_data))
+            first = persistence.get_stats()
+
+            bot_data["counter"] = 2
+            await persistence.update_bot_data(deepcopy(bot_data))
+            second = persistence.get_stats()
+
+            await persistence.update_chat_data(-100, {"photo_cfg": {"count": 5}})
+            await persistence.update_chat_data(-100, {"photo_cfg": {"count": 5}})
+            await persistence.update_conversation("settings", (-100, 7), 3)
+            await persistence.flush()
+            return first, second, persistence.get_stats()
+
+        first, second, final = asyncio.run(scenario())
+        self.assertEqual(first["last_write"]["entries"], 2)
+        self.assertEqual(second["last_write"]["entries"], 1)  # только counter
+        self.assertEqual(final["entries_written"], 5)
+        self.assertEqual(final["entries_unchanged"], 2)
+
+    def test_lazy_load_after_restart(self):
+        """После перезапуска данные чата подгружаются при первом обращении"""
+        async def scenario():
+            persistence = IncrementalPersistence(self.db_path)
+            await persistence.update_bot_data({"counter": 7})
+            await persistence.update_chat_data(42, {"menu_message_id": 10})
+            await persistence.update_conversation("settings", (42, 1), "STATE")
+            await persistence.drop_user_data(5)
+            await persistence.flush()
+
+            restarted = IncrementalPersistence(self.db_path)
+            bot_data = await restarted.get_bot_data()
+            self.assertEqual(await restarted.get_chat_data(), {})
+            chat_data = {}
+            await restarted.refresh_chat_data(42, chat_data)
+            conversations = await restarted.get_conversations("settings")
+
+            # Повторная запись той же записи не выполняется
+            await restarted.update_chat_data(42, dict(chat_data))
+            stats = restarted.get_stats()
+            await restarted.flush()
+            return bot_data, chat_data, conversations, stats
+
+        bot_data, chat_data, conversations, stats = asyncio.run(scenario())
+        self.assertIsInstance(bot_data, BotData)
+        self.assertEqual(bot_data, {"counter": 7})
+        self.assertEqual(chat_data, {"menu_message_id": 10})
+        self.assertEqual(conversations, {(42, 1): "STATE"})
+        self.assertEqual(stats["lazy_loads"], 1)
+        self.assertEqual(stats["entries_written"], 0)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Тест реестра задач JobQueue
+"""
+
+import asyncio
+import unittest
+from datetime import time
+
+import sys
+sys.path.append('.')
+
+from telegram.ext import ApplicationBuilder
+
+from modules.job_registry import JobRegistry
+
+
+async def _noop(context):
+    return None
+
+
+class TestJobRegistry(unittest.TestCase):
+    """Тест индексов по имени, чату и группе"""
+
+    def test_indices_and_cancel(self):
+        """Задачи находятся и снимаются по чату и группе, занятое имя заменяется"""
+        async def scenario():
+            application = ApplicationBuilder().token("123:TEST").build()
+            job_queue = application.job_queue
+            registry = JobRegistry(job_queue)
+
+            first = registry.run_daily(_noop, time(9, 0), name="daily_1_0", chat_id=1, group="daily_quiz")
+            registry.run_daily(_noop, time(10, 0), name="daily_1_1", chat_id=1, group="daily_quiz")
+            registry.run_daily(_noop, time(9, 0), name="daily_2_0", chat_id=2, group="daily_quiz")
+            registry.run_once(_noop, 3600, name="next_question_1", chat_id=1)
+
+            replacement = registry.run_daily(_noop, time(11, 0), name="daily_1_0", chat_id=1, group="daily_quiz")
+            self.assertTrue(first.removed)
+            self.assertIs(registry.get("daily_1_0"), replacement)
+            self.assertEqual(len(registry.get_chat_jobs(1)), 3)
+            self.assertEqual(len(registry.get_chat_jobs(1, group="daily_quiz")), 2)
+
+            self.assertEqual(registry.cancel_chat(1, group="daily_quiz"), 2)
+            self.assertIsNotNone(registry.get("next_question_1"))
+            self.assertEqual([job.name for job in registry.get_group_jobs("daily_quiz")], ["daily_2_0"])
+
+            # Задача, снятая в обход реестра, забывается при обращении
+            registry.get("daily_2_0").schedule_removal()
+            self.assertEqual(registry.get_group_jobs("daily_quiz"), [])
+            return registry.get_stats()
+
+        stats = asyncio.run(scenario())
+        self.assertEqual(stats["indexed_jobs"], 1)
+        self.assertEqual(stats["groups"], 0)
+        self.assertEqual(stats["cancelled_total"], 3)
+
+    def test_run_once_is_forgotten_after_run(self):
+        """Однократная задача удаляется из индекса после выполнения"""
+        async def scenario():
+            application = ApplicationBuilder().token("123:TEST").build()
+            registry = JobRegistry(application.job_queue)
+            calls = []
+
+            async def callback(context):
+                calls.append(context.job.name)
+
+            await application.job_queue.start()
+            try:
+                registry.run_once(callback, 0.01, name="once", chat_id=5)
+                await asyncio.sleep(0.2)
+            finally:
+                await application.job_queue.stop()
+            return calls, registry
+
+        calls, registry = asyncio.run(scenario())
+        self.assertEqual(calls, ["once"])
+        self.assertEqual(len(registry), 0)
+        self.assertEqual(registry.get_chat_jobs(5), [])
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
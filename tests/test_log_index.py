@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Тест индекса лог-файлов по времени
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import sys
+sys.path.append('.')
+
+from modules.log_index import LogFileIndex, LogIndex, key_to_isoformat, timestamp_key
+
+START = datetime(2026, 1, 2, 8, 0, 0)
+LEVELS = ["INFO", "WARNING", "ERROR"]
+
+
+def log_line(n):
+    ts = (START + timedelta(seconds=n)).strftime('%Y-%m-%d %H:%M:%S') + f",{n % 1000:03d}"
+    return f"{ts} - modules.quiz_engine - {LEVELS[n % 3]} - сообщение {n}\n"
+
+
+class TestLogIndex(unittest.TestCase):
+    """Тест поиска по диапазону, чтения с конца и инкрементального индексирования"""
+
+    def setUp(self):
+        self.temp_dir = Path(tempfile.mkdtemp())
+        self.log_file = self.temp_dir / "bot_2026-01-02.log"
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def write(self, lines, mode="w"):
+        with open(self.log_file, mode, encoding="utf-8") as f:
+            f.writelines(lines)
+
+    def test_range_query_reads_only_region(self):
+        """Запрос по диапазону читает участок файла и возвращает новые записи первыми"""
+        lines = [log_line(n) for n in range(3000)]
+        # Трассировка после ошибки 2000 (строки 2002-2003)
+        lines.insert(2001, "Traceback (most recent call last):\n")
+        lines.insert(2002, "ValueError: ERROR в данных\n")
+        self.write(lines)
+        index = LogIndex(self.temp_dir, stride=4096)
+
+        since = START + timedelta(seconds=1990)
+        until = START + timedelta(seconds=2010)
+        entries = index.query(since, until, limit=100)
+        self.assertEqual([e["message"] for e in entries[:2]], ["сообщение 2009", "сообщение 2008"])
+        # 08:33:30,010 позже until 08:33:30
+        self.assertEqual(len(entries), 20)
+        self.assertLess(index.lines_read, 300)
+
+        first = entries[-1]
+        self.assertEqual(first["message"], "сообщение 1990")
+        self.assertEqual(first["line"], 1991)
+        self.assertEqual(first["file"], self.log_file.name)
+        self.assertEqual(first["timestamp"], datetime(2026, 1, 2, 8, 33, 10, 990000).isoformat())
+        after_traceback = next(e for e in entries if e["message"] == "сообщение 2001")
+        self.assertEqual(after_traceback["line"], 2004)
+
+        errors = index.query(since, until, levels={"ERROR"}, limit=100)
+        self.assertTrue(all(e["level"] == "ERROR" for e in errors))
+        self.assertEqual(errors[-1]["message"], "ValueError: ERROR в данных")
+        self.assertIsNone(errors[-1]["timestamp"])
+        self.assertEqual(len(errors), 8)
+
+        latest = index.query(limit=5)
+        self.assertEqual([e["message"] for e in latest], [f"сообщение {n}" for n in range(2999, 2994, -1)])
+        self.assertEqual(latest[0]["line"], 3002)
+
+    def test_incremental_refresh_and_rotation(self):
+        """Дописанные строки индексируются по хвосту, ротация сбрасывает индекс"""
+        self.write([log_line(n) for n in range(200)])
+        index = LogFileIndex(self.log_file, stride=1024)
+        index.refresh()
+        points = len(index.points)
+        self.assertEqual(index.indexed_lines, 200)
+
+        # Недописанная строка не индексируется до перевода строки
+        self.write([log_line(n) for n in range(200, 400)] + ["2026-01-02 09:00:00,000 - x - INFO - недопис"], mode="a")
+        index.refresh()
+        self.assertEqual(index.indexed_lines, 400)
+        self.assertGreater(len(index.points), points)
+        self.assertEqual(index.first_key, "2026-01-02 08:00:00,000")
+        self.assertEqual(index.last_key, timestamp_key(START + timedelta(seconds=399, milliseconds=399)))
+        self.assertEqual(index.indexed_size, self.log_file.stat().st_size - len("2026-01-02 09:00:00,000 - x - INFO - недопис".encode()))
+
+        # Ротация: файл заменен новым с меньшим числом строк
+        rotated = self.temp_dir / "bot_2026-01-02.log.1"
+        os.rename(self.log_file, rotated)
+        self.write([log_line(n) for n in range(1000, 1010)])
+        index.refresh()
+        self.assertEqual(index.indexed_lines, 10)
+        self.assertEqual(index.first_key, "2026-01-02 08:16:40,000")
+
+        self.assertFalse(index.overlaps(None, timestamp_key(START)))
+        self.assertEqual(key_to_isoformat("2026-01-02 08:00:00,000"), "2026-01-02T08:00:00")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Тест пакетного удаления сообщений
+"""
+
+import asyncio
+import unittest
+
+import sys
+sys.path.append('.')
+
+from telegram.error import BadRequest, TimedOut
+
+from modules.message_deletion import MessageDeletionService
+from modules.request_scheduler import BotRequestScheduler
+
+
+class FakeBot:
+    """Бот, записывающий вызовы удаления"""
+
+    def __init__(self, batch_error=None, single_errors=None):
+        self.batch_error = batch_error
+        self.single_errors = single_errors or {}
+        self.batch_calls = []
+        self.single_calls = []
+
+    async def delete_messages(self, chat_id, message_ids):
+        self.batch_calls.append((chat_id, list(message_ids)))
+        if self.batch_error:
+            raise self.batch_error
+        return True
+
+    async def delete_message(self, chat_id, message_id):
+        self.single_calls.append((chat_id, message_id))
+        error = self.single_errors.get(message_id)
+        if error:
+            raise error
+        return True
+
+
+def _service():
+    return MessageDeletionService(BotRequestScheduler(max_requests_per_second=1000))
+
+
+class TestMessageDeletionService(unittest.TestCase):
+    """Тест группировки, пачек и перехода на удаление по одному"""
+
+    def test_batches_of_hundred(self):
+        """250 сообщений одного чата удаляются тремя вызовами"""
+        bot = FakeBot()
+        result = asyncio.run(_service().delete_messages(bot, {-100: range(250), -200: [1]}))
+        self.assertEqual([len(ids) for _, ids in bot.batch_calls], [100, 100, 50])
+        self.assertEqual(bot.single_calls, [(-200, 1)])
+        self.assertEqual(result.resolved_count, 251)
+        self.assertEqual(result.api_calls, 4)
+
+    def test_fallback_to_single_deletes(self):
+        """При ошибке пачки сообщения удаляются по одному, недоступные считаются обработанными"""
+        bot = FakeBot(
+            batch_error=BadRequest("Message can't be deleted for everyone"),
+            single_errors={2: BadRequest("Message to delete not found"), 3: TimedOut()}
+        )
+        service = _service()
+        result = asyncio.run(service.delete_chat_messages(bot, -100, [1, 2, 3]))
+        self.assertEqual(len(bot.single_calls), 3)
+        self.assertEqual(result.resolved[-100], {1, 2})
+        self.assertEqual(result.failed[-100], {3})
+        self.assertEqual(service.get_stats()["batch_fallbacks"], 1)
+
+    def test_should_stop_leaves_rest_pending(self):
+        """Остановка по backpressure прекращает удаление до следующего запуска"""
+        bot = FakeBot()
+        calls = []
+
+        def should_stop():
+            calls.append(1)
+            return len(calls) > 1
+
+        result = asyncio.run(_service().delete_messages(bot, {-100: range(150), -200: range(5)}, should_stop=should_stop))
+        self.assertTrue(result.stopped)
+        self.assertEqual(len(bot.batch_calls), 1)
+        self.assertEqual(result.resolved_count, 100)
+        self.assertEqual(result.skipped, 55)
+
+    def test_bounded_concurrency(self):
+        """Пачки разных чатов идут параллельно, но не больше лимитов сервиса и чата"""
+        class SlowBot(FakeBot):
+            def __init__(self):
+                super().__init__()
+                self.in_flight = {}
+                self.max_total = 0
+                self.max_per_chat = 0
+
+            async def delete_messages(self, chat_id, message_ids):
+                self.in_flight[chat_id] = self.in_flight.get(chat_id, 0) + 1
+                self.max_total = max(self.max_total, sum(self.in_flight.values()))
+                self.max_per_chat = max(self.max_per_chat, self.in_flight[chat_id])
+                await asyncio.sleep(0.01)
+                self.in_flight[chat_id] -= 1
+                return await super().delete_messages(chat_id, message_ids)
+
+        bot = SlowBot()
+        service = MessageDeletionService(
+            BotRequestScheduler(max_requests_per_second=1000), max_concurrency=4, per_chat_concurrency=2
+        )
+        messages_by_chat = {-chat: range(300) for chat in range(1, 6)}
+        result = asyncio.run(service.delete_messages(bot, messages_by_chat))
+        self.assertEqual(result.resolved_count, 1500)
+        self.assertEqual(bot.max_total, 4)
+        self.assertEqual(bot.max_per_chat, 2)
+        self.assertEqual(service.get_stats()["max_in_flight_seen"], 4)
+
+        # Пик сбрасывается при следующем запуске
+        asyncio.run(service.delete_chat_messages(bot, -1, [1]))
+        self.assertEqual(service.get_stats()["max_in_flight_seen"], 1)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
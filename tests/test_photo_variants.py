@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Тест оптимизированных вариантов изображений фото-викторины
+"""
+
+import tempfile
+import unittest
+from pathlib import Path
+
+import sys
+sys.path.append('.')
+
+from PIL import Image
+
+from modules.photo_variants import PhotoVariantBuilder, PhotoVariantIndex, load_manifest
+
+
+class TestPhotoVariants(unittest.TestCase):
+    """Тест построения вариантов и выбора файла для отправки"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        root = Path(self.tmp.name)
+        self.images_dir = root / "images"
+        self.variants_dir = root / "variants"
+        self.images_dir.mkdir()
+        self.big = self.images_dir / "Лиса.webp"
+        self.small = self.images_dir / "Ёж.webp"
+        Image.new("RGB", (400, 200), (200, 120, 40)).save(self.big, "WEBP")
+        Image.new("RGBA", (50, 50), (0, 0, 0, 0)).save(self.small, "WEBP")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _build(self):
+        builder = PhotoVariantBuilder(self.variants_dir, max_side=100, quality=70, workers=1)
+        return builder.build([self.big, self.small])
+
+    def test_variants_are_size_capped_and_skipped_when_unchanged(self):
+        """Длинная сторона ограничена, повторный запуск ничего не пересоздает"""
+        summary = self._build()
+        self.assertEqual((summary["built"], summary["skipped"], summary["failed"]), (2, 0, 0))
+
+        index = PhotoVariantIndex(self.variants_dir)
+        variant = index.resolve(self.big)
+        self.assertEqual(variant.parent, self.variants_dir)
+        with Image.open(variant) as img:
+            self.assertEqual(img.size, (100, 50))
+
+        summary = self._build()
+        self.assertEqual((summary["built"], summary["skipped"]), (0, 2))
+
+    def test_changed_source_falls_back_until_rebuilt(self):
+        """Измененный исходник отправляется как есть до пересоздания варианта"""
+        self._build()
+        Image.new("RGB", (300, 300), (10, 10, 10)).save(self.big, "WEBP")
+        self.assertEqual(PhotoVariantIndex(self.variants_dir).resolve(self.big), self.big)
+
+        summary = self._build()
+        self.assertEqual(summary["built"], 1)
+        self.assertEqual(len(list(self.variants_dir.glob("*.webp"))), 2)  # Старый вариант удален
+        self.assertNotEqual(PhotoVariantIndex(self.variants_dir).resolve(self.big), self.big)
+
+    def test_quality_is_lowered_to_fit_target_size(self):
+        """Вариант больше target_bytes пересжимается с меньшим качеством, но не ниже min_quality"""
+        noisy = self.images_dir / "Шум.webp"
+        Image.effect_noise((600, 600), 100).convert("RGB").save(noisy, "WEBP", lossless=True)
+        builder = PhotoVariantBuilder(self.variants_dir, max_side=600, quality=90, workers=1,
+                                      target_bytes=1, min_quality=60)
+        summary = builder.build([noisy])
+        entry = load_manifest(self.variants_dir)["files"][noisy.name]
+        self.assertEqual(summary["built"], 1)
+        self.assertEqual(entry["quality"], 60)
+        self.assertFalse(entry["use_source"])
+
+    def test_variant_larger_than_source_keeps_source(self):
+        """Если вариант не меньше исходника, отправляется исходник, файл варианта не создается"""
+        tiny = self.images_dir / "Сжатый.webp"
+        Image.effect_noise((80, 80), 100).convert("RGB").save(tiny, "WEBP", quality=1)
+        builder = PhotoVariantBuilder(self.variants_dir, max_side=100, quality=95, workers=1)
+        summary = builder.build([tiny])
+        self.assertEqual(summary["kept_source"], 1)
+        self.assertEqual(list(self.variants_dir.glob("*.webp")), [])
+        self.assertEqual(PhotoVariantIndex(self.variants_dir).resolve(tiny), tiny)
+
+        summary = builder.build([tiny])
+        self.assertEqual((summary["built"], summary["skipped"]), (0, 1))
+
+    def test_index_reloads_changed_manifest(self):
+        """Индекс, созданный до сборки вариантов, подхватывает новый манифест"""
+        index = PhotoVariantIndex(self.variants_dir)
+        self.assertEqual(index.resolve(self.big), self.big)
+
+        self._build()
+        self.assertEqual(index.resolve(self.big).parent, self.variants_dir)
+        self.assertEqual(index.reloads, 2)
+        self.assertFalse(index.refresh())
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Тест предвычисленных данных опросов (PollPayload)
+"""
+
+import unittest
+
+import sys
+sys.path.append('.')
+
+from modules.poll_payload import PollPayload, build_poll_payload, get_or_build_poll_payload, make_question_id
+
+
+def _identity(text):
+    return text
+
+
+class TestPollPayload(unittest.TestCase):
+    """Тест предвычисления и перемешивания вариантов опроса"""
+
+    def setUp(self):
+        self.question = {
+            "question": "Сколько будет 2+2?",
+            "options": ["3", "4 (четыре)", "5", "Очень длинный вариант ответа"],
+            "correct_option_text": "4 (четыре)",
+        }
+
+    def test_build_truncates_and_escapes(self):
+        """Варианты усекаются и экранируются один раз при построении"""
+        payload = build_poll_payload(self.question, "q1", 10, _identity)
+
+        self.assertTrue(payload.is_valid)
+        self.assertEqual(payload.correct_index, 1)
+        self.assertEqual(payload.options_plain[3], "Очень д...")
+        self.assertEqual(payload.options_escaped[1], "4 \\(четыре\\)")
+        self.assertEqual(payload.body_escaped, "Сколько будет 2\\+2?")
+
+    def test_shuffle_keeps_correct_answer(self):
+        """После перемешивания индекс указывает на правильный вариант"""
+        payload = build_poll_payload(self.question, "q1", 90, _identity)
+        for _ in range(20):
+            options, correct_idx = payload.shuffled()
+            self.assertEqual(sorted(options), sorted(payload.options_escaped))
+            self.assertEqual(options[correct_idx], payload.options_escaped[payload.correct_index])
+
+    def test_missing_correct_answer_is_invalid(self):
+        """Вопрос без правильного ответа среди вариантов помечается невалидным"""
+        self.question["correct_option_text"] = "42"
+        payload = build_poll_payload(self.question, "q1", 90, _identity)
+        self.assertFalse(payload.is_valid)
+
+    def test_question_text_with_header(self):
+        """Заголовок чата добавляется к готовому экранированному телу вопроса"""
+        payload = build_poll_payload(self.question, "q1", 90, _identity)
+        text = payload.build_question_text("Вопрос 1/10", 280)
+        self.assertEqual(text, "Вопрос 1/10\nСколько будет 2\\+2?")
+
+        truncated = payload.build_question_text("Вопрос 1/10", 15)
+        self.assertEqual(truncated, "Вопрос 1/10\n\\.\\.\\.")
+
+    def test_get_or_build_assigns_id(self):
+        """Вопрос без ID получает его и кэшируется"""
+        payloads = {}
+        self.question["original_category"] = "Математика"
+        payload = get_or_build_poll_payload(payloads, self.question, 90, _identity)
+
+        self.assertIsInstance(payload, PollPayload)
+        self.assertEqual(self.question["question_id"], make_question_id("Математика", self.question))
+        self.assertIs(get_or_build_poll_payload(payloads, self.question, 90, _identity), payload)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
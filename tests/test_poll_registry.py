@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Тест реестра опросов с вытеснением по сроку годности
+"""
+
+import pickle
+import unittest
+
+import sys
+sys.path.append('.')
+
+from modules.poll_registry import PollRegistry
+
+
+def _poll(chat_id, opened, open_period=60):
+    return {"chat_id": chat_id, "question_id": f"q{chat_id}", "open_timestamp": opened, "open_period_seconds": open_period}
+
+
+class TestPollRegistry(unittest.TestCase):
+    """Тест словарного интерфейса, вытеснения и сохранения"""
+
+    def test_evicts_only_expired(self):
+        """Вытесняются только опросы с истекшим сроком, удаленные вручную пропускаются"""
+        registry = PollRegistry(grace_seconds=10)
+        registry["a"] = _poll(-1, 1000.0)           # истекает в 1070
+        registry["b"] = _poll(-2, 1000.0, 600)      # истекает в 1610
+        registry["c"] = _poll(-3, 1010.0)           # истекает в 1080
+        del registry["c"]
+
+        self.assertEqual(registry.evict_expired(1069.0), {})
+        evicted = registry.evict_expired(1100.0)
+        self.assertEqual(list(evicted), ["a"])
+        self.assertNotIn("a", registry)
+        self.assertEqual(len(registry), 1)
+        self.assertEqual(registry.next_expiry(), 1610.0)
+        self.assertEqual(registry.evicted_total, 1)
+
+    def test_update_entry_in_place(self):
+        """Изменение полей записи не меняет срок, перезапись с новым временем - меняет"""
+        registry = PollRegistry(grace_seconds=0)
+        registry["a"] = _poll(-1, 100.0)
+        registry["a"]["solution_sent"] = True
+        registry["a"] = _poll(-1, 500.0)
+        self.assertEqual(registry.evict_expired(200.0), {})
+        self.assertEqual(list(registry.evict_expired(600.0)), ["a"])
+
+    def test_heap_compaction(self):
+        """Удаленные записи не накапливаются в куче"""
+        registry = PollRegistry(grace_seconds=0)
+        for i in range(500):
+            registry[str(i)] = _poll(i, float(i))
+            del registry[str(i)]
+        registry["last"] = _poll(0, 1.0)
+        self.assertLessEqual(registry.get_stats()["heap_size"], 130)
+
+    def test_pickle_roundtrip(self):
+        """После загрузки куча строится заново"""
+        registry = PollRegistry(grace_seconds=5)
+        registry["a"] = _poll(-1, 100.0)
+        restored = pickle.loads(pickle.dumps(registry))
+        self.assertEqual(restored["a"]["chat_id"], -1)
+        self.assertEqual(list(restored.evict_expired(1000.0)), ["a"])
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
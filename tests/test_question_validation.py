@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Тест параллельной валидации файлов вопросов
+"""
+
+import json
+import subprocess
+import tempfile
+import unittest
+from pathlib import Path
+
+import sys
+sys.path.append('.')
+
+from modules.question_validation import build_validation_report, iter_validate_question_files, validate_category_file
+
+
+class TestQuestionValidation(unittest.TestCase):
+    """Тест классификации, автоисправления и отчёта валидации"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.dir = Path(self.tmp.name)
+        self.good_question = {"question": "2+2?", "options": ["3", "4"], "correct": "4"}
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _write(self, name, content):
+        path = self.dir / f"{name}.json"
+        path.write_bytes(content.encode("utf-8") if isinstance(content, str) else content)
+        return path
+
+    def test_valid_file(self):
+        """Валидный файл: вопросы дополнены служебными полями, записана контрольная сумма"""
+        path = self._write("Математика", json.dumps([self.good_question, {"no_question": 1}]))
+        result = validate_category_file(str(path))
+
+        self.assertEqual(len(result.questions), 1)
+        question = result.questions[0]
+        self.assertEqual(question["correct_option_text"], "4")
+        self.assertEqual(question["original_category"], "Математика")
+        self.assertTrue(question["question_id"])
+        self.assertEqual([e["error_type"] for e in result.malformed], ["invalid_question"])
+        self.assertEqual(result.file_size, path.stat().st_size)
+        self.assertEqual(len(result.checksum), 32)
+
+    def test_not_list_and_broken_json(self):
+        """Файл не со списком и неисправимый JSON классифицируются как раньше"""
+        not_list = validate_category_file(str(self._write("dict", '{"a": 1}')))
+        broken = validate_category_file(str(self._write("broken", '[{"question": ')))
+
+        self.assertEqual(not_list.malformed[0]["error_type"], "category_not_list")
+        self.assertEqual(broken.malformed[0]["error_type"], "load_error")
+        self.assertFalse(broken.auto_fixed)
+
+    def test_auto_fix_bom_is_atomic_in_place(self):
+        """Файл с BOM исправляется на месте и загружается"""
+        path = self._write("bom", b"\xef\xbb\xbf" + json.dumps([self.good_question]).encode("utf-8") + b"\n\n")
+        result = validate_category_file(str(path))
+
+        self.assertTrue(result.auto_fixed)
+        self.assertEqual(len(result.questions), 1)
+        self.assertFalse(path.read_bytes().startswith(b"\xef\xbb\xbf"))
+        self.assertEqual(list(self.dir.glob("*.tmp")), [])
+
+    def test_validator_warnings_do_not_drop_questions(self):
+        """Нарушения правил QuizValidator попадают в предупреждения, вопрос остаётся"""
+        question = {"question": "Вопрос", "options": ["x" * 150, "y"], "correct": "y"}
+        result = validate_category_file(str(self._write("long", json.dumps([question]))))
+
+        self.assertEqual(len(result.questions), 1)
+        self.assertEqual(result.warnings_count, 1)
+        self.assertEqual(result.warnings[0]["index"], 0)
+
+    def test_streaming_pool_and_report(self):
+        """Пул процессов возвращает результаты по всем файлам, отчёт содержит время по файлам"""
+        paths = [self._write(f"cat{i}", json.dumps([self.good_question])) for i in range(5)]
+        results = list(iter_validate_question_files(paths, workers=2))
+        report = build_validation_report(results, 12.5, 2)
+
+        self.assertEqual(sorted(r.category for r in results), [f"cat{i}" for i in range(5)])
+        self.assertEqual(report["totals"]["files"], 5)
+        self.assertEqual(report["totals"]["questions"], 5)
+        self.assertTrue(all("duration_ms" in entry for entry in report["files"]))
+
+    def test_worker_import_does_not_load_bot(self):
+        """Процесс пула импортирует только правила: без telegram, handlers и data_manager"""
+        code = (
+            "import sys, modules.question_validation; "
+            "loaded = [m for m in ('telegram', 'handlers', 'data_manager', 'utils') if m in sys.modules]; "
+            "print(','.join(loaded))"
+        )
+        output = subprocess.run(
+            [sys.executable, "-c", code], capture_output=True, text=True, check=True,
+            cwd=Path(__file__).resolve().parent.parent
+        ).stdout.strip()
+        self.assertEqual(output, "")
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Тест акторов сессий викторин
+"""
+
+import asyncio
+import unittest
+
+import sys
+sys.path.append('.')
+
+from modules.quiz_actors import EVENT_ANSWER, EVENT_POLL_END, EVENT_STOP, QuizActorPool
+
+
+class TestQuizActorPool(unittest.TestCase):
+    """Тест очередности, склейки и метрик почтовых ящиков"""
+
+    def test_events_are_serialized_per_chat(self):
+        """События чата обрабатываются по одному и по порядку, чаты - независимо"""
+        async def scenario():
+            handled = []
+            running = set()
+            overlaps = []
+
+            async def handler(chat_id, event):
+                if chat_id in running:
+                    overlaps.append(chat_id)
+                running.add(chat_id)
+                try:
+                    await asyncio.sleep(0.001)
+                    if event.kind == EVENT_STOP:
+                        raise RuntimeError("сбой обработчика")
+                    handled.append((chat_id, event.kind, event.data.get("poll_id")))
+                finally:
+                    running.discard(chat_id)
+
+            pool = QuizActorPool(handler)
+            pool.post(1, EVENT_ANSWER, None, coalesce_key="p1", poll_id="p1")
+            pool.post(1, EVENT_ANSWER, None, coalesce_key="p1", poll_id="p1")
+            pool.post(2, EVENT_ANSWER, None, coalesce_key="p9", poll_id="p9")
+            pool.post(1, EVENT_STOP, None)
+            pool.post(1, EVENT_POLL_END, None, poll_id="p1")
+            self.assertEqual(pool.get_depth(1), 3)
+            self.assertTrue(await pool.drain(timeout=5))
+            return pool, handled, overlaps
+
+        pool, handled, overlaps = asyncio.run(scenario())
+        chat_1_events = [item for item in handled if item[0] == 1]
+        self.assertEqual(chat_1_events, [(1, EVENT_ANSWER, "p1"), (1, EVENT_POLL_END, "p1")])
+        self.assertIn((2, EVENT_ANSWER, "p9"), handled)
+        self.assertEqual(overlaps, [])
+
+        metrics = pool.get_metrics()
+        self.assertEqual(metrics["active_actors"], 0)
+        self.assertEqual(metrics["mailbox_depth"], 0)
+        self.assertEqual(metrics["coalesced_total"], 1)
+        self.assertEqual(metrics["processed_total"], 4)
+        self.assertEqual(metrics["errors_total"], 1)
+        self.assertEqual(metrics["max_depth_seen"], 3)
+
+    def test_coalesced_answer_can_be_posted_again_after_processing(self):
+        """После обработки ответа следующий ответ на тот же опрос снова попадает в ящик"""
+        async def scenario():
+            seen = []
+
+            async def handler(chat_id, event):
+                seen.append(event.kind)
+
+            pool = QuizActorPool(handler)
+            self.assertTrue(pool.post(5, EVENT_ANSWER, None, coalesce_key="p", poll_id="p"))
+            await pool.drain()
+            self.assertTrue(pool.post(5, EVENT_ANSWER, None, coalesce_key="p", poll_id="p"))
+            await pool.drain()
+            return seen
+
+        self.assertEqual(asyncio.run(scenario()), [EVENT_ANSWER, EVENT_ANSWER])
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
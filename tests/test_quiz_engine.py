@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Тест отправки опросов движком викторин
+"""
+
+import asyncio
+import unittest
+from types import SimpleNamespace
+
+import sys
+sys.path.append('.')
+
+from modules.quiz_engine import QuizEngine
+from modules.request_scheduler import BotRequestScheduler
+from modules.retry_policy import RetryPolicy
+
+QUESTION = {"question": "Столица Франции?", "options": ["Париж", "Лион"], "correct": "Париж"}
+
+
+class _FakeBot:
+    def __init__(self):
+        self.polls = []
+
+    async def send_poll(self, **kwargs):
+        self.polls.append(kwargs)
+        return SimpleNamespace(poll=None)  # движок дальше не идет
+
+
+def _engine():
+    state = SimpleNamespace(poll_payloads={})
+    app_config = SimpleNamespace(max_poll_option_length=100, max_poll_question_length=300)
+    data_manager = SimpleNamespace(_sanitize_text_for_telegram=lambda text: text)
+    engine = QuizEngine(state, app_config, data_manager)
+    engine.request_scheduler = BotRequestScheduler(max_requests_per_second=1000)
+    engine.retry_policy = RetryPolicy(min_delay=0.001, max_delay=0.005)
+    return engine
+
+
+class TestSendQuizPoll(unittest.TestCase):
+    """Тест использования заранее подготовленного опроса и оплаченного токена"""
+
+    def test_prefetch_miss_uses_prepaid_chat_token(self):
+        """При промахе заготовки оплаченный токен чата используется, а не оплачивается второй"""
+        async def scenario():
+            engine = _engine()
+            bot = _FakeBot()
+            context = SimpleNamespace(bot=bot)
+            # Заготовка для другого вопроса сессии
+            prepared = engine.prepare_quiz_poll(-100, QUESTION, "Вопрос 2", question_session_index=1)
+            await engine.request_scheduler.prepay_chat_token(-100)
+            await engine.send_quiz_poll(
+                context, -100, QUESTION, "Вопрос 1", open_period_seconds=30, quiz_type="session",
+                question_session_index=0, prepared=prepared
+            )
+            limiter = engine.request_scheduler.rate_limiter
+            return engine, bot, limiter.get_stats()["prepaid_tokens"], limiter.chat_buckets[-100]
+
+        engine, bot, prepaid, bucket = asyncio.run(scenario())
+        self.assertEqual(len(bot.polls), 1)
+        self.assertEqual(engine.get_prefetch_stats()["misses"], 1)
+        self.assertEqual((prepaid["used"], prepaid["outstanding"]), (1, 0))
+        # Списан только один токен чата - при оплате заранее
+        self.assertAlmostEqual(bucket.tokens, bucket.capacity - 1, places=2)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Тест разнесения запусков ежедневных викторин одного слота
+"""
+
+import unittest
+from datetime import datetime, timedelta, timezone
+
+import sys
+sys.path.append('.')
+
+from modules.quiz_fanout import build_fanout_report, plan_fanout
+
+
+class TestQuizFanout(unittest.TestCase):
+    """Тест плана запуска группы"""
+
+    def setUp(self):
+        self.slot = datetime(2025, 3, 1, 6, 0, tzinfo=timezone.utc)
+        self.chat_ids = [-1001, -1002, -1003, -1004]
+
+    def test_offsets_cover_window(self):
+        """Смещения равномерно распределены по окну, первый чат стартует в момент слота"""
+        plan = plan_fanout(self.chat_ids, self.slot, 60)
+        self.assertEqual(sorted(chat_id for chat_id, _ in plan), sorted(self.chat_ids))
+        self.assertEqual([offset for _, offset in plan], [0.0, 15.0, 30.0, 45.0])
+
+    def test_order_is_deterministic_per_slot(self):
+        """Порядок не зависит от порядка добавления, но меняется от дня к дню"""
+        plan = plan_fanout(self.chat_ids, self.slot, 60)
+        self.assertEqual(plan_fanout(reversed(self.chat_ids), self.slot, 60), plan)
+
+        orders = {
+            tuple(chat_id for chat_id, _ in plan_fanout(self.chat_ids, self.slot + timedelta(days=day), 60))
+            for day in range(10)
+        }
+        self.assertGreater(len(orders), 1)
+
+    def test_single_chat_and_report(self):
+        """Одиночный чат стартует без смещения, отчет считает отклонения"""
+        self.assertEqual(plan_fanout([-1001], self.slot, 60), [(-1001, 0.0)])
+        report = build_fanout_report(self.slot, 60, [0.01, 0.03], preselected=2)
+        self.assertEqual(report["chats"], 2)
+        self.assertEqual(report["max_start_skew"], 0.03)
+        self.assertEqual(report["avg_start_skew"], 0.02)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
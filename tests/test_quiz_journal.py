@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Тест журнала активных викторин
+"""
+
+import json
+import tempfile
+import unittest
+from pathlib import Path
+
+import sys
+sys.path.append('.')
+
+from modules.quiz_journal import (
+    EVENT_FINALIZED, EVENT_MESSAGES, EVENT_POLL_CLOSED, EVENT_PROGRESSION,
+    EVENT_QUESTION_SENT, EVENT_SCORE, QuizJournal
+)
+
+
+def make_snapshot(chat_id):
+    return {
+        "chat_id": chat_id, "quiz_type": "session", "quiz_mode": "serial_immediate",
+        "num_questions_to_ask": 3, "open_period_seconds": 30, "quiz_start_time": None,
+        "current_question_index": 0, "scores": {}, "active_poll_ids_in_session": [],
+        "latest_poll_id_sent": None, "progression_triggered_for_poll": {},
+        "message_ids_to_delete": [5], "is_stopping": False,
+        "poll_and_solution_message_ids": [], "results_message_ids": [], "questions": [],
+    }
+
+
+class TestQuizJournal(unittest.TestCase):
+    """Тест воспроизведения журнала поверх снимка"""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.journal = QuizJournal(Path(self.tmp_dir.name) / "active_quizzes")
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_replay_transitions(self):
+        """Переходы сессии восстанавливаются из журнала, оборванная строка пропускается"""
+        self.journal.write_snapshot(-100, make_snapshot(-100))
+        self.journal.append(-100, EVENT_QUESTION_SENT, index=1, poll_id="p1")
+        self.journal.append(-100, EVENT_SCORE, user_id="7", entry={"name": "Аня", "score": 1, "answered_this_session": ["p1"]})
+        self.journal.append(-100, EVENT_PROGRESSION, poll_id="p1")
+        self.journal.append(-100, EVENT_QUESTION_SENT, index=2, poll_id="p2")
+        self.journal.append(-100, EVENT_POLL_CLOSED, poll_id="p1", poll_msg_id=11, solution_msg_id=12)
+        self.journal.append(-100, EVENT_MESSAGES, message_ids=[5, 13])
+        with open(self.journal._journal_path(-100), "ab") as f:
+            f.write(b'{"e":"score","user_id":"8"')  # сбой посреди записи
+
+        quiz_data = self.journal.load_all()[-100]
+        self.assertEqual(quiz_data["current_question_index"], 2)
+        self.assertEqual(quiz_data["active_poll_ids_in_session"], ["p2"])
+        self.assertEqual(quiz_data["latest_poll_id_sent"], "p2")
+        self.assertEqual(quiz_data["progression_triggered_for_poll"], {"p2": False})
+        self.assertEqual(quiz_data["scores"]["7"]["score"], 1)
+        self.assertEqual(quiz_data["poll_and_solution_message_ids"], [{"poll_msg_id": 11, "solution_msg_id": 12}])
+        self.assertEqual(quiz_data["message_ids_to_delete"], [5, 13])
+
+    def test_snapshot_resets_journal_and_finalized_sessions_are_dropped(self):
+        """Новый снимок начинает журнал заново; финализированная сессия не восстанавливается"""
+        self.journal.write_snapshot(1, make_snapshot(1))
+        self.journal.append(1, EVENT_QUESTION_SENT, index=1, poll_id="a")
+        self.journal.write_snapshot(1, make_snapshot(1))
+        self.assertEqual(self.journal.replay(1)["current_question_index"], 0)
+
+        self.journal.write_snapshot(2, make_snapshot(2))
+        self.journal.append(2, EVENT_FINALIZED)
+        self.journal.append(3, EVENT_QUESTION_SENT, index=1, poll_id="b")  # без снимка не пишется
+
+        self.assertEqual(list(self.journal.load_all()), [1])
+        self.assertEqual(self.journal.chat_ids(), [1])
+        self.assertEqual(self.journal.retain([]), 1)
+        self.assertEqual(self.journal.get_stats()["sessions"], 0)
+
+
+class TestLegacyActiveQuizzesMigration(unittest.TestCase):
+    """Тест переноса active_quizzes.json прежнего формата в журналы"""
+
+    def setUp(self):
+        from types import SimpleNamespace
+        from data_manager import DataManager
+
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.data_dir = Path(self.tmp_dir.name)
+        self.data_manager = DataManager.__new__(DataManager)
+        self.data_manager.app_config = SimpleNamespace(data_dir=self.data_dir)
+        self.data_manager.quiz_journal = QuizJournal(self.data_dir / "active_quizzes")
+        self.legacy_file = self.data_dir / "active_quizzes.json"
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def _write_legacy(self, text):
+        self.legacy_file.write_text(text, encoding="utf-8")
+
+    def test_stale_or_empty_legacy_file_is_removed(self):
+        """Файл удаляется, даже если восстанавливать нечего"""
+        stale = make_snapshot(-1)
+        stale["quiz_start_time"] = "2020-01-01T00:00:00+00:00"
+        for content in ('{"active_quizzes": {}}', json.dumps({"active_quizzes": {"-1": stale}})):
+            self._write_legacy(content)
+            self.assertEqual(self.data_manager.load_active_quizzes(), {})
+            self.assertFalse(self.legacy_file.exists())
+
+    def test_legacy_quizzes_move_to_journal(self):
+        """Актуальные викторины переносятся в журналы, журнал новее файла"""
+        self.data_manager.quiz_journal.write_snapshot(-2, {**make_snapshot(-2), "current_question_index": 2})
+        self._write_legacy(json.dumps({"active_quizzes": {"-1": make_snapshot(-1), "-2": make_snapshot(-2)}}))
+
+        quizzes = self.data_manager.load_active_quizzes()
+        self.assertFalse(self.legacy_file.exists())
+        self.assertEqual(sorted(quizzes), [-2, -1])
+        self.assertEqual(quizzes[-2]["current_question_index"], 2)
+        self.assertEqual(self.data_manager.quiz_journal.chat_ids(), [-2, -1])
+
+    def test_unreadable_legacy_file_is_renamed(self):
+        """Нечитаемый файл переименовывается и больше не читается"""
+        self._write_legacy('{"active_quizzes": ')
+        self.assertEqual(self.data_manager.load_active_quizzes(), {})
+        self.assertFalse(self.legacy_file.exists())
+        self.assertTrue((self.data_dir / "active_quizzes.json.corrupt").exists())
+
+
+    def test_messages_added_after_snapshot_survive_restore(self):
+        """ID сообщений, добавленных после снимка, восстанавливаются из журнала"""
+        from types import SimpleNamespace
+
+        quiz_state = SimpleNamespace(chat_id=-1, message_ids_to_delete={5})
+        self.data_manager.quiz_journal.write_snapshot(-1, make_snapshot(-1))
+        self.data_manager.add_quiz_message_for_deletion(quiz_state, 42)
+
+        self.assertEqual(quiz_state.message_ids_to_delete, {5, 42})
+        self.assertEqual(self.data_manager.load_active_quizzes()[-1]["message_ids_to_delete"], [5, 42])
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
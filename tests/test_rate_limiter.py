@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Тест token bucket rate limiter
+"""
+
+import asyncio
+import unittest
+
+import sys
+sys.path.append('.')
+
+from modules.rate_limiter import RequestPriority, TelegramRateLimiter, TokenBucket
+from telegram import Bot
+
+from modules.request_scheduler import BotRequestScheduler, RequestBackpressureError, ScheduledHTTPXRequest
+
+
+class TestTokenBucket(unittest.TestCase):
+    """Тест ведра токенов"""
+
+    def test_reserve_and_refill(self):
+        """Резервация уходит в долг и возвращает время ожидания"""
+        bucket = TokenBucket(capacity=2, rate=1.0, now=0.0)
+        self.assertEqual(bucket.reserve(0.0), 0.0)
+        self.assertEqual(bucket.reserve(0.0), 0.0)
+        self.assertAlmostEqual(bucket.reserve(0.0), 1.0)
+        self.assertAlmostEqual(bucket.reserve(0.0), 2.0)
+        self.assertAlmostEqual(bucket.full_at(), 4.0)
+        self.assertEqual(bucket.wait_time(4.0), 0.0)
+
+
+class TestTelegramRateLimiter(unittest.TestCase):
+    """Тест приоритетов, порядка обслуживания и вытеснения чатов"""
+
+    def test_priority_then_fifo(self):
+        """При исчерпании глобального лимита опросы обслуживаются раньше удалений, внутри класса - FIFO"""
+        async def scenario():
+            limiter = TelegramRateLimiter(max_requests_per_second=1, max_requests_per_minute_per_chat=1000)
+            await limiter.acquire(0)  # Исчерпываем глобальное ведро
+            order = []
+
+            async def request(name, chat_id, priority):
+                await limiter.acquire(chat_id, priority)
+                order.append(name)
+
+            tasks = [
+                asyncio.create_task(request("cleanup-1", 1, RequestPriority.CLEANUP)),
+                asyncio.create_task(request("cleanup-2", 2, RequestPriority.CLEANUP)),
+                asyncio.create_task(request("poll-1", 3, RequestPriority.POLL)),
+                asyncio.create_task(request("poll-2", 4, RequestPriority.POLL)),
+            ]
+            await asyncio.sleep(0)
+            self.assertEqual(limiter.get_queue_depth()["cleanup"], 2)
+            limiter.global_bucket.rate = 1000.0  # Ускоряем пополнение для теста
+            await asyncio.gather(*tasks)
+            return order
+
+        self.assertEqual(asyncio.run(scenario()), ["poll-1", "poll-2", "cleanup-1", "cleanup-2"])
+
+    def test_idle_chats_are_evicted(self):
+        """Чаты с полностью пополненным ведром вытесняются"""
+        async def scenario():
+            limiter = TelegramRateLimiter(max_requests_per_second=1000, max_requests_per_minute_per_chat=60)
+            for chat_id in range(5):
+                await limiter.acquire(chat_id)
+            for bucket in limiter.chat_buckets.values():
+                bucket.updated -= 2.0  # Прошло достаточно времени для пополнения
+            await limiter.acquire(100)
+            return limiter
+
+        limiter = asyncio.run(scenario())
+        self.assertEqual(limiter.evicted_chats, TelegramRateLimiter.EVICTIONS_PER_ACQUIRE)
+        self.assertIn(100, limiter.chat_buckets)
+        self.assertEqual(limiter.get_stats()["total_requests"], 6)
+
+    def test_prepaid_chat_token(self):
+        """Заранее оплаченный токен чата используется один раз, неиспользованный возвращается в ведро"""
+        async def scenario():
+            limiter = TelegramRateLimiter(max_requests_per_second=1000, max_requests_per_minute_per_chat=2)
+            self.assertEqual(await limiter.prepay_chat_token(7), 0.0)
+            self.assertAlmostEqual(limiter.chat_buckets[7].tokens, 1.0, places=3)
+
+            # Запрос с оплаченным токеном не списывает токен из ведра чата
+            await limiter.acquire(7, RequestPriority.POLL, use_prepaid_token=True)
+            self.assertAlmostEqual(limiter.chat_buckets[7].tokens, 1.0, places=3)
+            # Следующий запрос резервирует обычным образом
+            await limiter.acquire(7, RequestPriority.POLL, use_prepaid_token=True)
+            self.assertAlmostEqual(limiter.chat_buckets[7].tokens, 0.0, places=2)
+
+            limiter.chat_buckets[7].tokens = 1.0
+            await limiter.prepay_chat_token(7)
+            self.assertEqual(limiter.release_prepaid_chat_tokens(7), 1)
+            self.assertAlmostEqual(limiter.chat_buckets[7].tokens, 1.0, places=2)
+            return limiter.get_stats()["prepaid_tokens"]
+
+        stats = asyncio.run(scenario())
+        self.assertEqual(stats["issued"], 2)
+        self.assertEqual(stats["used"], 1)
+        self.assertEqual(stats["outstanding"], 0)
+
+
+class _FakeBot:
+    async def delete_message(self, chat_id, message_id):
+        return chat_id, message_id
+
+
+class _OfflineRequest(ScheduledHTTPXRequest):
+    """Транспорт без сети: запоминает методы Bot API и отвечает успехом"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.methods = []
+
+    async def do_request(self, url, method, request_data=None, **kwargs):
+        self.methods.append(url.rsplit("/", 1)[-1])
+        return 200, b'{"ok": true, "result": true}'
+
+
+class TestBotRequestScheduler(unittest.TestCase):
+    """Тест планировщика исходящих запросов"""
+
+    def test_cleanup_burst_does_not_starve_polls(self):
+        """Опрос, пришедший во время всплеска удалений, выполняется раньше оставшихся удалений"""
+        async def scenario():
+            scheduler = BotRequestScheduler(max_requests_per_second=2, max_requests_per_minute_per_chat=1000)
+            order = []
+
+            async def api_call(name):
+                order.append(name)
+                return name
+
+            deletes = [
+                asyncio.create_task(scheduler.call(1, RequestPriority.CLEANUP, api_call, f"delete-{i}", chat_limited=False))
+                for i in range(6)
+            ]
+            await asyncio.sleep(0)
+            self.assertFalse(scheduler.is_congested(RequestPriority.BROADCAST))
+            poll = asyncio.create_task(scheduler.call(2, RequestPriority.POLL, api_call, "poll"))
+            await asyncio.sleep(0)
+            self.assertTrue(scheduler.is_congested(RequestPriority.CLEANUP))
+            scheduler.rate_limiter.global_bucket.rate = 1000.0
+            await asyncio.gather(poll, *deletes)
+            return order, scheduler.get_metrics()
+
+        order, metrics = asyncio.run(scenario())
+        self.assertLess(order.index("poll"), order.index("delete-5"))
+        self.assertEqual(order.index("poll"), 2)  # сразу после двух удалений, уже получивших токены
+        self.assertEqual(metrics["priorities"]["cleanup"]["submitted"], 6)
+        self.assertEqual(metrics["priorities"]["cleanup"]["max_pending_seen"], 4)
+
+    def test_backpressure_rejects_overflow(self):
+        """Переполненная очередь класса отклоняет новые запросы"""
+        async def scenario():
+            scheduler = BotRequestScheduler(max_requests_per_second=1, max_pending={RequestPriority.CLEANUP: 1})
+            blocker = asyncio.Event()
+
+            async def api_call():
+                await blocker.wait()
+
+            first = asyncio.create_task(scheduler.call(1, RequestPriority.CLEANUP, api_call))
+            await asyncio.sleep(0)
+            second = asyncio.create_task(scheduler.call(1, RequestPriority.CLEANUP, api_call))
+            await asyncio.sleep(0)
+            with self.assertRaises(RequestBackpressureError):
+                await scheduler.call(1, RequestPriority.CLEANUP, api_call)
+            blocker.set()
+            scheduler.rate_limiter.global_bucket.rate = 1000.0
+            await asyncio.gather(first, second)
+            return scheduler.get_metrics()
+
+        metrics = asyncio.run(scenario())
+        self.assertEqual(metrics["priorities"]["cleanup"]["rejected"], 1)
+
+    def test_chat_id_kwarg_is_forwarded_to_method(self):
+        """chat_id=... в kwargs передается методу бота, а не конфликтует с аргументом планировщика"""
+        async def scenario():
+            scheduler = BotRequestScheduler()
+            received = {}
+
+            async def send_message(chat_id, text, priority=None):
+                received.update(chat_id=chat_id, text=text, priority=priority)
+                return "sent"
+
+            result = await scheduler.call(
+                -100, RequestPriority.MESSAGE, send_message,
+                chat_id=-100, text="привет", priority="kwarg метода"
+            )
+            deleted = await scheduler.delete_message(_FakeBot(), -100, 7)
+            return result, received, deleted, scheduler.get_metrics()
+
+        result, received, deleted, metrics = asyncio.run(scenario())
+        self.assertEqual(result, "sent")
+        self.assertEqual(received, {"chat_id": -100, "text": "привет", "priority": "kwarg метода"})
+        self.assertEqual(deleted, (-100, 7))
+        self.assertEqual(metrics["priorities"]["message"]["submitted"], 1)
+        self.assertEqual(metrics["priorities"]["cleanup"]["submitted"], 1)
+
+
+    def test_transport_schedules_direct_bot_calls_once(self):
+        """Прямые вызовы бота планируются транспортом, вызовы через call - не повторно"""
+        async def scenario():
+            scheduler = BotRequestScheduler()
+            request = _OfflineRequest(scheduler=scheduler)
+            bot = Bot("123:test", request=request)
+            await bot.delete_message(chat_id=5, message_id=1)
+            await bot.send_chat_action(chat_id=5, action="typing")
+            await scheduler.call(5, RequestPriority.POLL, bot.delete_message, chat_id=5, message_id=2)
+            return request.methods, scheduler.get_metrics()
+
+        methods, metrics = asyncio.run(scenario())
+        self.assertEqual(methods, ["deleteMessage", "sendChatAction", "deleteMessage"])
+        self.assertEqual(metrics["transport_routed"], {"deleteMessage": 1, "sendChatAction": 1})
+        self.assertEqual(metrics["priorities"]["cleanup"]["submitted"], 1)
+        self.assertEqual(metrics["priorities"]["message"]["submitted"], 1)
+        self.assertEqual(metrics["priorities"]["poll"]["submitted"], 1)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
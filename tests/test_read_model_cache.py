@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Тест кэша разобранных JSON-файлов веб-панели
+"""
+
+import json
+import os
+import tempfile
+import unittest
+from pathlib import Path
+
+import sys
+sys.path.append('.')
+
+from modules.read_model_cache import ReadModelCache
+
+
+class TestReadModelCache(unittest.TestCase):
+    """Тест инвалидации по версии файла"""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.path = Path(self.tmp_dir.name) / "stats.json"
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def _replace(self, text, mtime_ns=None):
+        """Атомарная запись, как у бота: новый inode; mtime можно оставить прежним"""
+        tmp_path = self.path.with_name(".stats.json.tmp")
+        tmp_path.write_text(text, encoding="utf-8")
+        if mtime_ns is not None:
+            os.utime(tmp_path, ns=(mtime_ns, mtime_ns))
+        os.replace(tmp_path, self.path)
+
+    def test_replace_with_same_mtime_and_size_is_reloaded(self):
+        """os.replace меняет inode: новое содержимое видно даже при том же mtime и размере"""
+        cache = ReadModelCache()
+        self._replace('{"score": 1}')
+        first = cache.load_json(self.path)
+        self.assertEqual(first, {"score": 1})
+        self.assertIs(cache.load_json(self.path), first)
+
+        # Старый inode жив, пока открыт: новый файл не получит его номер
+        with open(self.path, "rb"):
+            self._replace('{"score": 2}', mtime_ns=self.path.stat().st_mtime_ns)
+        self.assertEqual(cache.load_json(self.path), {"score": 2})
+        self.assertEqual((cache.hits, cache.misses), (1, 2))
+
+    def test_broken_file_is_cached_until_changed(self):
+        """Поврежденный файл разбирается один раз на версию, исправленный - перечитывается"""
+        cache = ReadModelCache()
+        self._replace('{"score": ')
+        self.assertEqual(cache.load_json(self.path, default={}), {})
+        self.assertEqual(cache.load_json(self.path, default={}), {})
+        self.assertEqual((cache.errors, cache.misses), (1, 1))
+
+        self._replace(json.dumps({"score": 3}))
+        self.assertEqual(cache.load_json(self.path, default={}), {"score": 3})
+        self.assertEqual(cache.errors, 1)
+
+    def test_deleted_file_drops_entry(self):
+        """Удаленный файл возвращает default и уходит из кэша"""
+        cache = ReadModelCache()
+        self._replace('[1, 2, 3]')
+        self.assertEqual(cache.load_json(self.path), [1, 2, 3])
+        self.assertEqual(cache.get_stats()["entries"], 1)
+
+        self.path.unlink()
+        self.assertIsNone(cache.load_json(self.path))
+        self.assertEqual(cache.get_stats()["entries"], 0)
+
+    def test_count_items(self):
+        """count_items хранит только количество и следит за версией отдельно от load_json"""
+        cache = ReadModelCache()
+        self.assertEqual(cache.count_items(self.path), 0)
+        self._replace(json.dumps([{"q": 1}, {"q": 2}]))
+        self.assertEqual(cache.count_items(self.path), 2)
+        self.assertEqual(cache.count_items(self.path), 2)
+        self.assertEqual(cache.load_json(self.path), [{"q": 1}, {"q": 2}])
+        self.assertEqual(cache.get_stats()["entries"], 2)
+
+        with open(self.path, "rb"):
+            self._replace(json.dumps([{"q": 1}, {"q": 2}, {"q": 3}]))
+        self.assertEqual(cache.count_items(self.path), 3)
+        self.assertEqual(cache.get_stats()["hits"], 1)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
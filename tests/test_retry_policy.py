@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Тест единой политики повторов и circuit breaker'ов
+"""
+
+import asyncio
+import unittest
+
+import sys
+sys.path.append('.')
+
+from telegram.error import BadRequest, Forbidden, RetryAfter, TimedOut
+
+from modules.retry_policy import CircuitBreaker, CircuitOpenError, ErrorClass, RetryPolicy, classify_error
+
+
+def _fast_policy(**kwargs):
+    return RetryPolicy(min_delay=0.001, max_delay=0.005, **kwargs)
+
+
+class TestErrorClassification(unittest.TestCase):
+    """Тест классификации ошибок Bot API"""
+
+    def test_classify(self):
+        """BadRequest не считается сетевой ошибкой, хотя наследует NetworkError"""
+        self.assertEqual(classify_error(TimedOut()), ErrorClass.TRANSIENT)
+        self.assertEqual(classify_error(RetryAfter(3)), ErrorClass.FLOOD)
+        self.assertEqual(classify_error(Forbidden("bot was blocked by the user")), ErrorClass.CHAT_UNAVAILABLE)
+        self.assertEqual(classify_error(BadRequest("Chat not found")), ErrorClass.CHAT_UNAVAILABLE)
+        self.assertEqual(classify_error(BadRequest("Message is too long")), ErrorClass.BAD_REQUEST)
+
+
+class TestRetryPolicy(unittest.TestCase):
+    """Тест повторов и размыкания цепей"""
+
+    def test_transient_errors_are_retried(self):
+        """Таймаут повторяется, успешная попытка возвращает результат"""
+        calls = []
+
+        async def flaky():
+            calls.append(1)
+            if len(calls) < 3:
+                raise TimedOut()
+            return "ok"
+
+        policy = _fast_policy()
+        self.assertEqual(asyncio.run(policy.execute(1, flaky, max_attempts=5)), "ok")
+        self.assertEqual(len(calls), 3)
+        self.assertEqual(policy.get_stats()["retries"], 2)
+        self.assertNotIn(1, policy.chat_breakers)
+
+    def test_bad_request_is_not_retried(self):
+        """Ошибка запроса пробрасывается сразу"""
+        calls = []
+
+        async def bad():
+            calls.append(1)
+            raise BadRequest("Message is too long")
+
+        with self.assertRaises(BadRequest):
+            asyncio.run(_fast_policy().execute(1, bad, max_attempts=5))
+        self.assertEqual(len(calls), 1)
+
+    def test_chat_breaker_fails_fast(self):
+        """После серии таймаутов в чат следующие вызовы не выполняются, другие чаты работают"""
+        calls = []
+
+        async def timeout():
+            calls.append(1)
+            raise TimedOut()
+
+        async def ok():
+            return "ok"
+
+        async def scenario():
+            policy = _fast_policy(chat_failure_threshold=3, global_failure_threshold=100)
+            with self.assertRaises(TimedOut):
+                await policy.execute(7, timeout, max_attempts=3)
+            with self.assertRaises(CircuitOpenError):
+                await policy.execute(7, timeout, max_attempts=3)
+            self.assertEqual(await policy.execute(8, ok), "ok")
+            return policy
+
+        policy = asyncio.run(scenario())
+        self.assertEqual(len(calls), 3)
+        self.assertEqual(policy.get_stats()["short_circuited"], 1)
+
+    def test_global_breaker_half_open_probe(self):
+        """Глобальная цепь пропускает один пробный вызов после recovery_timeout"""
+        breaker = CircuitBreaker(failure_threshold=2, recovery_timeout=10.0)
+        breaker.record_failure(0.0)
+        breaker.record_failure(1.0)
+        self.assertEqual(breaker.state, CircuitBreaker.OPEN)
+        self.assertFalse(breaker.allow(5.0))
+        self.assertTrue(breaker.allow(11.0))
+        self.assertFalse(breaker.allow(11.5))  # Пробный вызов уже идет
+        breaker.record_success()
+        self.assertTrue(breaker.allow(12.0))
+
+    def test_unknown_error_is_not_route_success(self):
+        """Локальная ошибка не замыкает цепь и не учитывается в задержке, проба освобождается"""
+        async def broken():
+            raise ValueError("не сериализуется")
+
+        async def scenario():
+            policy = _fast_policy(global_failure_threshold=2, global_recovery_timeout=0.0)
+            policy.global_breaker.record_failure(0.0)
+            policy.global_breaker.record_failure(0.0)
+            with self.assertRaises(ValueError):
+                await policy.execute(7, broken, max_attempts=3)
+            return policy
+
+        policy = asyncio.run(scenario())
+        # Проба не состоялась как ответ API: цепь не замкнута, но следующая проба возможна
+        self.assertEqual(policy.global_breaker.state, CircuitBreaker.HALF_OPEN)
+        self.assertFalse(policy.global_breaker.probe_in_flight)
+        self.assertEqual(policy.global_breaker.failures, 2)
+        self.assertIsNone(policy.latency.srtt)
+        self.assertEqual(policy.get_stats()["errors_by_class"]["unknown"], 1)
+
+    def test_chat_id_kwarg_is_forwarded_to_method(self):
+        """chat_id=... в kwargs передается вызываемому методу"""
+        async def send_message(chat_id, text, max_attempts=None):
+            return chat_id, text, max_attempts
+
+        result = asyncio.run(_fast_policy().execute(-100, send_message, chat_id=-100, text="привет"))
+        self.assertEqual(result, (-100, "привет", None))
+
+    def test_backoff_follows_latency(self):
+        """Пауза между попытками растет вместе с наблюдаемой задержкой"""
+        policy = RetryPolicy(min_delay=0.2, max_delay=15.0)
+        fast = policy.backoff_delay(0)
+        for _ in range(10):
+            policy.latency.observe(3.0)
+        slow = policy.backoff_delay(0)
+        self.assertLess(fast, 0.3)
+        self.assertGreater(slow, 2.0)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
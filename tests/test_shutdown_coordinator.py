@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Тест координатора корректной остановки
+"""
+
+import asyncio
+import time
+import unittest
+
+import sys
+sys.path.append('.')
+
+from modules.shutdown_coordinator import (
+    PRIORITY_DRAIN, PRIORITY_FLUSH, PRIORITY_STOP_INTAKE,
+    STATUS_FAILED, STATUS_OK, STATUS_SKIPPED, STATUS_TIMEOUT, ShutdownCoordinator,
+)
+
+
+class TestShutdownCoordinator(unittest.TestCase):
+    """Тест порядка, параллельности и дедлайнов хуков остановки"""
+
+    def test_priority_order_and_parallel_flush(self):
+        """Группы идут по приоритету, хуки сброса группы выполняются параллельно"""
+        async def scenario():
+            calls = []
+            coordinator = ShutdownCoordinator(total_deadline=5)
+
+            async def intake():
+                calls.append("intake")
+
+            async def drain():
+                calls.append("drain")
+
+            def flush(name):
+                def hook():
+                    time.sleep(0.2)
+                    calls.append(name)
+                return hook
+
+            coordinator.register("flush_a", flush("flush_a"), priority=PRIORITY_FLUSH)
+            coordinator.register("flush_b", flush("flush_b"), priority=PRIORITY_FLUSH)
+            coordinator.register("drain", drain, priority=PRIORITY_DRAIN, parallel=False)
+            coordinator.register("intake", intake, priority=PRIORITY_STOP_INTAKE)
+
+            self.assertFalse(await coordinator.wait(timeout=0))
+            coordinator.request_stop("SIGTERM")
+            self.assertTrue(await coordinator.wait(timeout=1))
+
+            started = time.monotonic()
+            report = await coordinator.run()
+            return calls, report, time.monotonic() - started
+
+        calls, report, elapsed = asyncio.run(scenario())
+        self.assertEqual(calls[:2], ["intake", "drain"])
+        self.assertEqual(set(calls[2:]), {"flush_a", "flush_b"})
+        # Два хука по 0.2 сек в потоках: параллельно, а не 0.4 сек подряд
+        self.assertLess(elapsed, 0.35)
+        self.assertEqual(report.reason, "SIGTERM")
+        self.assertEqual(report.not_persisted, [])
+        self.assertEqual(set(report.persisted), {"intake", "drain", "flush_a", "flush_b"})
+
+    def test_failed_timeout_and_skipped_hooks_are_reported(self):
+        """Упавший, зависший и не дождавшийся очереди хуки попадают в несохраненные"""
+        async def scenario():
+            coordinator = ShutdownCoordinator(total_deadline=0.3)
+
+            def broken():
+                raise OSError("диск недоступен")
+
+            async def hanging():
+                await asyncio.sleep(10)
+
+            coordinator.register("ok", lambda: None, priority=PRIORITY_DRAIN)
+            coordinator.register("broken", broken, priority=PRIORITY_DRAIN)
+            coordinator.register("hanging", hanging, priority=PRIORITY_DRAIN, deadline=1.0)
+            coordinator.register("late", lambda: None, priority=PRIORITY_FLUSH)
+            report = await coordinator.run()
+            # Повторный запуск ничего не выполняет
+            second = await coordinator.run()
+            return report, second
+
+        report, second = asyncio.run(scenario())
+        statuses = {outcome.name: outcome.status for outcome in report.outcomes}
+        self.assertEqual(statuses, {
+            "ok": STATUS_OK,
+            "broken": STATUS_FAILED,
+            # Дедлайн хука урезан общим дедлайном
+            "hanging": STATUS_TIMEOUT,
+            "late": STATUS_SKIPPED,
+        })
+        self.assertEqual(set(report.not_persisted), {"broken", "hanging", "late"})
+        self.assertEqual(second.outcomes, [])
+
+    def test_data_manager_shared_file_hooks_run_in_order(self):
+        """Статистика категорий и очки пишут общие файлы: по очереди, глобальная статистика - один раз"""
+        from types import SimpleNamespace
+        from unittest import mock
+        from data_manager import DataManager
+
+        calls = []
+        data_manager = DataManager.__new__(DataManager)
+        data_manager.state = SimpleNamespace(user_scores={-1: {}, -2: {}, -3: {}})
+        data_manager.category_manager = SimpleNamespace(force_save_all_stats=lambda: calls.append("category_stats"))
+        with mock.patch.object(DataManager, "save_user_data", lambda self, chat_id, update_global=True: calls.append(("chat", chat_id, update_global))), \
+                mock.patch.object(DataManager, "update_global_statistics", lambda self: calls.append("global")):
+            coordinator = ShutdownCoordinator()
+            data_manager.register_flush_hooks(coordinator)
+            hooks = coordinator._hooks
+            self.assertFalse(hooks["category_stats"].parallel)
+            self.assertFalse(hooks["user_scores"].parallel)
+            self.assertTrue(hooks["deletion_timers"].parallel)
+            for name in ("active_quizzes", "messages_to_delete", "deletion_timers", "chat_settings", "analytics_views"):
+                coordinator.unregister(name)
+            report = asyncio.run(coordinator.run())
+
+        self.assertEqual(report.persisted, ["category_stats", "user_scores"])
+        self.assertEqual(calls, [
+            "category_stats",
+            ("chat", -1, False), ("chat", -2, False), ("chat", -3, False),
+            "global",
+        ])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Тест кэша file_id изображений фото-викторины
+"""
+
+import os
+import tempfile
+import unittest
+from pathlib import Path
+
+import sys
+sys.path.append('.')
+
+from modules.telegram_file_cache import TelegramFileIdCache, is_stale_file_id_error
+
+
+class TestTelegramFileIdCache(unittest.TestCase):
+    """Тест кэша по хешу содержимого"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp.name)
+        self.image = self.root / "Лиса.webp"
+        self.image.write_bytes(b"RIFF-fox")
+        self.cache_file = self.root / "system" / "photo_file_ids.json"
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_persisted_and_keyed_by_content(self):
+        """file_id переживает перезапуск и находится по содержимому, а не по имени"""
+        cache = TelegramFileIdCache(self.cache_file)
+        self.assertIsNone(cache.get(self.image, bot_id=1))
+        cache.put(self.image, "FILE-1", bot_id=1)
+
+        renamed = self.root / "Лиса2.webp"
+        renamed.write_bytes(b"RIFF-fox")
+        restored = TelegramFileIdCache(self.cache_file)
+        self.assertEqual(restored.get(renamed, bot_id=1), "FILE-1")
+
+        # Новое содержимое - новая загрузка
+        self.image.write_bytes(b"RIFF-fox-v2")
+        os.utime(self.image, ns=(1, 1))
+        self.assertIsNone(restored.get(self.image, bot_id=1))
+
+    def test_invalidate_and_other_bot(self):
+        """Отклоненный file_id забывается, кэш другого бота не используется"""
+        cache = TelegramFileIdCache(self.cache_file)
+        cache.put(self.image, "FILE-1", bot_id=1)
+        self.assertIsNone(cache.get(self.image, bot_id=2))
+
+        cache.put(self.image, "FILE-2", bot_id=2)
+        cache.invalidate(self.image)
+        self.assertIsNone(cache.get(self.image, bot_id=2))
+        self.assertEqual(cache.get_stats()["invalidations"], 1)
+        self.assertTrue(is_stale_file_id_error(Exception("Wrong file identifier/http url specified")))
+        self.assertFalse(is_stale_file_id_error(Exception("Can't parse entities")))
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Тест приема обновлений через webhook
+"""
+
+import asyncio
+import json
+import unittest
+
+import sys
+sys.path.append('.')
+
+from modules.webhook_server import SECRET_TOKEN_HEADER, WebhookIngress, WebhookServer
+
+
+async def _call(app, method, path, body=b"", secret=None):
+    """Вызывает ASGI-приложение и возвращает (статус, тело)"""
+    headers = [(b"content-type", b"application/json")]
+    if secret is not None:
+        headers.append((SECRET_TOKEN_HEADER, secret.encode()))
+    scope = {"type": "http", "method": method, "path": path, "headers": headers, "client": ("127.0.0.1", 5000)}
+    messages = [{"type": "http.request", "body": body, "more_body": False}]
+    sent = []
+
+    async def receive():
+        return messages.pop(0) if messages else {"type": "http.disconnect"}
+
+    async def send(message):
+        sent.append(message)
+
+    await app(scope, receive, send)
+    return sent[0]["status"], sent[1]["body"]
+
+
+def _update(update_id):
+    return json.dumps({"update_id": update_id}).encode()
+
+
+class TestWebhookIngress(unittest.TestCase):
+    """Тест проверки секрета, ограниченной очереди и маршрута здоровья"""
+
+    def test_secret_queue_and_health(self):
+        """Обновления с верным секретом ставятся в очередь, при переполнении - 503"""
+        async def scenario():
+            queue = asyncio.Queue(maxsize=2)
+            app = WebhookIngress(queue, decode=lambda data: data["update_id"], secret_token="s3cret")
+            results = [
+                await _call(app, "POST", app.webhook_path, _update(1), secret="wrong"),
+                await _call(app, "POST", app.webhook_path, _update(1)),
+                await _call(app, "POST", app.webhook_path, _update(1), secret="s3cret"),
+                await _call(app, "POST", app.webhook_path, _update(2), secret="s3cret"),
+                await _call(app, "POST", app.webhook_path, _update(3), secret="s3cret"),
+                await _call(app, "POST", app.webhook_path, b"{not json", secret="s3cret"),
+                await _call(app, "GET", app.webhook_path),
+                await _call(app, "GET", "/other"),
+            ]
+            health_status, health_body = await _call(app, "GET", app.health_path)
+            return [status for status, _ in results], health_status, json.loads(health_body), [queue.get_nowait(), queue.get_nowait()]
+
+        statuses, health_status, health, queued = asyncio.run(scenario())
+        self.assertEqual(statuses, [403, 403, 200, 200, 503, 400, 405, 404])
+        self.assertEqual(queued, [1, 2])
+        self.assertEqual(health_status, 503)
+        self.assertEqual(health["status"], "full")
+        self.assertEqual(health["accepted"], 2)
+        self.assertEqual(health["rejected_auth"], 2)
+        self.assertEqual(health["rejected_full"], 1)
+        self.assertEqual(health["rejected_invalid"], 1)
+
+    def test_body_size_limit(self):
+        """Слишком большое тело отклоняется без постановки в очередь"""
+        async def scenario():
+            queue = asyncio.Queue(maxsize=10)
+            app = WebhookIngress(queue, decode=lambda data: data, secret_token="s", max_body_bytes=16)
+            status, _ = await _call(app, "POST", app.webhook_path, b"x" * 100, secret="s")
+            return status, queue.qsize()
+
+        self.assertEqual(asyncio.run(scenario()), (413, 0))
+
+
+class TestWebhookServer(unittest.TestCase):
+    """Тест встроенного сервера на локальном порту"""
+
+    def test_serves_updates_over_http(self):
+        """Обновление, отправленное по HTTP, попадает в очередь"""
+        async def scenario():
+            queue = asyncio.Queue(maxsize=10)
+            app = WebhookIngress(queue, decode=lambda data: data["update_id"], secret_token="s3cret")
+            server = WebhookServer(app, host="127.0.0.1", port=0)
+            await server.start()
+            try:
+                body = _update(42)
+                reader, writer = await asyncio.open_connection("127.0.0.1", server.port)
+                writer.write(
+                    f"POST {app.webhook_path} HTTP/1.1\r\nHost: localhost\r\n"
+                    f"Content-Type: application/json\r\nX-Telegram-Bot-Api-Secret-Token: s3cret\r\n"
+                    f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode() + body
+                )
+                await writer.drain()
+                response = await reader.read()
+                writer.close()
+            finally:
+                await server.stop()
+            return response, await queue.get(), server.running
+
+        response, update_id, running = asyncio.run(scenario())
+        self.assertTrue(response.startswith(b"HTTP/1.1 200"))
+        self.assertEqual(update_id, 42)
+        self.assertFalse(running)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -4,6 +4,7 @@ from typing import List, Dict, Any, Optional, Callable, Coroutine, Union
 from datetime import datetime, timedelta, timezone
 from collections import OrderedDict
 from modules.logger_config import get_logger
+from modules.job_registry import get_job_registry
 
 from telegram import Update, User as TelegramUser
 from telegram.ext import ContextTypes, JobQueue
@@ -332,16 +333,15 @@ def schedule_job_unique(
     when: Union[timedelta, float, datetime],
     data: Any = None,
 ) -> None:
-    current_jobs = job_queue.get_jobs_by_name(job_name)
-    if current_jobs:
-        logger.info(f"Найдены существующие задачи ({len(current_jobs)}) с именем '{job_name}'. Удаляем...")
-        for job in current_jobs:
-            job.schedule_removal()
-        logger.info(f"Все старые задачи '{job_name}' удалены.")
+    # Реестр снимает задачу с тем же именем по индексу, без перебора всех задач JobQueue
+    chat_id = data.get("chat_id") if isinstance(data, dict) else None
+    registry = get_job_registry(job_queue)
+    if registry.get(job_name):
+        logger.info(f"Найдена существующая задача с именем '{job_name}'. Заменяем...")
     else:
         logger.debug(f"Задачи с именем '{job_name}' не найдены. Создаем новую.")
 
-    job_queue.run_once(callback, when, data=data, name=job_name) # type: ignore
+    registry.run_once(callback, when, name=job_name, data=data, chat_id=chat_id)
 
     when_display = when
     if isinstance(when, (float, int)): when_display = f"{when} сек"
@@ -2,6 +2,7 @@
 FastAPI веб-интерфейс для управления Morning Quiz Bot
 """
 import os
+import sys
 import json
 import subprocess
 import logging
@@ -66,6 +67,9 @@ BASE_DIR = Path(__file__).parent.parent
 # Если BASE_DIR не существует, используем текущую рабочую директорию
 if not BASE_DIR.exists():
     BASE_DIR = Path.cwd()
+# Модули бота (modules/, app_config, state) импортируются лениво внутри обработчиков
+if str(BASE_DIR) not in sys.path:
+    sys.path.insert(0, str(BASE_DIR))
 DATA_DIR = BASE_DIR / "data"
 CONFIG_DIR = BASE_DIR / "config"
 QUESTIONS_DIR = DATA_DIR / "questions"
@@ -127,7 +131,65 @@ class ChatSettingsUpdate(BaseModel):
     enabled_categories: Optional[List[str]] = None
     disabled_categories: Optional[List[str]] = None
 
+# Модель чтения: разобранные JSON-файлы с инвалидацией по mtime/размеру (modules/read_model_cache.py)
+from modules.read_model_cache import ReadModelCache
+
+read_model = ReadModelCache()
+
+
+def count_category_questions(category_name: str) -> int:
+    """Количество вопросов категории без загрузки вопросов в запрос"""
+    return read_model.count_items(QUESTIONS_DIR / f"{category_name}.json")
+
+
+# Представления аналитики, которые ведет бот (modules/analytics_views.py)
+ANALYTICS_VIEWS_DIR = STATS_DIR / "views"
+ANALYTICS_VIEWS_SCHEMA = 1
+
+
+def load_analytics_view(name: str) -> Optional[Dict[str, Any]]:
+    """Данные представления аналитики или None, если его нет или схема незнакома"""
+    view = read_model.load_json(ANALYTICS_VIEWS_DIR / f"{name}.json")
+    if not isinstance(view, dict) or view.get("schema") != ANALYTICS_VIEWS_SCHEMA:
+        return None
+    return view.get("data")
+
+
+# Индекс логов бота по времени (modules/log_index.py), живет между запросами
+_log_index = None
+
+
+def get_log_index():
+    """Индекс лог-файлов: достраивается по дописанным строкам при каждом запросе"""
+    global _log_index
+    if _log_index is None:
+        from modules.log_index import LogIndex
+        _log_index = LogIndex(LOGS_DIR)
+    return _log_index
+
+
 # Вспомогательные функции
+def count_active_quizzes() -> int:
+    """Количество активных викторин: снимки сессий в data/active_quizzes (журнал бота)"""
+    journal_dir = DATA_DIR / "active_quizzes"
+    if not journal_dir.exists():
+        return 0
+    return sum(1 for _ in journal_dir.glob("*.snapshot.json"))
+
+
+def load_cleanup_metrics() -> Dict[str, Any]:
+    """Метрики запусков очистки сообщений (пишет задача очистки бота)"""
+    metrics_file = SYSTEM_DIR / "cleanup_metrics.json"
+    if not metrics_file.exists():
+        return {"last_run": None, "history": []}
+    try:
+        with open(metrics_file, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError) as e:
+        logger.warning(f"Не удалось прочитать {metrics_file}: {e}")
+        return {"last_run": None, "history": []}
+
+
 def check_bot_service_status() -> bool:
     """
     Проверяет статус бота через PID файл, systemd и альтернативные методы.
@@ -257,9 +319,8 @@ def get_all_categories() -> List[str]:
     categories = []
     if CATEGORIES_FILE.exists():
         try:
-            with open(CATEGORIES_FILE, 'r', encoding='utf-8') as f:
-                cats_data = json.load(f)
-                categories = list(cats_data.keys())
+            cats_data = read_model.load_json(CATEGORIES_FILE, {})
+            categories = list(cats_data.keys())
         except:
             pass
     
@@ -305,6 +366,44 @@ def load_malformed_questions() -> List[Dict[str, Any]]:
         logger.error(f"Ошибка загрузки бракованных вопросов: {e}", exc_info=True)
         return []
 
+def load_validation_report() -> Optional[Dict[str, Any]]:
+    """Загружает отчёт о последней валидации файлов вопросов"""
+    report_file = SYSTEM_DIR / "validation_report.json"
+    if not report_file.exists():
+        return None
+    try:
+        with open(report_file, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except Exception as e:
+        logger.warning(f"Не удалось загрузить отчёт валидации: {e}")
+        return None
+
+def run_questions_validation() -> Dict[str, Any]:
+    """
+    Запускает параллельную валидацию файлов вопросов, атомарно сохраняет отчёт
+    и обновляет malformed_questions.json для проверенных категорий
+    """
+    import time
+    from modules.question_validation import (
+        build_validation_report, iter_validate_question_files
+    )
+    from modules.atomic_io import write_json_atomic
+
+    started = time.perf_counter()
+    results = list(iter_validate_question_files(sorted(QUESTIONS_DIR.glob("*.json"))))
+    report = build_validation_report(results, (time.perf_counter() - started) * 1000, workers=0)
+    write_json_atomic(SYSTEM_DIR / "validation_report.json", report)
+
+    validated = {r.category for r in results}
+    malformed = [e for e in load_malformed_questions() if e.get("category") not in validated]
+    seen_categories = {e.get("category") for e in malformed}
+    for result in results:
+        if result.malformed and result.category not in seen_categories:
+            malformed.append(result.malformed[0])
+            seen_categories.add(result.category)
+    write_json_atomic(SYSTEM_DIR / "malformed_questions.json", malformed)
+    return report
+
 # API Routes
 @app.get("/", response_class=HTMLResponse)
 async def index():
@@ -320,10 +419,9 @@ async def get_categories():
     result = []
     
     for cat_name in categories:
-        questions = load_category_questions(cat_name)
         result.append({
             "name": cat_name,
-            "question_count": len(questions),
+            "question_count": count_category_questions(cat_name),
             "file_path": f"questions/{cat_name}.json"
         })
     
@@ -599,11 +697,11 @@ async def get_statistics():
     stats["total_categories"] = len(categories)
     
     for cat_name in categories:
-        questions = load_category_questions(cat_name)
+        question_count = count_category_questions(cat_name)
         stats["categories"][cat_name] = {
-            "question_count": len(questions)
+            "question_count": question_count
         }
-        stats["total_questions"] += len(questions)
+        stats["total_questions"] += question_count
     
     return stats
 
@@ -625,12 +723,22 @@ async def get_malformed_questions():
             "malformed_questions": malformed_questions,
             "total": len(malformed_questions),
             "grouped_by_error": grouped_by_error,
-            "error_types": list(grouped_by_error.keys())
+            "error_types": list(grouped_by_error.keys()),
+            "validation_report": load_validation_report()
         }
     except Exception as e:
         logger.error(f"Ошибка при получении бракованных вопросов: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail=f"Ошибка загрузки бракованных вопросов: {str(e)}")
 
+@app.post("/api/malformed-questions/revalidate")
+async def revalidate_questions():
+    """Перепроверить все файлы вопросов (с автоисправлением) и обновить отчёт"""
+    try:
+        return await asyncio.to_thread(run_questions_validation)
+    except Exception as e:
+        logger.error(f"Ошибка при перепроверке вопросов: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail=f"Ошибка перепроверки вопросов: {str(e)}")
+
 @app.post("/api/categories/{category_name}/import")
 async def import_questions(category_name: str, questions: List[Dict[str, Any]]):
     """Импортировать вопросы в категорию"""
@@ -672,28 +780,25 @@ async def get_chats_analytics():
         # Загружаем настройки
         if settings_file.exists():
             try:
-                with open(settings_file, 'r', encoding='utf-8') as f:
-                    settings = json.load(f)
-                    chat_data["settings"] = settings
-                    chat_data["daily_quiz_enabled"] = settings.get("daily_quiz", {}).get("enabled", False)
+                settings = read_model.load_json(settings_file, {})
+                chat_data["settings"] = settings
+                chat_data["daily_quiz_enabled"] = settings.get("daily_quiz", {}).get("enabled", False)
             except:
                 pass
         
         # Загружаем статистику
         if stats_file.exists():
             try:
-                with open(stats_file, 'r', encoding='utf-8') as f:
-                    stats = json.load(f)
-                    chat_data["stats"] = stats
+                stats = read_model.load_json(stats_file, {})
+                chat_data["stats"] = stats
             except:
                 pass
         
         # Загружаем пользователей
         if users_file.exists():
             try:
-                with open(users_file, 'r', encoding='utf-8') as f:
-                    users = json.load(f)
-                    chat_data["user_count"] = len(users)
+                users = read_model.load_json(users_file, {})
+                chat_data["user_count"] = len(users)
             except:
                 pass
         
@@ -713,28 +818,24 @@ async def get_chat_analytics(chat_id: str):
     # Настройки
     settings_file = chat_dir / "settings.json"
     if settings_file.exists():
-        with open(settings_file, 'r', encoding='utf-8') as f:
-            result["settings"] = json.load(f)
+        result["settings"] = read_model.load_json(settings_file, {})
     
     # Статистика
     stats_file = chat_dir / "stats.json"
     if stats_file.exists():
-        with open(stats_file, 'r', encoding='utf-8') as f:
-            result["stats"] = json.load(f)
+        result["stats"] = read_model.load_json(stats_file, {})
     
     # Пользователи
     users_file = chat_dir / "users.json"
     if users_file.exists():
-        with open(users_file, 'r', encoding='utf-8') as f:
-            users = json.load(f)
-            result["users"] = users
-            result["user_count"] = len(users)
+        users = read_model.load_json(users_file, {})
+        result["users"] = users
+        result["user_count"] = len(users)
     
     # Статистика категорий
     cat_stats_file = chat_dir / "categories_stats.json"
     if cat_stats_file.exists():
-        with open(cat_stats_file, 'r', encoding='utf-8') as f:
-            result["categories_stats"] = json.load(f)
+        result["categories_stats"] = read_model.load_json(cat_stats_file, {})
     
     return result
 
@@ -746,22 +847,19 @@ async def get_global_analytics():
     # Глобальная статистика
     global_stats_file = STATS_DIR / "global_stats.json"
     if global_stats_file.exists():
-        with open(global_stats_file, 'r', encoding='utf-8') as f:
-            result["global_stats"] = json.load(f)
+        result["global_stats"] = read_model.load_json(global_stats_file, {})
     
     # Статистика категорий
     cat_stats_file = STATS_DIR / "categories_stats.json"
     if cat_stats_file.exists():
-        with open(cat_stats_file, 'r', encoding='utf-8') as f:
-            result["categories_stats"] = json.load(f)
+        result["categories_stats"] = read_model.load_json(cat_stats_file, {})
     
     # Глобальные пользователи
     global_users_file = GLOBAL_DIR / "users.json"
     if global_users_file.exists():
-        with open(global_users_file, 'r', encoding='utf-8') as f:
-            users = json.load(f)
-            result["global_users"] = users
-            result["total_global_users"] = len(users)
+        users = read_model.load_json(global_users_file, {})
+        result["global_users"] = users
+        result["total_global_users"] = len(users)
     
     return result
 
@@ -851,23 +949,22 @@ async def get_all_chats(use_telegram_api: bool = True):
         # Settings (используем как fallback или для дополнительной информации)
         if settings_file.exists():
             try:
-                with open(settings_file, 'r', encoding='utf-8') as f:
-                    settings = json.load(f)
-                    # Используем локальное название только если не получили через API
-                    if not chat_info["title"]:
-                        chat_info["title"] = settings.get("title")
-                    daily_quiz = settings.get("daily_quiz", {})
-                    chat_info["daily_quiz_enabled"] = daily_quiz.get("enabled", False)
-                    
-                    # Читаем times_msk
-                    times_msk_raw = daily_quiz.get("times_msk", [])
-                    if times_msk_raw and isinstance(times_msk_raw, list):
-                        chat_info["daily_quiz_times"] = times_msk_raw
-                    else:
-                        chat_info["daily_quiz_times"] = []
-                    
-                    chat_info["enabled_categories"] = settings.get("enabled_categories") or []
-                    chat_info["disabled_categories"] = settings.get("disabled_categories", [])
+                settings = read_model.load_json(settings_file, {})
+                # Используем локальное название только если не получили через API
+                if not chat_info["title"]:
+                    chat_info["title"] = settings.get("title")
+                daily_quiz = settings.get("daily_quiz", {})
+                chat_info["daily_quiz_enabled"] = daily_quiz.get("enabled", False)
+                
+                # Читаем times_msk
+                times_msk_raw = daily_quiz.get("times_msk", [])
+                if times_msk_raw and isinstance(times_msk_raw, list):
+                    chat_info["daily_quiz_times"] = times_msk_raw
+                else:
+                    chat_info["daily_quiz_times"] = []
+                
+                chat_info["enabled_categories"] = settings.get("enabled_categories") or []
+                chat_info["disabled_categories"] = settings.get("disabled_categories", [])
             except Exception as e:
                 logger.debug(f"Error loading settings for chat {chat_id}: {e}")
         
@@ -878,18 +975,16 @@ async def get_all_chats(use_telegram_api: bool = True):
         # Users count
         if users_file.exists():
             try:
-                with open(users_file, 'r', encoding='utf-8') as f:
-                    users = json.load(f)
-                    chat_info["users_count"] = len(users)
+                users = read_model.load_json(users_file, {})
+                chat_info["users_count"] = len(users)
             except:
                 pass
         
         # Total quizzes
         if stats_file.exists():
             try:
-                with open(stats_file, 'r', encoding='utf-8') as f:
-                    stats = json.load(f)
-                    chat_info["total_quizzes"] = stats.get("total_quizzes", 0)
+                stats = read_model.load_json(stats_file, {})
+                chat_info["total_quizzes"] = stats.get("total_quizzes", 0)
             except:
                 pass
         
@@ -1260,8 +1355,7 @@ async def get_categories_detailed_stats():
         if not categories_stats_file.exists():
             return {"categories": []}
         
-        with open(categories_stats_file, 'r', encoding='utf-8') as f:
-            stats = json.load(f)
+        stats = read_model.load_json(categories_stats_file, {})
         
         result = []
         for category, data in stats.items():
@@ -1291,8 +1385,7 @@ async def get_users_leaderboard(limit: int = 20):
         if not global_stats_file.exists():
             return {"users": []}
         
-        with open(global_stats_file, 'r', encoding='utf-8') as f:
-            stats = json.load(f)
+        stats = read_model.load_json(global_stats_file, {})
         
         top_users = stats.get("top_users", [])[:limit]
         
@@ -1314,8 +1407,7 @@ async def get_users_leaderboard(limit: int = 20):
                 
                 users_file = chat_dir / "users.json"
                 if users_file.exists():
-                    with open(users_file, 'r', encoding='utf-8') as f:
-                        chat_users = json.load(f)
+                    chat_users = read_model.load_json(users_file, {})
                     
                     if user["user_id"] in chat_users:
                         user_info = chat_users[user["user_id"]]
@@ -1336,8 +1428,7 @@ async def get_activity_overview():
         # Глобальная статистика
         global_stats_file = STATS_DIR / "global_stats.json"
         if global_stats_file.exists():
-            with open(global_stats_file, 'r', encoding='utf-8') as f:
-                global_stats = json.load(f)
+            global_stats = read_model.load_json(global_stats_file, {})
         else:
             global_stats = {}
         
@@ -1354,8 +1445,7 @@ async def get_activity_overview():
             settings_file = chat_dir / "settings.json"
             
             if stats_file.exists():
-                with open(stats_file, 'r', encoding='utf-8') as f:
-                    chat_data = json.load(f)
+                chat_data = read_model.load_json(stats_file, {})
                 
                 total_answered = chat_data.get("total_answered", 0)
                 total_messages += total_answered
@@ -1364,9 +1454,8 @@ async def get_activity_overview():
                 chat_title = f"Чат {chat_id}"
                 if settings_file.exists():
                     try:
-                        with open(settings_file, 'r', encoding='utf-8') as f:
-                            settings = json.load(f)
-                            chat_title = settings.get("title", chat_title)
+                        settings = read_model.load_json(settings_file, {})
+                        chat_title = settings.get("title", chat_title)
                     except:
                         pass
                 
@@ -1406,8 +1495,7 @@ async def get_top_categories(limit: int = 10):
         if not categories_stats_file.exists():
             return {"categories": []}
         
-        with open(categories_stats_file, 'r', encoding='utf-8') as f:
-            stats = json.load(f)
+        stats = read_model.load_json(categories_stats_file, {})
         
         categories = []
         for name, data in stats.items():
@@ -1434,8 +1522,7 @@ async def get_score_distribution():
         if not global_stats_file.exists():
             return {"distribution": {}}
         
-        with open(global_stats_file, 'r', encoding='utf-8') as f:
-            stats = json.load(f)
+        stats = read_model.load_json(global_stats_file, {})
         
         distribution = stats.get("score_distribution", {})
         
@@ -1475,22 +1562,18 @@ async def get_chat_detailed_stats(chat_id: str):
         result = {"chat_id": chat_id}
         
         if stats_file.exists():
-            with open(stats_file, 'r', encoding='utf-8') as f:
-                result["stats"] = json.load(f)
+            result["stats"] = read_model.load_json(stats_file, {})
         
         if users_file.exists():
-            with open(users_file, 'r', encoding='utf-8') as f:
-                users = json.load(f)
-                result["users_count"] = len(users)
-                result["users"] = users
+            users = read_model.load_json(users_file, {})
+            result["users_count"] = len(users)
+            result["users"] = users
         
         if categories_file.exists():
-            with open(categories_file, 'r', encoding='utf-8') as f:
-                result["categories"] = json.load(f)
+            result["categories"] = read_model.load_json(categories_file, {})
         
         if settings_file.exists():
-            with open(settings_file, 'r', encoding='utf-8') as f:
-                result["settings"] = json.load(f)
+            result["settings"] = read_model.load_json(settings_file, {})
         
         return result
     
@@ -1569,71 +1652,83 @@ async def update_photo_quiz(name: str, data: Dict[str, Any]):
 
 # ================== ПРОДВИНУТАЯ АНАЛИТИКА ==================
 
+def scan_dashboard_chats() -> Dict[str, Any]:
+    """Итоги по чатам обходом stats.json и settings.json (если бот еще не записал представление)"""
+    # Собираем статистику из чатов
+    chats = []
+    total_users = 0
+    total_answered = 0
+    total_score = 0
+    unique_users = set()
+    
+    for chat_dir in CHATS_DIR.iterdir():
+        if not chat_dir.is_dir():
+            continue
+    
+        chat_id = chat_dir.name
+        stats_file = chat_dir / "stats.json"
+        settings_file = chat_dir / "settings.json"
+    
+        chat_info = {
+            "chat_id": chat_id,
+            "title": f"Чат {chat_id}",
+            "users_count": 0,
+            "answered": 0,
+            "score": 0,
+            "daily_enabled": False
+        }
+    
+        if settings_file.exists():
+            try:
+                settings = read_model.load_json(settings_file, {})
+                chat_info["title"] = settings.get("title", chat_info["title"])
+                chat_info["daily_enabled"] = settings.get("daily_quiz", {}).get("enabled", False)
+            except:
+                pass
+    
+        if stats_file.exists():
+            try:
+                stats = read_model.load_json(stats_file, {})
+                chat_info["users_count"] = stats.get("total_users", 0)
+                chat_info["answered"] = stats.get("total_answered", 0)
+                chat_info["score"] = round(stats.get("total_score", 0), 1)
+    
+                total_answered += chat_info["answered"]
+                total_score += stats.get("total_score", 0)
+    
+                # Уникальные пользователи
+                for user_id in stats.get("user_activity", {}).keys():
+                    unique_users.add(user_id)
+            except:
+                pass
+    
+        chats.append(chat_info)
+    
+    total_users = len(unique_users)
+    return {
+        "total_users": total_users,
+        "total_answered": total_answered,
+        "total_score": total_score,
+        "chats": chats,
+    }
+
 @app.get("/api/analytics/dashboard")
 async def get_dashboard_data():
     """Получить данные для главного dashboard - реальные данные из stats.json"""
     try:
-        # Собираем статистику из чатов
-        chats = []
-        total_users = 0
-        total_answered = 0
-        total_score = 0
-        unique_users = set()
-        
-        for chat_dir in CHATS_DIR.iterdir():
-            if not chat_dir.is_dir():
-                continue
-            
-            chat_id = chat_dir.name
-            stats_file = chat_dir / "stats.json"
-            settings_file = chat_dir / "settings.json"
-            
-            chat_info = {
-                "chat_id": chat_id,
-                "title": f"Чат {chat_id}",
-                "users_count": 0,
-                "answered": 0,
-                "score": 0,
-                "daily_enabled": False
-            }
-            
-            if settings_file.exists():
-                try:
-                    with open(settings_file, 'r', encoding='utf-8') as f:
-                        settings = json.load(f)
-                        chat_info["title"] = settings.get("title", chat_info["title"])
-                        chat_info["daily_enabled"] = settings.get("daily_quiz", {}).get("enabled", False)
-                except:
-                    pass
-            
-            if stats_file.exists():
-                try:
-                    with open(stats_file, 'r', encoding='utf-8') as f:
-                        stats = json.load(f)
-                        chat_info["users_count"] = stats.get("total_users", 0)
-                        chat_info["answered"] = stats.get("total_answered", 0)
-                        chat_info["score"] = round(stats.get("total_score", 0), 1)
-                        
-                        total_answered += chat_info["answered"]
-                        total_score += stats.get("total_score", 0)
-                        
-                        # Уникальные пользователи
-                        for user_id in stats.get("user_activity", {}).keys():
-                            unique_users.add(user_id)
-                except:
-                    pass
-            
-            chats.append(chat_info)
-        
-        total_users = len(unique_users)
+        # Итоги по чатам: представление, которое ведет бот, или обход чатов, если его еще нет
+        overview = load_analytics_view("dashboard") or scan_dashboard_chats()
+        chats = overview["chats"]
+        total_users = overview["total_users"]
+        total_answered = overview["total_answered"]
+        total_score = overview["total_score"]
         
         # Категории и вопросы
         categories = get_all_categories()
         total_questions_db = 0
         for cat in categories:
             try:
-                questions = load_category_questions(cat)
-                total_questions_db += len(questions)
+                total_questions_db += count_category_questions(cat)
             except:
                 pass
         
@@ -1641,8 +1736,7 @@ async def get_dashboard_data():
         photo_count = 0
         if PHOTO_QUIZ_METADATA.exists():
             try:
-                with open(PHOTO_QUIZ_METADATA, 'r', encoding='utf-8') as f:
-                    photo_count = len(json.load(f))
+                photo_count = read_model.count_items(PHOTO_QUIZ_METADATA)
             except:
                 pass
         
@@ -1655,9 +1749,8 @@ async def get_dashboard_data():
         bot_mode = "main"
         if BOT_MODE_FILE.exists():
             try:
-                with open(BOT_MODE_FILE, 'r', encoding='utf-8') as f:
-                    mode_data = json.load(f)
-                    bot_mode = mode_data.get("mode", "main")
+                mode_data = read_model.load_json(BOT_MODE_FILE, {})
+                bot_mode = mode_data.get("mode", "main")
             except:
                 pass
         
@@ -1665,15 +1758,7 @@ async def get_dashboard_data():
         bot_enabled = check_bot_service_status()
         
         # Активные викторины
-        active_quizzes_count = 0
-        active_quizzes_file = DATA_DIR / "active_quizzes.json"
-        if active_quizzes_file.exists():
-            try:
-                with open(active_quizzes_file, 'r', encoding='utf-8') as f:
-                    active_data = json.load(f)
-                    active_quizzes_count = len(active_data.get("active_quizzes", {})) if isinstance(active_data, dict) else 0
-            except:
-                pass
+        active_quizzes_count = count_active_quizzes()
         
         return {
             "total_users": total_users,
@@ -1696,17 +1781,44 @@ async def get_dashboard_data():
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Ошибка: {str(e)}")
 
+def activity_chart_payload(chats_data: List[Dict[str, Any]], total_users: int, total_answered: int, total_score: float) -> Dict[str, Any]:
+    """Ответ графика активности: топ-10 чатов по числу ответов"""
+    chats_data.sort(key=lambda x: x["answered"], reverse=True)
+    return {
+        "labels": [c["chat_title"] for c in chats_data[:10]],
+        "data": [c["answered"] for c in chats_data[:10]],
+        "users": [c["users"] for c in chats_data[:10]],
+        "scores": [c["score"] for c in chats_data[:10]],
+        "total_users": total_users,
+        "total_answered": total_answered,
+        "total_score": round(total_score, 1)
+    }
+
 @app.get("/api/analytics/charts/activity")
 async def get_activity_chart():
     """Получить данные для графика активности - реальные данные из stats.json"""
     try:
+        overview = load_analytics_view("dashboard")
+        if overview is not None:
+            chats_data = [
+                {
+                    "chat_id": chat["chat_id"],
+                    "chat_title": chat["title"] if len(chat["title"]) <= 25 else chat["title"][:22] + "...",
+                    "users": chat["users_count"],
+                    "answered": chat["answered"],
+                    "score": chat["score"],
+                }
+                for chat in overview["chats"]
+            ]
+            total_users = sum(chat["users"] for chat in chats_data)
+            return activity_chart_payload(chats_data, total_users, overview["total_answered"], overview["total_score"])
+
         # Загружаем индекс чатов для получения названий
         chats_index_file = GLOBAL_DIR / "chats_index.json"
         chats_index = {}
         if chats_index_file.exists():
             try:
-                with open(chats_index_file, 'r', encoding='utf-8') as f:
-                    chats_index = json.load(f)
+                chats_index = read_model.load_json(chats_index_file, {})
             except:
                 pass
         
@@ -1723,71 +1835,67 @@ async def get_activity_chart():
             chat_id_str = chat_dir.name
             stats_file = chat_dir / "stats.json"
             if stats_file.exists():
-                with open(stats_file, 'r', encoding='utf-8') as f:
-                    stats = json.load(f)
-                    chat_users = stats.get("total_users", 0)
-                    chat_answered = stats.get("total_answered", 0)
-                    chat_score = stats.get("total_score", 0)
-                    
-                    total_users += chat_users
-                    total_answered += chat_answered
-                    total_score += chat_score
-                    
-                    # Получаем название чата: приоритет settings.json (там актуальные данные из API), потом индекс
-                    chat_title = None
-                    
-                    # Сначала проверяем settings.json (там актуальные названия, обновляемые через Telegram API)
-                    settings_file = chat_dir / "settings.json"
-                    if settings_file.exists():
-                        try:
-                            with open(settings_file, 'r', encoding='utf-8') as f:
-                                settings = json.load(f)
-                                chat_title = settings.get("title")
-                        except:
-                            pass
-                    
-                    # Если не нашли в settings, проверяем индекс
-                    if not chat_title:
-                        index_title = chats_index.get(chat_id_str, {}).get("title")
-                        if index_title:
-                            chat_title = index_title
-                    
-                    # Если название все еще не получено, используем дефолтное
-                    if not chat_title:
-                        # Для групп (ID начинается с -) используем более короткое название
-                        if chat_id_str.startswith('-'):
-                            chat_title = f"Группа {chat_id_str}"
-                        else:
-                            chat_title = f"Чат {chat_id_str}"
-                    
-                    # Если название слишком длинное, обрезаем
-                    if len(chat_title) > 25:
-                        chat_title = chat_title[:22] + "..."
-                    
-                    chats_data.append({
-                        "chat_id": chat_id_str,
-                        "chat_title": chat_title,
-                        "users": chat_users,
-                        "answered": chat_answered,
-                        "score": round(chat_score, 1)
-                    })
-        
-        # Сортируем чаты по активности
-        chats_data.sort(key=lambda x: x["answered"], reverse=True)
+                stats = read_model.load_json(stats_file, {})
+                chat_users = stats.get("total_users", 0)
+                chat_answered = stats.get("total_answered", 0)
+                chat_score = stats.get("total_score", 0)
+                
+                total_users += chat_users
+                total_answered += chat_answered
+                total_score += chat_score
+                
+                # Получаем название чата: приоритет settings.json (там актуальные данные из API), потом индекс
+                chat_title = None
+                
+                # Сначала проверяем settings.json (там актуальные названия, обновляемые через Telegram API)
+                settings_file = chat_dir / "settings.json"
+                if settings_file.exists():
+                    try:
+                        with open(settings_file, 'r', encoding='utf-8') as f:
+                            settings = json.load(f)
+                            chat_title = settings.get("title")
+                    except:
+                        pass
+                
+                # Если не нашли в settings, проверяем индекс
+                if not chat_title:
+                    index_title = chats_index.get(chat_id_str, {}).get("title")
+                    if index_title:
+                        chat_title = index_title
+                
+                # Если название все еще не получено, используем дефолтное
+                if not chat_title:
+                    # Для групп (ID начинается с -) используем более короткое название
+                    if chat_id_str.startswith('-'):
+                        chat_title = f"Группа {chat_id_str}"
+                    else:
+                        chat_title = f"Чат {chat_id_str}"
+                
+                # Если название слишком длинное, обрезаем
+                if len(chat_title) > 25:
+                    chat_title = chat_title[:22] + "..."
+                
+                chats_data.append({
+                    "chat_id": chat_id_str,
+                    "chat_title": chat_title,
+                    "users": chat_users,
+                    "answered": chat_answered,
+                    "score": round(chat_score, 1)
+                })
         
-        return {
-            "labels": [c["chat_title"] for c in chats_data[:10]],
-            "data": [c["answered"] for c in chats_data[:10]],
-            "users": [c["users"] for c in chats_data[:10]],
-            "scores": [c["score"] for c in chats_data[:10]],
-            "total_users": total_users,
-            "total_answered": total_answered,
-            "total_score": round(total_score, 1)
-        }
+        return activity_chart_payload(chats_data, total_users, total_answered, total_score)
     
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Ошибка: {str(e)}")
 
+@app.get("/api/analytics/activity/daily")
+async def get_daily_activity(days: int = 30):
+    """Ответы и активные участники по дням (UTC) из представления, которое ведет бот"""
+    view = load_analytics_view("activity")
+    if view is None:
+        return {"days": [], "available": False}
+    return {"days": view["days"][-days:] if days > 0 else [], "available": True}
+
 @app.get("/api/analytics/charts/categories")
 async def get_categories_chart():
     """Получить данные для графика категорий - реальные данные"""
@@ -1798,10 +1906,9 @@ async def get_categories_chart():
         category_data = []
         
         for cat_name in categories:
-            questions = load_category_questions(cat_name)
             category_data.append({
                 "name": cat_name,
-                "count": len(questions)
+                "count": count_category_questions(cat_name)
             })
         
         # Сортируем по количеству вопросов (топ 15)
@@ -1819,10 +1926,29 @@ async def get_categories_chart():
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Ошибка: {str(e)}")
 
+def users_chart_payload(top_users: List[Dict[str, Any]], total_users: int) -> Dict[str, Any]:
+    """Ответ графика топ пользователей"""
+    return {
+        "labels": [u["name"] for u in top_users],
+        "data": [round(u["score"], 1) for u in top_users],
+        "scores": [round(u["score"], 1) for u in top_users],
+        "answered": [u["answered"] for u in top_users],
+        "streaks": [u["max_streak"] for u in top_users],
+        "total_users": total_users
+    }
+
 @app.get("/api/analytics/charts/users")
 async def get_users_chart():
     """Получить данные для графика топ пользователей - реальные данные из stats.json"""
     try:
+        view = load_analytics_view("leaderboard")
+        if view is not None:
+            top_users = [
+                {"name": u["name"], "score": u["total_score"], "answered": u["total_answered"], "max_streak": u["max_consecutive_correct"]}
+                for u in view["leaderboard"][:10]
+            ]
+            return users_chart_payload(top_users, view["total_users"])
+
         all_users = {}
         
         # Собираем пользователей из stats.json каждого чата (там user_activity)
@@ -1832,39 +1958,31 @@ async def get_users_chart():
             
             stats_file = chat_dir / "stats.json"
             if stats_file.exists():
-                with open(stats_file, 'r', encoding='utf-8') as f:
-                    stats = json.load(f)
-                    user_activity = stats.get("user_activity", {})
+                stats = read_model.load_json(stats_file, {})
+                user_activity = stats.get("user_activity", {})
+                
+                for user_id, user_data in user_activity.items():
+                    if user_id not in all_users:
+                        all_users[user_id] = {
+                            "user_id": user_id,
+                            "name": user_data.get("name", f"User {user_id}"),
+                            "score": 0,
+                            "answered": 0,
+                            "max_streak": 0
+                        }
                     
-                    for user_id, user_data in user_activity.items():
-                        if user_id not in all_users:
-                            all_users[user_id] = {
-                                "user_id": user_id,
-                                "name": user_data.get("name", f"User {user_id}"),
-                                "score": 0,
-                                "answered": 0,
-                                "max_streak": 0
-                            }
-                        
-                        all_users[user_id]["score"] += user_data.get("score", 0)
-                        all_users[user_id]["answered"] += user_data.get("answered_count", 0)
-                        max_streak = user_data.get("max_consecutive_correct", 0)
-                        if max_streak > all_users[user_id]["max_streak"]:
-                            all_users[user_id]["max_streak"] = max_streak
+                    all_users[user_id]["score"] += user_data.get("score", 0)
+                    all_users[user_id]["answered"] += user_data.get("answered_count", 0)
+                    max_streak = user_data.get("max_consecutive_correct", 0)
+                    if max_streak > all_users[user_id]["max_streak"]:
+                        all_users[user_id]["max_streak"] = max_streak
         
         # Сортируем по баллам
         users_list = list(all_users.values())
         users_list.sort(key=lambda x: x["score"], reverse=True)
         top_users = users_list[:10]
         
-        return {
-            "labels": [u["name"] for u in top_users],
-            "data": [round(u["score"], 1) for u in top_users],
-            "scores": [round(u["score"], 1) for u in top_users],
-            "answered": [u["answered"] for u in top_users],
-            "streaks": [u["max_streak"] for u in top_users],
-            "total_users": len(users_list)
-        }
+        return users_chart_payload(top_users, len(users_list))
     
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Ошибка: {str(e)}")
@@ -1873,6 +1991,15 @@ async def get_users_chart():
 async def get_score_distribution_chart():
     """Получить данные для графика распределения баллов - реальные данные"""
     try:
+        view = load_analytics_view("score_distribution")
+        if view is not None:
+            buckets = view["buckets"]
+            return {
+                "labels": list(buckets.keys()),
+                "data": list(buckets.values()),
+                "values": list(buckets.values())
+            }
+
         score_ranges = {
             "0-50": 0,
             "51-200": 0,
@@ -1888,22 +2015,21 @@ async def get_score_distribution_chart():
             
             stats_file = chat_dir / "stats.json"
             if stats_file.exists():
-                with open(stats_file, 'r', encoding='utf-8') as f:
-                    stats = json.load(f)
-                    user_activity = stats.get("user_activity", {})
-                    
-                    for user_data in user_activity.values():
-                        score = user_data.get("score", 0)
-                        if score <= 50:
-                            score_ranges["0-50"] += 1
-                        elif score <= 200:
-                            score_ranges["51-200"] += 1
-                        elif score <= 500:
-                            score_ranges["201-500"] += 1
-                        elif score <= 1000:
-                            score_ranges["501-1000"] += 1
-                        else:
-                            score_ranges["1000+"] += 1
+                stats = read_model.load_json(stats_file, {})
+                user_activity = stats.get("user_activity", {})
+                
+                for user_data in user_activity.values():
+                    score = user_data.get("score", 0)
+                    if score <= 50:
+                        score_ranges["0-50"] += 1
+                    elif score <= 200:
+                        score_ranges["51-200"] += 1
+                    elif score <= 500:
+                        score_ranges["201-500"] += 1
+                    elif score <= 1000:
+                        score_ranges["501-1000"] += 1
+                    else:
+                        score_ranges["1000+"] += 1
         
         return {
             "labels": list(score_ranges.keys()),
@@ -1920,6 +2046,14 @@ async def get_score_distribution_chart():
 async def get_global_leaderboard(limit: int = 50):
     """Получить глобальный рейтинг пользователей из всех чатов"""
     try:
+        view = load_analytics_view("leaderboard")
+        # Представление хранит только топ; за более длинным рейтингом - обход чатов
+        if view is not None and (limit <= len(view["leaderboard"]) or len(view["leaderboard"]) == view["total_users"]):
+            return {
+                "leaderboard": view["leaderboard"][:limit],
+                "total_users": view["total_users"]
+            }
+
         all_users = {}
         
         # Собираем пользователей из stats.json каждого чата
@@ -1931,33 +2065,32 @@ async def get_global_leaderboard(limit: int = 50):
             stats_file = chat_dir / "stats.json"
             
             if stats_file.exists():
-                with open(stats_file, 'r', encoding='utf-8') as f:
-                    stats = json.load(f)
-                    user_activity = stats.get("user_activity", {})
+                stats = read_model.load_json(stats_file, {})
+                user_activity = stats.get("user_activity", {})
+                
+                for user_id, user_data in user_activity.items():
+                    if user_id not in all_users:
+                        all_users[user_id] = {
+                            "user_id": user_id,
+                            "name": user_data.get("name", f"User {user_id}"),
+                            "total_score": 0,
+                            "total_answered": 0,
+                            "max_consecutive_correct": 0,
+                            "chats": []
+                        }
                     
-                    for user_id, user_data in user_activity.items():
-                        if user_id not in all_users:
-                            all_users[user_id] = {
-                                "user_id": user_id,
-                                "name": user_data.get("name", f"User {user_id}"),
-                                "total_score": 0,
-                                "total_answered": 0,
-                                "max_consecutive_correct": 0,
-                                "chats": []
-                            }
-                        
-                        all_users[user_id]["total_score"] += user_data.get("score", 0)
-                        all_users[user_id]["total_answered"] += user_data.get("answered_count", 0)
-                        
-                        max_streak = user_data.get("max_consecutive_correct", 0)
-                        if max_streak > all_users[user_id]["max_consecutive_correct"]:
-                            all_users[user_id]["max_consecutive_correct"] = max_streak
-                        
-                        all_users[user_id]["chats"].append({
-                            "chat_id": chat_id,
-                            "score": round(user_data.get("score", 0), 1),
-                            "answered": user_data.get("answered_count", 0)
-                        })
+                    all_users[user_id]["total_score"] += user_data.get("score", 0)
+                    all_users[user_id]["total_answered"] += user_data.get("answered_count", 0)
+                    
+                    max_streak = user_data.get("max_consecutive_correct", 0)
+                    if max_streak > all_users[user_id]["max_consecutive_correct"]:
+                        all_users[user_id]["max_consecutive_correct"] = max_streak
+                    
+                    all_users[user_id]["chats"].append({
+                        "chat_id": chat_id,
+                        "score": round(user_data.get("score", 0), 1),
+                        "answered": user_data.get("answered_count", 0)
+                    })
         
         # Сортируем по баллам
         users_list = list(all_users.values())
@@ -2000,112 +2133,107 @@ async def get_chat_detailed(chat_id: str):
         # Загружаем настройки
         settings_file = chat_dir / "settings.json"
         if settings_file.exists():
-            with open(settings_file, 'r', encoding='utf-8') as f:
-                settings = json.load(f)
-                result["chat_name"] = settings.get("title", f"Чат {chat_id}")
-                daily_quiz = settings.get("daily_quiz", {})
-                result["daily_quiz_enabled"] = daily_quiz.get("enabled", False)
-
-                # Форматируем времена
-                times = daily_quiz.get("times_msk", [])
-                formatted_times = []
-                for t in times:
-                    if isinstance(t, dict):
-                        h = str(t.get("hour", 0)).zfill(2)
-                        m = str(t.get("minute", 0)).zfill(2)
-                        formatted_times.append(f"{h}:{m}")
-                    else:
-                        formatted_times.append(str(t))
-                result["daily_quiz_times"] = formatted_times
+            settings = read_model.load_json(settings_file, {})
+            result["chat_name"] = settings.get("title", f"Чат {chat_id}")
+            daily_quiz = settings.get("daily_quiz", {})
+            result["daily_quiz_enabled"] = daily_quiz.get("enabled", False)
+
+            # Форматируем времена
+            times = daily_quiz.get("times_msk", [])
+            formatted_times = []
+            for t in times:
+                if isinstance(t, dict):
+                    h = str(t.get("hour", 0)).zfill(2)
+                    m = str(t.get("minute", 0)).zfill(2)
+                    formatted_times.append(f"{h}:{m}")
+                else:
+                    formatted_times.append(str(t))
+            result["daily_quiz_times"] = formatted_times
 
         # Загружаем статистику
         stats_file = chat_dir / "stats.json"
         if stats_file.exists():
-            with open(stats_file, 'r', encoding='utf-8') as f:
-                stats = json.load(f)
-                result["user_count"] = stats.get("total_users", 0)
-                result["total_quizzes"] = stats.get("total_quizzes", 0)
-
-                # Формируем топ пользователей
-                user_activity = stats.get("user_activity", {})
-                users_list = []
-
-                for user_id, user_data in user_activity.items():
-                    users_list.append({
-                        "user_id": user_id,
-                        "name": user_data.get("name", f"User {user_id}"),
-                        "total_score": round(user_data.get("score", 0), 1)
-                    })
+            stats = read_model.load_json(stats_file, {})
+            result["user_count"] = stats.get("total_users", 0)
+            result["total_quizzes"] = stats.get("total_quizzes", 0)
+
+            # Формируем топ пользователей
+            user_activity = stats.get("user_activity", {})
+            users_list = []
+
+            for user_id, user_data in user_activity.items():
+                users_list.append({
+                    "user_id": user_id,
+                    "name": user_data.get("name", f"User {user_id}"),
+                    "total_score": round(user_data.get("score", 0), 1)
+                })
 
-                # Сортируем по баллам
-                users_list.sort(key=lambda x: x["total_score"], reverse=True)
-                result["top_users"] = users_list
+            # Сортируем по баллам
+            users_list.sort(key=lambda x: x["total_score"], reverse=True)
+            result["top_users"] = users_list
 
         # Загружаем статистику категорий с весами
         categories_stats_file = chat_dir / "categories_stats.json"
         if categories_stats_file.exists():
-            with open(categories_stats_file, 'r', encoding='utf-8') as f:
-                cat_stats = json.load(f)
+            cat_stats = read_model.load_json(categories_stats_file, {})
 
-                # Получаем веса категорий для данного чата
-                try:
-                    import sys
-                    sys.path.insert(0, str(BASE_DIR))
-                    from app_config import AppConfig
-                    from state import BotState
-                    from data_manager import DataManager
-                    from modules.category_manager import CategoryManager
-
-                    app_config = AppConfig()
-                    bot_state = BotState(app_config)
-                    data_manager = DataManager(app_config)
-                    category_manager = CategoryManager(bot_state, app_config, data_manager)
-
-                    # Получаем веса категорий
-                    weights_info = category_manager.get_category_weights_for_chat(chat_id)
-
-                    # Создаем словарь для быстрого поиска весов
-                    weights_dict = {w["name"]: w for w in weights_info}
-
-                    # Формируем список категорий с полной информацией
-                    cat_list = []
-                    for cat_name, cat_data in cat_stats.items():
-                        chat_usage = cat_data.get("chat_usage", 0)
-                        if isinstance(chat_usage, dict):
-                            chat_usage = sum(chat_usage.values())
-
-                        weight_data = weights_dict.get(cat_name, {})
-
-                        cat_list.append({
-                            "name": cat_name,
-                            "usage": int(chat_usage),
-                            "total_questions": cat_data.get("total_questions", 0),
-                            "weight": round(weight_data.get("weight", 0), 2),
-                            "excluded": weight_data.get("excluded", False),
-                            "days_since_use": round(weight_data.get("days_since_use", 0), 1)
-                        })
+            # Получаем веса категорий для данного чата
+            try:
+                from app_config import AppConfig
+                from state import BotState
+                from data_manager import DataManager
+                from modules.category_manager import CategoryManager
 
-                    # Сортируем по использованию
-                    cat_list.sort(key=lambda x: x["usage"], reverse=True)
-                    result["categories_stats"] = cat_list
+                app_config = AppConfig()
+                bot_state = BotState(app_config)
+                data_manager = DataManager(app_config)
+                category_manager = CategoryManager(bot_state, app_config, data_manager)
 
-                except Exception as e:
-                    logger.warning(f"Не удалось загрузить веса категорий для чата {chat_id}: {e}")
-                    # Продолжаем без весов - базовая статистика
-                    cat_list = []
-                    for cat_name, cat_data in cat_stats.items():
-                        chat_usage = cat_data.get("chat_usage", 0)
-                        if isinstance(chat_usage, dict):
-                            chat_usage = sum(chat_usage.values())
-
-                        cat_list.append({
-                            "name": cat_name,
-                            "usage": int(chat_usage),
-                            "total_questions": cat_data.get("total_questions", 0)
-                        })
+                # Получаем веса категорий
+                weights_info = category_manager.get_category_weights_for_chat(chat_id)
 
-                    cat_list.sort(key=lambda x: x["usage"], reverse=True)
-                    result["categories_stats"] = cat_list
+                # Создаем словарь для быстрого поиска весов
+                weights_dict = {w["name"]: w for w in weights_info}
+
+                # Формируем список категорий с полной информацией
+                cat_list = []
+                for cat_name, cat_data in cat_stats.items():
+                    chat_usage = cat_data.get("chat_usage", 0)
+                    if isinstance(chat_usage, dict):
+                        chat_usage = sum(chat_usage.values())
+
+                    weight_data = weights_dict.get(cat_name, {})
+
+                    cat_list.append({
+                        "name": cat_name,
+                        "usage": int(chat_usage),
+                        "total_questions": cat_data.get("total_questions", 0),
+                        "weight": round(weight_data.get("weight", 0), 2),
+                        "excluded": weight_data.get("excluded", False),
+                        "days_since_use": round(weight_data.get("days_since_use", 0), 1)
+                    })
+
+                # Сортируем по использованию
+                cat_list.sort(key=lambda x: x["usage"], reverse=True)
+                result["categories_stats"] = cat_list
+
+            except Exception as e:
+                logger.warning(f"Не удалось загрузить веса категорий для чата {chat_id}: {e}")
+                # Продолжаем без весов - базовая статистика
+                cat_list = []
+                for cat_name, cat_data in cat_stats.items():
+                    chat_usage = cat_data.get("chat_usage", 0)
+                    if isinstance(chat_usage, dict):
+                        chat_usage = sum(chat_usage.values())
+
+                    cat_list.append({
+                        "name": cat_name,
+                        "usage": int(chat_usage),
+                        "total_questions": cat_data.get("total_questions", 0)
+                    })
+
+                cat_list.sort(key=lambda x: x["usage"], reverse=True)
+                result["categories_stats"] = cat_list
         else:
             result["categories_stats"] = []
 
@@ -2132,21 +2260,19 @@ async def get_system_status():
         maintenance_file = DATA_DIR / "maintenance_status.json"
         if maintenance_file.exists():
             try:
-                with open(maintenance_file, 'r', encoding='utf-8') as f:
-                    maint_data = json.load(f)
-                    if maint_data.get("maintenance_mode", False):
-                        result["bot_mode"] = "maintenance"
-                        result["maintenance_reason"] = maint_data.get("reason", "Техническое обслуживание")
+                maint_data = read_model.load_json(maintenance_file, {})
+                if maint_data.get("maintenance_mode", False):
+                    result["bot_mode"] = "maintenance"
+                    result["maintenance_reason"] = maint_data.get("reason", "Техническое обслуживание")
             except:
                 pass
         
         # Если режим не maintenance, проверяем bot_mode.json
         if result["bot_mode"] == "main" and BOT_MODE_FILE.exists():
             try:
-                with open(BOT_MODE_FILE, 'r', encoding='utf-8') as f:
-                    mode_data = json.load(f)
-                    result["bot_mode"] = mode_data.get("mode", "main")
-                    result["maintenance_reason"] = mode_data.get("reason", "")
+                mode_data = read_model.load_json(BOT_MODE_FILE, {})
+                result["bot_mode"] = mode_data.get("mode", "main")
+                result["maintenance_reason"] = mode_data.get("reason", "")
             except:
                 pass
         
@@ -2154,21 +2280,17 @@ async def get_system_status():
         result["bot_enabled"] = check_bot_service_status()
         
         # Активные викторины
-        active_quizzes_file = DATA_DIR / "active_quizzes.json"
-        active_quizzes_count = 0
-        if active_quizzes_file.exists():
-            try:
-                with open(active_quizzes_file, 'r', encoding='utf-8') as f:
-                    active_data = json.load(f)
-                    active_quizzes = active_data.get("active_quizzes", {})
-                    if isinstance(active_quizzes, dict):
-                        active_quizzes_count = len(active_quizzes)
-                    elif isinstance(active_quizzes, list):
-                        active_quizzes_count = len(active_quizzes)
-            except Exception as e:
-                if logger:
-                    logger.warning(f"Ошибка чтения active_quizzes.json: {e}")
-        result["active_quizzes_count"] = active_quizzes_count
+        result["active_quizzes_count"] = count_active_quizzes()
+
+        # Последний запуск очистки сообщений
+        result["last_cleanup"] = load_cleanup_metrics().get("last_run")
+
+        # Эффективность кэша модели чтения
+        result["read_model_cache"] = read_model.get_stats()
+
+        # Индекс логов: только если к /api/logs уже обращались
+        if _log_index is not None:
+            result["log_index"] = _log_index.get_stats()
         
         # Подписки на ежедневные викторины - считаем чаты с включенными ежедневными викторинами
         daily_subscriptions = 0
@@ -2181,11 +2303,10 @@ async def get_system_status():
                 settings_file = chat_dir / "settings.json"
                 if settings_file.exists():
                     try:
-                        with open(settings_file, 'r', encoding='utf-8') as f:
-                            settings = json.load(f)
-                            daily_quiz = settings.get("daily_quiz", {})
-                            if isinstance(daily_quiz, dict) and daily_quiz.get("enabled", False):
-                                daily_subscriptions += 1
+                        settings = read_model.load_json(settings_file, {})
+                        daily_quiz = settings.get("daily_quiz", {})
+                        if isinstance(daily_quiz, dict) and daily_quiz.get("enabled", False):
+                            daily_subscriptions += 1
                     except Exception as e:
                         if logger:
                             logger.debug(f"Ошибка чтения настроек чата {chat_dir.name}: {e}")
@@ -2195,13 +2316,12 @@ async def get_system_status():
             subscriptions_file = SYSTEM_DIR / "daily_quiz_subscriptions.json"
             if subscriptions_file.exists():
                 try:
-                    with open(subscriptions_file, 'r', encoding='utf-8') as f:
-                        subs_data = json.load(f)
-                        if isinstance(subs_data, dict) and subs_data:
-                            # Если файл содержит данные, используем его как приоритетный источник
-                            file_count = len([k for k, v in subs_data.items() if v])
-                            if file_count > 0:
-                                daily_subscriptions = file_count
+                    subs_data = read_model.load_json(subscriptions_file, {})
+                    if isinstance(subs_data, dict) and subs_data:
+                        # Если файл содержит данные, используем его как приоритетный источник
+                        file_count = len([k for k, v in subs_data.items() if v])
+                        if file_count > 0:
+                            daily_subscriptions = file_count
                 except Exception as e:
                     if logger:
                         logger.debug(f"Ошибка чтения файла подписок: {e}")
@@ -2217,6 +2337,11 @@ async def get_system_status():
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Ошибка: {str(e)}")
 
+@app.get("/api/system/cleanup-metrics")
+async def get_cleanup_metrics():
+    """Метрики последних запусков очистки сообщений: удалено, ошибок, осталось, длительность"""
+    return load_cleanup_metrics()
+
 @app.post("/api/system/mode")
 async def set_system_mode(mode: str, reason: Optional[str] = None):
     """Установить режим работы бота"""
@@ -2867,8 +2992,7 @@ async def get_analytics_summary():
         category_stats = []
         
         for cat_name in categories:
-            questions = load_category_questions(cat_name)
-            count = len(questions)
+            count = count_category_questions(cat_name)
             total_questions += count
             category_stats.append({
                 "name": cat_name,
@@ -2901,31 +3025,29 @@ async def get_analytics_summary():
             }
             
             if settings_file.exists():
-                with open(settings_file, 'r', encoding='utf-8') as f:
-                    settings = json.load(f)
-                    chat_info["title"] = settings.get("title", chat_info["title"])
-                    chat_info["daily_enabled"] = settings.get("daily_quiz", {}).get("enabled", False)
+                settings = read_model.load_json(settings_file, {})
+                chat_info["title"] = settings.get("title", chat_info["title"])
+                chat_info["daily_enabled"] = settings.get("daily_quiz", {}).get("enabled", False)
             
             if stats_file.exists():
-                with open(stats_file, 'r', encoding='utf-8') as f:
-                    stats = json.load(f)
-                    chat_info["users"] = stats.get("total_users", 0)
-                    chat_info["answered"] = stats.get("total_answered", 0)
-                    chat_info["score"] = round(stats.get("total_score", 0), 1)
-                    
-                    total_answered_all += chat_info["answered"]
-                    total_score_all += chat_info["score"]
-                    
-                    # Собираем пользователей
-                    for user_id, user_data in stats.get("user_activity", {}).items():
-                        if user_id not in all_users:
-                            all_users[user_id] = {
-                                "name": user_data.get("name", f"User {user_id}"),
-                                "score": 0,
-                                "answered": 0
-                            }
-                        all_users[user_id]["score"] += user_data.get("score", 0)
-                        all_users[user_id]["answered"] += user_data.get("answered_count", 0)
+                stats = read_model.load_json(stats_file, {})
+                chat_info["users"] = stats.get("total_users", 0)
+                chat_info["answered"] = stats.get("total_answered", 0)
+                chat_info["score"] = round(stats.get("total_score", 0), 1)
+                
+                total_answered_all += chat_info["answered"]
+                total_score_all += chat_info["score"]
+                
+                # Собираем пользователей
+                for user_id, user_data in stats.get("user_activity", {}).items():
+                    if user_id not in all_users:
+                        all_users[user_id] = {
+                            "name": user_data.get("name", f"User {user_id}"),
+                            "score": 0,
+                            "answered": 0
+                        }
+                    all_users[user_id]["score"] += user_data.get("score", 0)
+                    all_users[user_id]["answered"] += user_data.get("answered_count", 0)
             
             chats_stats.append(chat_info)
         
@@ -2941,8 +3063,7 @@ async def get_analytics_summary():
         # Photo quiz
         photo_count = 0
         if PHOTO_QUIZ_METADATA.exists():
-            with open(PHOTO_QUIZ_METADATA, 'r', encoding='utf-8') as f:
-                photo_count = len(json.load(f))
+            photo_count = read_model.count_items(PHOTO_QUIZ_METADATA)
         
         return {
             "overview": {
@@ -2984,65 +3105,63 @@ async def get_all_users_full():
             chat_title = f"Чат {chat_id}"
             if settings_file.exists():
                 try:
-                    with open(settings_file, 'r', encoding='utf-8') as f:
-                        settings = json.load(f)
-                        chat_title = settings.get("title", chat_title)
+                    settings = read_model.load_json(settings_file, {})
+                    chat_title = settings.get("title", chat_title)
                 except:
                     pass
             
             if stats_file.exists():
-                with open(stats_file, 'r', encoding='utf-8') as f:
-                    stats = json.load(f)
-                    user_activity = stats.get("user_activity", {})
+                stats = read_model.load_json(stats_file, {})
+                user_activity = stats.get("user_activity", {})
+                
+                for user_id, user_data in user_activity.items():
+                    if user_id not in all_users:
+                        all_users[user_id] = {
+                            "user_id": user_id,
+                            "name": user_data.get("name", f"User {user_id}"),
+                            "total_score": 0,
+                            "total_answered": 0,
+                            "max_streak": 0,
+                            "streak_achievements": 0,
+                            "first_activity": None,
+                            "last_activity": None,
+                            "chats_activity": []
+                        }
                     
-                    for user_id, user_data in user_activity.items():
-                        if user_id not in all_users:
-                            all_users[user_id] = {
-                                "user_id": user_id,
-                                "name": user_data.get("name", f"User {user_id}"),
-                                "total_score": 0,
-                                "total_answered": 0,
-                                "max_streak": 0,
-                                "streak_achievements": 0,
-                                "first_activity": None,
-                                "last_activity": None,
-                                "chats_activity": []
-                            }
-                        
-                        # Агрегируем данные
-                        all_users[user_id]["total_score"] += user_data.get("score", 0)
-                        all_users[user_id]["total_answered"] += user_data.get("answered_count", 0)
-                        all_users[user_id]["streak_achievements"] += user_data.get("streak_achievements_count", 0)
-                        
-                        # Максимальная серия
-                        max_consec = user_data.get("max_consecutive_correct", 0)
-                        if max_consec > all_users[user_id]["max_streak"]:
-                            all_users[user_id]["max_streak"] = max_consec
-                        
-                        # Даты активности
-                        first_ans = user_data.get("first_answer")
-                        last_ans = user_data.get("last_answer")
-                        
-                        if first_ans:
-                            if all_users[user_id]["first_activity"] is None or first_ans < all_users[user_id]["first_activity"]:
-                                all_users[user_id]["first_activity"] = first_ans
-                        
-                        if last_ans:
-                            if all_users[user_id]["last_activity"] is None or last_ans > all_users[user_id]["last_activity"]:
-                                all_users[user_id]["last_activity"] = last_ans
-                        
-                        # Активность в чате
-                        all_users[user_id]["chats_activity"].append({
-                            "chat_id": chat_id,
-                            "chat_title": chat_title,
-                            "score": round(user_data.get("score", 0), 2),
-                            "answered_count": user_data.get("answered_count", 0),
-                            "consecutive_correct": user_data.get("consecutive_correct", 0),
-                            "max_consecutive_correct": user_data.get("max_consecutive_correct", 0),
-                            "first_answer": user_data.get("first_answer"),
-                            "last_answer": user_data.get("last_answer"),
-                            "streak_achievements_count": user_data.get("streak_achievements_count", 0)
-                        })
+                    # Агрегируем данные
+                    all_users[user_id]["total_score"] += user_data.get("score", 0)
+                    all_users[user_id]["total_answered"] += user_data.get("answered_count", 0)
+                    all_users[user_id]["streak_achievements"] += user_data.get("streak_achievements_count", 0)
+                    
+                    # Максимальная серия
+                    max_consec = user_data.get("max_consecutive_correct", 0)
+                    if max_consec > all_users[user_id]["max_streak"]:
+                        all_users[user_id]["max_streak"] = max_consec
+                    
+                    # Даты активности
+                    first_ans = user_data.get("first_answer")
+                    last_ans = user_data.get("last_answer")
+                    
+                    if first_ans:
+                        if all_users[user_id]["first_activity"] is None or first_ans < all_users[user_id]["first_activity"]:
+                            all_users[user_id]["first_activity"] = first_ans
+                    
+                    if last_ans:
+                        if all_users[user_id]["last_activity"] is None or last_ans > all_users[user_id]["last_activity"]:
+                            all_users[user_id]["last_activity"] = last_ans
+                    
+                    # Активность в чате
+                    all_users[user_id]["chats_activity"].append({
+                        "chat_id": chat_id,
+                        "chat_title": chat_title,
+                        "score": round(user_data.get("score", 0), 2),
+                        "answered_count": user_data.get("answered_count", 0),
+                        "consecutive_correct": user_data.get("consecutive_correct", 0),
+                        "max_consecutive_correct": user_data.get("max_consecutive_correct", 0),
+                        "first_answer": user_data.get("first_answer"),
+                        "last_answer": user_data.get("last_answer"),
+                        "streak_achievements_count": user_data.get("streak_achievements_count", 0)
+                    })
         
         # Сортируем по баллам
         users_list = list(all_users.values())
@@ -3149,82 +3268,79 @@ async def get_user_details(user_id: str):
             chat_title = f"Чат {chat_id}"
             if settings_file.exists():
                 try:
-                    with open(settings_file, 'r', encoding='utf-8') as f:
-                        settings = json.load(f)
-                        chat_title = settings.get("title", chat_title)
+                    settings = read_model.load_json(settings_file, {})
+                    chat_title = settings.get("title", chat_title)
                 except:
                     pass
             
             # Статистика из stats.json
             if stats_file.exists():
-                with open(stats_file, 'r', encoding='utf-8') as f:
-                    stats = json.load(f)
-                    user_activity = stats.get("user_activity", {})
+                stats = read_model.load_json(stats_file, {})
+                user_activity = stats.get("user_activity", {})
+                
+                if user_id in user_activity:
+                    found = True
+                    activity = user_activity[user_id]
                     
-                    if user_id in user_activity:
-                        found = True
-                        activity = user_activity[user_id]
-                        
-                        if user_data["name"] is None:
-                            user_data["name"] = activity.get("name", f"User {user_id}")
-                        
-                        user_data["total_score"] += activity.get("score", 0)
-                        user_data["total_answered"] += activity.get("answered_count", 0)
-                        user_data["streak_achievements"] += activity.get("streak_achievements_count", 0)
-                        
-                        max_consec = activity.get("max_consecutive_correct", 0)
-                        if max_consec > user_data["max_streak"]:
-                            user_data["max_streak"] = max_consec
-                        
-                        first_ans = activity.get("first_answer")
-                        last_ans = activity.get("last_answer")
-                        
-                        if first_ans:
-                            if user_data["first_activity"] is None or first_ans < user_data["first_activity"]:
-                                user_data["first_activity"] = first_ans
-                        
-                        if last_ans:
-                            if user_data["last_activity"] is None or last_ans > user_data["last_activity"]:
-                                user_data["last_activity"] = last_ans
-                        
-                        chat_activity = {
-                            "chat_id": chat_id,
-                            "chat_title": chat_title,
-                            "score": round(activity.get("score", 0), 2),
-                            "answered_count": activity.get("answered_count", 0),
-                            "consecutive_correct": activity.get("consecutive_correct", 0),
-                            "max_consecutive_correct": activity.get("max_consecutive_correct", 0),
-                            "first_answer": activity.get("first_answer"),
-                            "last_answer": activity.get("last_answer"),
-                            "streak_achievements_count": activity.get("streak_achievements_count", 0)
-                        }
-                        user_data["chats_activity"].append(chat_activity)
+                    if user_data["name"] is None:
+                        user_data["name"] = activity.get("name", f"User {user_id}")
+                    
+                    user_data["total_score"] += activity.get("score", 0)
+                    user_data["total_answered"] += activity.get("answered_count", 0)
+                    user_data["streak_achievements"] += activity.get("streak_achievements_count", 0)
+                    
+                    max_consec = activity.get("max_consecutive_correct", 0)
+                    if max_consec > user_data["max_streak"]:
+                        user_data["max_streak"] = max_consec
+                    
+                    first_ans = activity.get("first_answer")
+                    last_ans = activity.get("last_answer")
+                    
+                    if first_ans:
+                        if user_data["first_activity"] is None or first_ans < user_data["first_activity"]:
+                            user_data["first_activity"] = first_ans
+                    
+                    if last_ans:
+                        if user_data["last_activity"] is None or last_ans > user_data["last_activity"]:
+                            user_data["last_activity"] = last_ans
+                    
+                    chat_activity = {
+                        "chat_id": chat_id,
+                        "chat_title": chat_title,
+                        "score": round(activity.get("score", 0), 2),
+                        "answered_count": activity.get("answered_count", 0),
+                        "consecutive_correct": activity.get("consecutive_correct", 0),
+                        "max_consecutive_correct": activity.get("max_consecutive_correct", 0),
+                        "first_answer": activity.get("first_answer"),
+                        "last_answer": activity.get("last_answer"),
+                        "streak_achievements_count": activity.get("streak_achievements_count", 0)
+                    }
+                    user_data["chats_activity"].append(chat_activity)
             
             # Количество отвеченных опросов из users.json + ачивки
             if users_file.exists():
                 try:
-                    with open(users_file, 'r', encoding='utf-8') as f:
-                        users = json.load(f)
-                        if user_id in users:
-                            user_info = users[user_id]
-                            polls = user_info.get("answered_polls", [])
-                            user_data["answered_polls_count"] += len(polls)
-                            
-                            # Собираем ачивки
-                            milestones = user_info.get("milestones_achieved", [])
-                            
-                            if isinstance(milestones, (list, set)):
-                                for milestone_id in milestones:
-                                    try:
-                                        decoded = decode_achievement(milestone_id)
-                                        if decoded:
-                                            decoded["chat_id"] = chat_id
-                                            decoded["chat_title"] = chat_title
-                                            user_data["achievements"].append(decoded)
-                                    except Exception as e:
-                                        if logger:
-                                            logger.warning(f"Ошибка декодирования ачивки {milestone_id}: {e}")
-                                        continue
+                    users = read_model.load_json(users_file, {})
+                    if user_id in users:
+                        user_info = users[user_id]
+                        polls = user_info.get("answered_polls", [])
+                        user_data["answered_polls_count"] += len(polls)
+                        
+                        # Собираем ачивки
+                        milestones = user_info.get("milestones_achieved", [])
+                        
+                        if isinstance(milestones, (list, set)):
+                            for milestone_id in milestones:
+                                try:
+                                    decoded = decode_achievement(milestone_id)
+                                    if decoded:
+                                        decoded["chat_id"] = chat_id
+                                        decoded["chat_title"] = chat_title
+                                        user_data["achievements"].append(decoded)
+                                except Exception as e:
+                                    if logger:
+                                        logger.warning(f"Ошибка декодирования ачивки {milestone_id}: {e}")
+                                    continue
                 except Exception as e:
                     if logger:
                         logger.error(f"Ошибка при чтении ачивок пользователя {user_id} из {chat_id}: {e}")
@@ -3234,34 +3350,33 @@ async def get_user_details(user_id: str):
         global_users_file = GLOBAL_DIR / "users.json"
         if global_users_file.exists():
             try:
-                with open(global_users_file, 'r', encoding='utf-8') as f:
-                    global_users = json.load(f)
+                global_users = read_model.load_json(global_users_file, {})
+                
+                if user_id in global_users:
+                    global_user = global_users[user_id]
                     
-                    if user_id in global_users:
-                        global_user = global_users[user_id]
-                        
-                        # Глобальные ачивки
-                        global_milestones = global_user.get("milestones_achieved", [])
-                        
-                        if isinstance(global_milestones, (list, set)):
-                            for milestone_id in global_milestones:
-                                try:
-                                    # Проверяем, не добавили ли мы уже эту ачивку из конкретного чата
-                                    already_added = any(
-                                        a.get("description", "").endswith(milestone_id.split("_")[-1]) and 
-                                        milestone_id.split("_")[0] in a.get("description", "") 
-                                        for a in user_data["achievements"]
-                                    )
-                                    if not already_added:
-                                        decoded = decode_achievement(milestone_id)
-                                        if decoded:
-                                            decoded["chat_id"] = "global"
-                                            decoded["chat_title"] = "Глобальные"
-                                            user_data["achievements"].append(decoded)
-                                except Exception as e:
-                                    if logger:
-                                        logger.warning(f"Ошибка декодирования глобальной ачивки {milestone_id}: {e}")
-                                    continue
+                    # Глобальные ачивки
+                    global_milestones = global_user.get("milestones_achieved", [])
+                    
+                    if isinstance(global_milestones, (list, set)):
+                        for milestone_id in global_milestones:
+                            try:
+                                # Проверяем, не добавили ли мы уже эту ачивку из конкретного чата
+                                already_added = any(
+                                    a.get("description", "").endswith(milestone_id.split("_")[-1]) and 
+                                    milestone_id.split("_")[0] in a.get("description", "") 
+                                    for a in user_data["achievements"]
+                                )
+                                if not already_added:
+                                    decoded = decode_achievement(milestone_id)
+                                    if decoded:
+                                        decoded["chat_id"] = "global"
+                                        decoded["chat_title"] = "Глобальные"
+                                        user_data["achievements"].append(decoded)
+                            except Exception as e:
+                                if logger:
+                                    logger.warning(f"Ошибка декодирования глобальной ачивки {milestone_id}: {e}")
+                                continue
             except Exception as e:
                 if logger:
                     logger.error(f"Ошибка при чтении глобальных ачивок пользователя {user_id}: {e}", exc_info=True)
@@ -3309,9 +3424,8 @@ async def get_chat_full_info(chat_id: str):
         chats_index_file = GLOBAL_DIR / "chats_index.json"
         chat_meta = {}
         if chats_index_file.exists():
-            with open(chats_index_file, 'r', encoding='utf-8') as f:
-                chats_index = json.load(f)
-                chat_meta = chats_index.get(chat_id, {})
+            chats_index = read_model.load_json(chats_index_file, {})
+            chat_meta = chats_index.get(chat_id, {})
         
         result = {
             "chat_id": chat_id,
@@ -3332,110 +3446,105 @@ async def get_chat_full_info(chat_id: str):
         # Настройки
         settings_file = chat_dir / "settings.json"
         if settings_file.exists():
-            with open(settings_file, 'r', encoding='utf-8') as f:
-                settings = json.load(f)
-                result["settings"] = settings
-                result["title"] = settings.get("title", result["title"])
-                result["daily_quiz_config"] = settings.get("daily_quiz", {})
+            settings = read_model.load_json(settings_file, {})
+            result["settings"] = settings
+            result["title"] = settings.get("title", result["title"])
+            result["daily_quiz_config"] = settings.get("daily_quiz", {})
         
         # Статистика и пользователи
         stats_file = chat_dir / "stats.json"
         if stats_file.exists():
-            with open(stats_file, 'r', encoding='utf-8') as f:
-                stats = json.load(f)
-                result["stats"] = {
-                    "total_users": stats.get("total_users", 0),
-                    "total_score": round(stats.get("total_score", 0), 2),
-                    "total_answered": stats.get("total_answered", 0)
-                }
-                
-                # Пользователи с полной информацией
-                users_list = []
-                for user_id, user_data in stats.get("user_activity", {}).items():
-                    users_list.append({
-                        "user_id": user_id,
-                        "name": user_data.get("name", f"User {user_id}"),
-                        "score": round(user_data.get("score", 0), 2),
-                        "answered_count": user_data.get("answered_count", 0),
-                        "consecutive_correct": user_data.get("consecutive_correct", 0),
-                        "max_consecutive_correct": user_data.get("max_consecutive_correct", 0),
-                        "first_answer": user_data.get("first_answer"),
-                        "last_answer": user_data.get("last_answer"),
-                        "streak_achievements_count": user_data.get("streak_achievements_count", 0)
-                    })
-                
-                # Сортируем по баллам
-                users_list.sort(key=lambda x: x["score"], reverse=True)
-                for idx, user in enumerate(users_list):
-                    user["rank"] = idx + 1
-                
-                result["users"] = users_list
+            stats = read_model.load_json(stats_file, {})
+            result["stats"] = {
+                "total_users": stats.get("total_users", 0),
+                "total_score": round(stats.get("total_score", 0), 2),
+                "total_answered": stats.get("total_answered", 0)
+            }
+            
+            # Пользователи с полной информацией
+            users_list = []
+            for user_id, user_data in stats.get("user_activity", {}).items():
+                users_list.append({
+                    "user_id": user_id,
+                    "name": user_data.get("name", f"User {user_id}"),
+                    "score": round(user_data.get("score", 0), 2),
+                    "answered_count": user_data.get("answered_count", 0),
+                    "consecutive_correct": user_data.get("consecutive_correct", 0),
+                    "max_consecutive_correct": user_data.get("max_consecutive_correct", 0),
+                    "first_answer": user_data.get("first_answer"),
+                    "last_answer": user_data.get("last_answer"),
+                    "streak_achievements_count": user_data.get("streak_achievements_count", 0)
+                })
+            
+            # Сортируем по баллам
+            users_list.sort(key=lambda x: x["score"], reverse=True)
+            for idx, user in enumerate(users_list):
+                user["rank"] = idx + 1
+            
+            result["users"] = users_list
         
         # Статистика по категориям
         categories_stats_file = chat_dir / "categories_stats.json"
         if categories_stats_file.exists():
-            with open(categories_stats_file, 'r', encoding='utf-8') as f:
-                cat_stats = json.load(f)
-                # Преобразуем в список и сортируем
-                cat_list = []
-                for cat_name, cat_data in cat_stats.items():
-                    # Поддержка обоих форматов chat_usage
-                    chat_usage_data = cat_data.get("chat_usage", 0)
-                    if isinstance(chat_usage_data, dict):
-                        # Новый формат: берем значение для текущего чата или сумму всех
-                        chat_usage = sum(chat_usage_data.values())
-                    elif isinstance(chat_usage_data, (int, float)):
-                        # Старый формат: просто число
-                        chat_usage = int(chat_usage_data)
-                    else:
-                        chat_usage = 0
+            cat_stats = read_model.load_json(categories_stats_file, {})
+            # Преобразуем в список и сортируем
+            cat_list = []
+            for cat_name, cat_data in cat_stats.items():
+                # Поддержка обоих форматов chat_usage
+                chat_usage_data = cat_data.get("chat_usage", 0)
+                if isinstance(chat_usage_data, dict):
+                    # Новый формат: берем значение для текущего чата или сумму всех
+                    chat_usage = sum(chat_usage_data.values())
+                elif isinstance(chat_usage_data, (int, float)):
+                    # Старый формат: просто число
+                    chat_usage = int(chat_usage_data)
+                else:
+                    chat_usage = 0
 
-                    cat_list.append({
-                        "name": cat_name,
-                        "chat_usage": chat_usage,
-                        "last_used": cat_data.get("last_used", 0),
-                        "total_questions": cat_data.get("total_questions", 0)
-                    })
+                cat_list.append({
+                    "name": cat_name,
+                    "chat_usage": chat_usage,
+                    "last_used": cat_data.get("last_used", 0),
+                    "total_questions": cat_data.get("total_questions", 0)
+                })
 
-                # Добавляем веса категорий
-                try:
-                    import sys
-                    sys.path.insert(0, str(BASE_DIR))
-                    from app_config import AppConfig
-                    from state import BotState
-                    from data_manager import DataManager
-                    from modules.category_manager import CategoryManager
-
-                    app_config = AppConfig()
-                    bot_state = BotState(app_config)
-                    data_manager = DataManager(app_config)
-                    category_manager = CategoryManager(bot_state, app_config, data_manager)
-
-                    # Получаем веса категорий
-                    weights_info = category_manager.get_category_weights_for_chat(chat_id)
-
-                    # Создаем словарь для быстрого поиска весов
-                    weights_dict = {w["name"]: w for w in weights_info}
-
-                    # Обогащаем cat_list весами
-                    for cat in cat_list:
-                        cat_name = cat["name"]
-                        if cat_name in weights_dict:
-                            weight_data = weights_dict[cat_name]
-                            cat["weight"] = round(weight_data.get("weight", 0), 2)
-                            cat["excluded"] = weight_data.get("excluded", False)
-                            cat["days_since_use"] = round(weight_data.get("days_since_use", 0), 1)
-                        else:
-                            cat["weight"] = 0
-                            cat["excluded"] = False
-                            cat["days_since_use"] = 0
+            # Добавляем веса категорий
+            try:
+                from app_config import AppConfig
+                from state import BotState
+                from data_manager import DataManager
+                from modules.category_manager import CategoryManager
+
+                app_config = AppConfig()
+                bot_state = BotState(app_config)
+                data_manager = DataManager(app_config)
+                category_manager = CategoryManager(bot_state, app_config, data_manager)
+
+                # Получаем веса категорий
+                weights_info = category_manager.get_category_weights_for_chat(chat_id)
+
+                # Создаем словарь для быстрого поиска весов
+                weights_dict = {w["name"]: w for w in weights_info}
+
+                # Обогащаем cat_list весами
+                for cat in cat_list:
+                    cat_name = cat["name"]
+                    if cat_name in weights_dict:
+                        weight_data = weights_dict[cat_name]
+                        cat["weight"] = round(weight_data.get("weight", 0), 2)
+                        cat["excluded"] = weight_data.get("excluded", False)
+                        cat["days_since_use"] = round(weight_data.get("days_since_use", 0), 1)
+                    else:
+                        cat["weight"] = 0
+                        cat["excluded"] = False
+                        cat["days_since_use"] = 0
 
-                except Exception as e:
-                    logger.warning(f"Не удалось загрузить веса категорий для чата {chat_id}: {e}")
-                    # Продолжаем без весов
+            except Exception as e:
+                logger.warning(f"Не удалось загрузить веса категорий для чата {chat_id}: {e}")
+                # Продолжаем без весов
 
-                cat_list.sort(key=lambda x: x["chat_usage"], reverse=True)
-                result["categories_stats"] = cat_list
+            cat_list.sort(key=lambda x: x["chat_usage"], reverse=True)
+            result["categories_stats"] = cat_list
 
         return result
     
@@ -3450,6 +3559,25 @@ async def get_chat_full_info(chat_id: str):
 async def get_categories_usage():
     """Получить статистику использования категорий по всем чатам"""
     try:
+        view = load_analytics_view("categories")
+        if view is not None:
+            result = [
+                {
+                    "name": cat["name"],
+                    "total_usage": cat["usage"],
+                    "total_questions": count_category_questions(cat["name"]),
+                    # Время последнего использования бот ведет только по категории в целом
+                    "chats_used": [{"chat_id": chat_id, "usage": usage, "last_used": None} for chat_id, usage in cat["chat_usage"].items()],
+                    "last_used_global": cat["last_used"],
+                    "chats_count": cat["chats_count"]
+                }
+                for cat in view["categories"]
+            ]
+            return {
+                "categories": result,
+                "total": len(result)
+            }
+
         categories_usage = {}
         
         for chat_dir in CHATS_DIR.iterdir():
@@ -3460,42 +3588,41 @@ async def get_categories_usage():
             categories_stats_file = chat_dir / "categories_stats.json"
             
             if categories_stats_file.exists():
-                with open(categories_stats_file, 'r', encoding='utf-8') as f:
-                    cat_stats = json.load(f)
-                    
-                    for cat_name, cat_data in cat_stats.items():
-                        if cat_name not in categories_usage:
-                            # Поддержка обоих форматов: читаем global_usage (новый) или total_usage (старый)
-                            initial_usage = cat_data.get("global_usage", cat_data.get("total_usage", 0))
-
-                            categories_usage[cat_name] = {
-                                "name": cat_name,
-                                "total_usage": initial_usage,
-                                "total_questions": cat_data.get("total_questions", 0),
-                                "chats_used": [],
-                                "last_used_global": 0
-                            }
+                cat_stats = read_model.load_json(categories_stats_file, {})
+                
+                for cat_name, cat_data in cat_stats.items():
+                    if cat_name not in categories_usage:
+                        # Поддержка обоих форматов: читаем global_usage (новый) или total_usage (старый)
+                        initial_usage = cat_data.get("global_usage", cat_data.get("total_usage", 0))
 
-                        # Поддержка обоих форматов chat_usage: словарь (новый) или число (старый)
-                        chat_usage_data = cat_data.get("chat_usage", 0)
-                        if isinstance(chat_usage_data, dict):
-                            # Новый формат: словарь {"chat_id": count}
-                            usage = chat_usage_data.get(chat_id, 0)
-                        elif isinstance(chat_usage_data, (int, float)):
-                            # Старый формат: просто число
-                            usage = int(chat_usage_data)
-                        else:
-                            usage = 0
+                        categories_usage[cat_name] = {
+                            "name": cat_name,
+                            "total_usage": initial_usage,
+                            "total_questions": cat_data.get("total_questions", 0),
+                            "chats_used": [],
+                            "last_used_global": 0
+                        }
 
-                        categories_usage[cat_name]["chats_used"].append({
-                            "chat_id": chat_id,
-                            "usage": usage,
-                            "last_used": cat_data.get("last_used", 0)
-                        })
+                    # Поддержка обоих форматов chat_usage: словарь (новый) или число (старый)
+                    chat_usage_data = cat_data.get("chat_usage", 0)
+                    if isinstance(chat_usage_data, dict):
+                        # Новый формат: словарь {"chat_id": count}
+                        usage = chat_usage_data.get(chat_id, 0)
+                    elif isinstance(chat_usage_data, (int, float)):
+                        # Старый формат: просто число
+                        usage = int(chat_usage_data)
+                    else:
+                        usage = 0
+
+                    categories_usage[cat_name]["chats_used"].append({
+                        "chat_id": chat_id,
+                        "usage": usage,
+                        "last_used": cat_data.get("last_used", 0)
+                    })
 
-                        last_used = cat_data.get("last_used", 0)
-                        if last_used > categories_usage[cat_name]["last_used_global"]:
-                            categories_usage[cat_name]["last_used_global"] = last_used
+                    last_used = cat_data.get("last_used", 0)
+                    if last_used > categories_usage[cat_name]["last_used_global"]:
+                        categories_usage[cat_name]["last_used_global"] = last_used
         
         # Преобразуем в список
         result = list(categories_usage.values())
@@ -3526,10 +3653,9 @@ async def export_statistics():
         
         # Категории
         for cat_name in get_all_categories():
-            questions = load_category_questions(cat_name)
             export_data["categories"].append({
                 "name": cat_name,
-                "questions_count": len(questions)
+                "questions_count": count_category_questions(cat_name)
             })
         
         # Чаты и пользователи
@@ -4031,8 +4157,6 @@ async def get_logs(
         limit: Максимальное количество записей (по умолчанию 1000)
     """
     try:
-        import re
-        
         # Валидация уровня логирования - поддерживаем несколько уровней через запятую
         valid_levels = ['DEBUG', 'INFO', 'WARNING', 'ERROR', 'CRITICAL']
         levels_to_filter = None
@@ -4095,94 +4219,13 @@ async def get_logs(
                 "error": f"Директория логов не найдена: {LOGS_DIR}"
             }
         
-        # Получаем все лог-файлы
+        # Читаем только нужные участки файлов по индексу времени, с конца
         try:
-            log_files = sorted(LOGS_DIR.glob("bot_*.log"), key=lambda x: x.stat().st_mtime, reverse=True)
-        except Exception as e:
+            all_logs = get_log_index().query(since_dt, until_dt, levels_to_filter, limit)
+        except OSError as e:
             logger.error(f"Ошибка при получении списка лог-файлов: {e}")
             raise HTTPException(status_code=500, detail=f"Ошибка доступа к директории логов: {str(e)}")
         
-        all_logs = []
-        # levels_to_filter уже установлен выше, если level был передан
-        
-        # Паттерн для парсинга строк логов
-        # Формат: 2026-01-02 08:19:32,096 - modules.quiz_engine - ERROR - ...
-        log_line_pattern = re.compile(r'^(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}(?:,\d+)?)\s+-\s+(\S+)\s+-\s+(\w+)\s+-\s+(.*)$')
-        
-        for log_file in log_files:
-            try:
-                with open(log_file, 'r', encoding='utf-8') as f:
-                    for line_num, line in enumerate(f, 1):
-                        line = line.rstrip('\n\r')
-                        if not line.strip():
-                            continue
-                        
-                        # Парсим строку лога
-                        match = log_line_pattern.match(line)
-                        if match:
-                            timestamp_str, logger_name, log_level, message = match.groups()
-                            
-                            # Парсим timestamp
-                            try:
-                                # Убираем микросекунды если есть
-                                timestamp_str_clean = timestamp_str.replace(',', '.')
-                                if '.' in timestamp_str_clean:
-                                    log_dt = datetime.strptime(timestamp_str_clean, '%Y-%m-%d %H:%M:%S.%f')
-                                else:
-                                    log_dt = datetime.strptime(timestamp_str_clean, '%Y-%m-%d %H:%M:%S')
-                            except ValueError:
-                                continue
-                            
-                            # Фильтруем по уровню (поддерживаем несколько уровней)
-                            if levels_to_filter and log_level.upper() not in levels_to_filter:
-                                continue
-                            
-                            # Фильтруем по времени
-                            if since_dt and log_dt < since_dt:
-                                continue
-                            if until_dt and log_dt > until_dt:
-                                continue
-                            
-                            all_logs.append({
-                                "timestamp": log_dt.isoformat(),
-                                "level": log_level.upper(),
-                                "logger": logger_name,
-                                "message": message,
-                                "file": log_file.name,
-                                "line": line_num
-                            })
-                        else:
-                            # Если строка не соответствует паттерну, но содержит ERROR/CRITICAL, всё равно включаем
-                            if not levels_to_filter or any(lvl in ['ERROR', 'CRITICAL'] for lvl in levels_to_filter):
-                                if levels_to_filter and any(lvl in line.upper() for lvl in levels_to_filter):
-                                    # Пытаемся определить уровень из строки
-                                    detected_level = None
-                                    for lvl in levels_to_filter:
-                                        if lvl in line.upper():
-                                            detected_level = lvl
-                                            break
-                                    all_logs.append({
-                                        "timestamp": None,
-                                        "level": detected_level or (list(levels_to_filter)[0] if levels_to_filter else 'UNKNOWN'),
-                                        "logger": None,
-                                        "message": line,
-                                        "file": log_file.name,
-                                        "line": line_num
-                                    })
-                
-                # Если набрали достаточно логов, прерываем
-                if len(all_logs) >= limit * 2:  # Берем больше для сортировки
-                    break
-            except Exception as e:
-                logger.warning(f"Ошибка чтения лог-файла {log_file.name}: {e}")
-                continue
-        
-        # Сортируем по времени (новые первыми)
-        all_logs.sort(key=lambda x: x["timestamp"] if x["timestamp"] else "", reverse=True)
-        
-        # Ограничиваем количество
-        all_logs = all_logs[:limit]
-        
         return {
             "logs": all_logs,
             "total": len(all_logs),
@@ -4207,41 +4250,53 @@ class AdminMessageRequest(BaseModel):
     chat_ids: Optional[List[str]] = Field(None, description="Список ID чатов. Если пусто, отправляется во все чаты")
     send_to_all: bool = Field(False, description="Отправить во все чаты")
 
+# Сколько веб-панель ждет, пока бот отправит рассылку из очереди
+ADMIN_BROADCAST_WAIT_SECONDS = 60
+
+
+def admin_broadcast_queue():
+    from modules.admin_broadcast import BROADCASTS_DIR_NAME, AdminBroadcastQueue
+    return AdminBroadcastQueue(SYSTEM_DIR / BROADCASTS_DIR_NAME)
+
+
+def admin_broadcast_response(broadcast: Dict[str, Any]) -> Dict[str, Any]:
+    """Ответ в прежнем формате: results.success / results.failed, плюс чаты в очереди"""
+    from modules.admin_broadcast import STATUS_DONE, remaining_chat_ids
+
+    total = len(broadcast["chat_ids"])
+    sent = len(broadcast["success"])
+    done = broadcast["status"] == STATUS_DONE
+    message = f"Отправлено в {sent} из {total} чатов"
+    if not done:
+        message += ", остальные бот отправит из очереди"
+    return {
+        "success": True,
+        "broadcast_id": broadcast["id"],
+        "status": broadcast["status"],
+        "message": message,
+        "results": {
+            "total": total,
+            "success": broadcast["success"],
+            "failed": broadcast["failed"],
+            "queued": [] if done else remaining_chat_ids(broadcast),
+        }
+    }
+
+
 @app.post("/api/admin/send-message")
 async def send_admin_message(request: AdminMessageRequest):
-    """Отправить сообщение от админа в чаты"""
+    """
+    Отправить сообщение от админа в чаты.
+
+    Сообщения отправляет бот через общий планировщик запросов (единый лимит
+    Telegram на процесс бота): рассылка ставится в очередь, ответ содержит
+    результат, если бот успел отправить ее за ADMIN_BROADCAST_WAIT_SECONDS.
+    """
     try:
-        from telegram import Bot
         from telegram.constants import ParseMode
-        from modules.telegram_utils import safe_send_message
-        import sys
-        sys.path.insert(0, str(BASE_DIR))
+        from modules.admin_broadcast import STATUS_DONE
         from utils import escape_markdown_v2
         
-        # Получаем токен бота
-        bot_token = os.getenv("BOT_TOKEN")
-        
-        # Если токен не найден, пытаемся перезагрузить .env файл
-        if not bot_token:
-            try:
-                from dotenv import load_dotenv
-                BASE_DIR_FOR_ENV = Path(__file__).parent.parent
-                env_path = BASE_DIR_FOR_ENV / '.env'
-                if not env_path.exists():
-                    env_path = Path('.env')
-                if env_path.exists():
-                    load_dotenv(dotenv_path=env_path, override=True)
-                    bot_token = os.getenv("BOT_TOKEN")
-                    if bot_token:
-                        logger.info(f"BOT_TOKEN успешно загружен из {env_path.absolute()}")
-            except Exception as e:
-                logger.warning(f"Не удалось перезагрузить .env файл: {e}")
-        
-        if not bot_token:
-            raise HTTPException(status_code=500, detail="Токен бота не найден в переменных окружения. Убедитесь, что файл .env существует и содержит BOT_TOKEN")
-        
-        bot = Bot(token=bot_token)
-        
         # Определяем список чатов для отправки
         target_chat_ids = []
         
@@ -4263,42 +4318,35 @@ async def send_admin_message(request: AdminMessageRequest):
         
         if not target_chat_ids:
             raise HTTPException(status_code=400, detail="Не найдено чатов для отправки")
+
+        invalid_ids = [chat_id for chat_id in target_chat_ids if not str(chat_id).lstrip('-').isdigit()]
+        if invalid_ids:
+            raise HTTPException(status_code=400, detail=f"Некорректные ID чатов: {', '.join(map(str, invalid_ids))}")
         
         # Экранируем сообщение для Markdown V2
         try:
             escaped_message = escape_markdown_v2(request.message)
         except:
             escaped_message = request.message  # Если ошибка экранирования, отправляем как есть
-        
-        results = {
-            "total": len(target_chat_ids),
-            "success": [],
-            "failed": []
-        }
-        
-        # Отправляем сообщения
-        for chat_id in target_chat_ids:
-            try:
-                await safe_send_message(
-                    bot=bot,
-                    chat_id=int(chat_id),
-                    text=escaped_message,
-                    parse_mode=ParseMode.MARKDOWN_V2
-                )
-                results["success"].append(chat_id)
-            except Exception as e:
-                error_msg = str(e)
-                results["failed"].append({
-                    "chat_id": chat_id,
-                    "error": error_msg
-                })
-                logger.warning(f"Не удалось отправить сообщение в чат {chat_id}: {error_msg}")
-        
-        return {
-            "success": True,
-            "message": f"Отправлено в {len(results['success'])} из {len(target_chat_ids)} чатов",
-            "results": results
-        }
+
+        queue = admin_broadcast_queue()
+        broadcast_id = queue.submit(escaped_message, target_chat_ids, parse_mode=ParseMode.MARKDOWN_V2.value)
+        logger.info(f"Рассылка админа {broadcast_id} поставлена в очередь бота ({len(target_chat_ids)} чатов)")
+
+        broadcast = queue.load(broadcast_id)
+        if broadcast is None:
+            raise HTTPException(status_code=500, detail="Не удалось поставить рассылку в очередь")
+        if not check_bot_service_status():
+            # Рассылку отправит бот после запуска, ждать нечего
+            logger.warning(f"Рассылка админа {broadcast_id} ждет запуска бота")
+            return admin_broadcast_response(broadcast)
+
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + ADMIN_BROADCAST_WAIT_SECONDS
+        while broadcast["status"] != STATUS_DONE and loop.time() < deadline:
+            await asyncio.sleep(0.5)
+            broadcast = queue.load(broadcast_id) or broadcast
+        return admin_broadcast_response(broadcast)
     
     except HTTPException:
         raise
@@ -4306,6 +4354,15 @@ async def send_admin_message(request: AdminMessageRequest):
         logger.error(f"Ошибка отправки сообщений: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail=f"Ошибка отправки сообщений: {str(e)}")
 
+
+@app.get("/api/admin/broadcasts/{broadcast_id}")
+async def get_admin_broadcast(broadcast_id: str):
+    """Статус и результат рассылки админа из очереди бота"""
+    broadcast = admin_broadcast_queue().load(broadcast_id)
+    if broadcast is None:
+        raise HTTPException(status_code=404, detail="Рассылка не найдена")
+    return admin_broadcast_response(broadcast)
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
@@ -3536,6 +3536,11 @@ async function loadSettings() {
                                 <span>Подписок на ежедневные:</span>
                                 <strong>${status.daily_subscriptions || 0}</strong>
                             </div>
+                            ${status.last_cleanup ? `
+                            <div style="display: flex; justify-content: space-between; margin-top: 0.5rem;">
+                                <span>Последняя очистка (${escapeHtml(status.last_cleanup.started_at)}):</span>
+                                <strong>удалено ${status.last_cleanup.deleted}, ошибок ${status.last_cleanup.failed}, осталось ${status.last_cleanup.remaining}, ${status.last_cleanup.duration_seconds} с</strong>
+                            </div>` : ''}
                         </div>
                     </div>
                 </div>
@@ -4021,11 +4026,12 @@ async function sendAdminMessage() {
         const result = await response.json();
         const successCount = result.results?.success?.length || 0;
         const failedCount = result.results?.failed?.length || 0;
+        const queuedCount = result.results?.queued?.length || 0;
         const total = result.results?.total || 0;
         
         let resultHtml = `
             <div style="padding: 1rem; background: var(--bg-secondary); border-radius: 8px;">
-                <div style="font-weight: 600; margin-bottom: 0.5rem; color: ${successCount > 0 ? 'var(--success)' : 'var(--danger)'};">
+                <div style="font-weight: 600; margin-bottom: 0.5rem; color: ${successCount > 0 || queuedCount > 0 ? 'var(--success)' : 'var(--danger)'};">
                     ${result.message || `Отправлено: ${successCount}/${total}`}
                 </div>
         `;
@@ -4048,8 +4054,9 @@ async function sendAdminMessage() {
         resultHtml += '</div>';
         resultContainer.innerHTML = resultHtml;
         
-        if (successCount > 0) {
-            showToast(`Сообщение отправлено в ${successCount} чат(ов)`, 'success');
+        if (successCount > 0 || queuedCount > 0) {
+            const queuedNote = queuedCount > 0 ? `, в очереди бота: ${queuedCount}` : '';
+            showToast(`Сообщение отправлено в ${successCount} чат(ов)${queuedNote}`, 'success');
             // Очищаем поле сообщения после успешной отправки
             document.getElementById('adminMessageText').value = '';
         } else {